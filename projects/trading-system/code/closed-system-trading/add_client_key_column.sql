@@ -0,0 +1,15 @@
+-- Client-generated idempotency key per trade (write-behind journal, see trade_journal.py)
+-- The journal upserts OPENs on client_key and updates CLOSEs by client_key,
+-- so a retried or replayed flush never creates a duplicate row.
+ALTER TABLE trade_log
+ADD COLUMN IF NOT EXISTS client_key TEXT;
+
+ALTER TABLE paper_trade_log
+ADD COLUMN IF NOT EXISTS client_key TEXT;
+
+-- Existing rows get a key derived from their id
+UPDATE trade_log SET client_key = 'db-' || id WHERE client_key IS NULL;
+UPDATE paper_trade_log SET client_key = 'db-' || id WHERE client_key IS NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_trade_log_client_key ON trade_log(client_key);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_paper_trade_log_client_key ON paper_trade_log(client_key);
@@ -0,0 +1,4 @@
+-- Actual commissions for LIVE trades (user data stream / FULL order responses, see user_stream.py)
+-- paper_trade_log already has fee_usdt. OPEN rows hold the buy commission, CLOSED rows buy + sell.
+ALTER TABLE trade_log
+ADD COLUMN IF NOT EXISTS fee_usdt NUMERIC;
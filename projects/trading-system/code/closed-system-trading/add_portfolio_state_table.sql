@@ -0,0 +1,18 @@
+-- Running portfolio totals per symbol and mode (portfolio_ledger.py checkpoints)
+-- One row per (symbol, mode), upserted at most once a minute; keeps the peak
+-- equity and the max drawdown across restarts.
+CREATE TABLE IF NOT EXISTS portfolio_state (
+  id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  symbol TEXT NOT NULL,
+  mode TEXT NOT NULL CHECK (mode IN ('PAPER', 'LIVE')),
+  realized_pnl NUMERIC DEFAULT 0,
+  fees_paid NUMERIC DEFAULT 0,
+  open_trade_count INT DEFAULT 0,
+  open_quantity NUMERIC DEFAULT 0,
+  open_cost NUMERIC DEFAULT 0,
+  last_price NUMERIC,
+  peak_equity NUMERIC,
+  max_drawdown_pct NUMERIC DEFAULT 0,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL,
+  UNIQUE (symbol, mode)
+);
@@ -0,0 +1,40 @@
+-- Time-bucket rollups of portfolio_snapshots for the equity / drawdown charts (snapshot_series.py)
+-- One row per bucket in [p_from, p_to): the chart payload is set by the bucket count, not the history length.
+
+CREATE OR REPLACE FUNCTION snapshot_series(
+  p_symbol TEXT,
+  p_from TIMESTAMPTZ,
+  p_to TIMESTAMPTZ,
+  p_bucket_seconds INT
+)
+RETURNS TABLE (
+  bucket_time TIMESTAMPTZ,
+  equity_open NUMERIC,
+  equity_high NUMERIC,
+  equity_low NUMERIC,
+  equity_close NUMERIC,
+  drawdown_pct NUMERIC,       -- Worst current_drawdown_pct in the bucket
+  max_drawdown_pct NUMERIC,   -- Worst DD ever, as of the bucket
+  btc_price NUMERIC,          -- Last price in the bucket
+  samples BIGINT
+)
+LANGUAGE sql STABLE AS $$
+  SELECT
+    to_timestamp(floor(extract(epoch FROM s.snapshot_time) / greatest(p_bucket_seconds, 1)) * greatest(p_bucket_seconds, 1)) AS bucket_time,
+    (array_agg(s.total_equity_usdt ORDER BY s.snapshot_time))[1],
+    max(s.total_equity_usdt),
+    min(s.total_equity_usdt),
+    (array_agg(s.total_equity_usdt ORDER BY s.snapshot_time DESC))[1],
+    max(s.current_drawdown_pct),
+    max(s.max_drawdown_pct),
+    (array_agg(s.btc_price ORDER BY s.snapshot_time DESC))[1],
+    count(*)
+  FROM portfolio_snapshots s
+  WHERE s.symbol = p_symbol AND s.snapshot_time >= p_from AND s.snapshot_time < p_to
+  GROUP BY 1
+  ORDER BY 1;
+$$;
+
+-- Range scans without touching the table
+CREATE INDEX IF NOT EXISTS idx_snapshots_series
+  ON portfolio_snapshots(symbol, snapshot_time) INCLUDE (total_equity_usdt, current_drawdown_pct, max_drawdown_pct, btc_price);
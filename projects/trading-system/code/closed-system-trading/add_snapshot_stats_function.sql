@@ -0,0 +1,41 @@
+-- Snapshot aggregates in one round trip (snapshot_manager.fetch_snapshot_stats)
+-- Realized PnL, fees, open position totals, peak equity and the baseline of one
+-- symbol are summed in Postgres: the response is one row however long the trade
+-- history gets, and the API row limit (1000) can no longer truncate the totals.
+CREATE OR REPLACE FUNCTION snapshot_stats(p_symbol TEXT, p_paper BOOLEAN DEFAULT TRUE)
+RETURNS TABLE (
+  realized_pnl NUMERIC,
+  fees_paid NUMERIC,
+  open_trade_count BIGINT,
+  open_quantity NUMERIC,
+  open_cost NUMERIC,
+  peak_equity NUMERIC,
+  baseline_price NUMERIC,
+  initial_capital NUMERIC
+)
+LANGUAGE plpgsql STABLE AS $$
+BEGIN
+  RETURN QUERY EXECUTE format($q$
+    SELECT
+      coalesce(sum(t.pnl_usdt) FILTER (WHERE t.status = 'CLOSED'), 0),
+      coalesce(sum(t.fee_usdt), 0),
+      count(*) FILTER (WHERE t.status = 'OPEN'),
+      coalesce(sum(t.quantity) FILTER (WHERE t.status = 'OPEN'), 0),
+      coalesce(sum(t.entry_price * t.quantity) FILTER (WHERE t.status = 'OPEN'), 0),
+      (SELECT max(s.total_equity_usdt) FROM portfolio_snapshots s WHERE s.symbol = $1),
+      (SELECT b.baseline_price FROM baseline_prices b WHERE b.symbol = $1),
+      (SELECT b.initial_capital FROM baseline_prices b WHERE b.symbol = $1)
+    FROM %I t
+    WHERE t.symbol = $1 AND t.status IN ('OPEN', 'CLOSED')
+  $q$, CASE WHEN p_paper THEN 'paper_trade_log' ELSE 'trade_log' END)
+  USING p_symbol;
+END;
+$$;
+
+-- Index-only scans for the sums, and max(total_equity_usdt) as an index lookup
+CREATE INDEX IF NOT EXISTS idx_trade_log_snapshot_stats
+  ON trade_log(symbol, status) INCLUDE (pnl_usdt, fee_usdt, quantity, entry_price);
+CREATE INDEX IF NOT EXISTS idx_paper_trade_log_snapshot_stats
+  ON paper_trade_log(symbol, status) INCLUDE (pnl_usdt, fee_usdt, quantity, entry_price);
+CREATE INDEX IF NOT EXISTS idx_snapshots_symbol_equity
+  ON portfolio_snapshots(symbol, total_equity_usdt desc);
@@ -0,0 +1,16 @@
+-- Add a symbol dimension to trades and zones (multi-symbol engine, see supervisor.py)
+-- Existing rows belong to BTCUSDT, the only pair traded so far.
+ALTER TABLE trade_log
+ADD COLUMN IF NOT EXISTS symbol TEXT NOT NULL DEFAULT 'BTCUSDT';
+
+ALTER TABLE paper_trade_log
+ADD COLUMN IF NOT EXISTS symbol TEXT NOT NULL DEFAULT 'BTCUSDT';
+
+ALTER TABLE zones_config
+ADD COLUMN IF NOT EXISTS symbol TEXT NOT NULL DEFAULT 'BTCUSDT';
+
+-- Per-symbol lookups used by the position book and snapshots
+CREATE INDEX IF NOT EXISTS idx_trade_log_symbol_status ON trade_log(symbol, status);
+CREATE INDEX IF NOT EXISTS idx_paper_trade_log_symbol_status ON paper_trade_log(symbol, status);
+CREATE INDEX IF NOT EXISTS idx_zones_config_symbol_status ON zones_config(symbol, status);
+CREATE INDEX IF NOT EXISTS idx_snapshots_symbol_time ON portfolio_snapshots(symbol, snapshot_time desc);
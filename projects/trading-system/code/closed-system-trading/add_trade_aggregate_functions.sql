@@ -0,0 +1,66 @@
+-- Dashboard aggregates over the trade tables (trade_aggregates.py)
+-- One row per zone / per day instead of every trade row: the payload does not grow
+-- with the trade history and the API row limit (1000) cannot truncate the numbers.
+
+-- Per zone: invested (OPEN total_usdt), realized PnL (CLOSED), open / closed counts, fees
+CREATE OR REPLACE FUNCTION zone_stats(p_symbol TEXT, p_paper BOOLEAN DEFAULT TRUE)
+RETURNS TABLE (
+  zone_name TEXT,
+  invested NUMERIC,
+  realized_pnl NUMERIC,
+  open_count BIGINT,
+  closed_count BIGINT,
+  fees_paid NUMERIC
+)
+LANGUAGE plpgsql STABLE AS $$
+BEGIN
+  RETURN QUERY EXECUTE format($q$
+    SELECT
+      t.zone_name,
+      coalesce(sum(t.total_usdt) FILTER (WHERE t.status = 'OPEN'), 0),
+      coalesce(sum(t.pnl_usdt) FILTER (WHERE t.status = 'CLOSED'), 0),
+      count(*) FILTER (WHERE t.status = 'OPEN'),
+      count(*) FILTER (WHERE t.status = 'CLOSED'),
+      coalesce(sum(t.fee_usdt), 0)
+    FROM %I t
+    WHERE t.symbol = $1
+    GROUP BY t.zone_name
+  $q$, CASE WHEN p_paper THEN 'paper_trade_log' ELSE 'trade_log' END)
+  USING p_symbol;
+END;
+$$;
+
+-- Per day (UTC, by exit_at): realized PnL, fees and closed trades over the last p_days days
+CREATE OR REPLACE FUNCTION daily_pnl(p_symbol TEXT, p_paper BOOLEAN DEFAULT TRUE, p_days INT DEFAULT 90)
+RETURNS TABLE (
+  day DATE,
+  realized_pnl NUMERIC,
+  fees_paid NUMERIC,
+  closed_count BIGINT
+)
+LANGUAGE plpgsql STABLE AS $$
+BEGIN
+  RETURN QUERY EXECUTE format($q$
+    SELECT
+      (t.exit_at AT TIME ZONE 'utc')::date,
+      coalesce(sum(t.pnl_usdt), 0),
+      coalesce(sum(t.fee_usdt), 0),
+      count(*)
+    FROM %I t
+    WHERE t.symbol = $1 AND t.status = 'CLOSED' AND t.exit_at >= now() - make_interval(days => $2)
+    GROUP BY 1
+    ORDER BY 1
+  $q$, CASE WHEN p_paper THEN 'paper_trade_log' ELSE 'trade_log' END)
+  USING p_symbol, p_days;
+END;
+$$;
+
+-- Index-only scans for both functions
+CREATE INDEX IF NOT EXISTS idx_trade_log_zone_stats
+  ON trade_log(symbol, zone_name) INCLUDE (status, total_usdt, pnl_usdt, fee_usdt);
+CREATE INDEX IF NOT EXISTS idx_paper_trade_log_zone_stats
+  ON paper_trade_log(symbol, zone_name) INCLUDE (status, total_usdt, pnl_usdt, fee_usdt);
+CREATE INDEX IF NOT EXISTS idx_trade_log_daily_pnl
+  ON trade_log(symbol, exit_at) INCLUDE (pnl_usdt, fee_usdt) WHERE status = 'CLOSED';
+CREATE INDEX IF NOT EXISTS idx_paper_trade_log_daily_pnl
+  ON paper_trade_log(symbol, exit_at) INCLUDE (pnl_usdt, fee_usdt) WHERE status = 'CLOSED';
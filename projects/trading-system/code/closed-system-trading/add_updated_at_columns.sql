@@ -0,0 +1,29 @@
+-- Last-change stamp on the trade tables, for delta sync (delta_sync.py)
+-- The dashboard re-reads only rows with updated_at past the last one it saw.
+-- A trigger stamps every update (closes by the bot, AI results by n8n), so no writer has to set it.
+ALTER TABLE trade_log
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL;
+
+ALTER TABLE paper_trade_log
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL;
+
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+  NEW.updated_at = now();
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trade_log_set_updated_at ON trade_log;
+CREATE TRIGGER trade_log_set_updated_at BEFORE UPDATE ON trade_log
+  FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS paper_trade_log_set_updated_at ON paper_trade_log;
+CREATE TRIGGER paper_trade_log_set_updated_at BEFORE UPDATE ON paper_trade_log
+  FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+-- Delta queries: symbol = ? AND updated_at >= ? ORDER BY updated_at
+CREATE INDEX IF NOT EXISTS idx_trade_log_symbol_updated ON trade_log(symbol, updated_at);
+CREATE INDEX IF NOT EXISTS idx_paper_trade_log_symbol_updated ON paper_trade_log(symbol, updated_at);
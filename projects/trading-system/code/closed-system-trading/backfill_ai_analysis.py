@@ -51,7 +51,7 @@ def send_to_webhook(trade, mode):
         payload = {
             "trade_id": trade.get('id'),
             "mode": mode,
-            "pair": "BTCUSDT",
+            "pair": trade.get('symbol') or "BTCUSDT",
             "entry_price": float(trade.get('entry_price', 0)),
             "exit_price": float(trade.get('exit_price', 0) or 0),
             "quantity": float(trade.get('quantity', 0)),
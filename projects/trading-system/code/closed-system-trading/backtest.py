@@ -0,0 +1,544 @@
+"""
+Backtester (Grid + RSI + Regime)
+================================
+Replays historical 1m klines through the decision logic of start_bot, so a
+change to the grid step, TP, RSI limit or the BEAR_TREND rule can be
+evaluated on a year of data in seconds instead of weeks of PAPER trading.
+
+Same rules as the live loop (strategy.py, zone_index.py, grid_index.ZoneGrid):
+  - one decision per LOOP_INTERVAL, i.e. at every 1m close, price = the close
+  - zone selection; outside all zones nothing happens that tick (as in start_bot)
+  - budget / regime / RSI gate, bucket entry on the first empty level, cooldown
+  - SECURED -> breakeven exit and take profit, evaluated on the trades that
+    were open before this tick's buy
+  - fills at the tick price with execute_mock_order semantics and
+    TRADING_FEE_RATE fees; the trade log has the paper_trade_log columns
+    (--sim: through sim_exchange.py instead, quoted around the close)
+
+Indicators are precomputed in one vectorized pass. Closed 5m / 1h candles are
+built from the 1m bars with NumPy, the committed RSI / EMA state with pandas
+ewm (ADX: its warm-up is not an ewm, so a loop over the hourly candles), and
+the value the live IndicatorEngine reports on each tick (the in-progress
+candle evaluated on top of the committed state) is one NumPy step over all
+ticks. Only the per-tick position state runs in a Python loop.
+
+Usage:
+  python backtest.py --csv BTCUSDT-1m-2024.csv --zone 60000 110000 2000
+  python backtest.py --fetch --start 2024-01-01 --end 2025-01-01 --zones zones.json --grid-step 150 --out trades.csv
+  python backtest.py --store --start 2024-06-01 --zones zones.json   # offline, from market_store.py
+
+Run `python verify_backtest.py` to check the indicator pass against indicators.py.
+"""
+
+import argparse
+import bisect
+import json
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import strategy
+from config_cache import build_config
+from grid_index import ZoneGrid
+from indicators import ADX
+from kline_cache import KlineView
+from market_store import shared_store
+from sim_exchange import DEFAULT_FILTERS, DEFAULT_LATENCY_MS, SPREAD_BPS, SimExchange, SimOrderError
+
+SYMBOL = 'BTCUSDT'
+MINUTE_MS = 60_000
+RSI_INTERVAL_MS = 300_000       # RSI_TIMEFRAME (5m)
+REGIME_INTERVAL_MS = 3_600_000  # Regime timeframe (1h)
+RSI_PERIOD = 14
+EMA_WINDOW = 200
+ADX_WINDOW = 14
+ADX_THRESHOLD = 25
+STEP_SIZE = 0.00001             # BTCUSDT LOT_SIZE step
+MAX_TRADE_QTY = 0.001           # BTC (Hard Limit, SYMBOL_SETTINGS)
+FEE_RATE = strategy.FEE_RATE_BNB
+
+# Same defaults as trade_and_log.DEFAULT_SETTINGS (bot_settings overrides them live)
+DEFAULT_SETTINGS = {
+    'rsi_limit': 60,
+    'tp_usdt': 200.0,
+    'grid_step_usdt': 200.0,
+    'trade_cooldown': 300,
+    'trade_size_usdt': 20.0,
+}
+
+REGIMES = ('SIDEWAY', 'BULL_TREND', 'BEAR_TREND')
+SIDEWAY, BULL_TREND, BEAR_TREND = range(3)
+
+Candles = namedtuple('Candles', ['high', 'low', 'close', 'idx', 'run_high', 'run_low'])
+Indicators = namedtuple('Indicators', ['rsi', 'adx', 'ema', 'regime'])
+
+
+def log(message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] [BACKTEST] {message}")
+
+
+# --- Data ---
+
+def to_view(rows):
+    """KlineView of NumPy columns from Binance kline rows, sorted and de-duplicated by open_time."""
+    a = np.asarray(rows, dtype=np.float64)
+    a = a[:, :7] if a.ndim == 2 else np.zeros((0, 7))
+    open_time = a[:, 0].astype(np.int64)
+    # data.binance.vision spot files switched to microseconds in 2025
+    if len(open_time) and open_time.max() > 10**14:
+        open_time //= 1000
+    _, keep = np.unique(open_time, return_index=True)
+    return KlineView(open_time[keep], a[keep, 1], a[keep, 2], a[keep, 3], a[keep, 4], a[keep, 5], open_time[keep] + MINUTE_MS - 1)
+
+
+def load_klines_csv(path):
+    """1m klines from a Binance kline CSV (data.binance.vision layout, header row optional)."""
+    df = pd.read_csv(path, header=None, usecols=range(7))
+    df = df.apply(pd.to_numeric, errors='coerce').dropna()
+    return to_view(df.to_numpy())
+
+
+def store_klines(symbol, start=None, end=None):
+    """1m klines from the local market data store (memory-mapped, no download)."""
+    return shared_store.range(symbol, '1m', start, end)
+
+
+def fetch_klines(symbol, start, end=None):
+    """1m klines over REST (public endpoint, no API key needed), through the local store: only missing candles are downloaded."""
+    from binance.client import Client
+    shared_store.sync(Client(), symbol, '1m', start, end)
+    return store_klines(symbol, start, end)
+
+
+# --- Vectorized indicators ---
+
+def _ewm(values, alpha):
+    return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def resample(bars, interval_ms):
+    """
+    Candles of `interval_ms` built from 1m bars. For every bar: the index of
+    its candle and that candle's high/low so far, i.e. the in-progress candle
+    the live feed shows at the bar's close.
+    """
+    bucket = bars.open_time // interval_ms
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(bucket)] - 1
+    idx = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(bucket)]))
+    grouped = pd.DataFrame({'h': bars.high, 'l': bars.low}).groupby(idx)
+    return Candles(
+        high=np.maximum.reduceat(bars.high, starts),
+        low=np.minimum.reduceat(bars.low, starts),
+        close=bars.close[ends],
+        idx=idx,
+        run_high=grouped['h'].cummax().to_numpy(),
+        run_low=grouped['l'].cummin().to_numpy(),
+    )
+
+
+def rsi_ticks(candles, price, window=RSI_PERIOD):
+    """WilderRSI.update(price, closed=False) for every tick (NaN during warm-up)."""
+    close = candles.close
+    delta = np.diff(close, prepend=close[0])
+    avg_gain = _ewm(np.where(delta > 0, delta, 0.0), 1.0 / window)
+    avg_loss = _ewm(np.where(delta < 0, -delta, 0.0), 1.0 / window)
+
+    k = candles.idx  # Candles committed before this tick
+    p = np.maximum(k - 1, 0)
+    d = price - close[p]
+    gain = avg_gain[p] + (np.where(d > 0, d, 0.0) - avg_gain[p]) / window
+    loss = avg_loss[p] + (np.where(d < 0, -d, 0.0) - avg_loss[p]) / window
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(loss == 0, 100.0, 100.0 - 100.0 / (1.0 + gain / loss))
+    return np.where((k > 0) & (k + 1 >= window), rsi, np.nan)
+
+
+def ema_ticks(candles, price, window=EMA_WINDOW):
+    """EMA.update(price, closed=False) for every tick (NaN during warm-up)."""
+    alpha = 2.0 / (window + 1)
+    committed = _ewm(candles.close, alpha)
+    k = candles.idx
+    prev = committed[np.maximum(k - 1, 0)]
+    ema = np.where(k > 0, prev + alpha * (price - prev), price)
+    return np.where(k + 1 >= window, ema, np.nan)
+
+
+def _adx_states(candles, window):
+    """Committed ADX state after each closed candle: (tr, dm+, dm-, dx_sum, adx)."""
+    adx = ADX(window)
+    states = np.empty((len(candles.close), 5))
+    for j, (h, l, c) in enumerate(zip(candles.high.tolist(), candles.low.tolist(), candles.close.tolist())):
+        adx.update(h, l, c)
+        states[j] = (adx._tr, adx._dm_plus, adx._dm_minus, adx._dx_sum, np.nan if adx._adx is None else adx._adx)
+    return states
+
+
+def adx_ticks(candles, price, window=ADX_WINDOW):
+    """ADX.update(high, low, price, closed=False) for every tick (NaN during warm-up)."""
+    w = window
+    k = candles.idx
+    p = np.maximum(k - 1, 0)
+    state = _adx_states(candles, w)[p]
+    p_high, p_low, p_close = candles.high[p], candles.low[p], candles.close[p]
+    high, low = candles.run_high, candles.run_low
+
+    tr = np.maximum(high, p_close) - np.minimum(low, p_close)
+    up = high - p_high
+    down = p_low - low
+    dm_plus = np.where((up > down) & (up > 0), up, 0.0)
+    dm_minus = np.where((down > up) & (down > 0), down, 0.0)
+
+    warm = k <= w
+    s_tr = np.where(warm, state[:, 0] + tr, state[:, 0] - state[:, 0] / w + tr)
+    s_plus = np.where(warm, state[:, 1] + dm_plus, state[:, 1] - state[:, 1] / w + dm_plus)
+    s_minus = np.where(warm, state[:, 2] + dm_minus, state[:, 2] - state[:, 2] / w + dm_minus)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = np.where(s_tr != 0, 100 * s_plus / s_tr, 0.0)
+        minus_di = np.where(s_tr != 0, 100 * s_minus / s_tr, 0.0)
+        di_sum = plus_di + minus_di
+        dx = np.where(di_sum != 0, 100 * np.abs(plus_di - minus_di) / di_sum, 0.0)
+
+    adx = np.where(k == 2 * w - 1, (state[:, 3] + dx) / w, (state[:, 4] * (w - 1) + dx) / w)
+    return np.where(k >= 2 * w - 1, adx, np.nan)
+
+
+def compute_indicators(bars):
+    """RSI (5m), ADX / EMA 200 (1h) and the regime code as the live bot sees them at each 1m close."""
+    price = bars.close
+    rsi = rsi_ticks(resample(bars, RSI_INTERVAL_MS), price)
+    hourly = resample(bars, REGIME_INTERVAL_MS)
+    adx = adx_ticks(hourly, price)
+    ema = ema_ticks(hourly, price)
+
+    # Same rule as IndicatorEngine.regime (SIDEWAY while warming up)
+    trend = ~np.isnan(adx) & ~np.isnan(ema) & (adx >= ADX_THRESHOLD)
+    regime = np.where(trend, np.where(price > ema, BULL_TREND, BEAR_TREND), SIDEWAY)
+    return Indicators(rsi, adx, ema, regime)
+
+
+# --- Simulation ---
+
+class SimBook:
+    """
+    Open trades of the simulation (the PositionBook + GridIndex of the backtest).
+    Grid occupancy is updated per fill (ZoneGrid.add_entry / remove_entry) rather
+    than rebuilt on every book change as GridIndex does, since the backtest
+    changes the book thousands of times. Unsecured and SECURED trades are kept
+    sorted by entry, so the trades an exit rule can fire on are found with
+    bisect instead of a scan.
+    """
+
+    def __init__(self):
+        self.trades = {}
+        self.secured = set()
+        self._entries = []
+        self._unsecured = []  # (entry_price, id), sorted
+        self._secured = []    # (entry_price, id), sorted
+        self._zone_invested = {}
+        self._grids = {}  # zone_name -> ZoneGrid
+
+    def find_buy_level(self, zone, price, step):
+        grid = self._grids.get(zone['zone_name'])
+        if grid is None:
+            grid = self._grids[zone['zone_name']] = ZoneGrid(zone, step)
+            grid.reset(self._entries)
+        return grid.find_buy_level(price)
+
+    def zone_invested(self, zone_name):
+        return self._zone_invested.get(zone_name, 0.0)
+
+    def exit_candidates(self, price, secure_distance, tp):
+        """
+        Trades strategy.evaluate_exits can act on at `price`, in id order: unsecured ones
+        at least `secure_distance` below it, SECURED ones at TP or back at the breakeven buffer.
+        """
+        unsecured, secured = self._unsecured, self._secured
+        if not ((unsecured and unsecured[0][0] + secure_distance <= price)
+                or (secured and (secured[0][0] + tp <= price or secured[-1][0] + strategy.BREAKEVEN_BUFFER >= price))):
+            return []
+        ids = [i for _, i in self._unsecured[:bisect.bisect_right(self._unsecured, (price - secure_distance, float('inf')))]]
+        if self._secured:
+            ids += [i for _, i in self._secured[:bisect.bisect_right(self._secured, (price - tp, float('inf')))]]
+            ids += [i for _, i in self._secured[bisect.bisect_left(self._secured, (price - strategy.BREAKEVEN_BUFFER, float('-inf'))):]]
+        return [self.trades[i] for i in sorted(set(ids))]
+
+    def open(self, trade):
+        self.trades[trade['id']] = trade
+        bisect.insort(self._entries, trade['entry_price'])
+        for grid in self._grids.values():
+            grid.add_entry(trade['entry_price'])
+        bisect.insort(self._unsecured, (trade['entry_price'], trade['id']))
+        self._zone_invested[trade['zone_name']] = self.zone_invested(trade['zone_name']) + trade['total_usdt']
+
+    def mark_secured(self, trade_id):
+        key = (self.trades[trade_id]['entry_price'], trade_id)
+        self._unsecured.pop(bisect.bisect_left(self._unsecured, key))
+        bisect.insort(self._secured, key)
+        self.secured.add(trade_id)
+
+    def close(self, trade_id):
+        trade = self.trades.pop(trade_id)
+        key = (trade['entry_price'], trade_id)
+        side = self._secured if trade_id in self.secured else self._unsecured
+        side.pop(bisect.bisect_left(side, key))
+        self._entries.pop(bisect.bisect_left(self._entries, trade['entry_price']))
+        for grid in self._grids.values():
+            grid.remove_entry(trade['entry_price'])
+        self._zone_invested[trade['zone_name']] -= trade['total_usdt']
+        self.secured.discard(trade_id)
+        return trade
+
+
+def _iso(ms):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).isoformat()
+
+
+def equity_curve(prices, fills):
+    """
+    PnL at every tick: realized (net) plus open positions marked at the tick price,
+    built from the fills with two cumulative sums instead of per-tick bookkeeping.
+    """
+    qty, cost, pnl = np.zeros(len(prices)), np.zeros(len(prices)), np.zeros(len(prices))
+    if fills:
+        bar, d_qty, d_cost, d_pnl = (np.asarray(x) for x in zip(*fills))
+        np.add.at(qty, bar, d_qty)
+        np.add.at(cost, bar, d_cost)
+        np.add.at(pnl, bar, d_pnl)
+    return np.cumsum(pnl) + prices * np.cumsum(qty) - np.cumsum(cost)
+
+
+def _sim_fill(exchange, symbol, side, qty, price, t):
+    """(executed qty, quote) of a MARKET order through the simulated exchange, quoted around the bar close."""
+    exchange.on_price(symbol, price, ts=t)
+    try:
+        order = exchange.create_order(symbol=symbol, side=side, type='MARKET', quantity=qty, ts=t)
+    except SimOrderError:
+        return 0.0, 0.0
+    exchange.advance(t + exchange.latency_ms)
+    return float(order['executedQty']), float(order['cummulativeQuoteQty'])
+
+
+def run_backtest(bars, zones, settings=None, symbol=SYMBOL, step_size=STEP_SIZE, max_trade_qty=MAX_TRADE_QTY,
+                 fee_rate=FEE_RATE, indicators=None, exchange=None):
+    """
+    Replays `bars` (1m KlineView) through the start_bot decision loop.
+    `zones` are zones_config rows, `settings` a bot_settings row (missing keys use DEFAULT_SETTINGS).
+    `exchange`: a SimExchange(realtime=False) to fill through (spread, depth slippage, partial
+    fills, filters) instead of at the bar close.
+    Returns: (trades DataFrame with the paper_trade_log columns, summary dict)
+    """
+    config = build_config(settings, [dict(z, symbol=z.get('symbol') or symbol) for z in zones], DEFAULT_SETTINGS)
+    ind = indicators or compute_indicators(bars)
+    zone_index = config.zone_index(symbol)
+    zone_list = zone_index.zones
+
+    prices = bars.close
+    times = bars.close_time + 1  # Decision time: the bar's close
+    zone_ids = zone_index.select_ids(prices)
+    rsi = np.where(np.isnan(ind.rsi), 50.0, ind.rsi)  # calculate_rsi falls back to neutral 50
+    # Regime & RSI part of check_buy_permission, for every tick at once (the budget needs the book)
+    rsi_ok = np.where(ind.regime == BEAR_TREND, rsi < strategy.BEAR_RSI_LIMIT, rsi < config.rsi_limit)
+
+    book = SimBook()
+    closed = []
+    fills = []  # (bar, position qty change, cost basis change, realized pnl) for the equity curve
+    next_id = 1
+    last_trade_time = float('-inf')
+    tp, step, size, cooldown = config.tp_usdt, config.grid_step_usdt, config.trade_size_usdt, config.trade_cooldown
+    secure_distance = tp * strategy.SECURE_RATIO
+
+    for i, (z, price, ok, t) in enumerate(zip(zone_ids.tolist(), prices.tolist(), rsi_ok.tolist(), times.tolist())):
+        if z < 0:
+            continue  # Outside all zones: start_bot skips the whole iteration
+        zone = zone_list[z]
+
+        # 4. BUY decision, against the book before this tick's sells
+        level = None
+        if ok:
+            can_buy, _ = strategy.check_buy_permission(zone, book.zone_invested(zone['zone_name']), size, rsi[i], config.rsi_limit, REGIMES[ind.regime[i]])
+            if can_buy:
+                level = book.find_buy_level(zone, price, step)
+        if level is not None:
+            if t / 1000 - last_trade_time < cooldown:
+                level = None  # execute_buy: Trade Cooldown Active
+            else:
+                last_trade_time = t / 1000
+
+        # 5. SELL, on the trades open before the buy (only those an exit rule can fire on)
+        candidates = book.exit_candidates(price, secure_distance, tp) if book.trades else None
+        if candidates:
+            newly_secured, exits = strategy.evaluate_exits(candidates, price, tp, book.secured)
+            for trade_id in newly_secured:
+                book.mark_secured(trade_id)
+            for trade, reason in exits:
+                exit_price = price
+                if exchange:
+                    executed, quote = _sim_fill(exchange, symbol, 'SELL', trade['quantity'], price, t)
+                    if executed <= 0:
+                        continue  # Not filled: the trade stays open
+                    exit_price = quote / executed
+                book.close(trade['id'])
+                net_pnl, total_fee, pnl_percent = strategy.close_economics(trade['entry_price'], exit_price, trade['quantity'], fee_rate)
+                fills.append((i, -trade['quantity'], -trade['total_usdt'], net_pnl))
+                closed.append(dict(
+                    trade,
+                    exit_price=exit_price,
+                    exit_at=_iso(t),
+                    pnl_usdt=net_pnl,
+                    pnl_percent=pnl_percent,
+                    fee_usdt=total_fee,
+                    status='CLOSED',
+                    rsi_exit=rsi[i],
+                    exit_reason=reason,
+                    notes=f"{trade['notes']} | Closed at {exit_price} | Net PnL: {net_pnl:.2f}",
+                ))
+
+        if level is not None:
+            qty = strategy.order_quantity(size, price, step_size, max_trade_qty)
+            quote = price * qty  # execute_mock_order: filled at the tick price
+            if exchange:
+                qty, quote = _sim_fill(exchange, symbol, 'BUY', qty, price, t)
+            if qty > 0:
+                fills.append((i, qty, quote, 0.0))
+                book.open({
+                    'id': next_id,
+                    'created_at': _iso(t),
+                    'order_type': 'BUY',
+                    'symbol': symbol,
+                    'zone_name': zone['zone_name'],
+                    'entry_price': quote / qty if qty > 0 else price,
+                    'quantity': qty,
+                    'total_usdt': quote,
+                    'fee_usdt': quote * fee_rate,
+                    'status': 'OPEN',
+                    'rsi_entry': rsi[i],
+                    'notes': f"Grid Level {level}. OrderID: backtest_{next_id}",
+                })
+                next_id += 1
+
+    last_price = float(prices[-1]) if len(prices) else 0.0
+    trades = pd.DataFrame(closed + list(book.trades.values()))
+    if not trades.empty:
+        trades = trades.sort_values('id').reset_index(drop=True)
+
+    realized = sum(t['pnl_usdt'] for t in closed)
+    fees = sum(t['fee_usdt'] for t in closed) + sum(t['fee_usdt'] for t in book.trades.values())
+    unrealized = sum((last_price - t['entry_price']) * t['quantity'] for t in book.trades.values())
+    equity = equity_curve(prices, fills)
+    drawdown = np.maximum.accumulate(np.maximum(equity, 0.0)) - equity if len(equity) else np.zeros(1)
+    capital = sum(float(z['capital_allocated']) for z in zone_list)
+    gross = realized + fees
+    summary = {
+        'symbol': symbol,
+        'bars': len(prices),
+        'start': _iso(int(bars.open_time[0])) if len(prices) else None,
+        'end': _iso(int(times[-1])) if len(prices) else None,
+        'closed_trades': len(closed),
+        'open_trades': len(book.trades),
+        'win_rate_pct': 100 * sum(t['pnl_usdt'] > 0 for t in closed) / len(closed) if closed else 0.0,
+        'breakeven_exits': sum(t['exit_reason'] == 'BREAKEVEN' for t in closed),
+        'realized_pnl': realized,
+        'fees_paid': fees,
+        'unrealized_pnl': unrealized,
+        'net_pnl': realized + unrealized,
+        'open_position_usdt': sum(t['total_usdt'] for t in book.trades.values()),
+        'max_drawdown_usdt': float(drawdown.max()),
+        # Relative to the zones' allocated capital plus the running equity peak
+        'max_drawdown_pct': float((drawdown / (capital + np.maximum.accumulate(np.maximum(equity, 0.0)))).max() * 100) if capital and len(equity) else 0.0,
+        'fee_ratio': fees / gross if gross > 0 else float('inf'),  # Share of the gross profit paid as fees
+    }
+    return trades, summary
+
+
+# --- CLI ---
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Backtest the grid/RSI/regime strategy on 1m klines")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument('--csv', help="Binance 1m kline CSV (data.binance.vision)")
+    src.add_argument('--fetch', action='store_true', help="Sync the local store over REST, then read from it")
+    src.add_argument('--store', action='store_true', help="Read what market_store.py already holds (offline)")
+    parser.add_argument('--symbol', default=SYMBOL)
+    parser.add_argument('--start', help="With --fetch / --store, e.g. 2024-01-01")
+    parser.add_argument('--end', help="With --fetch / --store")
+    parser.add_argument('--zones', help="JSON file with zones_config rows")
+    parser.add_argument('--zone', nargs=3, type=float, action='append', metavar=('LOW', 'HIGH', 'CAPITAL'), help="Zone (repeatable)")
+    parser.add_argument('--settings', help="JSON file with a bot_settings row")
+    parser.add_argument('--grid-step', type=float)
+    parser.add_argument('--tp', type=float)
+    parser.add_argument('--rsi-limit', type=int)
+    parser.add_argument('--trade-size', type=float)
+    parser.add_argument('--cooldown', type=int)
+    parser.add_argument('--fee-rate', type=float, default=FEE_RATE)
+    parser.add_argument('--step-size', type=float, default=STEP_SIZE)
+    parser.add_argument('--max-qty', type=float, default=MAX_TRADE_QTY)
+    parser.add_argument('--sim', action='store_true', help="Fill through sim_exchange.py (spread, depth slippage, filters)")
+    parser.add_argument('--spread-bps', type=float, default=SPREAD_BPS, help="With --sim")
+    parser.add_argument('--latency-ms', type=int, default=DEFAULT_LATENCY_MS, help="With --sim")
+    parser.add_argument('--out', help="Write the trade log to this CSV")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    zones = []
+    if args.zones:
+        with open(args.zones, encoding='utf-8') as f:
+            zones = json.load(f)
+    for n, (low, high, capital) in enumerate(args.zone or [], 1):
+        zones.append({'zone_name': f"Zone {n}", 'price_low': low, 'price_high': high, 'capital_allocated': capital})
+    if not zones:
+        print("❌ No zones: use --zones or --zone LOW HIGH CAPITAL")
+        return
+
+    settings = {}
+    if args.settings:
+        with open(args.settings, encoding='utf-8') as f:
+            settings = json.load(f)
+    overrides = {'grid_step_usdt': args.grid_step, 'tp_usdt': args.tp, 'rsi_limit': args.rsi_limit,
+                 'trade_size_usdt': args.trade_size, 'trade_cooldown': args.cooldown}
+    settings.update({k: v for k, v in overrides.items() if v is not None})
+
+    started = time.perf_counter()
+    if args.csv:
+        bars = load_klines_csv(args.csv)
+    elif args.store:
+        bars = store_klines(args.symbol, args.start, args.end)
+    else:
+        bars = fetch_klines(args.symbol, args.start, args.end)
+    if len(bars.close) == 0:
+        print("❌ No candles for this range (run `python market_store.py sync` first for --store)")
+        return
+    log(f"Loaded {len(bars.close):,} 1m bars in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    indicators = compute_indicators(bars)
+    log(f"Indicators in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    exchange = None
+    if args.sim:
+        exchange = SimExchange(args.latency_ms, realtime=False, maker_fee_rate=args.fee_rate, taker_fee_rate=args.fee_rate, spread_bps=args.spread_bps)
+        exchange.set_filters(args.symbol, DEFAULT_FILTERS._replace(step_size=args.step_size, min_qty=args.step_size))
+    trades, summary = run_backtest(bars, zones, settings, args.symbol, args.step_size, args.max_qty, args.fee_rate, indicators, exchange)
+    log(f"Simulation in {time.perf_counter() - started:.2f}s")
+
+    print(f"\n📊 {summary['symbol']} {summary['start']} -> {summary['end']} ({summary['bars']:,} bars)")
+    print(f"   Closed: {summary['closed_trades']} (Win rate {summary['win_rate_pct']:.1f}%, {summary['breakeven_exits']} breakeven) | Open: {summary['open_trades']}")
+    print(f"   Realized PnL: ${summary['realized_pnl']:,.2f} | Fees: ${summary['fees_paid']:,.2f} | Unrealized: ${summary['unrealized_pnl']:,.2f} | Open position: ${summary['open_position_usdt']:,.2f}")
+    print(f"   Max Drawdown: ${summary['max_drawdown_usdt']:,.2f} ({summary['max_drawdown_pct']:.2f}%) | Fee ratio: {summary['fee_ratio']:.2f}")
+
+    if args.out:
+        trades.to_csv(args.out, index=False)
+        print(f"   Trade log written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+Benchmark Fakes (In-Process Binance & Supabase)
+===============================================
+Stand-ins for the two network clients so benchmark.py can time the bot's
+own work offline, with a configurable round trip added to every call.
+
+- FakeSupabase: the query-builder subset the bot, snapshot_manager and the
+  dashboard use (table/select/eq/gte/lt/order/limit/range/insert/update/upsert/rpc/execute)
+  over in-memory tables. Results go through a JSON round trip like the
+  PostgREST response would, so payload size shows up in the timings.
+  `max_rows` mimics the PostgREST row cap (1000 on Supabase). rpc() runs
+  the SQL functions in FAKE_FUNCTIONS (snapshot_stats, zone_stats, daily_pnl,
+  snapshot_series) as Python; pass
+  `functions={}` for a database they were never installed on. Tables in
+  `updated_at` get the column's default and trigger (add_updated_at_columns.sql).
+  Filtering or ordering on a column the table's rows lack raises, like PostgREST.
+- FakeBinance: fixture_client.FixtureClient (candles, filters) with a price
+  the benchmark moves itself and a latency per request.
+- synthetic_dataset(): zones tiling a price range, a fine grid and trades
+  on its levels, OPEN and CLOSED, deterministic for a seed.
+
+`calls` on both fakes counts round trips.
+"""
+
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from fixture_client import FIXTURE_ORIGIN, FixtureClient
+
+BENCH_PRICE_LOW = 50000.0
+BENCH_PRICE_HIGH = 150000.0
+BENCH_FIXTURE_NOW = FIXTURE_ORIGIN + 30 * 24 * 3600 * 1000  # 30 days of 1m candles (> REGIME_KLINE_LIMIT hours)
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+def _comparable(value):
+    """Timestamps compare as times, like Postgres (ISO strings with different offsets or precision)."""
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return value
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.op = 'select'
+        self.columns = None
+        self.filters = []
+        self.order_by = None
+        self.row_limit = None
+        self.row_offset = 0
+        self.payload = None
+        self.on_conflict = None
+
+    def select(self, columns="*", count=None):
+        self.op = 'select'
+        self.columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(',')]
+        return self
+
+    def insert(self, data):
+        self.op, self.payload = 'insert', data
+        return self
+
+    def update(self, data):
+        self.op, self.payload = 'update', data
+        return self
+
+    def upsert(self, data, on_conflict='id', ignore_duplicates=False):
+        self.op, self.payload, self.on_conflict = 'upsert', data, on_conflict
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, 'eq', value))
+        return self
+
+    def gte(self, column, value):
+        self.filters.append((column, 'gte', value))
+        return self
+
+    def lt(self, column, value):
+        self.filters.append((column, 'lt', value))
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by = (column, desc)
+        return self
+
+    def limit(self, n):
+        self.row_limit = n
+        return self
+
+    def range(self, start, end):
+        self.row_offset, self.row_limit = start, end - start + 1
+        return self
+
+    def _match(self, row):
+        for column, op, value in self.filters:
+            have = row.get(column)
+            if op == 'eq':
+                if have != value:
+                    return False
+            elif have is None or not (_comparable(have) >= _comparable(value) if op == 'gte' else _comparable(have) < _comparable(value)):
+                return False
+        return True
+
+    def execute(self):
+        return self.db._execute(self)
+
+
+class FakeRpc:
+    def __init__(self, db, fn, params):
+        self.db = db
+        self.fn = fn
+        self.params = params
+
+    def execute(self):
+        return self.db._execute_rpc(self)
+
+
+def _snapshot_stats(tables, p_symbol, p_paper=True):
+    """snapshot_stats() of add_snapshot_stats_function.sql."""
+    trades = [t for t in tables.get('paper_trade_log' if p_paper else 'trade_log', []) if t.get('symbol') == p_symbol]
+    closed = [t for t in trades if t.get('status') == 'CLOSED']
+    open_ = [t for t in trades if t.get('status') == 'OPEN']
+    equity = [s['total_equity_usdt'] for s in tables.get('portfolio_snapshots', []) if s.get('symbol') == p_symbol]
+    baseline = next((b for b in tables.get('baseline_prices', []) if b.get('symbol') == p_symbol), {})
+    return [{
+        'realized_pnl': sum(float(t.get('pnl_usdt') or 0) for t in closed),
+        'fees_paid': sum(float(t.get('fee_usdt') or 0) for t in closed + open_),
+        'open_trade_count': len(open_),
+        'open_quantity': sum(float(t['quantity']) for t in open_),
+        'open_cost': sum(float(t['entry_price']) * float(t['quantity']) for t in open_),
+        'peak_equity': max(equity) if equity else None,
+        'baseline_price': baseline.get('baseline_price'),
+        'initial_capital': baseline.get('initial_capital'),
+    }]
+
+
+def _zone_stats(tables, p_symbol, p_paper=True):
+    """zone_stats() of add_trade_aggregate_functions.sql."""
+    zones = {}
+    for t in tables.get('paper_trade_log' if p_paper else 'trade_log', []):
+        if t.get('symbol') != p_symbol:
+            continue
+        z = zones.setdefault(t['zone_name'], {'zone_name': t['zone_name'], 'invested': 0.0, 'realized_pnl': 0.0,
+                                              'open_count': 0, 'closed_count': 0, 'fees_paid': 0.0})
+        if t.get('status') == 'OPEN':
+            z['invested'] += float(t['total_usdt'])
+            z['open_count'] += 1
+        elif t.get('status') == 'CLOSED':
+            z['realized_pnl'] += float(t.get('pnl_usdt') or 0)
+            z['closed_count'] += 1
+        z['fees_paid'] += float(t.get('fee_usdt') or 0)
+    return list(zones.values())
+
+
+def _daily_pnl(tables, p_symbol, p_paper=True, p_days=90):
+    """daily_pnl() of add_trade_aggregate_functions.sql."""
+    since = datetime.now(timezone.utc) - timedelta(days=p_days)
+    days = {}
+    for t in tables.get('paper_trade_log' if p_paper else 'trade_log', []):
+        if t.get('symbol') != p_symbol or t.get('status') != 'CLOSED' or not t.get('exit_at'):
+            continue
+        exit_at = datetime.fromisoformat(t['exit_at'])
+        if exit_at < since:
+            continue
+        d = days.setdefault(exit_at.date().isoformat(), {'day': exit_at.date().isoformat(), 'realized_pnl': 0.0,
+                                                         'fees_paid': 0.0, 'closed_count': 0})
+        d['realized_pnl'] += float(t.get('pnl_usdt') or 0)
+        d['fees_paid'] += float(t.get('fee_usdt') or 0)
+        d['closed_count'] += 1
+    return [days[k] for k in sorted(days)]
+
+
+def _snapshot_series(tables, p_symbol, p_from, p_to, p_bucket_seconds):
+    """snapshot_series() of add_snapshot_series_function.sql."""
+    start, end, bucket = datetime.fromisoformat(p_from), datetime.fromisoformat(p_to), max(int(p_bucket_seconds), 1)
+    rows = [s for s in tables.get('portfolio_snapshots', []) if s.get('symbol') == p_symbol
+            and start <= datetime.fromisoformat(s['snapshot_time']) < end]
+    rows.sort(key=lambda s: datetime.fromisoformat(s['snapshot_time']))
+    buckets = {}
+    for s in rows:
+        key = int(datetime.fromisoformat(s['snapshot_time']).timestamp()) // bucket * bucket
+        buckets.setdefault(key, []).append(s)
+    out = []
+    for key in sorted(buckets):
+        group = buckets[key]
+        equity = [float(s['total_equity_usdt']) for s in group]
+        dd = [float(s['current_drawdown_pct']) for s in group if s.get('current_drawdown_pct') is not None]
+        max_dd = [float(s['max_drawdown_pct']) for s in group if s.get('max_drawdown_pct') is not None]
+        out.append({
+            'bucket_time': datetime.fromtimestamp(key, timezone.utc).isoformat(),
+            'equity_open': equity[0], 'equity_high': max(equity), 'equity_low': min(equity), 'equity_close': equity[-1],
+            'drawdown_pct': max(dd) if dd else None, 'max_drawdown_pct': max(max_dd) if max_dd else None,
+            'btc_price': group[-1].get('btc_price'), 'samples': len(group),
+        })
+    return out
+
+
+FAKE_FUNCTIONS = {'snapshot_stats': _snapshot_stats, 'zone_stats': _zone_stats, 'daily_pnl': _daily_pnl,
+                  'snapshot_series': _snapshot_series}
+
+
+class FakeSupabase:
+    def __init__(self, tables=None, latency_ms=0.0, max_rows=None, functions=None, updated_at=()):
+        self.tables = tables if tables is not None else {}
+        self.latency_ms = latency_ms
+        self.max_rows = max_rows
+        self.functions = FAKE_FUNCTIONS if functions is None else functions
+        self.updated_at = set(updated_at)
+        self.now = lambda: datetime.now(timezone.utc)
+        self.calls = 0
+        self._ids = {name: max((r.get('id', 0) for r in rows), default=0) for name, rows in self.tables.items()}
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, fn, params=None):
+        return FakeRpc(self, fn, params or {})
+
+    def _next_id(self, table):
+        self._ids[table] = self._ids.get(table, 0) + 1
+        return self._ids[table]
+
+    def _execute(self, q):
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        rows = self.tables.setdefault(q.table, [])
+        stamp = {'updated_at': self.now().isoformat()} if q.table in self.updated_at else {}
+        if rows:
+            for column in [f[0] for f in q.filters] + ([q.order_by[0]] if q.order_by else []):
+                if column not in rows[0]:
+                    raise Exception(f"column {q.table}.{column} does not exist")
+
+        if q.op == 'select':
+            out = [r for r in rows if q._match(r)] if q.filters else list(rows)
+            if q.order_by:
+                column, desc = q.order_by
+                out.sort(key=lambda r: (r.get(column) is None, r.get(column) or 0), reverse=desc)
+            out = out[q.row_offset:]
+            cap = min(x for x in (q.row_limit, self.max_rows, len(out)) if x is not None)
+            out = out[:cap]
+            if q.columns:
+                out = [{c: r.get(c) for c in q.columns} for r in out]
+        elif q.op == 'insert':
+            out = []
+            for data in (q.payload if isinstance(q.payload, list) else [q.payload]):
+                row = {**stamp, **data, 'id': self._next_id(q.table)}
+                rows.append(row)
+                out.append(row)
+        elif q.op == 'upsert':
+            out = []
+            keys = [k.strip() for k in q.on_conflict.split(',')]
+            existing = {tuple(r.get(k) for k in keys): r for r in rows}
+            for data in (q.payload if isinstance(q.payload, list) else [q.payload]):
+                row = existing.get(tuple(data.get(k) for k in keys))
+                if row is not None:
+                    if q.ignore_duplicates:
+                        continue
+                    row.update(data, **stamp)
+                else:
+                    row = {**stamp, **data, 'id': data.get('id') or self._next_id(q.table)}
+                    rows.append(row)
+                out.append(row)
+        else:  # update
+            out = [r for r in rows if q._match(r)]
+            for r in out:
+                r.update(q.payload, **stamp)
+
+        # Wire format: what PostgREST would send and the client would decode
+        return FakeResponse(json.loads(json.dumps(out, default=str)))
+
+    def _execute_rpc(self, q):
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if q.fn not in self.functions:
+            raise Exception(f"Could not find the function public.{q.fn} in the schema cache")
+        out = self.functions[q.fn](self.tables, **q.params)
+        return FakeResponse(json.loads(json.dumps(out, default=str)))
+
+
+class FakeBinance(FixtureClient):
+    """FixtureClient with a benchmark-driven ticker and a round trip per request."""
+
+    def __init__(self, latency_ms=0.0, prices=None, now=BENCH_FIXTURE_NOW, **kwargs):
+        super().__init__(now=now, **kwargs)
+        self.latency_ms = latency_ms
+        self.prices = dict(prices or {})
+
+    def _wait(self):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def get_klines(self, *args, **kwargs):
+        self._wait()
+        return super().get_klines(*args, **kwargs)
+
+    def get_symbol_ticker(self, symbol):
+        if symbol.upper() not in self.prices:
+            return super().get_symbol_ticker(symbol)
+        self.calls += 1
+        self._wait()
+        return {'symbol': symbol.upper(), 'price': f"{self.prices[symbol.upper()]:.8f}"}
+
+    def get_symbol_info(self, symbol):
+        self._wait()
+        return super().get_symbol_info(symbol)
+
+
+def synthetic_dataset(n_trades, n_zones, grid_step, symbol='BTCUSDT', open_ratio=0.1, open_above=None, seed=1,
+                      low=BENCH_PRICE_LOW, high=BENCH_PRICE_HIGH):
+    """
+    Returns (zones, trades): `n_zones` Active zones tiling [low, high) and
+    `n_trades` trade rows on grid levels of their zone, `open_ratio` of them OPEN.
+    With `open_above`, OPEN trades sit above that price (still waiting for their TP).
+    Zones get enough capital that the budget never blocks a buy.
+    """
+    rng = np.random.default_rng(seed)
+    width = (high - low) / n_zones
+    zones = [{
+        'id': i + 1, 'symbol': symbol, 'zone_name': f"Z{i + 1}", 'status': 'Active',
+        'price_low': low + i * width, 'price_high': low + (i + 1) * width, 'capital_allocated': 1e9,
+    } for i in range(n_zones)]
+
+    is_open = rng.random(n_trades) < open_ratio
+    prices = rng.uniform(low, high, n_trades)
+    if open_above is not None:
+        prices[is_open] = rng.uniform(max(low, open_above), high, int(is_open.sum()))
+    levels = np.floor(prices / grid_step) * grid_step
+    zone_ids = np.minimum(((levels - low) // width).astype(np.int64), n_zones - 1)
+    quantity = np.round(20.0 / levels, 5)
+    exit_move = rng.normal(200.0, 150.0, n_trades)
+    start = 1_700_000_000
+
+    trades = []
+    for i in range(n_trades):
+        entry, qty = float(levels[i]), float(quantity[i])
+        created = time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(start + i * 60))
+        row = {
+            'id': i + 1, 'symbol': symbol, 'zone_name': zones[zone_ids[i]]['zone_name'],
+            'entry_price': entry, 'quantity': qty, 'total_usdt': entry * qty,
+            'fee_usdt': entry * qty * 0.00075, 'notes': f"Grid Level {entry:.2f}", 'created_at': created,
+        }
+        if is_open[i]:
+            row.update(status='OPEN', exit_price=None, exit_at=None, pnl_usdt=None, pnl_percent=None)
+        else:
+            exit_price = entry + float(exit_move[i])
+            pnl = (exit_price - entry) * qty - row['fee_usdt'] * 2
+            row.update(status='CLOSED', exit_price=exit_price, exit_at=created, pnl_usdt=pnl,
+                       pnl_percent=pnl / row['total_usdt'] * 100, fee_usdt=row['fee_usdt'] * 2)
+        trades.append(row)
+    return zones, trades
@@ -0,0 +1,394 @@
+"""
+Benchmark Suite (Offline)
+=========================
+Times the bot's hot paths against in-process Binance and Supabase fakes
+(bench_fakes.py) on synthetic datasets, so a change can be measured
+before it reaches the VPS:
+
+  loop       one pass of the decision loop (supervisor.SymbolWorker.run_iteration,
+             the body of start_bot's loop) while the price walks the grid
+  grid       buy-level lookup and nearest empty levels (grid_index.py),
+             with a fill every 10 ticks
+  snapshot   snapshot_manager.capture_snapshot (snapshot_stats() runs inside the
+             fake, so only the one-row response is the bot's cost)
+  ledger     portfolio_ledger.PortfolioLedger: a price tick + snapshot write
+  dashboard  overview metrics + Zone Performance table + daily PnL (dashboard_data.py)
+             from the SQL aggregates (run inside the fake), every dataset expired
+  rerun      the same page rerun within the TTLs (DashboardData cache)
+  history    equity / drawdown charts of the 30-day and all-history ranges (snapshot_series.py:
+             rollups inside the fake + LTTB), uncached
+
+Each case reports per-iteration latency percentiles, CPU time per iteration,
+peak memory allocated during the iterations (tracemalloc, separate pass) and
+fake round trips per iteration. `--latency-ms` adds a round trip to every
+Binance and Supabase call; at 0 only the bot's own work is measured.
+
+Results can be stored as a baseline and later runs diffed against it;
+--compare exits with 1 when a case got slower or bigger than --tolerance.
+Baselines are only comparable on the same machine and settings.
+
+Usage:
+    python benchmark.py                                   # quick sizes
+    python benchmark.py --full                            # up to 1M trades / 10k zones
+    python benchmark.py --only loop,grid --latency-ms 20
+    python benchmark.py --trades 250000 --zones 500       # one custom size
+    python benchmark.py --save-baseline                   # benchmark_baseline.json
+    python benchmark.py --compare
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from bench_fakes import BENCH_PRICE_HIGH, BENCH_PRICE_LOW, FakeBinance, FakeSupabase, synthetic_dataset
+
+SYMBOL = 'BTCUSDT'
+START_PRICE = (BENCH_PRICE_LOW + BENCH_PRICE_HIGH) / 2 + 2.5
+GRID_STEP = 5.0  # Fine grid: 20,000 levels over the benchmark's price range
+QUICK_SIZES = [(1_000, 1), (100_000, 1_000)]  # (trades, zones)
+FULL_SIZES = [(1_000, 1), (100_000, 1_000), (1_000_000, 10_000)]
+ITERATIONS = {'loop': 200, 'grid': 5000, 'snapshot': 20, 'ledger': 200, 'dashboard': 10, 'rerun': 200, 'history': 20}
+MEMORY_ITERATIONS = 3
+MAX_SECONDS = 20      # Per case: stop early once this is spent (at least 3 iterations)
+SNAPSHOT_HISTORY = 24 * 365  # One year of hourly portfolio_snapshots
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+COMPARED = {'p50_ms': 0.05, 'p95_ms': 0.05, 'cpu_ms': 0.05, 'peak_kb': 64}  # Metric -> noise floor
+
+_bot = None
+
+
+def log(message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] [BENCH] {message}", file=sys.stderr)
+
+
+@contextlib.contextmanager
+def quiet():
+    """The bot logs every iteration; keep that out of the timings and the report."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def price_walk(n, step, seed=3):
+    rng = np.random.default_rng(seed)
+    return START_PRICE + np.cumsum(rng.normal(0, step * 2, n))
+
+
+def load_bot(binance_fake, supabase_fake, workdir):
+    """
+    Imports trade_and_log with the fakes in place of the real clients
+    (it connects at import time), its journal and market store in `workdir`.
+    """
+    global _bot
+    if _bot is not None:
+        return _bot
+    for key in ('BINANCE_API_KEY', 'BINANCE_API_SECRET', 'SUPABASE_KEY'):
+        os.environ.setdefault(key, 'bench')
+    os.environ.setdefault('SUPABASE_URL', 'https://bench.supabase.co')
+    os.environ['TRADE_JOURNAL_PATH'] = os.path.join(workdir, 'journal.db')
+    os.environ['MARKET_DATA_DIR'] = os.path.join(workdir, 'market_data')
+
+    import binance.client
+    import supabase as supabase_module
+
+    class BenchClient(binance.client.Client):
+        def __new__(cls, *args, **kwargs):
+            return binance_fake
+
+    binance.client.Client = BenchClient
+    supabase_module.create_client = lambda *args, **kwargs: supabase_fake
+
+    with quiet():
+        import trade_and_log
+    trade_and_log.N8N_WEBHOOK_URL = None  # No AI analysis requests for benchmark closes
+    _bot = trade_and_log
+    return _bot
+
+
+# --- Measurement ---
+
+def measure(step, iterations, counters=()):
+    """Runs step(i) `iterations` times (or until MAX_SECONDS): latency samples, CPU and peak memory."""
+    samples = []
+    calls = sum(c.calls for c in counters)
+    cpu = time.process_time()
+    started = time.perf_counter()
+    with quiet():
+        for i in range(iterations):
+            t0 = time.perf_counter()
+            step(i)
+            samples.append(time.perf_counter() - t0)
+            if time.perf_counter() - started > MAX_SECONDS and len(samples) >= 3:
+                break
+    cpu = time.process_time() - cpu
+    calls = sum(c.calls for c in counters) - calls
+    n = len(samples)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    with quiet():
+        for i in range(n, n + min(MEMORY_ITERATIONS, iterations)):
+            step(i)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    ms = np.array(samples) * 1000
+    return {
+        'iterations': n,
+        'p50_ms': float(np.percentile(ms, 50)), 'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)), 'mean_ms': float(ms.mean()), 'max_ms': float(ms.max()),
+        'cpu_ms': cpu * 1000 / n, 'peak_kb': max(peak, 0) / 1024, 'calls': calls / n,
+    }
+
+
+def dataset(trades, zones, args):
+    zone_rows, trade_rows = synthetic_dataset(trades, zones, args.grid_step, SYMBOL, open_ratio=args.open_ratio, open_above=START_PRICE)
+    settings = {'id': 1, 'rsi_limit': 100, 'tp_usdt': 200.0, 'grid_step_usdt': args.grid_step, 'trade_cooldown': 0,
+                'trade_size_usdt': 20.0, 'is_active': True}
+    baseline = {'id': 1, 'symbol': SYMBOL, 'baseline_price': START_PRICE, 'initial_capital': 10000.0}
+    equity = 10000.0 + np.cumsum(np.random.default_rng(5).normal(0, 20, SNAPSHOT_HISTORY))
+    peak = np.maximum.accumulate(equity)
+    drawdown = (peak - equity) / peak * 100
+    now = int(time.time()) // 3600 * 3600
+    snapshots = [{'id': i + 1, 'symbol': SYMBOL, 'total_equity_usdt': float(e), 'current_drawdown_pct': float(drawdown[i]),
+                  'snapshot_time': datetime.fromtimestamp(now - (SNAPSHOT_HISTORY - 1 - i) * 3600, timezone.utc).isoformat()}
+                 for i, e in enumerate(equity)]
+    return {'paper_trade_log': trade_rows, 'zones_config': zone_rows, 'bot_settings': [settings],
+            'baseline_prices': [baseline], 'portfolio_snapshots': snapshots}
+
+
+# --- Scenarios ---
+
+def bench_loop(tables, args, workdir, case):
+    from config_cache import ConfigCache, SupabaseConfigSource
+    from trade_journal import TradeJournal
+
+    binance = FakeBinance(args.latency_ms, prices={SYMBOL: START_PRICE})
+    db = FakeSupabase(tables, latency_ms=args.latency_ms)
+    bot = load_bot(binance, db, workdir)
+    import metrics
+    import supervisor
+
+    # Fresh clients, config, journal and symbol state for this dataset
+    # Wrapped like the real clients, so the loop timings include the metrics overhead
+    bot.binance_client = metrics.instrument_binance(binance) if bot.USE_METRICS else binance
+    bot.supabase_client = metrics.instrument_supabase(db) if bot.USE_METRICS else db
+    bot.config_cache = ConfigCache(SupabaseConfigSource(bot.supabase_client), bot.DEFAULT_SETTINGS)
+    bot.trade_journal = TradeJournal(None, path=os.path.join(workdir, f"journal-{case}.db"))
+    if bot.sim_exchange:
+        bot.sim_exchange.client = binance
+        bot.sim_exchange.latency_ms = args.latency_ms
+    bot.SYMBOL_STATES.clear()
+    worker = supervisor.SymbolWorker(SYMBOL)
+    with quiet():
+        worker.start()
+        worker.last_snapshot_time = time.time()  # Snapshots are their own case
+        for _ in range(2):  # Warm-up: candle history, indicators, grid
+            worker.run_iteration(bot.config_cache.get())
+
+    iterations = args.iterations or ITERATIONS['loop']
+    walk = price_walk(iterations + MEMORY_ITERATIONS, args.grid_step)
+
+    def step(i):
+        binance.prices[SYMBOL] = float(walk[i])
+        worker.run_iteration(bot.config_cache.get())
+
+    return measure(step, iterations, (binance, db))
+
+
+def bench_grid(tables, args, workdir, case):
+    from grid_index import GridIndex
+    from position_book import PositionBook
+    from zone_index import ZoneIndex
+
+    open_rows = [r for r in tables['paper_trade_log'] if r['status'] == 'OPEN']
+    db = FakeSupabase({'paper_trade_log': open_rows})
+    book = PositionBook(db, 'paper_trade_log', symbol=SYMBOL)
+    with quiet():
+        book.load()
+    zones = ZoneIndex(tables['zones_config'])
+    grid = GridIndex()
+    iterations = args.iterations or ITERATIONS['grid']
+    walk = price_walk(iterations + MEMORY_ITERATIONS, args.grid_step)
+
+    def step(i):
+        price = float(walk[i])
+        zone = zones.select(price)
+        if zone is None:
+            return
+        level = grid.find_buy_level(zone, price, args.grid_step, book)
+        grid.empty_levels_below(zone, price, args.grid_step, book, 3)
+        if level is not None and i % 10 == 0:
+            book.open({'zone_name': zone['zone_name'], 'entry_price': level, 'quantity': 0.0002, 'status': 'OPEN'})
+
+    return measure(step, iterations, (db,))
+
+
+def bench_snapshot(tables, args, workdir, case):
+    from snapshot_manager import capture_snapshot
+
+    binance = FakeBinance(args.latency_ms, prices={SYMBOL: START_PRICE})
+    db = FakeSupabase(tables, latency_ms=args.latency_ms)
+    return measure(lambda i: capture_snapshot(db, binance, mode='PAPER', symbol=SYMBOL),
+                   args.iterations or ITERATIONS['snapshot'], (binance, db))
+
+
+def bench_ledger(tables, args, workdir, case):
+    from portfolio_ledger import PortfolioLedger
+
+    db = FakeSupabase(tables, latency_ms=args.latency_ms)
+    with quiet():
+        ledger = PortfolioLedger(db, SYMBOL).load()
+    walk = price_walk((args.iterations or ITERATIONS['ledger']) + MEMORY_ITERATIONS, args.grid_step)
+
+    def step(i):
+        ledger.on_price(float(walk[i]))
+        with quiet():
+            ledger.write_snapshot()
+
+    return measure(step, args.iterations or ITERATIONS['ledger'], (db,))
+
+
+def dashboard_step(data):
+    """What dashboard.py's overview tab reads and computes on a rerun."""
+    price = data.price(SYMBOL)
+    data.overview(True, SYMBOL, price)
+    data.zone_performance(True, SYMBOL)
+    data.daily_pnl(True, SYMBOL)
+
+
+def bench_dashboard(tables, args, workdir, case):
+    from dashboard_data import DASHBOARD_TTLS, DashboardData
+
+    binance = FakeBinance(args.latency_ms, prices={SYMBOL: START_PRICE})
+    db = FakeSupabase(tables, latency_ms=args.latency_ms)
+    data = DashboardData(db, binance)
+
+    def step(i):
+        for dataset in DASHBOARD_TTLS:  # Everything expired: the uncached page load
+            data.invalidate(dataset)
+        dashboard_step(data)
+
+    return measure(step, args.iterations or ITERATIONS['dashboard'], (binance, db))
+
+
+def bench_rerun(tables, args, workdir, case):
+    from dashboard_data import DashboardData
+
+    binance = FakeBinance(args.latency_ms, prices={SYMBOL: START_PRICE})
+    db = FakeSupabase(tables, latency_ms=args.latency_ms)
+    data = DashboardData(db, binance)
+    dashboard_step(data)  # First viewer loads; reruns within the TTLs are served from memory
+    return measure(lambda i: dashboard_step(data), args.iterations or ITERATIONS['rerun'], (binance, db))
+
+
+def bench_history(tables, args, workdir, case):
+    from snapshot_series import load_series
+
+    db = FakeSupabase(tables, latency_ms=args.latency_ms)
+
+    def step(i):
+        load_series(db, SYMBOL, '30d')
+        load_series(db, SYMBOL, 'All')
+
+    return measure(step, args.iterations or ITERATIONS['history'], (db,))
+
+
+SCENARIOS = {'loop': bench_loop, 'grid': bench_grid, 'snapshot': bench_snapshot, 'ledger': bench_ledger, 'dashboard': bench_dashboard,
+             'rerun': bench_rerun, 'history': bench_history}
+
+
+# --- Report / Baseline ---
+
+def case_key(scenario, trades, zones):
+    return f"{scenario}/{trades}t/{zones}z"
+
+
+def print_report(results):
+    print(f"{'case':<28} {'iters':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'cpu ms':>10} {'peak KB':>10} {'calls':>6}")
+    for key, r in results.items():
+        print(f"{key:<28} {r['iterations']:>6} {r['p50_ms']:>10.3f} {r['p95_ms']:>10.3f} {r['p99_ms']:>10.3f} "
+              f"{r['cpu_ms']:>10.3f} {r['peak_kb']:>10.1f} {r['calls']:>6.1f}")
+
+
+def compare(results, settings, path, tolerance):
+    """Prints every compared metric against the baseline. Returns the number of regressions."""
+    with open(path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('settings') != settings:
+        log(f"⚠️ Baseline settings differ: {baseline.get('settings')} vs {settings}")
+
+    regressions = 0
+    print(f"\nvs baseline {path} ({baseline.get('created')}), tolerance {tolerance:.0%}")
+    for key, r in results.items():
+        old = baseline['results'].get(key)
+        if old is None:
+            print(f"{key:<28} (new)")
+            continue
+        cells = []
+        for metric, floor in COMPARED.items():
+            change = (r[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+            worse = r[metric] - old[metric] > floor and change > tolerance
+            regressions += worse
+            cells.append(f"{metric} {old[metric]:.3f} -> {r[metric]:.3f} ({change:+.0%}){' ❌' if worse else ''}")
+        print(f"{key:<28} " + " | ".join(cells))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the trading loop and snapshot pipeline")
+    parser.add_argument('--full', action='store_true', help="Add the 1M trades / 10k zones size")
+    parser.add_argument('--only', help=f"Comma-separated scenarios ({', '.join(SCENARIOS)})")
+    parser.add_argument('--trades', type=int, help="One custom size: number of trades (with --zones)")
+    parser.add_argument('--zones', type=int, default=1)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Round trip added to every Binance / Supabase call")
+    parser.add_argument('--grid-step', type=float, default=GRID_STEP)
+    parser.add_argument('--open-ratio', type=float, default=0.1, help="Share of the trades still OPEN")
+    parser.add_argument('--iterations', type=int, help="Iterations per case (default per scenario)")
+    parser.add_argument('--save-baseline', nargs='?', const=BASELINE_PATH, metavar='PATH')
+    parser.add_argument('--compare', nargs='?', const=BASELINE_PATH, metavar='PATH')
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown before --compare fails")
+    args = parser.parse_args()
+
+    scenarios = args.only.split(',') if args.only else list(SCENARIOS)
+    sizes = [(args.trades, args.zones)] if args.trades else (FULL_SIZES if args.full else QUICK_SIZES)
+    settings = {'latency_ms': args.latency_ms, 'grid_step': args.grid_step, 'open_ratio': args.open_ratio}
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for case, (trades, zones) in enumerate(sizes):
+            log(f"Generating {trades:,} trades / {zones:,} zones...")
+            tables = dataset(trades, zones, args)
+            for scenario in scenarios:
+                key = case_key(scenario, trades, zones)
+                log(f"Running {key}")
+                # Scenarios that write get their own copy of the tables
+                copy = {name: [dict(r) for r in rows] for name, rows in tables.items()} if scenario == 'loop' else tables
+                results[key] = SCENARIOS[scenario](copy, args, workdir, case)
+            del tables
+
+    print_report(results)
+    output = {'created': datetime.now(timezone.utc).isoformat(), 'python': platform.python_version(),
+              'machine': platform.machine(), 'settings': settings, 'results': results}
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2)
+        log(f"Baseline saved to {args.save_baseline}")
+    if args.compare:
+        regressions = compare(results, settings, args.compare, args.tolerance)
+        log(f"{regressions} regression(s)" if regressions else "No regressions")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
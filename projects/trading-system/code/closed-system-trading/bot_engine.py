@@ -0,0 +1,212 @@
+"""
+Async Bot Engine
+================
+asyncio runtime for the grid bot. Each iteration runs the independent reads
+(config snapshot, price, regime, RSI) concurrently,
+so an iteration costs about the slowest single call instead of the sum of
+all of them. Open trades are read from the in-memory position book
+(position_book.py), which is reconciled with Supabase in the background.
+Orders are placed by a separate task that consumes a queue,
+and the snapshot runs in the background, so neither blocks the next decision.
+
+Decision rules and order execution are the ones in trade_and_log.py /
+strategy.py: PAPER, LIVE and DRY_RUN behave exactly as in the sync loop.
+
+Usage: python bot_engine.py
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+import trade_and_log as bot
+from trade_and_log import log
+
+IO_WORKERS = 12  # Threads for blocking client calls (6 reads + orders + snapshot, with headroom)
+
+
+class AsyncBotEngine:
+    def __init__(self, symbol=None):
+        self.symbol = symbol or bot.SYMBOL
+        self.state = bot.symbol_state(self.symbol)
+        self.step_size = None
+        self.orders = asyncio.Queue()
+        self._pending_sells = set()  # Trade IDs queued or being sold
+        self._pending_buy = False
+        self._snapshot_task = None
+        self._reconcile_task = None
+
+    # --- I/O (blocking client calls run in worker threads) ---
+
+    async def fetch_state(self):
+        """
+        Runs every independent read of one iteration concurrently.
+        The config snapshot is usually served from memory (config_cache.py);
+        a reload after a change notification overlaps with the other reads.
+        """
+        symbol = self.symbol
+        config, price, regime, rsi = await asyncio.gather(
+            asyncio.to_thread(metrics.timed, 'settings', symbol, lambda: self.state.apply_overrides(bot.config_cache.get())),
+            asyncio.to_thread(metrics.timed, 'price', symbol, bot.get_market_price, symbol),
+            asyncio.to_thread(metrics.timed, 'regime', symbol, bot.analyze_market_regime, symbol),
+            asyncio.to_thread(metrics.timed, 'rsi', symbol, bot.calculate_rsi, symbol),
+        )
+        return config, price, regime, rsi, self.state.position_book.open_trades()
+
+    async def order_worker(self):
+        """Places orders one at a time, in decision order (keeps cooldown semantics)."""
+        while True:
+            side, args = await self.orders.get()
+            try:
+                if side == 'BUY':
+                    await asyncio.to_thread(bot.execute_buy, *args)
+                else:
+                    trade = args[0]
+                    await asyncio.to_thread(bot.execute_sell, *args)
+                    self.state.position_book.secured.discard(trade['id'])
+            except Exception as e:
+                log(f"❌ Order task failure ({side}): {e}")
+                metrics.errors.inc(symbol=self.symbol, where='order')
+            finally:
+                if side == 'BUY':
+                    self._pending_buy = False
+                else:
+                    self._pending_sells.discard(args[0]['id'])
+                self.orders.task_done()
+
+    def maybe_snapshot(self):
+        if self._snapshot_task and not self._snapshot_task.done():
+            return
+        if time.time() - bot.LAST_SNAPSHOT_TIME <= bot.SNAPSHOT_INTERVAL:
+            # Ledger resync / checkpoint when due (background too)
+            self._snapshot_task = asyncio.create_task(asyncio.to_thread(bot.checkpoint_portfolio, self.state))
+            return
+        log(f"[SNAPSHOT] Running Portfolio Snapshot...")
+        bot.LAST_SNAPSHOT_TIME = time.time()
+        self._snapshot_task = asyncio.create_task(
+            asyncio.to_thread(metrics.timed, 'snapshot', self.symbol, bot.take_snapshot, self.symbol)
+        )
+
+    def maybe_reconcile(self):
+        book = self.state.position_book
+        if time.time() - book.last_reconcile < book.reconcile_interval:
+            return
+        if self._reconcile_task and not self._reconcile_task.done():
+            return
+        # Skip while orders are in flight: their DB write and book update are not atomic
+        if self._pending_buy or self._pending_sells:
+            return
+        self._reconcile_task = asyncio.create_task(asyncio.to_thread(book.reconcile))
+
+    async def sync_limit_grid(self, config, *args, **kwargs):
+        if self.state.limit_grid:
+            await asyncio.to_thread(bot.sync_limit_grid, self.state, config, *args, **kwargs)
+
+    # --- Iteration ---
+
+    async def run_iteration(self):
+        """
+        One decision pass. Returns the number of seconds to sleep afterwards.
+        """
+        started = time.perf_counter()
+        config, current_price, (market_regime, current_adx), current_rsi, open_trades = await self.fetch_state()
+        log(f"[TIMING] State fetched in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        # 0. Master Switch (config snapshot is fixed for the whole iteration)
+        if not config.is_active:
+            log("[PAUSE] Bot Paused via Dashboard (Master Switch OFF). Sleeping...")
+            await self.sync_limit_grid(config)
+            return bot.LOOP_INTERVAL
+
+        # 0.5 Snapshot Check & Position Book Reconciliation (background)
+        self.maybe_snapshot()
+        self.maybe_reconcile()
+
+        # 1. Zones & Price
+        with metrics.span('zones', self.symbol):
+            active_zones = config.zones_for(self.symbol)
+        if not active_zones:
+            log("⚠️ No Active Zones found. Sleeping...")
+            await self.sync_limit_grid(config)
+            return bot.LOOP_INTERVAL
+        if not current_price:
+            return 10
+
+        log(f"[ANALYSIS] Regime: {market_regime} | ADX: {current_adx:.2f}")
+
+        # 2. Select Correct Zone based on Price
+        with metrics.span('zone_select', self.symbol):
+            active_zone = bot.select_active_zone(config, current_price, self.symbol)
+        if not active_zone:
+            await self.sync_limit_grid(config, current_price=current_price)
+            return bot.LOOP_INTERVAL
+        log(f"[STATS] Market Data | Price: {current_price:.2f} | RSI: {current_rsi:.2f}")
+
+        if not (self._pending_buy or self._pending_sells):
+            bot.check_balance_drift(self.state)
+
+        # Trades with an order in flight are not re-evaluated
+        open_trades = [t for t in open_trades if t['id'] not in self._pending_sells]
+        metrics.open_trades.set(self.state.position_book.count(), symbol=self.symbol)
+
+        # 4. BUY (Entry)
+        with metrics.span('buy', self.symbol):
+            if self.state.limit_grid:
+                # Resting LIMIT buys + TP orders (order calls, so off the event loop)
+                await self.sync_limit_grid(config, active_zone, current_price, current_rsi, market_regime)
+                level = None
+            else:
+                level, _ = bot.check_buy(active_zone, self.state.position_book, current_price, current_rsi, market_regime, config, self.state.grid_index)
+        if level is not None and not self._pending_buy:
+            self._pending_buy = True
+            await self.orders.put(('BUY', (active_zone, level, current_price, self.step_size, current_rsi, config, self.symbol)))
+
+        # 5. SELL (Take Profit & Smart Exit)
+        with metrics.span('sell', self.symbol):
+            exits = bot.check_sells(open_trades, current_price, config, self.state.position_book, self.state.limit_grid)
+        for trade, reason in exits:
+            self._pending_sells.add(trade['id'])
+            await self.orders.put(('SELL', (trade, current_price, self.step_size, current_rsi, market_regime, config)))
+
+        log("💤 Waiting for price action...")
+        return bot.LOOP_INTERVAL
+
+    async def run(self):
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=IO_WORKERS))
+
+        config = await asyncio.to_thread(bot.config_cache.get)
+
+        log(f"[START] Async Bot Starting... MODE={bot.TRADING_MODE} | Step=${config.grid_step_usdt} | TP=${config.tp_usdt} | RSI Limit: {config.rsi_limit} | Size=${config.trade_size_usdt}")
+        self.step_size = await asyncio.to_thread(bot.get_symbol_step_size, self.symbol)
+        bot.start_metrics()
+        bot.start_trade_journal()
+        await asyncio.to_thread(self.state.position_book.load)
+        await asyncio.to_thread(bot.warm_up_from_store, [self.symbol])
+        await asyncio.to_thread(bot.start_market_feed, [self.symbol])
+        await asyncio.to_thread(bot.start_portfolio_ledger, [self.symbol])
+        await asyncio.to_thread(bot.start_read_model, [self.symbol])
+        bot.start_user_stream()
+        await asyncio.to_thread(bot.start_limit_grid, [self.symbol])
+        bot.start_config_watch()
+
+        worker = asyncio.create_task(self.order_worker())
+        try:
+            while True:
+                try:
+                    with metrics.span('iteration', self.symbol):
+                        delay = await self.run_iteration()
+                except Exception as e:
+                    log(f"[CRITICAL] Error in main loop: {e}")
+                    metrics.errors.inc(symbol=self.symbol, where='loop')
+                    delay = bot.LOOP_INTERVAL
+                await asyncio.sleep(delay)
+        finally:
+            worker.cancel()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(AsyncBotEngine().run())
+    except KeyboardInterrupt:
+        print("\n🛑 Bot stopped by user.")
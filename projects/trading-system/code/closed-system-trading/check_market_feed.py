@@ -0,0 +1,72 @@
+"""
+Offline check for MarketDataFeed against the local replay server.
+Verifies price/book/kline updates, reconnect after the server drops us, and
+that a failing listener does not keep the others from getting ticks.
+
+Usage: python check_market_feed.py
+"""
+
+import time
+from market_feed import MarketDataFeed
+from replay_server import ReplayServer
+
+PORT = 8799
+
+
+class BrokenListener:
+    def on_trade(self, *args):
+        raise RuntimeError("listener bug")
+
+    on_quote = on_trade
+
+
+class CountingListener:
+    trades = 0
+
+    def on_trade(self, *args):
+        self.trades += 1
+
+    def on_quote(self, *args):
+        pass
+
+
+counter = CountingListener()
+server = ReplayServer(port=PORT, rate=500, drop_after=300).start()
+feed = MarketDataFeed('BTCUSDT', history={'1m': 50, '5m': 20}, ws_url=server.url)
+feed.listeners += [BrokenListener(), counter]
+feed.start()
+
+try:
+    if not feed.wait_ready(10):
+        print("❌ FAIL: No price received from replay server.")
+        exit(1)
+
+    price = feed.get_price()
+    bid, ask = feed.get_book()
+    print(f"✅ PASS: Price received: {price} (Bid: {bid} / Ask: {ask})")
+
+    # Server drops every 300 messages, give the feed time to reconnect at least once
+    deadline = time.time() + 10
+    while feed.reconnects < 1 and time.time() < deadline:
+        time.sleep(0.2)
+    time.sleep(1.5)
+
+    if feed.reconnects >= 1 and feed.get_price(max_age=2) is not None:
+        print(f"✅ PASS: Reconnected {feed.reconnects} time(s) and still streaming.")
+    else:
+        print(f"❌ FAIL: Reconnects: {feed.reconnects}, fresh price: {feed.get_price(max_age=2)}")
+
+    if counter.trades > 0:
+        print(f"✅ PASS: {counter.trades} ticks delivered past a listener that raised {feed.listener_errors} times.")
+    else:
+        print("❌ FAIL: A failing listener kept the ticks from the next one.")
+
+    klines = feed.get_klines('1m')
+    if klines and all(len(k) == 7 for k in klines):
+        print(f"✅ PASS: {len(klines)} x 1m candles in memory. Last close: {klines[-1][4]}")
+    else:
+        print("❌ FAIL: No candles stored.")
+
+finally:
+    feed.stop()
+    server.stop()
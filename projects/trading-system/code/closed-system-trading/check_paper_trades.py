@@ -1,9 +1,29 @@
 import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from read_model import READ_MODEL_PORT, ReadModelClient
 
 load_dotenv()
 
+
+def print_trade(trade):
+    print(f"- {trade.get('created_at', 'not flushed yet')} | {trade['order_type']} | qty: {trade['quantity']} | price: {trade['entry_price']} | status: {trade['status']}")
+    if trade['order_type'] == 'SELL':
+        print(f"  PnL: {trade.get('pnl_usdt', 'N/A')} | Fee: {trade.get('fee_usdt', 'N/A')}")
+
+
+# A running PAPER bot serves its open trades and latest fills (read_model.py): no Supabase client needed.
+# The all-time record count is only in Supabase: it is printed when no bot is running.
+symbol = os.environ.get("SYMBOL", "BTCUSDT")
+live = ReadModelClient(int(os.environ.get("READ_MODEL_PORT", READ_MODEL_PORT))).state(symbol)
+if live and (live['settings'] or {}).get('trading_mode') == 'PAPER':
+    print(f"=== Paper Trades (Running Bot, {symbol}) ===")
+    print("\nLast 5 Paper Trades (opened or closed):")
+    for trade in live['trades'][:5]:
+        print_trade(trade)
+    print(f"\nTotal OPEN paper trades: {len(live['positions'])}")
+    exit(0)
+
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
 
@@ -24,9 +44,7 @@ try:
         recent = supabase.table("paper_trade_log").select("*").order("created_at", desc=True).limit(5).execute()
         print("\nLast 5 Paper Trades:")
         for trade in recent.data:
-            print(f"- {trade['created_at']} | {trade['order_type']} | qty: {trade['quantity']} | price: {trade['entry_price']} | status: {trade['status']}")
-            if trade['order_type'] == 'SELL':
-                print(f"  PnL: {trade.get('pnl_usdt', 'N/A')} | Fee: {trade.get('fee_usdt', 'N/A')}")
+            print_trade(trade)
     
     # Check if there are any OPEN paper trades
     open_trades = supabase.table("paper_trade_log").select("*").eq("status", "OPEN").execute()
@@ -1,9 +1,19 @@
 import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from read_model import READ_MODEL_PORT, ReadModelClient
 
 load_dotenv()
 
+# The running bot's config snapshot (read_model.py): no Supabase client needed
+symbol = os.environ.get("SYMBOL", "BTCUSDT")
+live = ReadModelClient(int(os.environ.get("READ_MODEL_PORT", READ_MODEL_PORT))).get("settings", symbol)
+if live:
+    print(f"=== Bot Settings (Running Bot, {symbol}) ===")
+    for k, v in live.items():
+        print(f"{k}: {v}")
+    exit(0)
+
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
 
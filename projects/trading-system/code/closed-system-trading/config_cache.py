@@ -0,0 +1,259 @@
+"""
+Config Cache
+============
+Keeps `bot_settings` and the Active `zones_config` rows in memory as one
+immutable, versioned BotConfig snapshot instead of querying Supabase every loop.
+
+The snapshot is reloaded when:
+  - a change notification arrives (Supabase Realtime, or the local marker
+    file that dashboard.py touches after every settings/zone write), or
+  - the TTL expires (safety net if notifications are not available).
+
+Each snapshot carries a ZoneIndex per symbol over its zones (zone_index.py),
+so the index is built once per zones_config change, not per price check.
+
+Readers call `get()` once per iteration and use that snapshot for every
+decision in the iteration, so a change is applied atomically between
+iterations and never half-way through one.
+
+Realtime needs the tables in the `supabase_realtime` publication (see schema.sql).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from zone_index import ZoneIndex
+
+CONFIG_TTL = 300           # Seconds before a reload even without a notification
+MARKER_POLL_INTERVAL = 1.0 # Seconds between marker file checks
+CONFIG_MARKER_PATH = os.getenv('CONFIG_MARKER_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.config_changed'))
+WATCHED_TABLES = ('bot_settings', 'zones_config')
+
+DEFAULT_SYMBOL = 'BTCUSDT' # Zones without a symbol (before add_symbol_column.sql) belong here
+
+EMPTY_ZONE_INDEX = ZoneIndex(())
+
+
+class BotConfig(namedtuple('BotConfig', [
+    'rsi_limit', 'tp_usdt', 'grid_step_usdt', 'trade_cooldown', 'trade_size_usdt', 'is_active',
+    'zones', 'zone_indexes', 'version', 'loaded_at',
+])):
+    __slots__ = ()
+
+    def zone_index(self, symbol=DEFAULT_SYMBOL):
+        """ZoneIndex over the Active zones of `symbol`."""
+        return self.zone_indexes.get(symbol, EMPTY_ZONE_INDEX)
+
+    def zones_for(self, symbol=DEFAULT_SYMBOL):
+        return self.zone_index(symbol).zones
+
+
+def index_zones(zones):
+    """One ZoneIndex per symbol."""
+    by_symbol = {}
+    for z in zones:
+        by_symbol.setdefault(z.get('symbol') or DEFAULT_SYMBOL, []).append(z)
+    return {symbol: ZoneIndex(rows) for symbol, rows in by_symbol.items()}
+
+
+def log(message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] [CONFIG] {message}")
+
+
+def touch_config_marker(path=CONFIG_MARKER_PATH):
+    """Signals a local config change (called by the dashboard after writes)."""
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(str(time.time()))
+    except OSError as e:
+        print(f"⚠️ Could not touch config marker: {e}")
+
+
+def build_config(settings, zones, defaults, version=0):
+    """Builds a BotConfig from a bot_settings row (missing keys fall back to `defaults`)."""
+    settings = settings or {}
+    return BotConfig(
+        rsi_limit=int(settings.get('rsi_limit', defaults['rsi_limit'])),
+        tp_usdt=float(settings.get('tp_usdt', defaults['tp_usdt'])),
+        grid_step_usdt=float(settings.get('grid_step_usdt', defaults['grid_step_usdt'])),
+        trade_cooldown=int(settings.get('trade_cooldown', defaults['trade_cooldown'])),
+        trade_size_usdt=float(settings.get('trade_size_usdt', defaults['trade_size_usdt'])),
+        is_active=bool(settings.get('is_active', True)),
+        zones=tuple(zones or ()),
+        zone_indexes=index_zones(zones or ()),  # Rebuilt only when settings/zones actually change
+        version=version,
+        loaded_at=time.time(),
+    )
+
+
+class SupabaseConfigSource:
+    """Raw loaders. Unlike the bot helpers, these raise on error so a failed load never looks like 'no zones'."""
+
+    def __init__(self, supabase_client):
+        self.supabase = supabase_client
+
+    def load_settings(self):
+        response = self.supabase.table("bot_settings").select("*").eq("id", 1).execute()
+        return response.data[0] if response.data else None
+
+    def load_zones(self):
+        response = self.supabase.table("zones_config").select("*").eq("status", "Active").execute()
+        return response.data or []
+
+
+class ConfigCache:
+    def __init__(self, source, defaults, ttl=CONFIG_TTL):
+        self.source = source
+        self.defaults = dict(defaults)
+        self.ttl = ttl
+        self._config = None
+        self._fingerprint = None
+        self._dirty = threading.Event()
+        self._dirty.set()
+        self._lock = threading.Lock()
+        self._notifiers = []
+        self.listeners = []  # fn(config) per new version (e.g. read_model.ReadModel.on_config)
+
+    def invalidate(self, reason="manual"):
+        if not self._dirty.is_set():
+            log(f"Invalidated ({reason})")
+        self._dirty.set()
+
+    def get(self):
+        """Current snapshot; reloads first if invalidated or older than the TTL."""
+        config = self._config
+        if config is None or self._dirty.is_set() or time.time() - config.loaded_at > self.ttl:
+            return self.refresh()
+        return config
+
+    def refresh(self):
+        with self._lock:
+            self._dirty.clear()
+            try:
+                settings = self.source.load_settings()
+                zones = self.source.load_zones()
+            except Exception as e:
+                log(f"⚠️ Reload failed, keeping v{self._config.version if self._config else 0}: {e}")
+                # Retried on the next get(), not after the TTL: the change (or the first load) is still missing
+                self._dirty.set()
+                if self._config is None:
+                    self._config = build_config(None, (), self.defaults)._replace(loaded_at=0)
+                return self._config
+
+            fingerprint = hashlib.sha1(json.dumps([settings, zones], sort_keys=True, default=str).encode()).hexdigest()
+            previous = self._config
+            if previous is not None and fingerprint == self._fingerprint:
+                # Unchanged: keep version, just renew the TTL
+                self._config = previous._replace(loaded_at=time.time())
+                return self._config
+
+            version = previous.version + 1 if previous else 1
+            self._config = build_config(settings, zones, self.defaults, version)
+            self._fingerprint = fingerprint
+            if previous is not None:
+                log(f"v{version} applied | RSI {self._config.rsi_limit} | TP ${self._config.tp_usdt} | "
+                    f"Step ${self._config.grid_step_usdt} | Size ${self._config.trade_size_usdt} | "
+                    f"Active: {self._config.is_active} | Zones: {len(self._config.zones)}")
+            for listener in self.listeners:
+                listener(self._config)
+            return self._config
+
+    # --- Change notifications ---
+
+    def watch_marker(self, path=CONFIG_MARKER_PATH):
+        notifier = MarkerFileNotifier(path, self.invalidate).start()
+        self._notifiers.append(notifier)
+        return notifier
+
+    def watch_realtime(self, supabase_url, supabase_key, tables=WATCHED_TABLES):
+        notifier = RealtimeNotifier(supabase_url, supabase_key, tables, self.invalidate).start()
+        self._notifiers.append(notifier)
+        return notifier
+
+    def stop(self):
+        for n in self._notifiers:
+            n.stop()
+
+
+class MarkerFileNotifier:
+    """Local stand-in for push notifications: fires when the marker file's mtime changes."""
+
+    def __init__(self, path, on_change):
+        self.path = path
+        self.on_change = on_change
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _run(self):
+        last = self._mtime()
+        while not self._stop.wait(MARKER_POLL_INTERVAL):
+            current = self._mtime()
+            if current != last:
+                last = current
+                self.on_change("marker file")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="config-marker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+class RealtimeNotifier:
+    """Supabase Realtime (postgres_changes) subscription on the config tables."""
+
+    def __init__(self, supabase_url, supabase_key, tables, on_change):
+        self.url = supabase_url
+        self.key = supabase_key
+        self.tables = tables
+        self.on_change = on_change
+        self._stop = threading.Event()
+        self._thread = None
+        self.connected = False
+
+    async def _listen(self):
+        from supabase import acreate_client
+
+        client = await acreate_client(self.url, self.key)
+        channel = client.channel("bot-config-changes")
+        for table in self.tables:
+            channel.on_postgres_changes(
+                "*", schema="public", table=table,
+                callback=lambda payload, t=table: self.on_change(f"realtime: {t}")
+            )
+        await channel.subscribe()
+        self.connected = True
+        log(f"Realtime subscribed: {', '.join(self.tables)}")
+        while not self._stop.is_set():
+            await asyncio.sleep(1)
+        await client.remove_all_channels()
+
+    def _run(self):
+        try:
+            asyncio.run(self._listen())
+        except Exception as e:
+            self.connected = False
+            log(f"⚠️ Realtime unavailable, relying on marker file + TTL: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="config-realtime", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
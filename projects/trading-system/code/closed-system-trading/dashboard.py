@@ -5,7 +5,13 @@ import time
 from binance.client import Client
 from dotenv import load_dotenv
 from supabase import create_client, Client as SupabaseClient
-from snapshot_manager import calculate_unrealized_pnl # Import shard logic
+from kline_cache import KlineCache
+from market_store import shared_store as market_store
+from config_cache import touch_config_marker
+from dashboard_data import DashboardData
+from read_model import READ_MODEL_PORT, ReadModelClient
+from snapshot_series import CHART_RANGES, DEFAULT_RANGE, format_bucket
+from trade_aggregates import DAILY_PNL_DAYS
 
 # --- Configuration & Setup ---
 st.set_page_config(
@@ -38,39 +44,57 @@ def init_clients():
 
 binance_client, supabase_client = init_clients()
 
+# Shared across sessions/reruns: only candles newer than the last stored one are fetched
+@st.cache_resource
+def get_kline_cache():
+    return KlineCache(capacity={'1m': 240})
+
+kline_cache = get_kline_cache()
+
+# Shared across sessions/reruns: every read below is served from memory until its TTL
+# (dashboard_data.DASHBOARD_TTLS) or until a write on this page invalidates it.
+# The price is read from the running bot's read model when it is up (read_model.py).
+@st.cache_resource
+def get_dashboard_data():
+    read_model = ReadModelClient(int(os.getenv('READ_MODEL_PORT', READ_MODEL_PORT)))
+    return DashboardData(supabase_client, binance_client, kline_cache, read_model=read_model)
+
+dashboard_data = get_dashboard_data()
+
+# Pairs traded by the supervisor (same SYMBOLS setting as the bot)
+DASHBOARD_SYMBOLS = [s.strip().upper() for s in os.getenv('SYMBOLS', 'BTCUSDT').split(',') if s.strip()]
+LIVE_REFRESH_SECONDS = int(os.getenv('LIVE_REFRESH_SECONDS', 5))  # Live Refresh: overview fragment period
+
 # --- Data Fetching ---
-def get_btc_price():
+def get_btc_price(symbol='BTCUSDT'):
+    """Last price of `symbol` (name kept from the BTC-only dashboard)."""
     try:
-        ticker = binance_client.get_symbol_ticker(symbol='BTCUSDT')
-        return float(ticker['price'])
+        return dashboard_data.price(symbol)
     except:
         return 0.0
 
-def get_thb_rate():
+@st.cache_data(ttl=300)
+def fetch_price_history(symbol='BTCUSDT', days=30):
+    """1h closes for the last `days` days from the local market data store (synced first, only new candles are downloaded)."""
+    start = int(time.time() * 1000) - days * 86_400_000
     try:
-        # Try fetching USDTTHB
-        ticker = binance_client.get_symbol_ticker(symbol='USDTTHB')
-        return float(ticker['price'])
-    except:
-        # Fallback to ~34.0 if unavailable
-        return 34.0
-
-def fetch_zones():
-    response = supabase_client.table("zones_config").select("*").order("price_low", desc=False).execute()
-    df = pd.DataFrame(response.data)
-    if not df.empty:
-        # Ensure correct types
-        df['price_low'] = df['price_low'].astype(float)
-        df['price_high'] = df['price_high'].astype(float)
-        df['capital_allocated'] = df['capital_allocated'].astype(float)
-    return df
+        market_store.sync(binance_client, symbol, '1h', start)
+    except Exception as e:
+        st.warning(f"⚠️ Price history sync failed, showing stored candles: {e}")
+    v = market_store.range(symbol, '1h', start)
+    # Copied out, so the mapping is released and the bot can still rewrite the file (Windows)
+    return pd.DataFrame({'time': pd.to_datetime(v.open_time, unit='ms'), 'close': v.close.copy()})
+
+def get_thb_rate():
+    # USDTTHB, ~34.0 if unavailable
+    return dashboard_data.thb_rate()
+
+def fetch_zones(symbol='BTCUSDT'):
+    return dashboard_data.zones(symbol)
 
 def fetch_baseline(symbol='BTCUSDT'):
     try:
-        response = supabase_client.table("baseline_prices").select("*").eq("symbol", symbol).execute()
-        if response.data:
-            return response.data[0]
-        return None
+        return dashboard_data.baseline(symbol)
     except Exception as e:
         # Table might not exist yet if migration hasn't run
         return None
@@ -86,6 +110,7 @@ def set_baseline(symbol, price, capital):
         }
         # Upsert based on symbol unique constraint
         supabase_client.table("baseline_prices").upsert(data, on_conflict="symbol").execute()
+        dashboard_data.invalidate('baseline', symbol)
         st.success("✅ Baseline Set Successfully!")
         time.sleep(1)
         st.rerun()
@@ -111,13 +136,15 @@ def upsert_zones(df_to_save):
                 "capital_allocated": record['capital_allocated']
             }
             supabase_client.table("zones_config").update(payload).eq("id", record['id']).execute()
+        dashboard_data.invalidate('zones')
+        touch_config_marker() # Bot reloads zones immediately
             
         st.success("✅ Changes saved to Supabase!")
         st.rerun()
     except Exception as e:
         st.error(f"❌ Failed to save: {e}")
 
-def create_next_zone(based_on_price, direction="UP"):
+def create_next_zone(based_on_price, direction="UP", symbol='BTCUSDT'):
     """
     Creates a new zone.
     UP: [based_on_price, based_on_price + 2000]
@@ -136,6 +163,7 @@ def create_next_zone(based_on_price, direction="UP"):
     try:
         new_zone = {
             "zone_name": name,
+            "symbol": symbol,
             "price_low": low,
             "price_high": high,
             # "zone_width": width, # Removed: Generated column in DB
@@ -143,45 +171,59 @@ def create_next_zone(based_on_price, direction="UP"):
             "status": "Inactive"
         }
         supabase_client.table("zones_config").insert(new_zone).execute()
+        dashboard_data.invalidate('zones', symbol)
+        touch_config_marker()
         st.success(f"✅ Created Zone: {name}")
         st.rerun()
     except Exception as e:
         st.error(f"Failed to create zone: {e}")
 
-def fetch_snapshots(limit=100):
+def fetch_snapshots(limit=100, symbol='BTCUSDT'):
+    try:
+        return dashboard_data.snapshots(symbol, limit).copy() # Copy: the charts convert columns in place
+    except Exception as e:
+        return pd.DataFrame()
+
+def fetch_snapshot_series(symbol, range_key):
+    try:
+        return dashboard_data.snapshot_series(symbol, range_key)
+    except Exception as e:
+        st.error(f"Error fetching snapshot history: {e}")
+        return pd.DataFrame(), 0
+
+def fetch_recent_trades(is_paper_mode, symbol):
     try:
-        response = supabase_client.table("portfolio_snapshots")\
-            .select("*")\
-            .order("snapshot_time", desc=True)\
-            .limit(limit)\
-            .execute()
-        return pd.DataFrame(response.data)
+        return dashboard_data.recent_trades(is_paper_mode, symbol)
     except Exception as e:
+        st.error(f"Error fetching recent trades: {e}")
         return pd.DataFrame()
 
-def fetch_ai_trades(is_paper_mode, limit=50):
+def fetch_ai_trades(is_paper_mode, limit=50, symbol='BTCUSDT'):
     """Fetch closed trades that have AI analysis."""
-    table = "paper_trade_log" if is_paper_mode else "trade_log"
     try:
-        response = supabase_client.table(table)\
-            .select("id, created_at, exit_at, zone_name, entry_price, exit_price, quantity, pnl_usdt, pnl_percent, ai_analysis, ai_score")\
-            .eq("status", "CLOSED")\
-            .order("exit_at", desc=True)\
-            .limit(limit)\
-            .execute()
-        df = pd.DataFrame(response.data)
-        return df
+        return dashboard_data.ai_trades(is_paper_mode, symbol, limit)
     except Exception as e:
         return pd.DataFrame()
 
+def fetch_trades_data(is_paper_mode, symbol):
+    try:
+        return dashboard_data.trades(is_paper_mode, symbol)
+    except Exception as e:
+        st.error(f"Error fetching trades: {e}")
+        return pd.DataFrame()
+
+def fetch_daily_pnl(is_paper_mode, symbol):
+    try:
+        return dashboard_data.daily_pnl(is_paper_mode, symbol)
+    except Exception as e:
+        st.error(f"Error fetching daily PnL: {e}")
+        return pd.DataFrame()
+
 # --- Bot Settings Helpers ---
 def fetch_bot_settings():
     try:
-        # Assuming ID=1 is the singleton settings row
-        response = supabase_client.table("bot_settings").select("*").eq("id", 1).execute()
-        if response.data:
-            return response.data[0]
-        return {} # Empty if not found
+        # Assuming ID=1 is the singleton settings row ({} if not found)
+        return dashboard_data.settings()
     except Exception:
         # If table missing or error, return empty (UI will use defaults)
         return {}
@@ -189,6 +231,8 @@ def fetch_bot_settings():
 def update_bot_settings(settings_dict):
     try:
         supabase_client.table("bot_settings").update(settings_dict).eq("id", 1).execute()
+        dashboard_data.invalidate('settings')
+        touch_config_marker() # Bot reloads settings immediately
         st.success("✅ Bot Settings Updated!")
         time.sleep(1) # Give a moment to see the success message
         st.rerun()
@@ -207,6 +251,8 @@ view_mode = st.sidebar.radio(
 
 is_paper = (view_mode == 'Paper Trading')
 
+selected_symbol = st.sidebar.selectbox("Symbol", DASHBOARD_SYMBOLS, index=0)
+
 if is_paper:
     st.warning("⚠️ SIMULATION MODE: Displaying Paper Trading Data")
     st.markdown("""
@@ -224,6 +270,68 @@ if is_paper:
     <div class="paper-badge">SIMULATION / PAPER TRADING ACTIVE</div>
     """, unsafe_allow_html=True)
 
+live_mode = st.sidebar.toggle(
+    "🔴 Live Refresh",
+    value=False,
+    help=f"Re-runs the overview every {LIVE_REFRESH_SECONDS}s. Only rows changed since the last refresh are fetched."
+)
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS if live_mode else None)
+def live_overview(is_paper, selected_symbol):
+    """Overview metrics, zone alert and recent trades. A fragment: in Live Refresh mode only this part reruns."""
+    col1, col2, col3, col4, col5 = st.columns(5)
+    
+    btc_price = get_btc_price(selected_symbol)
+    df_zones = fetch_zones(selected_symbol)
+    df_snapshots = fetch_snapshots(limit=1, symbol=selected_symbol) # Get latest snapshot for drawdown
+    
+    # Calc Metrics (dashboard_data.py: SQL aggregates, cached until the totals / zones / price change)
+    metrics = dashboard_data.overview(is_paper, selected_symbol, btc_price)
+    realized_profit = metrics['realized_profit']
+    unrealized_profit = metrics['unrealized_profit']
+    open_trades_count = metrics['open_trades_count']
+            
+    # Get Drawdown from latest snapshot if available
+    current_dd = 0.0
+    max_dd = None
+    if not df_snapshots.empty and 'current_drawdown_pct' in df_snapshots.columns:
+        current_dd = df_snapshots.iloc[0]['current_drawdown_pct']
+        if 'max_drawdown_pct' in df_snapshots.columns and pd.notna(df_snapshots.iloc[0]['max_drawdown_pct']):
+            max_dd = float(df_snapshots.iloc[0]['max_drawdown_pct']) # Portfolio ledger: worst DD over every tick
+    
+    # Zone metrics
+    total_active_capital = metrics['total_active_capital']
+    is_price_safe = metrics['is_price_safe']
+    nearest_edge_distance, nearest_edge = metrics['nearest_edge_distance'], metrics['nearest_edge']
+    
+    with col1:
+        st.metric(f"{selected_symbol} Price", f"${btc_price:,.2f}")
+    with col2:
+        st.metric("Active Capital", f"${total_active_capital:,.2f}")
+    with col3:
+        # Split PnL Display
+        st.metric("Realized PnL", f"${realized_profit:,.2f}", delta=f"${unrealized_profit:.2f} (Unrealized)")
+    with col4:
+        st.metric("Open Trades", f"{open_trades_count}")
+    with col5:
+         st.metric("Drawdown", f"{current_dd:.2f}%", delta=f"Max {max_dd:.2f}%" if max_dd else None, delta_color="off")
+    
+    # Alert Banner
+    if not is_price_safe and not df_zones.empty:
+        st.error(f"🚨 ALERT: Current Price ${btc_price:,.2f} is NOT in any Active Module! Please Activate a zone.")
+        if nearest_edge is not None:
+            st.caption(f"Nearest active zone edge: ${nearest_edge:,.2f} (${nearest_edge_distance:,.2f} away)")
+
+    # Trades opened or changed last (delta-synced: a refresh fetches only what changed)
+    with st.expander("🕒 Recent Activity", expanded=live_mode):
+        df_recent = fetch_recent_trades(is_paper, selected_symbol)
+        if not df_recent.empty:
+            st.dataframe(df_recent, use_container_width=True, hide_index=True)
+        else:
+            st.info("No trades yet.")
+        if live_mode:
+            st.caption(f"🔴 Live: updated {time.strftime('%H:%M:%S')}, every {LIVE_REFRESH_SECONDS}s")
+
 # Main Tabs
 main_tab1, main_tab2, main_tab3, main_tab4 = st.tabs(["Control & Monitor", "Performance Analysis", "TP Calculator", "AI Analytics"])
 
@@ -260,12 +368,12 @@ with main_tab1:
 
             # Conversion Display
             thb_rate = get_thb_rate()
-            btc_price_live = get_btc_price()
+            btc_price_live = get_btc_price(selected_symbol)
             
             size_thb = new_size * thb_rate
             size_btc = new_size / btc_price_live if btc_price_live > 0 else 0
             
-            st.info(f"💵 **Value in THB:** ~{size_thb:,.2f} THB (Rate: {thb_rate:.2f})  |  BTC: {size_btc:.6f}")
+            st.info(f"💵 **Value in THB:** ~{size_thb:,.2f} THB (Rate: {thb_rate:.2f})  |  {selected_symbol}: {size_btc:.6f}")
             
             new_active = st.checkbox("✅ Master Switch (Active)", value=s_active)
             
@@ -280,89 +388,10 @@ with main_tab1:
                 }
                 update_bot_settings(payload)
 
-    # --- Dashboard Overview ---
-    col1, col2, col3, col4, col5 = st.columns(5)
-    
-    btc_price = get_btc_price()
-    df_zones = fetch_zones()
-    df_snapshots = fetch_snapshots(limit=1) # Get latest snapshot for drawdown
-    
-    # Data Fetching for Metrics
-    def fetch_trades_data(is_paper_mode):
-        table = "paper_trade_log" if is_paper_mode else "trade_log"
-        try:
-            res = supabase_client.table(table).select("*").execute()
-            df = pd.DataFrame(res.data)
-            if not df.empty:
-                for col in ['entry_price', 'quantity', 'total_usdt', 'pnl_usdt', 'fee_usdt']:
-                    if col in df.columns:
-                        df[col] = df[col].astype(float)
-            return df
-        except Exception as e:
-            st.error(f"Error fetching trades: {e}")
-            return pd.DataFrame()
-    
-    df_trades = fetch_trades_data(is_paper)
-    
-    # Calc Metrics
-    realized_profit = 0.0
-    unrealized_profit = 0.0
-    open_trades_count = 0
-    paper_fees = 0.0
-    
-    if not df_trades.empty:
-        # Realized PnL (Closed Trades)
-        if 'pnl_usdt' in df_trades.columns:
-            realized_profit = df_trades[df_trades['status'] == 'CLOSED']['pnl_usdt'].sum()
-        
-        # Unrealized PnL (Open Trades)
-        # Using shared logic for consistency
-        open_trades_df = df_trades[df_trades['status'] == 'OPEN']
-        if not open_trades_df.empty:
-            open_trades_list = open_trades_df.to_dict('records')
-            unrealized_profit, _, _ = calculate_unrealized_pnl(open_trades_list, btc_price)
-            open_trades_count = len(open_trades_df)
-            
-        if is_paper and 'fee_usdt' in df_trades.columns:
-            paper_fees = df_trades['fee_usdt'].sum()
-            
-    # Get Drawdown from latest snapshot if available
-    current_dd = 0.0
-    if not df_snapshots.empty and 'current_drawdown_pct' in df_snapshots.columns:
-        current_dd = df_snapshots.iloc[0]['current_drawdown_pct']
-    
-    # Zone metrics
-    if not df_zones.empty:
-        active_zones = df_zones[df_zones['status'] == 'Active']
-        total_active_capital = active_zones['capital_allocated'].sum() or 0.0
-        
-        current_active_zone = active_zones[
-            (active_zones['price_low'] <= btc_price) & 
-            (active_zones['price_high'] >= btc_price)
-        ]
-        
-        current_zone_display = current_active_zone.iloc[0]['zone_name'] if not current_active_zone.empty else "None (⚠️ OUT OF ZONE)"
-        is_price_safe = not current_active_zone.empty
-    else:
-        total_active_capital = 0.0
-        current_zone_display = "No Data"
-        is_price_safe = False
-    
-    with col1:
-        st.metric("BTC Price", f"${btc_price:,.2f}")
-    with col2:
-        st.metric("Active Capital", f"${total_active_capital:,.2f}")
-    with col3:
-        # Split PnL Display
-        st.metric("Realized PnL", f"${realized_profit:,.2f}", delta=f"${unrealized_profit:.2f} (Unrealized)")
-    with col4:
-        st.metric("Open Trades", f"{open_trades_count}")
-    with col5:
-         st.metric("Drawdown", f"{current_dd:.2f}%", delta_color="inverse")
-    
-    # Alert Banner
-    if not is_price_safe and not df_zones.empty:
-        st.error(f"🚨 ALERT: Current Price ${btc_price:,.2f} is NOT in any Active Module! Please Activate a zone.")
+    # --- Dashboard Overview (live_overview: refreshed on its own in Live Refresh mode) ---
+    btc_price = get_btc_price(selected_symbol)
+    df_zones = fetch_zones(selected_symbol)
+    live_overview(is_paper, selected_symbol)
     
     st.divider()
     
@@ -404,54 +433,8 @@ with main_tab1:
     st.divider()
     with st.expander("📊 Zone Performance Analysis", expanded=True):
         if not df_zones.empty:
-            # Prepare aggregation
-            # We need: Zone Name | Budget | Invested | Remaining | Realized PnL | % Utilized
-            
-            # Create a base frame from df_zones
-            perf_df = df_zones[['zone_name', 'capital_allocated']].copy()
-            perf_df.columns = ['Zone Name', 'Budget (USDT)']
-            perf_df['Invested (USDT)'] = 0.0
-            perf_df['Realized PnL (USDT)'] = 0.0
-            perf_df['Trade Count'] = 0
-            
-            if not df_trades.empty:
-                # Group metrics
-                # Invested: Sum total_usdt where status=OPEN
-                open_trades_agg = df_trades[df_trades['status'] == 'OPEN'].groupby('zone_name')['total_usdt'].sum().reset_index()
-                
-                # Realized PnL: Sum pnl_usdt (all closed trades)
-                pnl_agg = df_trades.groupby('zone_name')['pnl_usdt'].sum().reset_index() if 'pnl_usdt' in df_trades.columns else pd.DataFrame(columns=['zone_name', 'pnl_usdt'])
-                
-                # Count
-                count_agg = df_trades[df_trades['status'] == 'OPEN'].groupby('zone_name').size().reset_index(name='count')
-                
-                pass # Aggregations ready
-                
-                # Map to perf_df
-                for index, row in perf_df.iterrows():
-                    z_name = row['Zone Name']
-                    
-                    # Fill Invested
-                    if not open_trades_agg.empty:
-                        item = open_trades_agg[open_trades_agg['zone_name'] == z_name]
-                        if not item.empty:
-                            perf_df.at[index, 'Invested (USDT)'] = item.iloc[0]['total_usdt']
-                            
-                    # Fill PnL
-                    if not pnl_agg.empty:
-                        item = pnl_agg[pnl_agg['zone_name'] == z_name]
-                        if not item.empty:
-                            perf_df.at[index, 'Realized PnL (USDT)'] = item.iloc[0]['pnl_usdt']
-                            
-                    # Fill Count
-                    if not count_agg.empty:
-                        item = count_agg[count_agg['zone_name'] == z_name]
-                        if not item.empty:
-                            perf_df.at[index, 'Trade Count'] = item.iloc[0]['count']
-            
-            # Calc Derivatives
-            perf_df['Remaining (USDT)'] = perf_df['Budget (USDT)'] - perf_df['Invested (USDT)']
-            perf_df['% Utilized'] = (perf_df['Invested (USDT)'] / perf_df['Budget (USDT)'].replace(0, 1)) * 100
+            # Zone Name | Budget | Invested | Remaining | Realized PnL | % Utilized
+            perf_df = dashboard_data.zone_performance(is_paper, selected_symbol)
             
             # Formatting for display
             st.dataframe(
@@ -489,19 +472,19 @@ with main_tab1:
         if st.button("⬆️ Generate Next UPPER Zone"):
             if not df_zones.empty:
                 max_high = df_zones['price_high'].max()
-                create_next_zone(max_high, "UP")
+                create_next_zone(max_high, "UP", selected_symbol)
             else:
                 base = round(btc_price / 1000) * 1000
-                create_next_zone(base, "UP")
+                create_next_zone(base, "UP", selected_symbol)
     
     with c_act2:
         if st.button("⬇️ Generate Next LOWER Zone"):
             if not df_zones.empty:
                 min_low = df_zones['price_low'].min()
-                create_next_zone(min_low, "DOWN")
+                create_next_zone(min_low, "DOWN", selected_symbol)
             else:
                 base = round(btc_price / 1000) * 1000
-                create_next_zone(base, "DOWN")
+                create_next_zone(base, "DOWN", selected_symbol)
     
     with c_act3:
         if st.button("🛑 Emergency Mode (Toggle)"):
@@ -523,14 +506,19 @@ with main_tab1:
             )
             
     with col_ex2:
-        if not df_trades.empty:
-            csv_trades = df_trades.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="📜 Export Trade History (CSV)",
-                data=csv_trades,
-                file_name=f"trade_history_{'paper' if is_paper else 'live'}_{int(time.time())}.csv",
-                mime="text/csv",
-            )
+        # Every trade row: only read once asked for, not on every rerun
+        if st.toggle("📜 Prepare Trade History Export"):
+            df_trades = fetch_trades_data(is_paper, selected_symbol)
+            if not df_trades.empty:
+                csv_trades = df_trades.to_csv(index=False).encode('utf-8')
+                st.download_button(
+                    label=f"📜 Export Trade History (CSV, {len(df_trades):,} trades)",
+                    data=csv_trades,
+                    file_name=f"trade_history_{'paper' if is_paper else 'live'}_{int(time.time())}.csv",
+                    mime="text/csv",
+                )
+            else:
+                st.info("No trades yet.")
 
 # ==========================================
 # TAB 2: Performance Analysis (NEW)
@@ -541,14 +529,13 @@ with main_tab2:
     # 1. Baseline Configuration
     st.subheader("1. Day 1 Baseline Configuration")
     
-    # Needs to fetch baseline for BTCUSDT
-    baseline_data = fetch_baseline("BTCUSDT")
+    baseline_data = fetch_baseline(selected_symbol)
     current_baseline_price = float(baseline_data['baseline_price']) if baseline_data else 0.0
     current_initial_capital = float(baseline_data['initial_capital']) if baseline_data and baseline_data.get('initial_capital') else 0.0
     
     with st.expander("📝 Set/Update Baseline", expanded=not bool(baseline_data)):
         with st.form("baseline_form"):
-            b_symbol = st.text_input("Symbol", value="BTCUSDT", disabled=True)
+            b_symbol = st.text_input("Symbol", value=selected_symbol, disabled=True)
             b_price = st.number_input("Day 1 Price ($)", value=current_baseline_price if current_baseline_price > 0 else btc_price, min_value=0.0)
             b_capital = st.number_input("Initial Capital ($)", value=current_initial_capital, min_value=0.0)
             
@@ -560,7 +547,7 @@ with main_tab2:
     st.subheader("2. Market Comparison")
     
     if current_baseline_price > 0:
-        btc_price_now = get_btc_price()
+        btc_price_now = get_btc_price(selected_symbol)
         
         # Calculate BTC Return
         btc_change_pct = ((btc_price_now - current_baseline_price) / current_baseline_price) * 100
@@ -575,36 +562,49 @@ with main_tab2:
             st.metric("Market Change", f"{btc_change_pct:.2f}%", delta=f"{btc_change_pct:.2f}%")
             
         st.info(f"💡 Explanation: If you held BTC since Day 1 (${current_baseline_price:,.0f}), your asset value would have changed by {btc_change_pct:.2f}%.")
+
+        df_price = fetch_price_history(selected_symbol)
+        if not df_price.empty:
+            st.markdown("**Price (1h, last 30 days) vs Day 1 Price**")
+            df_price['day_1_price'] = current_baseline_price
+            st.line_chart(df_price, x='time', y=['close', 'day_1_price'])
         
         # 3. Portfolio Health
         st.divider()
         st.subheader("3. Portfolio Health")
         
-        # specific fetch for history
-        df_history = fetch_snapshots(limit=500)
+        # Equity / drawdown rollups of the visible range, downsampled to a fixed point budget (snapshot_series.py)
+        range_key = st.radio("Range", list(CHART_RANGES), index=list(CHART_RANGES).index(DEFAULT_RANGE),
+                             horizontal=True, key="health_range")
+        df_chart, bucket_seconds = fetch_snapshot_series(selected_symbol, range_key)
         
-        if not df_history.empty:
-            # Sort chronologically for charting
-            df_history['snapshot_time'] = pd.to_datetime(df_history['snapshot_time'])
-            df_chart = df_history.sort_values('snapshot_time')
-            
+        if not df_chart.empty:
             chart_col1, chart_col2 = st.columns(2)
             
             with chart_col1:
                 st.markdown("**Equity Curve (USDT)**")
-                st.line_chart(df_chart, x='snapshot_time', y='total_equity_usdt')
+                # Close per bucket, with the bucket's high / low around it
+                st.line_chart(df_chart, x='bucket_time', y=['equity_high', 'equity_close', 'equity_low'])
                 
             with chart_col2:
                 st.markdown("**Drawdown History (%)**")
-                # Invert DD to look like underwater chart if possible, or just line
-                st.area_chart(df_chart, x='snapshot_time', y='current_drawdown_pct', color="#ff4b4b")
+                # Worst drawdown per bucket
+                st.area_chart(df_chart, x='bucket_time', y='drawdown_pct', color="#ff4b4b")
+
+            st.caption(f"{len(df_chart):,} points of {format_bucket(bucket_seconds)} buckets")
                 
             # Additional Breakdown
             with st.expander("🔎 Detailed History Data"):
-                st.dataframe(df_chart.sort_values('snapshot_time', ascending=False), use_container_width=True)
+                st.dataframe(df_chart.sort_values('bucket_time', ascending=False), use_container_width=True)
                 
         else:
             st.info("📉 Charts will appear here once data is collected (Runs hourly).")
+
+        # Realized PnL per day (daily_pnl(): one row per day, not per trade)
+        df_daily = fetch_daily_pnl(is_paper, selected_symbol)
+        if not df_daily.empty:
+            st.markdown(f"**Daily Realized PnL (USDT, last {DAILY_PNL_DAYS} days)**")
+            st.bar_chart(df_daily, x='day', y='realized_pnl')
             
         st.caption("Advanced metrics tracking is Active.")
         
@@ -693,7 +693,7 @@ with main_tab4:
     st.caption("Automated insights from AI for every closed trade")
     
     # Fetch AI-analyzed trades
-    df_ai_trades = fetch_ai_trades(is_paper)
+    df_ai_trades = fetch_ai_trades(is_paper, symbol=selected_symbol)
     
     if df_ai_trades.empty:
         st.info("No closed trades found yet. AI insights will appear here once trades are closed.")
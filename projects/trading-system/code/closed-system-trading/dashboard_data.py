@@ -0,0 +1,351 @@
+"""
+Dashboard Data Prep
+===================
+The frames and metrics the dashboard overview and the Zone Performance
+table are built from, kept free of Streamlit so benchmark.py and scripts
+can run the same code the dashboard does.
+
+DashboardData is the dashboard's data layer: every Supabase / Binance read
+goes through a TTLCache with one TTL per dataset (DASHBOARD_TTLS). One
+instance is shared by all sessions of the Streamlit server, so a rerun or a
+second viewer is served from memory. The dashboard's own writes invalidate
+the datasets they change (invalidate()). Trades and snapshots are written by
+the bot and only expire. Derived results (overview, Zone Performance) are
+cached on the versions of the frames they were computed from.
+
+Row datasets (trades, recent trades, snapshots, AI trades) are DeltaFrames
+(delta_sync.py): after the first load an expired dataset fetches only the
+rows changed since its watermark, so short TTLs and the live refresh cost a
+near-empty query each.
+
+Trade numbers come from SQL aggregates (snapshot_stats(), zone_stats(),
+daily_pnl(); trade_aggregates.py), a few rows per symbol however long the
+history is. Every trade row is only read for the CSV export, or to aggregate
+here when the functions are not installed.
+
+With a read model client (read_model.py) the price comes from the running
+bot's market feed; without the bot, from Binance as before.
+
+Frames returned by DashboardData are shared between sessions: read-only.
+"""
+
+import threading
+import time
+
+import pandas as pd
+
+import snapshot_series
+from delta_sync import DeltaFrame
+import trade_aggregates
+from snapshot_manager import fetch_snapshot_stats
+from zone_index import ZoneIndex
+
+NUMERIC_TRADE_COLUMNS = ['entry_price', 'quantity', 'total_usdt', 'pnl_usdt', 'fee_usdt']
+
+# Seconds a dataset is served from memory. Dashboard writes invalidate settings / zones / baseline at once.
+DASHBOARD_TTLS = {
+    'price': 2,        # Last price (live 1m candle)
+    'thb_rate': 300,
+    'settings': 60,    # bot_settings row
+    'zones': 60,       # zones_config of a symbol
+    'baseline': 300,   # baseline_prices row
+    'stats': 10,       # Written by the bot, expire only: totals of a symbol (snapshot_stats())
+    'zone_stats': 10,  # Per-zone aggregates (zone_stats())
+    'daily_pnl': 60,   # Per-day realized PnL (daily_pnl())
+    'trades': 5,       # Every trade row: CSV export and databases without the functions (delta-synced)
+    'recent_trades': 5,  # Last changed trades (delta-synced)
+    'snapshots': 5,    # Latest portfolio_snapshots (delta-synced)
+    'snapshot_series': 60,  # Chart rollups of a visible range (snapshot_series.py)
+    'ai_trades': 10,   # Closed trades + n8n analysis (delta-synced)
+    'overview': 10,    # Derived: overview metrics at a price
+    'zone_performance': 10,
+}
+THB_FALLBACK_RATE = 34.0
+AI_TRADE_COLUMNS = "id, created_at, exit_at, zone_name, entry_price, exit_price, quantity, pnl_usdt, pnl_percent, ai_analysis, ai_score"
+RECENT_TRADE_COLUMNS = "id, created_at, updated_at, zone_name, status, entry_price, exit_price, quantity, pnl_usdt"
+RECENT_TRADES = 20
+
+
+def trades_frame(rows):
+    """DataFrame of trade rows as returned by Supabase, numeric columns as float."""
+    df = pd.DataFrame(rows)
+    if not df.empty:
+        for col in NUMERIC_TRADE_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype(float)
+    return df
+
+
+def overview_metrics(stats, df_zones, price, is_paper):
+    """
+    Numbers of the overview row: PnL, open trades, fees, active capital and the zone at `price`.
+    `stats`: the trade totals of snapshot_manager.fetch_snapshot_stats() (realized_pnl,
+    fees_paid, open_trade_count, open_quantity, open_cost).
+    """
+    metrics = {
+        'realized_profit': float(stats['realized_pnl']),
+        # Unrealized PnL, same formula as the snapshots: price * Sum(qty) - Sum(entry * qty)
+        'unrealized_profit': float(price * stats['open_quantity'] - stats['open_cost']) if stats['open_trade_count'] else 0.0,
+        'open_trades_count': int(stats['open_trade_count']),
+        'paper_fees': float(stats['fees_paid']) if is_paper else 0.0,
+        'total_active_capital': 0.0, 'current_zone_display': "No Data", 'is_price_safe': False,
+        'nearest_edge_distance': None, 'nearest_edge': None,
+    }
+
+    if not df_zones.empty:
+        active_zones = df_zones[df_zones['status'] == 'Active']
+        metrics['total_active_capital'] = active_zones['capital_allocated'].sum() or 0.0
+
+        # Same lookup as the bot: first containing zone wins, overlaps are listed
+        zone_index = ZoneIndex(active_zones.to_dict('records'))
+        containing = zone_index.containing(price)
+        if containing:
+            metrics['current_zone_display'] = " + ".join(z['zone_name'] for z in containing)
+        else:
+            metrics['current_zone_display'] = "None (⚠️ OUT OF ZONE)"
+        metrics['is_price_safe'] = bool(containing)
+        metrics['nearest_edge_distance'], metrics['nearest_edge'] = zone_index.nearest_edge(price)
+
+    return metrics
+
+
+def zone_performance(df_zones, df_zone_stats):
+    """
+    Zone Name | Budget | Invested | Realized PnL | Trade Count | Remaining | % Utilized, one row per zone.
+    `df_zone_stats`: trade_aggregates.ZONE_STATS_COLUMNS, one row per zone with trades.
+    """
+    stats = df_zone_stats.set_index('zone_name')
+    names = df_zones['zone_name']
+    perf_df = pd.DataFrame({
+        'Zone Name': names.values,
+        'Budget (USDT)': df_zones['capital_allocated'].values,
+        'Invested (USDT)': names.map(stats['invested']).fillna(0.0).values,          # OPEN total_usdt
+        'Realized PnL (USDT)': names.map(stats['realized_pnl']).fillna(0.0).values,  # CLOSED pnl_usdt
+        'Trade Count': names.map(stats['open_count']).fillna(0).astype(int).values,  # OPEN trades
+    })
+
+    # Calc Derivatives
+    perf_df['Remaining (USDT)'] = perf_df['Budget (USDT)'] - perf_df['Invested (USDT)']
+    perf_df['% Utilized'] = (perf_df['Invested (USDT)'] / perf_df['Budget (USDT)'].replace(0, 1)) * 100
+    return perf_df
+
+
+# --- Cached data layer ---
+
+class TTLCache:
+    """
+    Values per (dataset, key), each dataset with its own TTL. Thread-safe;
+    concurrent misses on one key run the loader once. A loader that raises
+    caches nothing. Every stored value gets a new version number.
+    """
+
+    def __init__(self, ttls, clock=time.monotonic):
+        self.ttls = dict(ttls)
+        self.clock = clock
+        self._entries = {}   # (dataset, key) -> (expires, version, value)
+        self._loading = {}   # (dataset, key) -> Lock held by the loading thread
+        self._lock = threading.Lock()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, k):
+        entry = self._entries.get(k)
+        return entry if entry and entry[0] > self.clock() else None
+
+    def get(self, dataset, key, loader):
+        k = (dataset, key)
+        with self._lock:
+            entry = self._fresh(k)
+            if entry:
+                self.hits += 1
+                return entry[2]
+            loading = self._loading.setdefault(k, threading.Lock())
+        with loading:
+            with self._lock:
+                entry = self._fresh(k)  # Loaded by another session meanwhile
+                if entry:
+                    self.hits += 1
+                    return entry[2]
+                self.misses += 1
+            value = loader()
+            with self._lock:
+                self._version += 1
+                self._entries[k] = (self.clock() + self.ttls.get(dataset, 0), self._version, value)
+                self._loading.pop(k, None)
+                self._purge(dataset)
+            return value
+
+    def version(self, dataset, key):
+        """Version of the cached value (None if missing or expired)."""
+        with self._lock:
+            entry = self._fresh((dataset, key))
+            return entry[1] if entry else None
+
+    def invalidate(self, dataset, key=None):
+        """Drops `dataset` for `key`, or for every key."""
+        with self._lock:
+            for k in [k for k in self._entries if k[0] == dataset and (key is None or k[1] == key)]:
+                del self._entries[k]
+
+    def _purge(self, dataset):
+        now = self.clock()
+        for k in [k for k, e in self._entries.items() if k[0] == dataset and e[0] <= now]:
+            del self._entries[k]
+
+
+class DashboardData:
+    """The dashboard's reads, cached per dataset (see module docstring)."""
+
+    def __init__(self, supabase_client, binance_client, kline_cache=None, ttls=None, read_model=None):
+        self.supabase = supabase_client
+        self.binance = binance_client
+        self.kline_cache = kline_cache
+        self.read_model = read_model  # read_model.ReadModelClient (None: Binance only)
+        self.cache = TTLCache(ttls or DASHBOARD_TTLS)
+        self._frames = {}  # (dataset, key) -> DeltaFrame
+        self._frames_lock = threading.Lock()
+
+    def invalidate(self, dataset, key=None):
+        self.cache.invalidate(dataset, key)
+
+    def delta_frame(self, dataset, key, table, filters, **kwargs):
+        """The DeltaFrame behind a row dataset, created on first use."""
+        with self._frames_lock:
+            if (dataset, key) not in self._frames:
+                self._frames[(dataset, key)] = DeltaFrame(self.supabase, table, filters, **kwargs)
+            return self._frames[(dataset, key)]
+
+    def rows_fetched(self):
+        """Rows transferred by all DeltaFrames so far."""
+        return sum(f.rows_fetched for f in self._frames.values())
+
+    # --- Market ---
+
+    def price(self, symbol):
+        def load():
+            if self.read_model is not None:
+                price = self.read_model.price(symbol)
+                if price:
+                    return price
+            if self.kline_cache is not None:
+                # Close of the live 1m candle == last traded price
+                self.kline_cache.top_up(self.binance, symbol, '1m')
+                closes = self.kline_cache.view(symbol, '1m', 1).close
+                if len(closes):
+                    return float(closes[-1])
+            return float(self.binance.get_symbol_ticker(symbol=symbol)['price'])
+        return self.cache.get('price', symbol, load)
+
+    def thb_rate(self):
+        def load():
+            try:
+                return float(self.binance.get_symbol_ticker(symbol='USDTTHB')['price'])
+            except Exception:
+                return THB_FALLBACK_RATE
+        return self.cache.get('thb_rate', None, load)
+
+    # --- Config ---
+
+    def settings(self):
+        """bot_settings row id=1 ({} if missing)."""
+        def load():
+            response = self.supabase.table("bot_settings").select("*").eq("id", 1).execute()
+            return response.data[0] if response.data else {}
+        return self.cache.get('settings', None, load)
+
+    def zones(self, symbol):
+        def load():
+            response = self.supabase.table("zones_config").select("*").eq("symbol", symbol).order("price_low", desc=False).execute()
+            df = pd.DataFrame(response.data)
+            if not df.empty:
+                for col in ('price_low', 'price_high', 'capital_allocated'):
+                    df[col] = df[col].astype(float)
+            return df
+        return self.cache.get('zones', symbol, load)
+
+    def baseline(self, symbol):
+        """baseline_prices row of `symbol` (None if missing)."""
+        def load():
+            response = self.supabase.table("baseline_prices").select("*").eq("symbol", symbol).execute()
+            return response.data[0] if response.data else None
+        return self.cache.get('baseline', symbol, load)
+
+    # --- Written by the bot ---
+
+    def trades(self, is_paper, symbol):
+        """Every trade row."""
+        frame = self.delta_frame('trades', (is_paper, symbol), trade_aggregates.trade_table(is_paper), {"symbol": symbol})
+
+        def load():
+            frame.sync()
+            return trades_frame(frame.frame.copy())
+        return self.cache.get('trades', (is_paper, symbol), load)
+
+    def recent_trades(self, is_paper, symbol, limit=RECENT_TRADES):
+        """The `limit` trades opened or changed last, newest first."""
+        frame = self.delta_frame('recent_trades', (is_paper, symbol, limit), trade_aggregates.trade_table(is_paper),
+                                 {"symbol": symbol}, columns=RECENT_TRADE_COLUMNS, window=limit)
+
+        def load():
+            frame.sync()
+            df = frame.frame
+            return df.sort_values('updated_at', ascending=False).reset_index(drop=True) if 'updated_at' in df.columns else df.iloc[::-1]
+        return self.cache.get('recent_trades', (is_paper, symbol, limit), load)
+
+    def stats(self, is_paper, symbol):
+        """Trade totals of `symbol` (snapshot_manager.fetch_snapshot_stats)."""
+        def load():
+            return fetch_snapshot_stats(self.supabase, is_paper, symbol) \
+                or trade_aggregates.trade_stats_from_trades(self.trades(is_paper, symbol))
+        return self.cache.get('stats', (is_paper, symbol), load)
+
+    def zone_stats(self, is_paper, symbol):
+        def load():
+            df = trade_aggregates.fetch_zone_stats(self.supabase, is_paper, symbol)
+            return df if df is not None else trade_aggregates.zone_stats_from_trades(self.trades(is_paper, symbol))
+        return self.cache.get('zone_stats', (is_paper, symbol), load)
+
+    def daily_pnl(self, is_paper, symbol, days=trade_aggregates.DAILY_PNL_DAYS):
+        def load():
+            df = trade_aggregates.fetch_daily_pnl(self.supabase, is_paper, symbol, days)
+            return df if df is not None else trade_aggregates.daily_pnl_from_trades(self.trades(is_paper, symbol), days)
+        return self.cache.get('daily_pnl', (is_paper, symbol, days), load)
+
+    def snapshots(self, symbol, limit=100):
+        """The last `limit` snapshots, newest first."""
+        frame = self.delta_frame('snapshots', (symbol, limit), "portfolio_snapshots", {"symbol": symbol},
+                                 watermark='id', window=limit)
+
+        def load():
+            frame.sync()
+            return frame.frame.iloc[::-1].reset_index(drop=True)
+        return self.cache.get('snapshots', (symbol, limit), load)
+
+    def snapshot_series(self, symbol, range_key=snapshot_series.DEFAULT_RANGE):
+        """(chart frame, bucket seconds) of the equity / drawdown charts (snapshot_series.load_series)."""
+        return self.cache.get('snapshot_series', (symbol, range_key),
+                              lambda: snapshot_series.load_series(self.supabase, symbol, range_key))
+
+    def ai_trades(self, is_paper, symbol, limit=50):
+        """The last `limit` closed trades with their AI analysis, latest exit first."""
+        frame = self.delta_frame('ai_trades', (is_paper, symbol, limit), trade_aggregates.trade_table(is_paper),
+                                 {"status": "CLOSED", "symbol": symbol}, columns=AI_TRADE_COLUMNS, order='exit_at', window=limit)
+
+        def load():
+            frame.sync()
+            df = frame.frame
+            return df.sort_values('exit_at', ascending=False).reset_index(drop=True) if not df.empty else df
+        return self.cache.get('ai_trades', (is_paper, symbol, limit), load)
+
+    # --- Derived (recomputed when an input was reloaded) ---
+
+    def overview(self, is_paper, symbol, price):
+        stats, df_zones = self.stats(is_paper, symbol), self.zones(symbol)
+        key = (is_paper, symbol, price, self.cache.version('stats', (is_paper, symbol)), self.cache.version('zones', symbol))
+        return self.cache.get('overview', key, lambda: overview_metrics(stats, df_zones, price, is_paper))
+
+    def zone_performance(self, is_paper, symbol):
+        df_zone_stats, df_zones = self.zone_stats(is_paper, symbol), self.zones(symbol)
+        key = (is_paper, symbol, self.cache.version('zone_stats', (is_paper, symbol)), self.cache.version('zones', symbol))
+        return self.cache.get('zone_performance', key, lambda: zone_performance(df_zones, df_zone_stats))
@@ -0,0 +1,165 @@
+"""
+Delta Sync (Watermarked Table Frames)
+=====================================
+Keeps the rows of one table filter in memory and tops them up with only the
+rows changed since the last sync, instead of re-reading the table:
+
+    trades = DeltaFrame(supabase, "paper_trade_log", {"symbol": "BTCUSDT"})
+    trades.sync()      # First call: full load (paged). Later: rows past the watermark only
+    trades.frame       # pandas DataFrame, merged on `key`
+
+Watermarks:
+  - `updated_at` (add_updated_at_columns.sql): a trigger stamps every
+    update, so closes and AI results written after the insert are picked up.
+    Each delta re-reads DELTA_OVERLAP_SECONDS behind the watermark:
+    now() is the transaction start, so a row can commit with a stamp older
+    than one already seen. Re-read rows merge on `key` and change nothing.
+  - `id`: insert-only tables (portfolio_snapshots).
+Without the updated_at column a frame falls back to `id` (new rows only).
+Any other failed read (timeout, dropped connection) is raised and the
+watermark is kept: the next sync retries the same delta.
+
+`window` keeps the newest N rows by `order` (a recent-trades list, the last
+snapshots); without it the frame holds every row. Deletes are not seen by
+a delta: every RESYNC_INTERVAL the frame reloads in full.
+"""
+
+import threading
+import time
+
+import pandas as pd
+
+DELTA_OVERLAP_SECONDS = 10
+RESYNC_INTERVAL = 3600
+PAGE_SIZE = 1000  # PostgREST max rows per response on Supabase
+UNDEFINED_COLUMN = '42703'  # Postgres error code PostgREST passes on for an unknown column
+
+
+def missing_column(error, column):
+    """True if `error` is PostgREST reporting that `column` does not exist (not a transient failure)."""
+    message = str(error)
+    return (getattr(error, 'code', None) == UNDEFINED_COLUMN or 'does not exist' in message) and column in message
+
+
+class DeltaFrame:
+    def __init__(self, supabase, table, filters=None, columns="*", watermark='updated_at', key='id',
+                 order=None, window=None, clock=time.monotonic):
+        self.supabase = supabase
+        self.table = table
+        self.filters = dict(filters or {})
+        self.columns = columns
+        self.watermark = watermark
+        self.key = key
+        self.order = order or watermark
+        self.window = window
+        self.clock = clock
+        self.frame = pd.DataFrame()
+        self.last_seen = None      # Highest watermark merged so far (int id or UTC Timestamp)
+        self.loaded_at = None      # clock() of the last full load
+        self.rows_fetched = 0      # Rows transferred, all syncs
+        self._lock = threading.Lock()
+
+    def _select(self, columns):
+        query = self.supabase.table(self.table).select(columns)
+        for column, value in self.filters.items():
+            query = query.eq(column, value)
+        return query
+
+    def _select_columns(self):
+        if self.columns.strip() == "*":
+            return "*"
+        extra = [c for c in (self.key, self.watermark, self.order) if c not in [x.strip() for x in self.columns.split(',')]]
+        return ", ".join([self.columns] + extra)
+
+    def _since(self):
+        """Lower bound of the next delta (inclusive), overlap included."""
+        if self.watermark == self.key:
+            return self.last_seen + 1
+        return (self.last_seen - pd.Timedelta(seconds=DELTA_OVERLAP_SECONDS)).isoformat()
+
+    def _full(self):
+        columns = self._select_columns()
+        if self.window:
+            return self._select(columns).order(self.order, desc=True).limit(self.window).execute().data
+        rows = []
+        while True:
+            page = self._select(columns).order(self.key, desc=False).range(len(rows), len(rows) + PAGE_SIZE - 1).execute().data
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+
+    def _delta(self):
+        rows, since = [], self._since()
+        while True:
+            page = self._select(self._select_columns())\
+                .gte(self.watermark, since)\
+                .order(self.watermark, desc=False)\
+                .range(len(rows), len(rows) + PAGE_SIZE - 1)\
+                .execute().data
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+
+    def _merge(self, rows, replace=False):
+        """Merges `rows` on `key` (replaces the frame on a full load). Returns how many were new or changed."""
+        delta = pd.DataFrame(rows)
+        if replace or self.frame.empty:
+            frame, changed = delta, len(delta)
+        elif delta.empty:
+            return 0
+        else:
+            # Overlap re-reads come back unchanged: same key, same watermark
+            if self.watermark == self.key:
+                changed = int((~delta[self.key].isin(self.frame[self.key])).sum())
+            else:
+                seen = self.frame.set_index(self.key)[self.watermark]
+                changed = int((delta[self.watermark].astype(str) != delta[self.key].map(seen).astype(str)).sum())
+            frame = pd.concat([self.frame[~self.frame[self.key].isin(delta[self.key])], delta], ignore_index=True)
+        if not frame.empty:
+            if self.window:
+                frame = frame.sort_values(self.order, ascending=False).head(self.window)
+            frame = frame.sort_values(self.key).reset_index(drop=True)
+            newest = self._newest(delta)
+            if newest is not None and (self.last_seen is None or newest > self.last_seen):
+                self.last_seen = newest
+        self.frame = frame
+        return changed
+
+    def _newest(self, rows):
+        """Highest watermark in `rows` (timestamps parsed: ISO strings differ in offset and precision)."""
+        if rows.empty or self.watermark not in rows.columns:
+            return None
+        if self.watermark == self.key:
+            return int(rows[self.key].max())
+        return pd.to_datetime(rows[self.watermark], utc=True, format='ISO8601').max()
+
+    def _fall_back(self, reason):
+        print(f"⚠️ Delta sync of {self.table} by {self.watermark} unavailable ({reason}). "
+              f"Run add_updated_at_columns.sql; syncing new rows by {self.key} only.")
+        if self.order == self.watermark:
+            self.order = self.key
+        self.watermark = self.key
+
+    def _fetch(self, due):
+        """(rows, full): a delta, or every row when a full load is due or the watermark fell back to `key`."""
+        try:
+            rows = self._full() if due else self._delta()
+        except Exception as e:
+            if self.watermark == self.key or not missing_column(e, self.watermark):
+                raise
+            self._fall_back(e)
+            return self._full(), True
+        if due and rows and self.watermark not in rows[0]:
+            self._fall_back(f"no {self.watermark} column")
+        return rows, due
+
+    def sync(self):
+        """Fetches what changed since the last sync (everything on the first call). Returns the number of new or changed rows."""
+        with self._lock:
+            due = self.last_seen is None or self.clock() - self.loaded_at > RESYNC_INTERVAL
+            rows, full = self._fetch(due)
+            if full:
+                self.loaded_at = self.clock()
+                self.last_seen = None
+            self.rows_fetched += len(rows)
+            return self._merge(rows, replace=full)
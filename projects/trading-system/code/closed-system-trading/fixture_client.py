@@ -0,0 +1,133 @@
+"""
+Fixture Client (Offline Binance Stand-in)
+=========================================
+Answers the Binance REST calls the bot and its tools make
+(get_klines, get_historical_klines, get_symbol_ticker, get_symbol_info, ping)
+from local data, so the market data store, backtests and the bot warm-up
+can be exercised without network access. replay_server.py is the WebSocket
+counterpart.
+
+Candles come from a fixture JSON file
+    {"BTCUSDT": {"1m": [[open_time, open, high, low, close, volume, close_time], ...]}}
+or, by default, from a deterministic 1m random walk per symbol (same seed,
+same candles) that larger intervals are aggregated from. Every candle up
+to `now` exists, the last one being in progress, like on the exchange.
+
+- `outages` [(start_ms, end_ms)]: no candles in these ranges (exchange maintenance).
+- `calls` counts requests, to check how much a sync actually downloads.
+"""
+
+import json
+import time
+import zlib
+
+import numpy as np
+
+from market_feed import INTERVAL_MS
+
+FIXTURE_ORIGIN = 1_672_531_200_000  # 2023-01-01 00:00 UTC, first synthetic candle
+START_PRICES = {'BTCUSDT': 90000.0, 'ETHUSDT': 3000.0}
+
+
+class FixtureClient:
+    def __init__(self, path=None, seed=7, now=None, outages=(), volatility=0.0008, step_size=0.00001):
+        self.seed = seed
+        self.now = now  # ms; None = wall clock
+        self.outages = list(outages)
+        self.volatility = volatility
+        self.step_size = step_size
+        self.calls = 0
+        self._fixture = {}
+        self._series = {}  # (symbol, interval) -> (open_time, ohlcv rows)
+        if path:
+            with open(path, encoding='utf-8') as f:
+                self._fixture = json.load(f)
+
+    def _now(self):
+        return self.now if self.now is not None else int(time.time() * 1000)
+
+    # --- Candle source ---
+
+    def _walk(self, symbol, until):
+        """1m random walk from FIXTURE_ORIGIN up to `until`: (open_time, [open, high, low, close, volume])."""
+        n = max((until - FIXTURE_ORIGIN) // 60_000 + 1, 0)
+        rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode())])
+        start = START_PRICES.get(symbol, 100.0)
+        close = start * np.exp(np.cumsum(rng.normal(0, self.volatility, n)))
+        open_ = np.r_[start, close[:-1]]
+        wick = np.abs(rng.normal(0, self.volatility / 2, n)) * close
+        ohlcv = np.column_stack([open_, np.maximum(open_, close) + wick, np.minimum(open_, close) - wick, close, rng.uniform(1, 50, n)])
+        return FIXTURE_ORIGIN + np.arange(n, dtype=np.int64) * 60_000, ohlcv
+
+    def _candles(self, symbol, interval):
+        symbol = symbol.upper()
+        now = self._now()
+        cached = self._series.get((symbol, interval))
+        if cached and cached[0] >= now:
+            return cached[1], cached[2]
+
+        if symbol in self._fixture:
+            rows = np.asarray(self._fixture[symbol].get(interval, []), dtype=np.float64).reshape(-1, 7)
+            open_time, ohlcv = rows[:, 0].astype(np.int64), rows[:, 1:6]
+        else:
+            step = INTERVAL_MS[interval]
+            t, m = self._walk(symbol, now)
+            bucket = t // step
+            starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]]) if len(t) else np.zeros(0, dtype=np.int64)
+            ends = np.r_[starts[1:], len(t)] - 1
+            open_time = bucket[starts] * step
+            ohlcv = np.column_stack([
+                m[starts, 0], np.maximum.reduceat(m[:, 1], starts), np.minimum.reduceat(m[:, 2], starts),
+                m[ends, 3], np.add.reduceat(m[:, 4], starts),
+            ]) if len(starts) else np.zeros((0, 5))
+
+        keep = open_time <= now
+        for a, b in self.outages:
+            keep &= (open_time < a) | (open_time >= b)
+        self._series[(symbol, interval)] = (now, open_time[keep], ohlcv[keep])
+        return open_time[keep], ohlcv[keep]
+
+    # --- Binance Client API ---
+
+    def ping(self):
+        return {}
+
+    def get_klines(self, symbol, interval, limit=500, startTime=None, endTime=None):
+        """Same shape as Binance: [open_time, open, high, low, close, volume, close_time, ...] (prices as strings)."""
+        self.calls += 1
+        open_time, ohlcv = self._candles(symbol, interval)
+        limit = min(int(limit), 1000)
+        a, b = 0, len(open_time)
+        if startTime is not None:
+            a = int(np.searchsorted(open_time, startTime, side='left'))
+        if endTime is not None:
+            b = int(np.searchsorted(open_time, endTime, side='right'))
+        a, b = (a, min(b, a + limit)) if startTime is not None else (max(a, b - limit), b)
+        step = INTERVAL_MS[interval]
+        return [
+            [int(open_time[i])] + [f"{v:.8f}" for v in ohlcv[i]] + [int(open_time[i]) + step - 1, "0", 0, "0", "0", "0"]
+            for i in range(a, b)
+        ]
+
+    def get_historical_klines(self, symbol, interval, start_str=None, end_str=None, limit=1000):
+        from market_store import to_ms
+        start, end = to_ms(start_str) or 0, to_ms(end_str)
+        out = []
+        while True:
+            rows = self.get_klines(symbol, interval, limit=limit, startTime=start, endTime=end)
+            out.extend(rows)
+            if len(rows) < limit:
+                return out
+            start = rows[-1][0] + INTERVAL_MS[interval]
+
+    def get_symbol_ticker(self, symbol):
+        self.calls += 1
+        _, ohlcv = self._candles(symbol, '1m')
+        return {'symbol': symbol.upper(), 'price': f"{ohlcv[-1, 3]:.8f}"}
+
+    def get_symbol_info(self, symbol):
+        return {'symbol': symbol.upper(), 'filters': [
+            {'filterType': 'PRICE_FILTER', 'minPrice': '0.01000000', 'maxPrice': '1000000.00000000', 'tickSize': '0.01000000'},
+            {'filterType': 'LOT_SIZE', 'minQty': f"{self.step_size:.8f}", 'maxQty': '9000.00000000', 'stepSize': f"{self.step_size:.8f}"},
+            {'filterType': 'NOTIONAL', 'minNotional': '5.00000000', 'applyMinToMarket': True, 'maxNotional': '9000000.00000000', 'applyMaxToMarket': False},
+        ]}
@@ -0,0 +1,126 @@
+"""
+Grid Index
+==========
+O(log n) replacement for the per-tick grid scan in check_buy.
+
+The old check walked every grid level and, for each one, every open trade
+(O(levels x trades)). Here each zone's levels are built once into a sorted
+list, the active bucket is found with bisect, and occupancy is precomputed
+per level ID (the level's index in the zone grid):
+
+    level_id = round((price - price_low) / step)
+
+An open trade occupies every level within OCCUPIED_TOLERANCE of its entry
+(same rule as strategy.find_buy_level). Occupancy is rebuilt only when the
+position book changes, never per tick.
+"""
+
+import bisect
+import math
+import threading
+from collections import Counter
+
+import strategy
+
+
+class ZoneGrid:
+    """Sorted grid levels of one zone plus occupancy counts per level ID."""
+
+    def __init__(self, zone, step, tolerance=strategy.OCCUPIED_TOLERANCE):
+        self.zone_name = zone['zone_name']
+        self.low = float(zone['price_low'])
+        self.high = float(zone['price_high'])
+        self.step = float(step)
+        self.tolerance = tolerance
+        self.levels = strategy.generate_grid_levels(zone, self.step)
+        self.occupied = Counter()  # level_id -> open trades occupying it
+
+    def level_id(self, price):
+        return round((price - self.low) / self.step)
+
+    def _ids_near(self, entry_price):
+        """Level IDs strictly within `tolerance` of `entry_price`."""
+        first = max(0, math.floor((entry_price - self.tolerance - self.low) / self.step))
+        last = min(len(self.levels) - 1, math.ceil((entry_price + self.tolerance - self.low) / self.step))
+        return [i for i in range(first, last + 1) if abs(entry_price - self.levels[i]) < self.tolerance]
+
+    def add_entry(self, entry_price):
+        for i in self._ids_near(entry_price):
+            self.occupied[i] += 1
+
+    def remove_entry(self, entry_price):
+        for i in self._ids_near(entry_price):
+            self.occupied[i] -= 1
+            if self.occupied[i] <= 0:
+                del self.occupied[i]
+
+    def reset(self, entry_prices):
+        self.occupied.clear()
+        for p in entry_prices:
+            self.add_entry(p)
+
+    def find_buy_level(self, price):
+        """First empty level whose bucket holds `price` (same result as strategy.find_buy_level)."""
+        i = bisect.bisect_left(self.levels, price)
+        # Float accumulation in the levels can put `price` in two adjacent buckets
+        while i < len(self.levels) and self.levels[i] - self.step < price:
+            if i not in self.occupied:
+                return self.levels[i]
+            i += 1
+        return None
+
+    def empty_levels_below(self, price, n):
+        """Up to `n` empty levels strictly below `price`, nearest first (resting LIMIT buys, limit_grid.py)."""
+        out = []
+        i = bisect.bisect_left(self.levels, price) - 1
+        while i >= 0 and len(out) < n:
+            if i not in self.occupied:
+                out.append(self.levels[i])
+            i -= 1
+        return out
+
+
+class GridIndex:
+    """
+    ZoneGrid per active zone, kept in sync with the position book.
+    Grids are rebuilt when a zone's bounds or the grid step change;
+    occupancy is rebuilt when the book's version changes.
+    """
+
+    def __init__(self, tolerance=strategy.OCCUPIED_TOLERANCE):
+        self.tolerance = tolerance
+        self._grids = {}          # zone_name -> ZoneGrid
+        self._entries = []
+        self._book_version = None
+        self._lock = threading.Lock()
+
+    def _grid(self, zone, step):
+        grid = self._grids.get(zone['zone_name'])
+        if grid is None or (grid.low, grid.high, grid.step) != (float(zone['price_low']), float(zone['price_high']), float(step)):
+            grid = ZoneGrid(zone, step, self.tolerance)
+            grid.reset(self._entries)
+            self._grids[zone['zone_name']] = grid
+        return grid
+
+    def sync(self, book):
+        """Re-reads entry prices from the book if it changed since the last sync."""
+        if book.version == self._book_version:
+            return
+        self._entries = book.entry_prices()
+        self._book_version = book.version
+        for grid in self._grids.values():
+            grid.reset(self._entries)
+
+    def find_buy_level(self, zone, price, step, book):
+        with self._lock:
+            self.sync(book)
+            return self._grid(zone, step).find_buy_level(price)
+
+    def empty_levels_below(self, zone, price, step, book, n):
+        with self._lock:
+            self.sync(book)
+            return self._grid(zone, step).empty_levels_below(price, n)
+
+    def levels(self, zone, step):
+        with self._lock:
+            return self._grid(zone, step).levels
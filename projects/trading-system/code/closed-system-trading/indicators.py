@@ -0,0 +1,214 @@
+"""
+Incremental Indicator Engine
+============================
+O(1) rolling state for the indicators the bot uses, replacing the per-loop
+pandas/`ta` recomputation over the full kline window.
+
+- EMA        : matches ta.trend.EMAIndicator (ewm span=window, adjust=False)
+- WilderRSI  : matches ta.momentum.RSIIndicator (ewm alpha=1/window, adjust=False)
+- ADX        : matches ta.trend.ADXIndicator(...).adx()
+
+Every indicator supports two kinds of update:
+  update(..., closed=True)   commits a finished candle to the rolling state.
+  update(..., closed=False)  evaluates the in-progress candle against the
+                             committed state without changing it, so it can
+                             be called on every tick.
+
+Values are None until the indicator has seen enough candles
+(ta reports NaN for EMA/RSI and 0 for ADX during warm-up).
+Run `python verify_indicators.py` to check the engine against `ta`.
+"""
+
+
+class EMA:
+    def __init__(self, window):
+        self.window = window
+        self.alpha = 2.0 / (window + 1)
+        self.count = 0
+        self._ema = None
+        self.value = None
+
+    def update(self, close, closed=True):
+        ema = close if self._ema is None else self._ema + self.alpha * (close - self._ema)
+        count = self.count + 1
+        if closed:
+            self._ema, self.count = ema, count
+        self.value = ema if count >= self.window else None
+        return self.value
+
+
+class WilderRSI:
+    def __init__(self, window=14):
+        self.window = window
+        self.count = 0  # Candles seen (the first counts as a zero change, as in `ta`)
+        self._prev_close = None
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+        self.value = None
+
+    def update(self, close, closed=True):
+        if self._prev_close is None:
+            if closed:
+                self._prev_close = close
+                self.count = 1
+            self.value = None
+            return None
+
+        delta = close - self._prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+
+        avg_gain = self._avg_gain + (gain - self._avg_gain) / self.window
+        avg_loss = self._avg_loss + (loss - self._avg_loss) / self.window
+        count = self.count + 1
+
+        if closed:
+            self._prev_close = close
+            self._avg_gain, self._avg_loss, self.count = avg_gain, avg_loss, count
+
+        if count < self.window:
+            self.value = None
+        elif avg_loss == 0:
+            self.value = 100.0
+        else:
+            self.value = 100.0 - (100.0 / (1.0 + avg_gain / avg_loss))
+        return self.value
+
+
+class ADX:
+    """
+    Wilder ADX with +DI / -DI.
+    Smoothed TR/DM start as a plain sum over the first `window` changes,
+    ADX starts as the mean of the first `window` DX values (same as `ta`).
+    """
+
+    def __init__(self, window=14):
+        self.window = window
+        self.count = 0  # Candles seen
+        self._prev = None  # (high, low, close)
+        self._tr = 0.0
+        self._dm_plus = 0.0
+        self._dm_minus = 0.0
+        self._dx_sum = 0.0
+        self._adx = None
+        self.value = None
+        self.plus_di = None
+        self.minus_di = None
+
+    def update(self, high, low, close, closed=True):
+        w = self.window
+        c = self.count  # Index of this candle
+
+        if self._prev is None:
+            if closed:
+                self._prev = (high, low, close)
+                self.count = 1
+            self.value = self.plus_di = self.minus_di = None
+            return None
+
+        p_high, p_low, p_close = self._prev
+        tr = max(high, p_close) - min(low, p_close)
+        up = high - p_high
+        down = p_low - low
+        dm_plus = up if up > down and up > 0 else 0.0
+        dm_minus = down if down > up and down > 0 else 0.0
+
+        if c <= w:
+            s_tr, s_plus, s_minus = self._tr + tr, self._dm_plus + dm_plus, self._dm_minus + dm_minus
+        else:
+            s_tr = self._tr - self._tr / w + tr
+            s_plus = self._dm_plus - self._dm_plus / w + dm_plus
+            s_minus = self._dm_minus - self._dm_minus / w + dm_minus
+
+        dx_sum, adx, plus_di, minus_di = self._dx_sum, self._adx, None, None
+        if c >= w:
+            plus_di = 100 * s_plus / s_tr if s_tr != 0 else 0.0
+            minus_di = 100 * s_minus / s_tr if s_tr != 0 else 0.0
+            di_sum = plus_di + minus_di
+            dx = 100 * abs(plus_di - minus_di) / di_sum if di_sum != 0 else 0.0
+
+            if c < 2 * w - 1:
+                dx_sum += dx
+            elif c == 2 * w - 1:
+                adx = (dx_sum + dx) / w
+            else:
+                adx = (self._adx * (w - 1) + dx) / w
+
+        if closed:
+            self._prev = (high, low, close)
+            self.count = c + 1
+            self._tr, self._dm_plus, self._dm_minus = s_tr, s_plus, s_minus
+            self._dx_sum, self._adx = dx_sum, adx
+
+        self.value, self.plus_di, self.minus_di = adx, plus_di, minus_di
+        return adx
+
+
+class IndicatorEngine:
+    """
+    Indicators for one symbol, fed from Binance kline rows or KlineCache views.
+    The first sync() per interval seeds from history; later calls only
+    process candles newer than the last committed one, so each loop costs
+    O(new candles) instead of a full recompute.
+    """
+
+    def __init__(self, regime_interval='1h', rsi_interval='5m', ema_window=200, adx_window=14, rsi_window=14):
+        self.regime_interval = regime_interval
+        self.rsi_interval = rsi_interval
+        self.ema = EMA(ema_window)
+        self.adx = ADX(adx_window)
+        self.rsi = WilderRSI(rsi_window)
+        self.last_close = {}
+        self._committed_open = {}  # interval -> open_time of last committed candle
+
+    def _apply(self, interval, high, low, close, closed):
+        if interval == self.regime_interval:
+            self.ema.update(close, closed)
+            self.adx.update(high, low, close, closed)
+        if interval == self.rsi_interval:
+            self.rsi.update(close, closed)
+        self.last_close[interval] = close
+
+    def _sync(self, interval, open_times, highs, lows, closes):
+        n = len(open_times)
+        if n == 0:
+            return
+        committed = self._committed_open.get(interval)
+
+        # Walk back to the first candle we have not committed yet
+        start = n - 1
+        while start > 0 and (committed is None or int(open_times[start - 1]) > committed):
+            start -= 1
+
+        for i in range(start, n - 1):
+            self._apply(interval, float(highs[i]), float(lows[i]), float(closes[i]), closed=True)
+            self._committed_open[interval] = int(open_times[i])
+
+        if int(open_times[-1]) > self._committed_open.get(interval, -1):
+            self._apply(interval, float(highs[-1]), float(lows[-1]), float(closes[-1]), closed=False)
+
+    def sync(self, interval, klines):
+        """
+        Brings `interval` up to date with `klines` (Binance rows, oldest first).
+        The last kline is treated as in progress; everything before it as closed.
+        """
+        self._sync(
+            interval,
+            [k[0] for k in klines], [k[2] for k in klines], [k[3] for k in klines], [k[4] for k in klines]
+        )
+
+    def sync_view(self, interval, view):
+        """Same as sync(), reading the zero-copy columns of a KlineCache view."""
+        self._sync(interval, view.open_time, view.high, view.low, view.close)
+
+    def regime(self, adx_threshold=25):
+        """Returns (regime, adx) using the same rule as analyze_market_regime, or None during warm-up."""
+        adx, ema = self.adx.value, self.ema.value
+        close = self.last_close.get(self.regime_interval)
+        if adx is None or ema is None or close is None:
+            return None
+        if adx < adx_threshold:
+            return 'SIDEWAY', adx
+        elif close > ema:
+            return 'BULL_TREND', adx
+        return 'BEAR_TREND', adx
@@ -0,0 +1,184 @@
+"""
+Kline Cache
+===========
+Shared, bounded candle storage per (symbol, interval), backed by fixed-size
+NumPy ring buffers. Memory is allocated once per series and never grows,
+however long the bot runs.
+
+- Incremental top-up: only candles from the last stored `open_time` onward
+  are fetched over REST (the last stored candle may still be in progress).
+- Zero-copy reads: every value is written twice (at i and i + capacity), so
+  the newest N candles are always one contiguous slice and view() returns
+  read-only NumPy views without copying.
+
+Used by the market data feed, analyze_market_regime / calculate_rsi and the dashboard.
+"""
+
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+DEFAULT_CAPACITY = 1000  # Candles per series (Binance max per REST call)
+REST_LIMIT = 1000
+
+KlineView = namedtuple('KlineView', ['open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time'])
+
+
+class KlineRing:
+    """Fixed-capacity OHLCV ring buffer for one symbol/interval."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._times = np.zeros((2, 2 * capacity), dtype=np.int64)    # open_time, close_time
+        self._ohlcv = np.zeros((5, 2 * capacity), dtype=np.float64)  # open, high, low, close, volume
+        self._head = 0  # Next write position (0..capacity-1)
+        self.size = 0
+
+    @property
+    def last_open_time(self):
+        if self.size == 0:
+            return None
+        return int(self._times[0, self._head - 1 + self.capacity])
+
+    def _write(self, pos, row):
+        for p in (pos, pos + self.capacity):
+            self._times[0, p] = row[0]
+            self._times[1, p] = row[6]
+            self._ohlcv[:, p] = row[1:6]
+
+    def upsert(self, row):
+        """
+        Stores a candle [open_time, open, high, low, close, volume, close_time].
+        Same open_time as the newest candle -> overwrite (in-progress update).
+        Newer -> append (evicting the oldest when full). Older -> ignored.
+        """
+        open_time = int(row[0])
+        last = self.last_open_time
+        if last is not None and open_time < last:
+            return False
+        if last is not None and open_time == last:
+            self._write((self._head - 1) % self.capacity, row)
+            return True
+        self._write(self._head, row)
+        self._head = (self._head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return True
+
+    def truncate_after(self, open_time):
+        """Drops every candle newer than `open_time` (used before refilling a gap)."""
+        if self.size == 0:
+            return
+        t = self.view().open_time
+        drop = len(t) - int(np.searchsorted(t, open_time, side='right'))
+        self._head = (self._head - drop) % self.capacity
+        self.size -= drop
+
+    def view(self, n=None):
+        """Read-only views of the newest `n` candles (oldest first). No copy."""
+        n = self.size if n is None else min(n, self.size)
+        end = self._head + self.capacity
+        start = end - n
+        times = self._times[:, start:end]
+        ohlcv = self._ohlcv[:, start:end]
+        cols = (times[0], ohlcv[0], ohlcv[1], ohlcv[2], ohlcv[3], ohlcv[4], times[1])
+        for c in cols:
+            c.flags.writeable = False
+        return KlineView(*cols)
+
+    def first_gap_open_time(self, step_ms):
+        """open_time of the candle after which the series is discontinuous, else the newest open_time."""
+        if self.size == 0:
+            return None
+        t = self.view().open_time
+        gaps = np.nonzero(np.diff(t) > step_ms)[0]
+        return int(t[gaps[0]]) if len(gaps) else int(t[-1])
+
+
+class KlineCache:
+    """Thread-safe registry of KlineRing per (symbol, interval)."""
+
+    def __init__(self, capacity=None):
+        self.capacity = dict(capacity or {})  # interval -> candles, falls back to DEFAULT_CAPACITY
+        self._rings = {}
+        self._lock = threading.RLock()
+
+    def ring(self, symbol, interval):
+        key = (symbol.upper(), interval)
+        with self._lock:
+            if key not in self._rings:
+                self._rings[key] = KlineRing(self.capacity.get(interval, DEFAULT_CAPACITY))
+            return self._rings[key]
+
+    def upsert(self, symbol, interval, row):
+        with self._lock:
+            return self.ring(symbol, interval).upsert(row)
+
+    def upsert_many(self, symbol, interval, rows):
+        with self._lock:
+            ring = self.ring(symbol, interval)
+            for row in rows:
+                ring.upsert(row)
+
+    def size(self, symbol, interval):
+        return self.ring(symbol, interval).size
+
+    def last_open_time(self, symbol, interval):
+        return self.ring(symbol, interval).last_open_time
+
+    def view(self, symbol, interval, n=None):
+        """
+        Zero-copy view of the newest `n` candles.
+        Views alias the ring: read them before the next write from another thread,
+        or use klines() for a stable copy.
+        """
+        with self._lock:
+            return self.ring(symbol, interval).view(n)
+
+    def klines(self, symbol, interval, n=None):
+        """Copy of the newest `n` candles as Binance-style rows (for legacy callers)."""
+        with self._lock:
+            v = self.ring(symbol, interval).view(n)
+            return [
+                [int(v.open_time[i]), float(v.open[i]), float(v.high[i]), float(v.low[i]),
+                 float(v.close[i]), float(v.volume[i]), int(v.close_time[i])]
+                for i in range(len(v.open_time))
+            ]
+
+    def top_up(self, rest_client, symbol, interval, since=None):
+        """
+        Fetches only what is missing: the full capacity when empty, otherwise
+        everything from `since` (default: the newest stored open_time) onward.
+        Returns the number of candles received.
+        """
+        ring = self.ring(symbol, interval)
+        start = since if since is not None else ring.last_open_time
+        received = 0
+        truncate = since is not None
+
+        if start is None:
+            limit = min(ring.capacity, REST_LIMIT)
+            rows = _parse(rest_client.get_klines(symbol=symbol.upper(), interval=interval, limit=limit))
+            self.upsert_many(symbol, interval, rows)
+            return len(rows)
+
+        while True:
+            rows = _parse(rest_client.get_klines(symbol=symbol.upper(), interval=interval, startTime=start, limit=REST_LIMIT))
+            with self._lock:
+                if truncate and rows:
+                    # Refilling a hole: rewrite everything after `since` in order
+                    ring.truncate_after(since)
+                    truncate = False
+                self.upsert_many(symbol, interval, rows)
+            received += len(rows)
+            if len(rows) < REST_LIMIT:
+                return received
+            start = rows[-1][0]
+
+
+def _parse(klines):
+    return [[int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]), int(k[6])] for k in klines]
+
+
+# Process-wide cache shared by the bot, feed, and any strategy running in this process
+shared_cache = KlineCache()
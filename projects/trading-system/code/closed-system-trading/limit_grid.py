@@ -0,0 +1,318 @@
+"""
+Limit Grid (Resting Orders Mode)
+================================
+EXECUTION_MODE = 'LIMIT_GRID' in trade_and_log.py. Instead of a MARKET buy
+when the 60s poll happens to land in a level's bucket, resting LIMIT buys
+sit on the nearest GRID_ORDERS empty grid levels below the price, and a
+LIMIT take-profit sell (entry + tp_usdt) is placed as soon as a buy fills.
+Fills happen on the exchange the moment the price gets there, as maker.
+
+- sync() runs every loop iteration: buys that are no longer wanted (zone or
+  grid step changed, level taken, budget / RSI / regime gate closed) are
+  cancelled and the missing ones placed; every open trade gets (or keeps) a
+  TP order at its entry + the current tp_usdt.
+- Fills arrive as executionReport events (user_stream.py in LIVE, SimExchange
+  listeners in PAPER) and are handled on a worker thread: a filled buy opens
+  the trade and places its TP, a filled TP closes the trade.
+- trade_cooldown applies as in MARKET mode: a filled buy cancels the other
+  resting buys, and none are placed until the cooldown has passed, so a fast
+  drop fills one level per cooldown instead of every resting buy at once.
+- The Smart Exit (SECURED -> breakeven) stays with the loop: cancel_tp()
+  first, then a MARKET sell of what is left.
+- Orders carry a `grid-` client order id; leftovers from a previous run are
+  cancelled at start(). poll() re-reads known orders over REST (after a user
+  stream reconnect) so fills missed while disconnected are not lost.
+"""
+
+import math
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+CLIENT_ID_PREFIX = 'grid-'
+DEFAULT_GRID_ORDERS = 3  # Resting buys per symbol
+OPEN_STATUSES = ('NEW', 'PARTIALLY_FILLED')
+
+
+def log(message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] [GRID] {message}")
+
+
+def round_price(price, tick_size, up=False):
+    """Price on the symbol's tick (PRICE_FILTER), rounded down (buys) or up (take profits)."""
+    n = price / tick_size
+    n = math.ceil(n - 1e-9) if up else math.floor(n + 1e-9)
+    return round(n * tick_size, 8)
+
+
+def new_client_order_id(kind):
+    return f"{CLIENT_ID_PREFIX}{kind}-{uuid.uuid4().hex[:16]}"
+
+
+class LimitGrid:
+    """
+    Resting orders of one symbol. `exchange` has the Binance order API
+    (the binance Client in LIVE, SimExchange in PAPER); `filters` is a
+    sim_exchange.SymbolFilters for tick/step rounding.
+    on_buy_filled(buy, order) -> trade opened in `book` (or None)
+    on_tp_filled(trade, order, prior) closes the trade; `prior` is (qty, quote)
+    sold by an earlier TP order of the trade that was replaced part-filled.
+    """
+
+    def __init__(self, exchange, symbol, book, filters, on_buy_filled, on_tp_filled, orders=DEFAULT_GRID_ORDERS, clock=time.monotonic):
+        self.exchange = exchange
+        self.symbol = symbol.upper()
+        self.book = book
+        self.filters = filters
+        self.on_buy_filled = on_buy_filled
+        self.on_tp_filled = on_tp_filled
+        self.orders = orders
+        self.clock = clock
+        self.tp_usdt = None
+        self.cooldown = 0           # config.trade_cooldown (seconds), set by sync()
+        self.last_buy_fill = None   # clock() of the last buy fill
+
+        self.buys = {}       # orderId -> {'level', 'price', 'quantity', 'zone', 'rsi'}
+        self.tps = {}        # trade id -> {'orderId', 'price', 'filled', 'prior'}
+        self._tp_trade = {}  # orderId -> trade id
+        self._tp_errors = {} # trade id -> last TP placement error (logged once)
+        self._tp_filled = set()  # Trade ids whose TP filled and whose close is being recorded (outside the lock)
+        self.lock = threading.RLock()  # Held by trade_and_log.execute_sell across a Smart Exit
+        self._events = queue.Queue()
+        self._thread = None
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Cancels grid orders left over from a previous run, then starts the fill worker."""
+        try:
+            for order in self.exchange.get_open_orders(symbol=self.symbol):
+                if str(order.get('clientOrderId', '')).startswith(CLIENT_ID_PREFIX):
+                    self.exchange.cancel_order(symbol=self.symbol, orderId=order['orderId'])
+                    log(f"{self.symbol}: cancelled leftover order {order['orderId']} ({order['side']} @ {order['price']})")
+        except Exception as e:
+            log(f"⚠️ {self.symbol}: could not clean up leftover orders: {e}")
+        if not self._thread:
+            self._thread = threading.Thread(target=self._run, name=f"grid-{self.symbol}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Cancels every resting order of this grid."""
+        with self.lock:
+            for order_id in list(self.buys):
+                self._cancel_buy(order_id)
+            for trade_id in list(self.tps):
+                self.cancel_tp(trade_id)
+
+    # --- Events ---
+
+    def on_execution_report(self, event):
+        """executionReport listener (user data stream / SimExchange); cheap, the work happens on the worker."""
+        if event.get('e') == 'executionReport' and event.get('s') == self.symbol and str(event.get('c', '')).startswith(CLIENT_ID_PREFIX):
+            self._events.put(event)
+
+    def _run(self):
+        while True:
+            event = self._events.get()
+            try:
+                self._handle(int(event['i']), event['X'], float(event['z']), float(event['Z']), event.get('o', 'LIMIT'))
+            except Exception as e:
+                log(f"❌ {self.symbol}: fill handling failed for order {event.get('i')}: {e}")
+            finally:
+                self._events.task_done()
+
+    def wait_idle(self):
+        """Blocks until every queued order event has been handled."""
+        self._events.join()
+
+    def _handle(self, order_id, status, executed, quote, order_type='LIMIT'):
+        """A grid order reached a final state (or partial fill: nothing to do until it is final)."""
+        with self.lock:
+            if status in OPEN_STATUSES:
+                trade_id = self._tp_trade.get(order_id)
+                if trade_id is not None:
+                    self.tps[trade_id]['filled'] = executed  # Part-filled TPs are not replaced
+                return
+            buy = self.buys.pop(order_id, None)
+            trade_id = self._tp_trade.pop(order_id, None)
+            tp = self.tps.pop(trade_id, None) if trade_id is not None else None
+            if tp and status == 'FILLED':
+                self._tp_filled.add(trade_id)  # cancel_tp() answers None until the close is recorded
+            if buy and executed > 0:
+                self.last_buy_fill = self.clock()
+        order = {'orderId': order_id, 'status': status, 'executedQty': executed, 'cummulativeQuoteQty': quote, 'type': order_type}
+        if buy and executed > 0:
+            trade = self.on_buy_filled(buy, order)
+            if trade and self.tp_usdt is not None:
+                self._place_tp(trade, self.tp_usdt)
+            if self.cooldown > 0:
+                with self.lock:
+                    for other in list(self.buys):
+                        if other in self.buys:  # Not already cancelled by a part-filled one's own cooldown
+                            self._cancel_buy(other)  # One buy per trade_cooldown, as in MARKET mode
+        elif tp:
+            try:
+                trade = self.book.get(trade_id)
+                if trade is None:
+                    return
+                if status == 'FILLED':
+                    self.on_tp_filled(trade, order, tp['prior'])
+                else:
+                    # Cancelled / expired outside the bot: sync() places a new one
+                    log(f"⚠️ {self.symbol}: TP order {order_id} for trade {trade_id} ended {status} ({executed} filled)")
+            finally:
+                with self.lock:
+                    self._tp_filled.discard(trade_id)
+
+    def poll(self):
+        """Re-reads every known order over REST and handles the ones that finished (missed stream events)."""
+        with self.lock:
+            known = list(self.buys) + list(self._tp_trade)
+        for order_id in known:
+            try:
+                order = self.exchange.get_order(symbol=self.symbol, orderId=order_id)
+            except Exception as e:
+                log(f"⚠️ {self.symbol}: could not poll order {order_id}: {e}")
+                continue
+            self._handle(order_id, order['status'], float(order['executedQty']), float(order['cummulativeQuoteQty']), order.get('type', 'LIMIT'))
+
+    # --- Orders ---
+
+    def cooldown_left(self):
+        """Seconds until buys may rest again after the last buy fill (0 if none)."""
+        if self.last_buy_fill is None:
+            return 0
+        return max(self.cooldown - (self.clock() - self.last_buy_fill), 0)
+
+    def sync(self, zone, price, config, can_buy, grid_index, rsi, max_trade_qty=None):
+        """
+        Brings the resting orders in line with this iteration: buys on the nearest
+        empty levels below `price` (none if `can_buy` is False, there is no zone or
+        the trade cooldown is running), and a TP for every open trade at entry + config.tp_usdt.
+        """
+        step, tick = config.grid_step_usdt, self.filters.tick_size
+        with self.lock:
+            self.tp_usdt = config.tp_usdt
+            self.cooldown = config.trade_cooldown
+            if zone and can_buy and self.cooldown_left():
+                log(f"⏳ {self.symbol}: Trade Cooldown Active. No resting buys. ({int(self.cooldown_left())}s left)")
+                can_buy = False
+
+            wanted = {}
+            if zone and can_buy:
+                budget = float(zone['capital_allocated']) - self.book.zone_invested(zone['zone_name'])
+                n = min(self.orders, int(budget // config.trade_size_usdt)) if config.trade_size_usdt > 0 else 0
+                for level in grid_index.empty_levels_below(zone, price, step, self.book, max(n, 0)):
+                    wanted[round_price(level, tick)] = level
+
+            for order_id, buy in list(self.buys.items()):
+                if order_id not in self.buys:
+                    continue  # Cancelled by the cooldown of a part-filled buy cancelled just before
+                if buy['price'] in wanted and buy['zone'] == zone['zone_name']:
+                    wanted.pop(buy['price'])
+                else:
+                    self._cancel_buy(order_id)
+            for limit, level in wanted.items():
+                if self.cooldown_left():
+                    break  # A buy filled while placing (marketable, or a part-filled cancel)
+                qty = _floor_step(config.trade_size_usdt / limit, self.filters.step_size)
+                if max_trade_qty:
+                    qty = min(qty, max_trade_qty)
+                self._place_buy(zone, level, limit, qty, rsi)
+
+            open_ids = set()
+            for trade in self.book.open_trades():
+                open_ids.add(trade['id'])
+                target = round_price(float(trade['entry_price']) + config.tp_usdt, tick, up=True)
+                tp = self.tps.get(trade['id'])
+                prior = (0.0, 0.0)
+                if tp and tp['price'] != target and not tp['filled']:
+                    # tp_usdt changed: move the order (a part-filled one keeps its price)
+                    prior = self.cancel_tp(trade['id'])
+                    if prior is None:
+                        continue  # Filled meanwhile
+                    tp = None
+                if not tp:
+                    self._place_tp(trade, config.tp_usdt, prior)
+            for trade_id in set(self.tps) - open_ids:
+                self.cancel_tp(trade_id)  # Closed elsewhere (dashboard, reconcile)
+            for trade_id in set(self._tp_errors) - open_ids:
+                del self._tp_errors[trade_id]
+
+    def _place_buy(self, zone, level, limit, qty, rsi):
+        try:
+            order = self.exchange.create_order(symbol=self.symbol, side='BUY', type='LIMIT', timeInForce='GTC',
+                                               quantity=f"{qty:.8f}", price=f"{limit:.8f}", newClientOrderId=new_client_order_id('b'))
+        except Exception as e:
+            log(f"❌ {self.symbol}: LIMIT BUY @ {limit} failed: {e}")
+            return
+        with self.lock:
+            self.buys[int(order['orderId'])] = {'level': level, 'price': limit, 'quantity': qty, 'zone': zone['zone_name'], 'zone_row': zone, 'rsi': rsi}
+        log(f"[ORDER] {self.symbol} LIMIT BUY {qty} @ {limit} (Grid Level {level})")
+        # Marketable or filled while we were registering it: handle what already happened
+        if order.get('status') not in OPEN_STATUSES:
+            self._handle(int(order['orderId']), order['status'], float(order['executedQty']), float(order['cummulativeQuoteQty']))
+
+    def _cancel_buy(self, order_id):
+        try:
+            order = self.exchange.cancel_order(symbol=self.symbol, orderId=order_id)
+        except Exception as e:
+            # Usually filled in the meantime: the fill event finishes it
+            log(f"⚠️ {self.symbol}: cancel of BUY {order_id} failed: {e}")
+            return
+        self._handle(order_id, 'CANCELED', float(order.get('executedQty', 0)), float(order.get('cummulativeQuoteQty', 0)))
+
+    def _place_tp(self, trade, tp_usdt, prior=(0.0, 0.0)):
+        target = round_price(float(trade['entry_price']) + tp_usdt, self.filters.tick_size, up=True)
+        qty = _floor_step(float(trade['quantity']) - prior[0], self.filters.step_size)
+        try:
+            order = self.exchange.create_order(symbol=self.symbol, side='SELL', type='LIMIT', timeInForce='GTC',
+                                               quantity=f"{qty:.8f}", price=f"{target:.8f}", newClientOrderId=new_client_order_id('tp'))
+        except Exception as e:
+            # e.g. a part-filled buy below NOTIONAL: retried every sync, logged once
+            if self._tp_errors.get(trade['id']) != str(e):
+                self._tp_errors[trade['id']] = str(e)
+                log(f"❌ {self.symbol}: TP LIMIT SELL @ {target} for trade {trade['id']} failed: {e}")
+            return
+        self._tp_errors.pop(trade['id'], None)
+        order_id = int(order['orderId'])
+        with self.lock:
+            self.tps[trade['id']] = {'orderId': order_id, 'price': target, 'filled': 0.0, 'prior': prior}
+            self._tp_trade[order_id] = trade['id']
+        log(f"[ORDER] {self.symbol} TP LIMIT SELL {qty} @ {target} (Trade {trade['id']})")
+        if order.get('status') not in OPEN_STATUSES:
+            self._handle(order_id, order['status'], float(order['executedQty']), float(order['cummulativeQuoteQty']))
+
+    def cancel_tp(self, trade_id):
+        """
+        Cancels the TP order of a trade (before a Smart Exit). Returns (qty, quote) its TP orders
+        already sold, or None if the TP has filled meanwhile (the trade is closed, do not sell again).
+        A trade without a resting TP returns (0.0, 0.0), unless its TP fill is still being recorded
+        or the trade has left the book: None.
+        """
+        with self.lock:
+            tp = self.tps.pop(trade_id, None)
+            if tp is None:
+                if trade_id in self._tp_filled or self.book.get(trade_id) is None:
+                    return None
+                return (0.0, 0.0)
+            self._tp_trade.pop(tp['orderId'], None)
+        try:
+            order = self.exchange.cancel_order(symbol=self.symbol, orderId=tp['orderId'])
+        except Exception as e:
+            # Filled (or gone): let the fill event close the trade
+            with self.lock:
+                self.tps[trade_id] = tp
+                self._tp_trade[tp['orderId']] = trade_id
+            log(f"⚠️ {self.symbol}: cancel of TP {tp['orderId']} failed ({e}), leaving the trade to it")
+            self.poll()
+            return None
+        return tp['prior'][0] + float(order.get('executedQty', 0)), tp['prior'][1] + float(order.get('cummulativeQuoteQty', 0))
+
+
+def _floor_step(qty, step_size):
+    return math.floor(qty / step_size + 1e-9) * step_size if step_size > 0 else qty
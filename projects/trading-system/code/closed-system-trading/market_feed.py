@@ -0,0 +1,269 @@
+"""
+Market Data Feed
+================
+Streams trade, bookTicker and kline events from Binance over one combined
+WebSocket and keeps the latest price and candles in memory, so the bot loop
+can read market data without a REST round trip. One feed can carry several
+symbols (the multi-symbol supervisor shares a single connection).
+
+- Runs its own asyncio loop in a background thread.
+- Reconnects with exponential backoff when the socket drops.
+- Backfills missed candles over REST after every (re)connect and whenever
+  a kline event skips ahead of the last stored candle.
+- Candles live in the shared KlineCache (kline_cache.py), so every reader in
+  the process sees the same bounded ring buffers.
+
+Offline testing: run `python replay_server.py` and point the feed at it
+with MARKET_WS_URL=ws://localhost:8765
+"""
+
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime
+
+import websockets
+
+from kline_cache import shared_cache, DEFAULT_CAPACITY
+
+BINANCE_WS_URL = "wss://stream.binance.com:9443"
+
+# Candles kept per interval (matches the largest REST `limit` used by the bot)
+DEFAULT_HISTORY = {'1h': 300, '5m': 100}
+
+RECONNECT_MIN_DELAY = 1   # Seconds
+RECONNECT_MAX_DELAY = 30  # Seconds
+LISTENER_ERROR_LOG_INTERVAL = 60  # Seconds between logs of the same failing listener (it fails on every tick)
+
+INTERVAL_MS = {
+    '1m': 60_000,
+    '3m': 180_000,
+    '5m': 300_000,
+    '15m': 900_000,
+    '30m': 1_800_000,
+    '1h': 3_600_000,
+    '2h': 7_200_000,
+    '4h': 14_400_000,
+    '1d': 86_400_000,
+}
+
+
+def log(message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] [FEED] {message}")
+
+
+class MarketDataFeed:
+    """
+    In-process market data for one symbol or a list of symbols.
+    Readers take an optional `symbol` (default: the first one).
+    get_klines() returns Binance REST format rows
+    [open_time, open, high, low, close, volume, close_time] so existing
+    kline parsing (`float(k[4])` etc.) works unchanged; get_view() returns
+    zero-copy NumPy columns.
+    """
+
+    def __init__(self, symbol, history=None, rest_client=None, ws_url=BINANCE_WS_URL, cache=None):
+        symbols = [symbol] if isinstance(symbol, str) else list(symbol)
+        self.symbols = tuple(s.upper() for s in symbols)
+        self.symbol = self.symbols[0]
+        self.history = dict(history or DEFAULT_HISTORY)
+        self.rest_client = rest_client
+        self.ws_url = ws_url.rstrip('/')
+        self.cache = cache or shared_cache
+        for interval, n in self.history.items():
+            if n > DEFAULT_CAPACITY:
+                self.cache.capacity.setdefault(interval, n)
+
+        self._lock = threading.Lock()
+        self._last_price = {}       # symbol -> price
+        self._last_price_time = {}  # symbol -> time.time() of the last trade
+        self._book = {}             # symbol -> (bid, ask)
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._loop = None
+        self._ws = None
+
+        self.listeners = []  # Objects with on_trade(symbol, price, qty, ts) / on_quote(symbol, bid, ask, bid_qty, ask_qty), e.g. SimExchange
+        self.listener_errors = 0
+        self._listener_error_logged = {}  # (listener type, method) -> time of the last log
+
+        self.reconnects = 0
+        self.backfilled = 0
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"feed-{'-'.join(self.symbols)}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._loop and self._ws:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def wait_ready(self, timeout=10):
+        """Blocks until every symbol has a first price. Returns False on timeout."""
+        return self._ready.wait(timeout)
+
+    def covers(self, symbol):
+        return symbol.upper() in self.symbols
+
+    # --- Readers (thread-safe) ---
+
+    def get_price(self, max_age=None, symbol=None):
+        """Latest trade price, or None if nothing arrived within `max_age` seconds."""
+        symbol = (symbol or self.symbol).upper()
+        with self._lock:
+            price = self._last_price.get(symbol)
+            if price is None:
+                return None
+            if max_age is not None and time.time() - self._last_price_time[symbol] > max_age:
+                return None
+            return price
+
+    def get_book(self, symbol=None):
+        """Best (bid, ask) from the bookTicker stream."""
+        with self._lock:
+            return self._book.get((symbol or self.symbol).upper(), (None, None))
+
+    def get_klines(self, interval, limit=None, symbol=None):
+        """Copy of the most recent candles (oldest first), including the in-progress one."""
+        return self.cache.klines(symbol or self.symbol, interval, limit)
+
+    def get_view(self, interval, limit=None, symbol=None):
+        """Zero-copy NumPy view of the most recent candles (see KlineCache.view)."""
+        return self.cache.view(symbol or self.symbol, interval, limit)
+
+    def has_history(self, interval, limit, symbol=None):
+        return self.cache.size(symbol or self.symbol, interval) >= limit
+
+    # --- Internals ---
+
+    def _stream_url(self):
+        streams = []
+        for s in (x.lower() for x in self.symbols):
+            streams += [f"{s}@trade", f"{s}@bookTicker"] + [f"{s}@kline_{i}" for i in self.history]
+        return f"{self.ws_url}/stream?streams={'/'.join(streams)}"
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._consume())
+        finally:
+            self._loop.close()
+
+    async def _consume(self):
+        delay = RECONNECT_MIN_DELAY
+        while not self._stop.is_set():
+            try:
+                async with websockets.connect(self._stream_url(), ping_interval=20) as ws:
+                    self._ws = ws
+                    log(f"Connected {', '.join(self.symbols)} ({self.ws_url})")
+                    delay = RECONNECT_MIN_DELAY
+                    await asyncio.to_thread(self._backfill_all)
+                    async for raw in ws:
+                        self._handle_message(raw)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                log(f"⚠️ Stream error: {e}")
+            finally:
+                self._ws = None
+
+            if self._stop.is_set():
+                break
+            self.reconnects += 1
+            log(f"Reconnecting in {delay}s...")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def _handle_message(self, raw):
+        msg = json.loads(raw)
+        stream = msg.get('stream', '')
+        data = msg.get('data', msg)
+        symbol = (data.get('s') or stream.split('@')[0] or self.symbol).upper()
+
+        if stream.endswith('@trade') or data.get('e') == 'trade':
+            with self._lock:
+                self._last_price[symbol] = float(data['p'])
+                self._last_price_time[symbol] = time.time()
+                ready = len(self._last_price) >= len(self.symbols)
+            if ready:
+                self._ready.set()
+            self._notify('on_trade', symbol, float(data['p']), float(data.get('q', 0)), data.get('T'))
+        elif stream.endswith('@bookTicker') or ('b' in data and 'a' in data and 'e' not in data):
+            with self._lock:
+                self._book[symbol] = (float(data['b']), float(data['a']))
+            self._notify('on_quote', symbol, float(data['b']), float(data['a']), float(data.get('B', 0)) or None, float(data.get('A', 0)) or None)
+        elif data.get('e') == 'kline':
+            self._handle_kline(symbol, data['k'])
+
+    def _notify(self, method, *args):
+        """Calls `method` on every listener; a failing listener is logged, not allowed to drop the connection."""
+        for listener in self.listeners:
+            try:
+                getattr(listener, method)(*args)
+            except Exception as e:
+                self.listener_errors += 1
+                key = (type(listener).__name__, method)
+                if time.time() - self._listener_error_logged.get(key, 0) >= LISTENER_ERROR_LOG_INTERVAL:
+                    self._listener_error_logged[key] = time.time()
+                    log(f"⚠️ Listener {key[0]}.{method} failed ({self.listener_errors} listener errors so far): {e}")
+
+    def _handle_kline(self, symbol, k):
+        interval = k['i']
+        row = [int(k['t']), float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v']), int(k['T'])]
+
+        if interval not in self.history or symbol not in self.symbols:
+            return
+        last_open = self.cache.last_open_time(symbol, interval)
+        gap = last_open is not None and row[0] - last_open > INTERVAL_MS.get(interval, 0)
+        # Same open_time overwrites the live candle, older (late duplicate) is ignored
+        self.cache.upsert(symbol, interval, row)
+
+        if gap:
+            log(f"Gap detected on {symbol} {interval}, backfilling...")
+            # Off the event loop so the stream keeps draining while REST runs
+            self._loop.run_in_executor(None, self._backfill, symbol, interval)
+
+    def _backfill_all(self):
+        for symbol in self.symbols:
+            for interval in self.history:
+                self._backfill(symbol, interval)
+
+    def _backfill(self, symbol, interval):
+        """Fetches candles from the first gap (or the newest stored candle) onward over REST."""
+        if self.rest_client is None:
+            return
+        try:
+            ring = self.cache.ring(symbol, interval)
+            since = ring.first_gap_open_time(INTERVAL_MS.get(interval, 0))
+            self.backfilled += self.cache.top_up(self.rest_client, symbol, interval, since=since)
+        except Exception as e:
+            log(f"⚠️ Backfill failed for {symbol} {interval}: {e}")
+
+
+if __name__ == "__main__":
+    import os
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
+    feed = MarketDataFeed('BTCUSDT', ws_url=os.getenv('MARKET_WS_URL', BINANCE_WS_URL)).start()
+    try:
+        if not feed.wait_ready(15):
+            print("❌ No data received.")
+        while True:
+            bid, ask = feed.get_book()
+            print(f"Price: {feed.get_price()} | Bid: {bid} | Ask: {ask} | 1h candles: {len(feed.get_klines('1h'))} | 5m candles: {len(feed.get_klines('5m'))}")
+            time.sleep(5)
+    except KeyboardInterrupt:
+        feed.stop()
@@ -0,0 +1,320 @@
+"""
+Market Data Store
+=================
+Local archive of closed klines per symbol/interval, so history is
+downloaded once and kept, instead of being pulled over REST by every script.
+
+Layout: MARKET_DATA_DIR/<SYMBOL>/<interval>.bin holds one fixed-width
+record per candle (KLINE_DTYPE, 56 bytes) sorted by open_time, and
+<interval>.gaps.json the ranges the exchange has no candles for.
+
+- Zero-copy reads: the file is memory-mapped and range() bisects open_time,
+  returning a KlineView of column views into the mapping (nothing is loaded
+  or copied; the OS pages in only what is touched).
+- sync() downloads only what is missing: before the first stored candle,
+  after the last one and inside gaps. New candles after the last one are
+  appended; a backfill before or inside the series rewrites the file once
+  (temp file + rename, so readers never see a half-written file).
+- Only closed candles are stored; the in-progress one belongs to the live feed.
+- Ranges the exchange returned nothing for (maintenance) are recorded as
+  known gaps and not requested again.
+- Writers in different processes (bot warm-up, dashboard chart, scripts)
+  take an exclusive lock on <interval>.lock for the read-append/merge, so
+  concurrent syncs cannot interleave or duplicate candles. On Windows a file
+  another process has mapped cannot be replaced: the rewrite is retried,
+  then skipped (the missing range is downloaded again on the next sync).
+
+Shared by backtest.py / optimize.py, the bot warm-up
+(trade_and_log.warm_up_from_store) and the dashboard price chart.
+
+Usage:
+  python market_store.py sync --symbol BTCUSDT --interval 1m --start 2024-01-01
+  python market_store.py info
+  python market_store.py sync --fixture ...   # offline, FixtureClient instead of Binance
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+
+from kline_cache import KlineView, REST_LIMIT
+from market_feed import INTERVAL_MS
+
+MARKET_DATA_DIR = os.getenv('MARKET_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'market_data'))
+
+KLINE_DTYPE = np.dtype([
+    ('open_time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+    ('close', '<f8'), ('volume', '<f8'), ('close_time', '<i8'),
+])
+EMPTY = np.zeros(0, dtype=KLINE_DTYPE)
+REPLACE_RETRIES = 20      # os.replace attempts while a reader holds the file mapped (Windows)
+REPLACE_RETRY_DELAY = 0.05
+
+
+def log(message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] [STORE] {message}")
+
+
+def to_ms(value):
+    """Milliseconds from an int (ms), a datetime or an ISO date string ('2024-01-01')."""
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def as_view(records):
+    """KlineView of column views into a KLINE_DTYPE array (no copy)."""
+    return KlineView(*(records[name] for name in KLINE_DTYPE.names))
+
+
+def to_records(klines):
+    """KLINE_DTYPE array from Binance kline rows."""
+    records = np.zeros(len(klines), dtype=KLINE_DTYPE)
+    if len(klines):
+        a = np.asarray([k[:7] for k in klines], dtype=np.float64)
+        for j, name in enumerate(KLINE_DTYPE.names):
+            records[name] = a[:, j]
+    return records
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock on `path`, across processes (blocks until it is free)."""
+    with open(path, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gives up after ~10s: keep waiting
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def replace_file(tmp, path):
+    """os.replace, retried while another process has `path` memory-mapped (Windows). False if it never went through."""
+    for attempt in range(REPLACE_RETRIES):
+        try:
+            os.replace(tmp, path)
+            return True
+        except PermissionError:
+            time.sleep(REPLACE_RETRY_DELAY)
+    os.remove(tmp)
+    return False
+
+
+class MarketStore:
+    def __init__(self, root=MARKET_DATA_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    # --- Files ---
+
+    def _path(self, symbol, interval, suffix='.bin'):
+        return os.path.join(self.root, symbol.upper(), f"{interval}{suffix}")
+
+    def records(self, symbol, interval):
+        """Every stored candle as a read-only memory-mapped KLINE_DTYPE array."""
+        path = self._path(symbol, interval)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return EMPTY
+        return np.memmap(path, dtype=KLINE_DTYPE, mode='r')
+
+    def known_gaps(self, symbol, interval):
+        path = self._path(symbol, interval, '.gaps.json')
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding='utf-8') as f:
+            return [tuple(g) for g in json.load(f)]
+
+    def _add_known_gaps(self, symbol, interval, gaps):
+        merged = sorted(set(self.known_gaps(symbol, interval)) | set(gaps))
+        with open(self._path(symbol, interval, '.gaps.json'), 'w', encoding='utf-8') as f:
+            json.dump(merged, f)
+
+    def write(self, symbol, interval, records):
+        """Adds candles (KLINE_DTYPE); a candle with an existing open_time replaces the stored one."""
+        if len(records) == 0:
+            return 0
+        records = np.sort(records, order='open_time')
+        path = self._path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock, file_lock(self._path(symbol, interval, '.lock')):
+            current = self.records(symbol, interval)  # Read under the lock: another process may have just written
+            if len(current) == 0 or records['open_time'][0] > current['open_time'][-1]:
+                with open(path, 'ab') as f:
+                    records.tofile(f)
+                return len(records)
+
+            # Backfill before/inside the series: merge and rewrite once
+            merged = np.concatenate([records, np.array(current)])
+            _, keep = np.unique(merged['open_time'], return_index=True)  # First occurrence = the new candle
+            merged = merged[keep]
+            added = len(merged) - len(current)
+            tmp = path + '.tmp'
+            merged.tofile(tmp)
+            del current
+            if not replace_file(tmp, path):
+                log(f"⚠️ {symbol.upper()} {interval}: file in use by another process, {added} backfilled candles not stored this time")
+                return 0
+            return added
+
+    # --- Reads ---
+
+    def range(self, symbol, interval, start=None, end=None):
+        """Zero-copy KlineView of the candles with start <= open_time < end (ms, datetime or ISO date)."""
+        records = self.records(symbol, interval)
+        t = records['open_time']
+        a = 0 if start is None else int(np.searchsorted(t, to_ms(start), side='left'))
+        b = len(t) if end is None else int(np.searchsorted(t, to_ms(end), side='left'))
+        return as_view(records[a:b])
+
+    def last(self, symbol, interval, n):
+        """Zero-copy KlineView of the newest `n` stored candles."""
+        records = self.records(symbol, interval)
+        return as_view(records[max(len(records) - n, 0):])
+
+    def gaps(self, symbol, interval, start=None, end=None):
+        """Missing open_time ranges [(from, to)) inside the stored series, minus known exchange gaps."""
+        step = INTERVAL_MS[interval]
+        t = self.range(symbol, interval, start, end).open_time
+        holes = [(int(t[i]) + step, int(t[i + 1])) for i in np.nonzero(np.diff(t) > step)[0]]
+        known = self.known_gaps(symbol, interval)
+        return [h for h in holes if not _covered(h, known)]
+
+    # --- Sync ---
+
+    def _download(self, client, symbol, interval, start, end):
+        """Closed candles with start <= open_time < end, paginated."""
+        now = int(time.time() * 1000)
+        out = []
+        while start < end:
+            rows = client.get_klines(symbol=symbol.upper(), interval=interval, startTime=start, endTime=end - 1, limit=REST_LIMIT)
+            rows = [r for r in rows if int(r[0]) < end and int(r[6]) < now]
+            if not rows:
+                break
+            out.extend(rows)
+            start = int(rows[-1][0]) + INTERVAL_MS[interval]
+            if len(rows) < REST_LIMIT:
+                break
+        return to_records(out)
+
+    def sync(self, client, symbol, interval, start, end=None):
+        """
+        Makes the store complete for [start, end) (default end: now), downloading only the
+        missing ranges. Returns the number of candles added.
+        """
+        step = INTERVAL_MS[interval]
+        start = to_ms(start) // step * step
+        end = min(to_ms(end) if end is not None else int(time.time() * 1000), int(time.time() * 1000))
+        stored = self.range(symbol, interval)
+        first, last = (int(stored.open_time[0]), int(stored.open_time[-1])) if len(stored.open_time) else (None, None)
+        del stored  # No open mapping while write() replaces the file
+
+        if first is None:
+            missing = [(start, end)]
+        else:
+            missing = []
+            if start < first:
+                missing.append((start, first))
+            missing += [g for g in self.gaps(symbol, interval) if g[1] > start and g[0] < end]
+            if last + step < end:
+                missing.append((last + step, end))
+        known = self.known_gaps(symbol, interval)
+        missing = [m for m in missing if not _covered(m, known)]
+
+        added = 0
+        empty = []
+        for a, b in missing:
+            records = self._download(client, symbol, interval, a, b)
+            added += self.write(symbol, interval, records)
+            # Whatever the exchange still has no candles for inside a closed range is a real gap
+            got = records['open_time']
+            edges = np.r_[a, got + step] if len(got) else np.array([a])
+            nexts = np.r_[got, b] if len(got) else np.array([b])
+            empty += [(int(x), int(y)) for x, y in zip(edges, nexts) if y > x and y < end - step]
+        if empty:
+            self._add_known_gaps(symbol, interval, empty)
+        if added:
+            log(f"{symbol.upper()} {interval}: +{added} candles ({len(missing)} ranges)")
+        return added
+
+    def info(self):
+        """[(symbol, interval, candles, first, last)] for everything stored."""
+        rows = []
+        if not os.path.isdir(self.root):
+            return rows
+        for symbol in sorted(os.listdir(self.root)):
+            folder = os.path.join(self.root, symbol)
+            for name in sorted(os.listdir(folder)) if os.path.isdir(folder) else []:
+                if name.endswith('.bin'):
+                    t = self.records(symbol, name[:-4])['open_time']
+                    rows.append((symbol, name[:-4], len(t), int(t[0]) if len(t) else None, int(t[-1]) if len(t) else None))
+        return rows
+
+
+def _covered(rng, known):
+    return any(a <= rng[0] and rng[1] <= b for a, b in known)
+
+
+# Process-wide store (same directory for the bot, backtests and the dashboard)
+shared_store = MarketStore()
+
+
+def _fmt(ms):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime("%Y-%m-%d %H:%M") if ms is not None else "-"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local kline archive")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sync_cmd = sub.add_parser('sync', help="Download missing candles")
+    sync_cmd.add_argument('--symbol', nargs='+', default=['BTCUSDT'])
+    sync_cmd.add_argument('--interval', nargs='+', default=['1m'])
+    sync_cmd.add_argument('--start', required=True, help="e.g. 2024-01-01")
+    sync_cmd.add_argument('--end')
+    sync_cmd.add_argument('--fixture', nargs='?', const='', help="Offline: FixtureClient (optional fixture JSON)")
+    sub.add_parser('info', help="List stored series")
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        for symbol, interval, n, first, last in shared_store.info():
+            print(f"{symbol:10} {interval:4} {n:>10,} candles  {_fmt(first)} -> {_fmt(last)}")
+    else:
+        if args.fixture is not None:
+            from fixture_client import FixtureClient
+            client = FixtureClient(args.fixture or None)
+        else:
+            from binance.client import Client
+            client = Client()  # Public endpoints, no API key needed
+        for symbol in args.symbol:
+            for interval in args.interval:
+                added = shared_store.sync(client, symbol, interval, args.start, args.end)
+                print(f"✅ {symbol.upper()} {interval}: {added:,} new candles, {len(shared_store.gaps(symbol, interval))} unfilled gaps")
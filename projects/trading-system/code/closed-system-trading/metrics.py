@@ -0,0 +1,305 @@
+"""
+Metrics
+=======
+Timings, counters and gauges from inside the bot, served in the Prometheus
+text format on a local HTTP endpoint (http://127.0.0.1:9108/metrics), so a
+slow iteration can be traced to Binance, Supabase, indicator math or the
+snapshot instead of guessed at from the logs.
+
+- span(stage, symbol): times one stage of the decision loop into the
+  `grid_bot_stage_seconds` histogram (`stage="iteration"` is the whole pass).
+- instrument_binance() / instrument_supabase(): wrap the clients so every
+  request is timed into `grid_bot_external_seconds`, failures are counted
+  and the Binance request weight is tracked (estimated per call, and the
+  `X-MBX-USED-WEIGHT-1M` header when the response carries it).
+- Counters (orders, errors) and gauges (open trades, zone usage) are set
+  where the bot already has the numbers.
+
+Recording is a perf_counter() pair, a bisect and a dict update under a
+lock, so it can stay on in production. Rendering happens only on a scrape.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_ADDR = '127.0.0.1'
+METRICS_PORT = 9108
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds: sub-millisecond indicator math up to multi-second REST timeouts
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Binance REQUEST_WEIGHT per client method (spot API docs); anything else counts as 1
+BINANCE_WEIGHTS = {
+    'get_symbol_ticker': 2, 'get_klines': 2, 'get_historical_klines': 2, 'get_symbol_info': 20,
+    'get_exchange_info': 20, 'get_account': 20, 'get_asset_balance': 20, 'get_order': 4,
+    'get_open_orders': 6, 'get_all_orders': 20, 'get_order_book': 5, 'get_my_trades': 20,
+    'stream_get_listen_key': 2, 'stream_keepalive': 2,
+}
+SUPABASE_QUERY_METHODS = ('select', 'insert', 'update', 'upsert', 'delete')
+
+
+def log(message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] [METRICS] {message}")
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, '')) for n in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, value in series:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_labels(self.label_names, key)} {value}"]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def _render_series(self, key, value):
+        counts, total = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', le)])} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total}")
+        lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+stage_seconds = REGISTRY.register(Histogram('grid_bot_stage_seconds', "Duration of a decision loop stage.", ['symbol', 'stage']))
+external_seconds = REGISTRY.register(Histogram('grid_bot_external_seconds', "Duration of a Binance / Supabase request.", ['service', 'call']))
+external_errors = REGISTRY.register(Counter('grid_bot_external_errors_total', "Binance / Supabase requests that raised.", ['service', 'call']))
+api_weight = REGISTRY.register(Counter('grid_bot_binance_request_weight_total', "Estimated Binance REQUEST_WEIGHT spent.", ['call']))
+used_weight = REGISTRY.register(Gauge('grid_bot_binance_used_weight_1m', "X-MBX-USED-WEIGHT-1M of the last Binance response."))
+orders = REGISTRY.register(Counter('grid_bot_orders_total', "Filled orders logged as trades.", ['symbol', 'side', 'mode']))
+errors = REGISTRY.register(Counter('grid_bot_errors_total', "Errors handled by the bot.", ['symbol', 'where']))
+open_trades = REGISTRY.register(Gauge('grid_bot_open_trades', "Open trades in the position book.", ['symbol']))
+zone_invested = REGISTRY.register(Gauge('grid_bot_zone_invested_usdt', "USDT invested in a zone's open trades.", ['symbol', 'zone']))
+zone_usage = REGISTRY.register(Gauge('grid_bot_zone_usage_ratio', "Zone invested / capital_allocated.", ['symbol', 'zone']))
+
+
+@contextmanager
+def span(stage, symbol=''):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - started, symbol=symbol, stage=stage)
+
+
+def timed(stage, symbol, fn, *args, **kwargs):
+    """fn(*args, **kwargs) inside span(stage, symbol), e.g. for asyncio.to_thread."""
+    with span(stage, symbol):
+        return fn(*args, **kwargs)
+
+
+def record_zone(symbol, zone, invested):
+    capital = float(zone['capital_allocated'])
+    zone_invested.set(invested, symbol=symbol, zone=zone['zone_name'])
+    zone_usage.set(invested / capital if capital > 0 else 0.0, symbol=symbol, zone=zone['zone_name'])
+
+
+def _timed(service, call, fn, after=None):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            external_errors.inc(service=service, call=call)
+            raise
+        finally:
+            external_seconds.observe(time.perf_counter() - started, service=service, call=call)
+            if after:
+                after()
+    return wrapper
+
+
+# --- Client wrappers ---
+
+class InstrumentedBinance:
+    """Binance client whose method calls are timed and weighed. Attributes pass through."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def _after(self):
+        response = getattr(self._client, 'response', None)
+        weight = response is not None and response.headers.get('x-mbx-used-weight-1m')
+        if weight:
+            used_weight.set(int(weight))
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+        weight = BINANCE_WEIGHTS.get(name, 1)
+
+        def call(*args, **kwargs):
+            api_weight.inc(weight, call=name)
+            return _timed('binance', name, attr, self._after)(*args, **kwargs)
+        return call
+
+
+class InstrumentedQuery:
+    """A Supabase query builder; execute() is timed as `<table>.<method>`."""
+
+    def __init__(self, builder, call):
+        self._builder = builder
+        self._call = call
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if name == 'execute':
+            return _timed('supabase', self._call, attr)
+        if not callable(attr):
+            return attr
+        call = self._call.split('.')[0] + f".{name}" if name in SUPABASE_QUERY_METHODS else self._call
+
+        def chain(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return InstrumentedQuery(result, call) if hasattr(result, 'execute') else result
+        return chain
+
+
+class InstrumentedSupabase:
+    """Supabase client whose table / rpc queries are timed. Everything else passes through."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name):
+        return InstrumentedQuery(self._client.table(name), name)
+
+    def from_(self, name):
+        return self.table(name)
+
+    def rpc(self, fn, params=None, *args, **kwargs):
+        return InstrumentedQuery(self._client.rpc(fn, params or {}, *args, **kwargs), f"rpc.{fn}")
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def instrument_binance(client):
+    return InstrumentedBinance(client)
+
+
+def instrument_supabase(client):
+    return InstrumentedSupabase(client)
+
+
+# --- Endpoint ---
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every 15s would flood the bot log
+
+
+_server = None
+
+
+def start_server(port=METRICS_PORT, addr=METRICS_ADDR):
+    """Serves /metrics from a daemon thread (once per process). Returns the server, or None if the port is taken."""
+    global _server
+    if _server:
+        return _server
+    try:
+        _server = ThreadingHTTPServer((addr, port), MetricsHandler)
+    except OSError as e:
+        log(f"⚠️ Metrics endpoint not started on {addr}:{port}: {e}")
+        return None
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    log(f"Serving http://{addr}:{port}/metrics")
+    return _server
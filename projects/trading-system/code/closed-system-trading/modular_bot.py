@@ -5,6 +5,7 @@ from datetime import datetime, timezone
 from binance.client import Client
 from dotenv import load_dotenv
 from supabase import create_client, Client as SupabaseClient
+from zone_index import ZoneIndex
 
 # Load environment variables
 load_dotenv()
@@ -26,6 +27,8 @@ class ModularBot:
         self.supabase_client: SupabaseClient = create_client(self.supabase_url, self.supabase_key)
 
         self.symbol = 'BTCUSDT'
+        self.zone_index = ZoneIndex(())
+        self._zone_key = ()
 
     def get_current_price(self):
         """Fetches current price from Binance."""
@@ -58,14 +61,14 @@ class ModularBot:
         if not active_zones:
             return False, None
 
-        for zone in active_zones:
-            low = float(zone['price_low'])
-            high = float(zone['price_high'])
-            
-            if low <= current_price <= high:
-                return True, zone
-        
-        return False, None
+        # Rebuild the index only when the zone set changed
+        zone_key = tuple((z.get('id'), z['zone_name'], z['price_low'], z['price_high']) for z in active_zones)
+        if zone_key != self._zone_key:
+            self.zone_index = ZoneIndex(active_zones)
+            self._zone_key = zone_key
+
+        zone = self.zone_index.select(current_price)
+        return zone is not None, zone
 
     def alert_out_of_zone(self, current_price):
         """Sends an alert (currently print) that price is out of active zones."""
@@ -109,6 +112,9 @@ class ModularBot:
             print(f"   Using Allocated Capital: ${current_zone['capital_allocated']} for MM calculations.")
         else:
             self.alert_out_of_zone(price)
+            distance, edge = self.zone_index.nearest_edge(price)
+            if edge is not None:
+                print(f"   Nearest zone edge: ${edge:,.2f} (${distance:,.2f} away)")
 
 if __name__ == "__main__":
     bot = ModularBot()
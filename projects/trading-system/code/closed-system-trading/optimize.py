@@ -0,0 +1,293 @@
+"""
+Parameter Optimizer (bot_settings)
+==================================
+Grid or random search over the bot_settings knobs (rsi_limit, tp_usdt,
+grid_step_usdt, trade_cooldown, trade_size_usdt) with backtest.py, on a
+process pool.
+
+- The price history and its indicators (which do not depend on the
+  settings) are computed once, saved as .npy files and memory-mapped
+  read-only by every worker, so workers share one copy in the page cache
+  and a task ships only its parameters.
+- Walk-forward: rolling train/test windows. Each window picks its best
+  candidate on the train slice and reports how that pick did on the
+  following, unseen test slice. Candidates are then ranked on the most
+  recent train window.
+- Ranking by net PnL, max drawdown, fee ratio or net PnL / drawdown.
+- The best candidates are exported as ready-to-apply bot_settings rows
+  (JSON, plus the SQL UPDATE for the top one).
+
+Tasks are independent and CPU-bound, so throughput scales with the number
+of cores (one worker per core by default).
+
+Usage:
+  python optimize.py --csv BTCUSDT-1m-2024.csv --zones zones.json \\
+      --rsi-limit 45 50 55 60 --tp 150 200 250 --grid-step 100 150 200
+  python optimize.py --csv ... --zone 60000 110000 2000 --random 200 --train-days 90 --test-days 30 --export best.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+import backtest
+from kline_cache import KlineView
+
+PARAMS = {  # CLI flag -> bot_settings column
+    'rsi_limit': 'rsi_limit',
+    'tp': 'tp_usdt',
+    'grid_step': 'grid_step_usdt',
+    'cooldown': 'trade_cooldown',
+    'trade_size': 'trade_size_usdt',
+}
+RANKINGS = {  # name -> (summary key, higher is better)
+    'net_pnl': ('net_pnl', True),
+    'drawdown': ('max_drawdown_usdt', False),
+    'fee_ratio': ('fee_ratio', False),
+    'pnl_per_dd': ('pnl_per_dd', True),
+}
+DAY_MS = 86_400_000
+
+# Worker state (memory-mapped in init_worker)
+_bars = None
+_indicators = None
+_job = None
+
+
+def log(message):
+    backtest.log(message)
+
+
+# --- Shared, memory-mapped history ---
+
+def save_history(path, bars, indicators):
+    for name, column in zip(KlineView._fields, bars):
+        np.save(os.path.join(path, f"bars_{name}.npy"), np.ascontiguousarray(column))
+    for name, column in zip(backtest.Indicators._fields, indicators):
+        np.save(os.path.join(path, f"ind_{name}.npy"), np.ascontiguousarray(column))
+
+
+def load_history(path):
+    """Read-only memory maps: every process reads the same pages, nothing is copied."""
+    bars = KlineView(*(np.load(os.path.join(path, f"bars_{n}.npy"), mmap_mode='r') for n in KlineView._fields))
+    indicators = backtest.Indicators(*(np.load(os.path.join(path, f"ind_{n}.npy"), mmap_mode='r') for n in backtest.Indicators._fields))
+    return bars, indicators
+
+
+def init_worker(path, job):
+    global _bars, _indicators, _job
+    _bars, _indicators = load_history(path)
+    _job = job
+
+
+def run_task(task):
+    """One backtest: (candidate index, settings, (start, end) bar range) -> (index, range, summary)."""
+    index, settings, (start, end) = task
+    bars = KlineView(*(column[start:end] for column in _bars))
+    indicators = backtest.Indicators(*(column[start:end] for column in _indicators))
+    _, summary = backtest.run_backtest(bars, _job['zones'], settings, _job['symbol'], _job['step_size'],
+                                       _job['max_qty'], _job['fee_rate'], indicators)
+    summary['pnl_per_dd'] = summary['net_pnl'] / summary['max_drawdown_usdt'] if summary['max_drawdown_usdt'] > 0 else summary['net_pnl']
+    return index, (start, end), summary
+
+
+# --- Search space & windows ---
+
+def candidates(grid, n_random=None, seed=0):
+    """Every combination of `grid` ({column: [values]}), or `n_random` of them without repetition."""
+    keys = list(grid)
+    combos = list(itertools.product(*(grid[k] for k in keys)))
+    if n_random and n_random < len(combos):
+        combos = random.Random(seed).sample(combos, n_random)
+    return [dict(zip(keys, combo)) for combo in combos]
+
+
+def walk_forward_windows(open_time, train_days, test_days):
+    """Rolling [(train_start, train_end, test_end)] bar indices, stepping by one test window."""
+    windows = []
+    start = int(open_time[0])
+    while True:
+        train_end = start + train_days * DAY_MS
+        a, b, c = np.searchsorted(open_time, [start, train_end, train_end + test_days * DAY_MS])
+        if b >= len(open_time):
+            break
+        windows.append((int(a), int(b), int(c)))
+        start += test_days * DAY_MS
+    return windows
+
+
+def _rank_key(summary, by):
+    key, higher = RANKINGS[by]
+    return ((-1 if higher else 1) * summary[key], -summary['net_pnl'])
+
+
+def rank(results, by):
+    """Sorts [(settings, summary)] best first by `by` (RANKINGS), ties broken by net PnL."""
+    return sorted(results, key=lambda r: _rank_key(r[1], by))
+
+
+# --- Runner ---
+
+def optimize(bars, zones, grid, n_random=None, train_days=None, test_days=None, rank_by='net_pnl',
+             workers=None, symbol=backtest.SYMBOL, step_size=backtest.STEP_SIZE, max_qty=backtest.MAX_TRADE_QTY,
+             fee_rate=backtest.FEE_RATE, seed=0):
+    """
+    Runs the search. Returns (ranking, walk_forward) where ranking is [(settings, summary)]
+    best first (on the most recent train window with walk-forward, else on everything) and
+    walk_forward is one row per window with the train pick and its out-of-sample result.
+    """
+    settings_list = candidates(grid, n_random, seed)
+    indicators = backtest.compute_indicators(bars)
+    n = len(bars.close)
+
+    windows = walk_forward_windows(bars.open_time, train_days, test_days) if train_days and test_days else []
+    final_range = (int(np.searchsorted(bars.open_time, int(bars.open_time[-1]) - train_days * DAY_MS)), n) if windows else (0, n)
+    ranges = sorted({final_range} | {(a, b) for a, b, _ in windows} | {(b, c) for _, b, c in windows})
+    tasks = [(i, s, r) for r in ranges for i, s in enumerate(settings_list)]
+
+    job = {'zones': zones, 'symbol': symbol, 'step_size': step_size, 'max_qty': max_qty, 'fee_rate': fee_rate}
+    workers = workers or os.cpu_count()
+    log(f"{len(settings_list)} candidates x {len(ranges)} ranges = {len(tasks)} backtests on {workers} workers")
+
+    path = tempfile.mkdtemp(prefix="optimize_")
+    results = {}
+    started = time.perf_counter()
+    try:
+        save_history(path, bars, indicators)
+        with Pool(workers, initializer=init_worker, initargs=(path, job)) as pool:
+            for index, r, summary in pool.imap_unordered(run_task, tasks, chunksize=max(1, len(tasks) // (workers * 8))):
+                results[(index, r)] = summary
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+    elapsed = time.perf_counter() - started
+    log(f"Done in {elapsed:.1f}s ({len(tasks) / elapsed:.1f} backtests/s)")
+
+    walk_forward = []
+    for a, b, c in windows:
+        best_index = min(range(len(settings_list)), key=lambda i: _rank_key(results[(i, (a, b))], rank_by))
+        test = results[(best_index, (b, c))]
+        walk_forward.append({
+            'train_start': backtest._iso(int(bars.open_time[a])),
+            'test_start': backtest._iso(int(bars.open_time[b])),
+            'test_end': backtest._iso(int(bars.close_time[c - 1]) + 1),
+            **settings_list[best_index],
+            'train_net_pnl': results[(best_index, (a, b))]['net_pnl'],
+            'test_net_pnl': test['net_pnl'],
+            'test_max_drawdown_usdt': test['max_drawdown_usdt'],
+            'test_fee_ratio': test['fee_ratio'],
+        })
+
+    ranking = rank([(settings_list[i], results[(i, final_range)]) for i in range(len(settings_list))], rank_by)
+    return ranking, walk_forward
+
+
+def settings_row(settings):
+    """A bot_settings row (id 1) with the candidate's values."""
+    row = {'id': 1}
+    row.update({k: (int(v) if k in ('rsi_limit', 'trade_cooldown') else float(v)) for k, v in settings.items()})
+    return row
+
+
+def settings_sql(settings):
+    row = settings_row(settings)
+    assignments = ", ".join(f"{k} = {v}" for k, v in row.items() if k != 'id')
+    return f"UPDATE bot_settings SET {assignments} WHERE id = 1;"
+
+
+# --- CLI ---
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Grid / random search and walk-forward over bot_settings")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument('--csv', help="Binance 1m kline CSV (data.binance.vision)")
+    src.add_argument('--fetch', action='store_true', help="Sync the local store over REST, then read from it")
+    src.add_argument('--store', action='store_true', help="Read what market_store.py already holds (offline)")
+    parser.add_argument('--symbol', default=backtest.SYMBOL)
+    parser.add_argument('--start', help="With --fetch / --store, e.g. 2024-01-01")
+    parser.add_argument('--end', help="With --fetch / --store")
+    parser.add_argument('--zones', help="JSON file with zones_config rows")
+    parser.add_argument('--zone', nargs=3, type=float, action='append', metavar=('LOW', 'HIGH', 'CAPITAL'), help="Zone (repeatable)")
+    parser.add_argument('--rsi-limit', type=int, nargs='+', default=[backtest.DEFAULT_SETTINGS['rsi_limit']])
+    parser.add_argument('--tp', type=float, nargs='+', default=[backtest.DEFAULT_SETTINGS['tp_usdt']])
+    parser.add_argument('--grid-step', type=float, nargs='+', default=[backtest.DEFAULT_SETTINGS['grid_step_usdt']])
+    parser.add_argument('--cooldown', type=int, nargs='+', default=[backtest.DEFAULT_SETTINGS['trade_cooldown']])
+    parser.add_argument('--trade-size', type=float, nargs='+', default=[backtest.DEFAULT_SETTINGS['trade_size_usdt']])
+    parser.add_argument('--random', type=int, help="Sample this many combinations instead of the full grid")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--train-days', type=int, help="Walk-forward train window")
+    parser.add_argument('--test-days', type=int, help="Walk-forward test window (also the step)")
+    parser.add_argument('--rank-by', choices=list(RANKINGS), default='net_pnl')
+    parser.add_argument('--workers', type=int, help="Processes (default: all cores)")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--fee-rate', type=float, default=backtest.FEE_RATE)
+    parser.add_argument('--step-size', type=float, default=backtest.STEP_SIZE)
+    parser.add_argument('--max-qty', type=float, default=backtest.MAX_TRADE_QTY)
+    parser.add_argument('--export', help="Write the top candidates as bot_settings rows (JSON)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    zones = []
+    if args.zones:
+        with open(args.zones, encoding='utf-8') as f:
+            zones = json.load(f)
+    for n, (low, high, capital) in enumerate(args.zone or [], 1):
+        zones.append({'zone_name': f"Zone {n}", 'price_low': low, 'price_high': high, 'capital_allocated': capital})
+    if not zones:
+        print("❌ No zones: use --zones or --zone LOW HIGH CAPITAL")
+        return
+
+    if args.csv:
+        bars = backtest.load_klines_csv(args.csv)
+    elif args.store:
+        bars = backtest.store_klines(args.symbol, args.start, args.end)
+    else:
+        bars = backtest.fetch_klines(args.symbol, args.start, args.end)
+    if len(bars.close) == 0:
+        print("❌ No candles for this range (run `python market_store.py sync` first for --store)")
+        return
+    log(f"Loaded {len(bars.close):,} 1m bars")
+
+    grid = {PARAMS[flag]: values for flag, values in (
+        ('rsi_limit', args.rsi_limit), ('tp', args.tp), ('grid_step', args.grid_step),
+        ('cooldown', args.cooldown), ('trade_size', args.trade_size))}
+    ranking, walk_forward = optimize(
+        bars, zones, grid, args.random, args.train_days, args.test_days, args.rank_by, args.workers,
+        args.symbol, args.step_size, args.max_qty, args.fee_rate, args.seed
+    )
+
+    if walk_forward:
+        wf = pd.DataFrame(walk_forward)
+        print("\n🔁 Walk-forward (best on train -> result on the following test window)")
+        print(wf.to_string(index=False, float_format=lambda x: f"{x:,.2f}"))
+        print(f"   Out-of-sample net PnL: ${wf['test_net_pnl'].sum():,.2f} over {len(wf)} windows")
+
+    top = ranking[:args.top]
+    table = pd.DataFrame([{**s, **{k: r[k] for k in ('net_pnl', 'max_drawdown_usdt', 'fee_ratio', 'closed_trades', 'open_trades')}} for s, r in top])
+    print(f"\n🏆 Top {len(top)} by {args.rank_by}" + (" (most recent train window)" if walk_forward else ""))
+    print(table.to_string(index=False, float_format=lambda x: f"{x:,.2f}"))
+    if top:
+        print(f"\nApply the best one:\n{settings_sql(top[0][0])}")
+
+    if args.export:
+        with open(args.export, 'w', encoding='utf-8') as f:
+            json.dump([
+                {'rank': n, 'bot_settings': settings_row(s), 'metrics': {k: r[k] for k in ('net_pnl', 'max_drawdown_usdt', 'max_drawdown_pct', 'fee_ratio', 'closed_trades')}}
+                for n, (s, r) in enumerate(top, 1)
+            ], f, indent=2)
+        print(f"Exported {len(top)} candidates to {args.export}")
+
+
+if __name__ == "__main__":
+    main()
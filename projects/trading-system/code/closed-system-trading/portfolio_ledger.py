@@ -0,0 +1,314 @@
+"""
+Portfolio Ledger
+================
+Running portfolio totals of one symbol, kept in memory and updated in place
+instead of recomputed from the trade tables for every snapshot.
+
+- Fills (record_buy / record_sell): realized PnL, fees and the open position
+  (count, quantity, cost).
+- Price ticks (market feed trades, the loop's price): equity, peak equity,
+  current and max drawdown. The max drawdown is over every tick seen, not
+  only over the hourly snapshots.
+- Checkpoint: one row per symbol and mode in `portfolio_state`
+  (add_portfolio_state_table.sql), written at most every CHECKPOINT_INTERVAL
+  when something changed, so the peak and max drawdown survive restarts.
+- load() seeds the totals from snapshot_stats() (one round trip, exact once
+  the trade journal is flushed) and the peak / max drawdown from the
+  checkpoint. The totals are resynced the same way every RESYNC_INTERVAL,
+  and as soon as the open trade count drifts from the position book
+  (e.g. a trade closed by hand in the dashboard).
+
+A snapshot is then one insert of snapshot_row(), at any frequency.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+
+from snapshot_manager import fetch_snapshot_stats, fetch_snapshot_stats_client_side
+
+STATE_TABLE = "portfolio_state"
+CHECKPOINT_INTERVAL = 60  # Seconds between checkpoints (only written when something changed)
+RESYNC_INTERVAL = 3600    # Seconds between resyncs of the totals (and baseline) from snapshot_stats()
+JOURNAL_WAIT = 10         # Seconds load() waits for pending journal entries to reach Supabase
+
+
+def log(message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] [LEDGER] {message}")
+
+
+class PortfolioLedger:
+    """Totals, peak equity and drawdown of one symbol in one mode (PAPER or LIVE table)."""
+
+    def __init__(self, supabase_client, symbol, is_paper=True, journal=None,
+                 checkpoint_interval=CHECKPOINT_INTERVAL, resync_interval=RESYNC_INTERVAL):
+        self.supabase = supabase_client
+        self.symbol = symbol
+        self.is_paper = is_paper
+        self.mode = 'PAPER' if is_paper else 'LIVE'
+        self.table_name = "paper_trade_log" if is_paper else "trade_log"
+        self.journal = journal
+        self.checkpoint_interval = checkpoint_interval
+        self.resync_interval = resync_interval
+        self._lock = threading.RLock()
+
+        self.realized_pnl = 0.0
+        self.fees_paid = 0.0
+        self.open_count = 0
+        self.open_quantity = 0.0
+        self.open_cost = 0.0       # Sum(entry_price * quantity) of the open trades
+        self.initial_capital = 0.0
+        self.baseline_price = None
+        self.price = None
+        self.peak_equity = None
+        self.max_drawdown_pct = 0.0
+
+        self.loaded = False
+        self.dirty = False         # Changed since the last checkpoint
+        self.last_checkpoint = 0.0
+        self.last_resync = 0.0
+
+    # --- Derived ---
+
+    def equity(self, price=None):
+        """Initial capital + realized + unrealized PnL at `price` (the last tick by default)."""
+        price = self.price if price is None else price
+        unrealized = price * self.open_quantity - self.open_cost if price is not None else 0.0
+        return self.initial_capital + self.realized_pnl + unrealized
+
+    def drawdown_pct(self, equity=None):
+        equity = self.equity() if equity is None else equity
+        if not self.peak_equity or self.peak_equity <= 0:
+            return 0.0
+        return max(0.0, (self.peak_equity - equity) / self.peak_equity * 100)
+
+    def _mark(self):
+        """Peak and max drawdown at the current price (lock held)."""
+        if self.price is None:
+            return
+        equity = self.equity()
+        if self.peak_equity is None or equity > self.peak_equity:
+            self.peak_equity = equity
+            self.dirty = True
+        drawdown = self.drawdown_pct(equity)
+        if drawdown > self.max_drawdown_pct:
+            self.max_drawdown_pct = drawdown
+            self.dirty = True
+
+    # --- Updates (memory only, O(1)) ---
+
+    def on_price(self, price):
+        with self._lock:
+            self.price = float(price)
+            self._mark()
+
+    def on_trade(self, symbol, price, qty, ts=None):
+        """MarketDataFeed listener: every trade print marks the portfolio."""
+        if symbol == self.symbol:
+            self.on_price(price)
+
+    def on_quote(self, symbol, bid, ask, bid_qty=None, ask_qty=None):
+        pass
+
+    def on_open(self, trade):
+        """A BUY was logged as an OPEN trade (normalized trade of the position book)."""
+        qty = float(trade['quantity'])
+        with self._lock:
+            self.open_count += 1
+            self.open_quantity += qty
+            self.open_cost += float(trade['entry_price']) * qty
+            self.fees_paid += float(trade.get('fee_usdt') or 0.0)
+            self.dirty = True
+            self._mark()
+
+    def on_close(self, trade, update_data):
+        """`trade` (as it was open) was closed with `update_data` (pnl_usdt, total fee_usdt)."""
+        qty = float(trade['quantity'])
+        buy_fee = float(trade.get('fee_usdt') or 0.0)
+        with self._lock:
+            self.open_count -= 1
+            self.open_quantity -= qty
+            self.open_cost -= float(trade['entry_price']) * qty
+            self.realized_pnl += float(update_data.get('pnl_usdt') or 0.0)
+            self.fees_paid += float(update_data.get('fee_usdt', buy_fee) or 0.0) - buy_fee
+            if self.open_count <= 0:
+                # No rounding residue left behind once the book is flat
+                self.open_count, self.open_quantity, self.open_cost = 0, 0.0, 0.0
+            self.dirty = True
+            self._mark()
+
+    # --- Load / Resync ---
+
+    def _journal_pending(self):
+        return bool(self.journal and self.journal.pending(self.table_name))
+
+    def _wait_for_journal(self, timeout):
+        deadline = time.time() + timeout
+        while self._journal_pending() and time.time() < deadline:
+            time.sleep(0.1)
+        return not self._journal_pending()
+
+    def _fetch_stats(self):
+        return fetch_snapshot_stats(self.supabase, self.is_paper, self.symbol) or \
+            fetch_snapshot_stats_client_side(self.supabase, self.is_paper, self.symbol)
+
+    def _apply_stats(self, stats):
+        self.realized_pnl = stats['realized_pnl']
+        self.fees_paid = stats['fees_paid']
+        self.open_count = int(stats['open_trade_count'])
+        self.open_quantity = stats['open_quantity']
+        self.open_cost = stats['open_cost']
+        self.baseline_price = stats['baseline_price']
+        self.initial_capital = stats['initial_capital'] or 0.0
+        self.last_resync = time.time()
+
+    def _fetch_checkpoint(self):
+        try:
+            res = self.supabase.table(STATE_TABLE).select("*").eq("symbol", self.symbol).eq("mode", self.mode).execute()
+            return res.data[0] if res.data else None
+        except Exception as e:
+            log(f"⚠️ No checkpoint read from {STATE_TABLE} (run add_portfolio_state_table.sql?): {e}")
+            return None
+
+    def _snapshot_max_drawdown(self):
+        """Worst drawdown in the snapshot history: the starting max drawdown when there is no checkpoint yet."""
+        try:
+            res = self.supabase.table("portfolio_snapshots")\
+                .select("current_drawdown_pct")\
+                .eq("symbol", self.symbol)\
+                .order("current_drawdown_pct", desc=True)\
+                .limit(1)\
+                .execute()
+            if res.data and res.data[0]['current_drawdown_pct'] is not None:
+                return float(res.data[0]['current_drawdown_pct'])
+        except Exception as e:
+            log(f"⚠️ Error fetching snapshot drawdowns: {e}")
+        return 0.0
+
+    def load(self):
+        """Seeds the totals, peak and max drawdown. Returns self; `loaded` stays False if Supabase failed."""
+        if self.journal and not self._wait_for_journal(JOURNAL_WAIT):
+            log(f"⚠️ Journal entries still pending for {self.table_name}: totals resync once they are flushed")
+        try:
+            stats = self._fetch_stats()
+            checkpoint = self._fetch_checkpoint()
+            max_drawdown = float(checkpoint.get('max_drawdown_pct') or 0.0) if checkpoint else self._snapshot_max_drawdown()
+        except Exception as e:
+            log(f"⚠️ Ledger load failed for {self.symbol}: {e}")
+            return self
+
+        peaks = [float(p) for p in (stats['peak_equity'], checkpoint and checkpoint.get('peak_equity')) if p is not None]
+        with self._lock:
+            self._apply_stats(stats)
+            if self._journal_pending():
+                self.last_resync = 0.0  # Resync at the next checkpoint
+            self.peak_equity = max(peaks) if peaks else None
+            self.max_drawdown_pct = max(self.max_drawdown_pct, max_drawdown)
+            self._mark()
+            self.loaded = True
+        log(f"Loaded {self.symbol} ({self.mode}): realized {self.realized_pnl:.2f} | fees {self.fees_paid:.2f} | "
+            f"{self.open_count} open | peak {self.peak_equity or 0:,.2f} | max DD {self.max_drawdown_pct:.2f}%"
+            + (" (from checkpoint)" if checkpoint else ""))
+        return self
+
+    def resync(self):
+        """Replaces the totals with snapshot_stats(). Skipped while fills are still waiting in the journal."""
+        if self._journal_pending():
+            return False
+        try:
+            stats = self._fetch_stats()
+        except Exception as e:
+            log(f"⚠️ Resync failed, keeping in-memory totals: {e}")
+            self.last_resync = time.time()
+            return False
+        with self._lock:
+            if int(stats['open_trade_count']) != self.open_count or abs(stats['realized_pnl'] - self.realized_pnl) > 0.01:
+                log(f"⚠️ Drift vs DB ({self.symbol}): {self.open_count} open / realized {self.realized_pnl:.2f} in memory, "
+                    f"{int(stats['open_trade_count'])} / {stats['realized_pnl']:.2f} in DB. Adopting the DB totals.")
+            self._apply_stats(stats)
+            self.dirty = True
+            self._mark()
+        return True
+
+    # --- Checkpoint / Snapshot ---
+
+    def state_row(self):
+        with self._lock:
+            return {
+                "symbol": self.symbol,
+                "mode": self.mode,
+                "realized_pnl": self.realized_pnl,
+                "fees_paid": self.fees_paid,
+                "open_trade_count": self.open_count,
+                "open_quantity": self.open_quantity,
+                "open_cost": self.open_cost,
+                "last_price": self.price,
+                "peak_equity": self.peak_equity,
+                "max_drawdown_pct": self.max_drawdown_pct,
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }
+
+    def checkpoint(self):
+        try:
+            self.supabase.table(STATE_TABLE).upsert(self.state_row(), on_conflict="symbol,mode").execute()
+        except Exception as e:
+            log(f"⚠️ Checkpoint failed: {e}")
+            return False
+        self.dirty = False
+        self.last_checkpoint = time.time()
+        return True
+
+    def maybe_checkpoint(self, book_count=None):
+        """
+        Called every loop iteration: resyncs when due or when `book_count` (open trades
+        in the position book) disagrees, then checkpoints if something changed.
+        """
+        if time.time() - self.last_resync >= self.resync_interval or (book_count is not None and book_count != self.open_count):
+            self.resync()
+        if self.dirty and time.time() - self.last_checkpoint >= self.checkpoint_interval:
+            return self.checkpoint()
+        return None
+
+    def snapshot_row(self):
+        """portfolio_snapshots row at the last price."""
+        with self._lock:
+            price = self.price
+            unrealized = price * self.open_quantity - self.open_cost
+            equity = self.equity()
+            baseline_return = 0.0
+            if self.baseline_price and self.baseline_price > 0:
+                baseline_return = (price - self.baseline_price) / self.baseline_price * 100
+            return {
+                "symbol": self.symbol,
+                "btc_price": price, # Column predates multi-symbol: price of `symbol`
+                "total_equity_usdt": equity,
+                "realized_pnl": self.realized_pnl,
+                "unrealized_pnl": unrealized,
+                "total_fees_paid": self.fees_paid,
+                "open_trade_count": self.open_count,
+                "total_position_btc": self.open_quantity,
+                "total_position_usdt": price * self.open_quantity,
+                "peak_equity": self.peak_equity,
+                "current_drawdown_pct": self.drawdown_pct(equity),
+                "max_drawdown_pct": self.max_drawdown_pct,
+                "baseline_price": self.baseline_price,
+                "baseline_return_pct": baseline_return,
+                "snapshot_time": datetime.now(timezone.utc).isoformat()
+            }
+
+    def write_snapshot(self):
+        """Inserts snapshot_row() and checkpoints. Needs a price (on_price) first. Returns the row, or None."""
+        if self.price is None:
+            log(f"⚠️ No price for {self.symbol} yet, snapshot skipped.")
+            return None
+        row = self.snapshot_row()
+        try:
+            self.supabase.table("portfolio_snapshots").insert(row).execute()
+        except Exception as e:
+            print(f"❌ Snapshot Capture Failed: {e}")
+            return None
+        self.checkpoint()
+        print(f"📸 {self.symbol} Portfolio Snapshot Captured. Equity: ${row['total_equity_usdt']:,.2f} | "
+              f"DD: {row['current_drawdown_pct']:.2f}% (max {row['max_drawdown_pct']:.2f}%)")
+        return row
@@ -0,0 +1,256 @@
+"""
+Position Book
+=============
+The bot's in-memory view of its OPEN trades, replacing the per-loop
+`select("*")` on paper_trade_log / trade_log.
+
+- Loaded once at startup, then updated in place by execute_buy / execute_sell.
+- Write-through: every open/close is written to Supabase first and applied to
+  memory only once the write succeeded, so the book never runs ahead of the DB.
+  With a TradeJournal (trade_journal.py) the write goes to the local journal
+  instead and Supabase is updated in the background; pending journal entries
+  are overlaid on every load/reconcile.
+- Periodic reconciliation reloads from the DB and reports drift (e.g. a trade
+  closed by hand in the dashboard).
+
+Numeric columns are parsed to float once on load, and the values the loop
+needs every iteration are kept as indexes: invested capital per zone, the
+sorted entry prices that occupy grid levels, and the SECURED trade IDs.
+"""
+
+import bisect
+import threading
+import time
+from datetime import datetime
+
+from trade_journal import new_client_key
+
+RECONCILE_INTERVAL = 600  # Seconds between DB reconciliations
+
+NUMERIC_FIELDS = ('entry_price', 'quantity', 'total_usdt', 'fee_usdt', 'rsi_entry')
+
+
+def log(message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] [BOOK] {message}")
+
+
+def normalize_trade(row):
+    """
+    Copy of a trade row with numeric columns parsed to float (None stays None).
+    The book keys trades by `client_key` when present (known before the row
+    reaches Supabase); the DB id is kept as `db_id`.
+    """
+    trade = dict(row)
+    for field in NUMERIC_FIELDS:
+        if trade.get(field) is not None:
+            trade[field] = float(trade[field])
+    trade['db_id'] = row.get('id')
+    if row.get('client_key'):
+        trade['id'] = row['client_key']
+    return trade
+
+
+def is_db_id(trade_id):
+    """True for a Supabase `id` (integer), False for a client_key ('BTCUSDT-1718000000000-3f9a1c')."""
+    return isinstance(trade_id, int) or (isinstance(trade_id, str) and trade_id.isdigit())
+
+
+def trade_value(trade):
+    """Capital tied up in a trade: total_usdt if recorded, else entry * qty."""
+    value = trade.get('total_usdt') or 0.0
+    if value == 0:
+        value = trade['entry_price'] * trade['quantity']
+    return value
+
+
+class PositionBook:
+    """Open trades of one symbol (all rows of the table if `symbol` is None)."""
+
+    def __init__(self, supabase_client, table_name, symbol=None, reconcile_interval=RECONCILE_INTERVAL, journal=None):
+        self.supabase = supabase_client
+        self.table_name = table_name
+        self.symbol = symbol
+        self.journal = journal
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.RLock()
+        self._positions = {}     # id -> normalized trade dict
+        self._zone_invested = {} # zone_name -> USDT
+        self._entries = []       # sorted entry prices of all open trades
+        self.secured = set()     # IDs of trades that hit > 50% of TP
+        self.last_reconcile = 0.0
+        self.loaded = False
+        self.version = 0         # Bumped on every open/close/reload (derived indexes resync on change)
+
+    # --- Indexes ---
+
+    def _index_add(self, trade):
+        zone = trade.get('zone_name')
+        self._zone_invested[zone] = self._zone_invested.get(zone, 0.0) + trade_value(trade)
+        bisect.insort(self._entries, trade['entry_price'])
+
+    def _index_remove(self, trade):
+        zone = trade.get('zone_name')
+        remaining = self._zone_invested.get(zone, 0.0) - trade_value(trade)
+        if abs(remaining) < 1e-9:
+            self._zone_invested.pop(zone, None)
+        else:
+            self._zone_invested[zone] = remaining
+        i = bisect.bisect_left(self._entries, trade['entry_price'])
+        if i < len(self._entries) and self._entries[i] == trade['entry_price']:
+            self._entries.pop(i)
+
+    def _replace_all(self, trades):
+        self._positions = {}
+        self._zone_invested = {}
+        self._entries = []
+        for trade in trades:
+            self._positions[trade['id']] = trade
+            self._index_add(trade)
+        self.secured &= set(self._positions)
+        self.version += 1
+
+    # --- Reads (memory only) ---
+
+    def open_trades(self):
+        with self._lock:
+            return list(self._positions.values())
+
+    def get(self, trade_id):
+        with self._lock:
+            return self._positions.get(trade_id)
+
+    def count(self):
+        return len(self._positions)
+
+    def zone_invested(self, zone_name):
+        with self._lock:
+            return self._zone_invested.get(zone_name, 0.0)
+
+    def entry_prices(self):
+        """Sorted entry prices of open trades (the occupied grid levels)."""
+        with self._lock:
+            return list(self._entries)
+
+    def entries_near(self, price, tolerance):
+        """True if an open trade's entry lies strictly within `tolerance` of `price` (O(log n))."""
+        with self._lock:
+            i = bisect.bisect_right(self._entries, price - tolerance)
+            return i < len(self._entries) and self._entries[i] < price + tolerance
+
+    # --- Load / Reconcile ---
+
+    def _fetch_open(self):
+        """Open trades from Supabase, with fills still waiting in the journal applied on top."""
+        query = self.supabase.table(self.table_name).select("*").eq("status", "OPEN")
+        if self.symbol:
+            query = query.eq("symbol", self.symbol)
+        if not self.journal:
+            return list(map(normalize_trade, query.execute().data or []))
+
+        # A flush between the two reads would hide an OPEN from both, or leave a flushed
+        # CLOSE's trade OPEN: no flush until both are taken. Both sides key trades by client_key.
+        with self.journal.barrier():
+            rows = query.execute().data or []
+            pending = self.journal.pending(self.table_name)
+        trades = {t['id']: t for t in map(normalize_trade, rows)}
+        for op, key, payload in pending:
+            if op == 'OPEN' and (not self.symbol or payload.get('symbol') == self.symbol):
+                trades.setdefault(key, normalize_trade(payload))
+            elif op == 'CLOSE':
+                trades.pop(key, None)
+        return list(trades.values())
+
+    def load(self):
+        trades = self._fetch_open()
+        with self._lock:
+            self._replace_all(trades)
+            self.loaded = True
+            self.last_reconcile = time.time()
+        log(f"Loaded {len(trades)} open trades from {self.table_name}" + (f" ({self.symbol})" if self.symbol else ""))
+        return self
+
+    def reconcile(self):
+        """Reloads from the DB, logs any drift and adopts the DB state."""
+        try:
+            trades = self._fetch_open()
+        except Exception as e:
+            log(f"⚠️ Reconcile failed, keeping in-memory book: {e}")
+            self.last_reconcile = time.time()
+            return False
+
+        with self._lock:
+            db_ids = {t['id'] for t in trades}
+            mem_ids = set(self._positions)
+            missing, extra = db_ids - mem_ids, mem_ids - db_ids
+            if missing or extra:
+                log(f"⚠️ Drift vs DB{f' ({self.symbol})' if self.symbol else ''}: +{len(missing)} open in DB only {sorted(map(str, missing))[:5]} | -{len(extra)} in memory only {sorted(map(str, extra))[:5]}")
+            self._replace_all(trades)
+            self.last_reconcile = time.time()
+        return not (missing or extra)
+
+    def maybe_reconcile(self):
+        if time.time() - self.last_reconcile >= self.reconcile_interval:
+            return self.reconcile()
+        return None
+
+    # --- Write-through ---
+
+    def open(self, data):
+        """
+        Records an OPEN trade and adds it to the book.
+        With a journal: appended locally (microseconds), flushed to Supabase in the background.
+        Without: inserted into Supabase first.
+        """
+        if self.symbol:
+            data = dict(data, symbol=self.symbol)
+        if self.journal:
+            data = dict(data, client_key=new_client_key(self.symbol))
+            self.journal.append('OPEN', self.table_name, data['client_key'], data)
+            row = data
+        else:
+            response = self.supabase.table(self.table_name).insert(data).execute()
+            row = response.data[0] if response.data else dict(data)
+        trade = normalize_trade(row)
+        with self._lock:
+            if trade.get('id') is not None:
+                self._positions[trade['id']] = trade
+                self._index_add(trade)
+                self.version += 1
+        return trade
+
+    def close(self, trade_id, update_data, on_flushed=None):
+        """
+        Writes the close (journal, or Supabase directly), then removes the trade from the book.
+        `on_flushed(row)` runs once the close is in Supabase, with the updated row.
+        """
+        trade = self.get(trade_id)
+        if trade:
+            client_key = trade.get('client_key')
+        else:
+            # Not in the book (closed by a reconcile, another process): the book's id is the client_key when it is not a DB id
+            client_key = None if is_db_id(trade_id) else trade_id
+        if self.journal and client_key:
+            self.journal.append('CLOSE', self.table_name, client_key, update_data, on_flushed)
+        else:
+            # No journal, or a trade from before client_key existed
+            query = self.supabase.table(self.table_name).update(update_data)
+            if client_key:
+                query = query.eq("client_key", client_key)
+            else:
+                query = query.eq("id", trade['db_id'] if trade else int(trade_id))
+            response = query.execute()
+            if on_flushed:
+                on_flushed(response.data[0] if response.data else None)
+        with self._lock:
+            trade = self._positions.pop(trade_id, None)
+            if trade is not None:
+                self._index_remove(trade)
+                self.version += 1
+            self.secured.discard(trade_id)
+        return trade
+
+    def mark_secured(self, trade_id):
+        with self._lock:
+            if trade_id in self._positions:
+                self.secured.add(trade_id)
@@ -0,0 +1,269 @@
+"""
+Read Model
+==========
+The bot's hot in-memory state served to every other process on the machine
+over a local HTTP endpoint (http://127.0.0.1:9109), so the dashboard and the
+check scripts read what the bot already holds instead of opening their own
+Binance / Supabase clients and querying the same tables again.
+
+Topics (GET /<topic>?symbol=BTCUSDT, JSON):
+  - price: last trade price (market feed ticks, or the loop's price)
+  - zones / settings: the bot's current config snapshot (config_cache.py)
+  - positions: open trades in the position book
+  - ledger: the portfolio ledger's snapshot row at the last price
+  - trades: the last RECENT_TRADES opened or closed trades
+GET /state?symbol= returns every topic in one response.
+
+The bot registers a provider per topic (provide()) and publishes a change
+(publish() / observe()); reads call the provider, so they are never staler
+than the bot itself. Every change bumps one version counter:
+
+    GET /subscribe?topics=trades,positions&since=<version>&timeout=25
+
+blocks until one of the topics changed after `since` (long poll) and
+returns {"version": ..., "changed": [...]}, instead of polling on a timer.
+Price changes are published at most every PRICE_PUBLISH_INTERVAL per symbol.
+
+ReadModelClient is the consumer side: keep-alive connections, and None
+whenever the bot is not running, so callers fall back to their own clients.
+"""
+
+import http.client
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+READ_MODEL_ADDR = '127.0.0.1'
+READ_MODEL_PORT = 9109
+TOPICS = ('price', 'zones', 'settings', 'positions', 'ledger', 'trades')
+RECENT_TRADES = 20
+PRICE_PUBLISH_INTERVAL = 0.5  # Seconds between price change notifications per symbol
+SUBSCRIBE_TIMEOUT = 25        # Default long-poll wait (seconds)
+MAX_SUBSCRIBE_TIMEOUT = 60
+CLIENT_TIMEOUT = 2.0          # Seconds for a read; a subscribe waits its own timeout on top
+CLIENT_RETRY_AFTER = 5.0      # Seconds a client skips the service after a failed connection
+
+
+def log(message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] [READMODEL] {message}")
+
+
+class ReadModel:
+    """Topic providers, recent trades and the change version (see module docstring)."""
+
+    def __init__(self, recent_trades=RECENT_TRADES, price_interval=PRICE_PUBLISH_INTERVAL, clock=time.monotonic):
+        self.recent_trades = recent_trades
+        self.price_interval = price_interval
+        self.clock = clock
+        self.symbols = set()     # Symbols the bot trades; other symbols read as None
+        self.version = 0
+        self.versions = dict.fromkeys(TOPICS, 0)  # Version of each topic's last change
+        self._providers = {}     # topic -> fn(symbol)
+        self._prices = {}        # symbol -> last price
+        self._price_published = {}  # symbol -> clock() of the last price notification
+        self._trades = {}        # symbol -> OrderedDict(trade id -> row), oldest first
+        self._tokens = {}        # (topic, symbol) -> last observe() token
+        self._changed = threading.Condition()
+
+    # --- Bot side ---
+
+    def provide(self, topic, fn):
+        """Serves `topic` from fn(symbol) (called on every read)."""
+        self._providers[topic] = fn
+
+    def publish(self, *topics):
+        with self._changed:
+            self.version += 1
+            for topic in topics:
+                self.versions[topic] = self.version
+            self._changed.notify_all()
+
+    def observe(self, topic, symbol, token):
+        """Publishes `topic` when `token` (e.g. a version) differs from the last one seen for `symbol`."""
+        if self._tokens.get((topic, symbol)) != token:
+            self._tokens[(topic, symbol)] = token
+            self.publish(topic)
+
+    def on_trade(self, symbol, price, qty=None, ts=None):
+        """Market feed listener (and the loop's price): keeps the last price."""
+        self._prices[symbol] = price
+        now = self.clock()
+        if now - self._price_published.get(symbol, float('-inf')) >= self.price_interval:
+            self._price_published[symbol] = now
+            self.publish('price')
+
+    def on_quote(self, symbol, bid, ask, bid_qty=None, ask_qty=None):
+        pass
+
+    def on_config(self, config):
+        """ConfigCache listener: a new settings / zones snapshot."""
+        self.publish('settings', 'zones')
+
+    def seed_trades(self, symbol, rows):
+        """Recent trades of `symbol` at startup, oldest first."""
+        with self._changed:
+            self._trades[symbol] = OrderedDict((row['id'], dict(row)) for row in rows[-self.recent_trades:])
+
+    def on_fill(self, symbol, trade):
+        """An opened or closed trade: recent trades, positions and ledger changed."""
+        with self._changed:
+            trades = self._trades.setdefault(symbol, OrderedDict())
+            trades.pop(trade['id'], None)
+            trades[trade['id']] = dict(trade)
+            while len(trades) > self.recent_trades:
+                trades.popitem(last=False)
+        self.publish('trades', 'positions', 'ledger')
+
+    # --- Reads ---
+
+    def read(self, topic, symbol):
+        if topic not in TOPICS:
+            raise KeyError(topic)
+        if symbol not in self.symbols:
+            return None
+        if topic == 'price' and symbol in self._prices:
+            return self._prices[symbol]
+        if topic == 'trades':
+            with self._changed:
+                return list(reversed(self._trades.get(symbol, {}).values()))  # Newest first
+        provider = self._providers.get(topic)
+        return provider(symbol) if provider else None
+
+    def state(self, symbol):
+        return {topic: self.read(topic, symbol) for topic in TOPICS}
+
+    def wait(self, since, topics=TOPICS, timeout=SUBSCRIBE_TIMEOUT):
+        """Blocks until one of `topics` changed after version `since` (or `timeout`). Returns (version, changed topics)."""
+        def changed():
+            return [t for t in topics if self.versions.get(t, 0) > since]
+        with self._changed:
+            if since > self.version:
+                return self.version, list(topics)  # Bot restarted: everything may have changed
+            self._changed.wait_for(changed, timeout)
+            return self.version, changed()
+
+
+# --- Endpoint ---
+
+class ReadModelHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive: a read is one round trip on an open connection
+    disable_nagle_algorithm = True  # Headers and body go out as two writes: without this, + 40 ms delayed ACK
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = url.path.strip('/')
+        model = self.server.model
+        symbol = params.get('symbol', '').upper()
+        try:
+            if path == 'subscribe':
+                topics = [t for t in params.get('topics', ','.join(TOPICS)).split(',') if t]
+                timeout = min(float(params.get('timeout', SUBSCRIBE_TIMEOUT)), MAX_SUBSCRIBE_TIMEOUT)
+                version, changed = model.wait(int(params.get('since', 0)), topics, timeout)
+                body = {'version': version, 'changed': changed}
+            elif path == 'state':
+                body = {'version': model.version, 'data': model.state(symbol)}
+            elif path in TOPICS:
+                body = {'version': model.version, 'data': model.read(path, symbol)}
+            else:
+                self.send_error(404)
+                return
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        except Exception as e:
+            log(f"⚠️ {self.path} failed: {e}")
+            self.send_error(500)
+            return
+        payload = json.dumps(body, default=str).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # Every dashboard rerun reads here
+
+
+_server = None
+
+
+def start_server(model, port=READ_MODEL_PORT, addr=READ_MODEL_ADDR):
+    """Serves `model` from a daemon thread (once per process). Returns the server, or None if the port is taken."""
+    global _server
+    if _server:
+        return _server
+    try:
+        _server = ThreadingHTTPServer((addr, port), ReadModelHandler)
+    except OSError as e:
+        log(f"⚠️ Read model not started on {addr}:{port}: {e}")
+        return None
+    _server.daemon_threads = True
+    _server.model = model
+    threading.Thread(target=_server.serve_forever, name="read-model", daemon=True).start()
+    log(f"Serving http://{addr}:{port}/state")
+    return _server
+
+
+# --- Consumer side ---
+
+class ReadModelClient:
+    """
+    Reads from a running bot's read model. Every call returns None when the
+    service is unreachable; the client then skips it for CLIENT_RETRY_AFTER
+    seconds, so a caller without a bot falls back to its own reads at no cost.
+    """
+
+    def __init__(self, port=READ_MODEL_PORT, addr=READ_MODEL_ADDR, timeout=CLIENT_TIMEOUT, retry_after=CLIENT_RETRY_AFTER):
+        self.addr = addr
+        self.port = port
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._down_until = 0.0
+        self._local = threading.local()  # One keep-alive connection per thread
+
+    def _request(self, path, timeout=None):
+        if time.monotonic() < self._down_until:
+            return None
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.addr, self.port, timeout=self.timeout)
+        try:
+            conn.timeout = timeout or self.timeout
+            if conn.sock:
+                conn.sock.settimeout(conn.timeout)
+            conn.request('GET', path)
+            response = conn.getresponse()
+            body = response.read()
+            if response.status != 200:
+                return None
+            return json.loads(body)
+        except (OSError, http.client.HTTPException, ValueError):
+            conn.close()
+            self._local.conn = None
+            self._down_until = time.monotonic() + self.retry_after
+            return None
+
+    def get(self, topic, symbol):
+        """`topic` of `symbol` (None if the service or the value is missing)."""
+        response = self._request(f"/{topic}?symbol={symbol}")
+        return response['data'] if response else None
+
+    def state(self, symbol):
+        """{topic: value} of `symbol`, or None."""
+        return self.get('state', symbol)
+
+    def price(self, symbol):
+        price = self.get('price', symbol)
+        return float(price) if price is not None else None
+
+    def subscribe(self, topics=TOPICS, since=0, timeout=SUBSCRIBE_TIMEOUT):
+        """Waits until one of `topics` changed after version `since`: {"version", "changed"}, or None."""
+        return self._request(f"/subscribe?topics={','.join(topics)}&since={since}&timeout={timeout}",
+                             timeout=timeout + self.timeout)
@@ -0,0 +1,221 @@
+"""
+Replay Server (Offline Binance Stream Stand-in)
+===============================================
+A local WebSocket server that speaks the Binance combined-stream format
+(`{"stream": ..., "data": ...}`) so MarketDataFeed can be exercised without
+network access.
+
+Sources:
+  - A recorded JSONL file (one combined-stream message per line).
+  - A synthetic random walk (default) producing trade, bookTicker and
+    kline events for every interval requested in the connection URL.
+
+Usage:
+  python replay_server.py                         # synthetic, ws://localhost:8765
+  python replay_server.py --file feed.jsonl       # replay a recording
+  python replay_server.py --drop-after 500        # cut each client after 500 msgs (reconnect testing)
+  python replay_server.py record --seconds 600 --out feed.jsonl   # record live Binance stream
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import websockets
+
+from market_feed import BINANCE_WS_URL, INTERVAL_MS
+
+DEFAULT_PORT = 8765
+
+
+def synthetic_messages(symbol, intervals, start_price=90000.0, volatility=0.0005, start_time_ms=None):
+    """Endless generator of combined-stream messages for a random-walk market."""
+    s = symbol.lower()
+    price = start_price
+    now_ms = start_time_ms or int(time.time() * 1000)
+    candles = {}
+    trade_id = 0
+
+    while True:
+        price = max(1.0, price * (1 + random.gauss(0, volatility)))
+        qty = round(random.uniform(0.0001, 0.05), 5)
+        now_ms += random.randint(50, 500)
+        trade_id += 1
+
+        yield {"stream": f"{s}@trade", "data": {
+            "e": "trade", "E": now_ms, "s": symbol, "t": trade_id,
+            "p": f"{price:.2f}", "q": f"{qty}", "T": now_ms, "m": random.random() < 0.5,
+        }}
+        yield {"stream": f"{s}@bookTicker", "data": {
+            "u": trade_id, "s": symbol,
+            "b": f"{price - 0.01:.2f}", "B": "1.0", "a": f"{price + 0.01:.2f}", "A": "1.0",
+        }}
+
+        for interval in intervals:
+            step = INTERVAL_MS[interval]
+            open_time = now_ms - now_ms % step
+            c = candles.get(interval)
+            if c is None or c['t'] != open_time:
+                c = {"t": open_time, "T": open_time + step - 1, "i": interval,
+                     "o": price, "h": price, "l": price, "c": price, "v": 0.0}
+                candles[interval] = c
+            c['h'] = max(c['h'], price)
+            c['l'] = min(c['l'], price)
+            c['c'] = price
+            c['v'] += qty
+            closed = now_ms >= c['T']
+            yield {"stream": f"{s}@kline_{interval}", "data": {
+                "e": "kline", "E": now_ms, "s": symbol,
+                "k": {"t": c['t'], "T": c['T'], "s": symbol, "i": interval,
+                      "o": f"{c['o']:.2f}", "c": f"{c['c']:.2f}", "h": f"{c['h']:.2f}", "l": f"{c['l']:.2f}",
+                      "v": f"{c['v']:.5f}", "x": closed},
+            }}
+
+
+def file_messages(path, loop_forever=True):
+    """Replays a recorded JSONL file, optionally looping."""
+    while True:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        if not loop_forever:
+            return
+
+
+def _requested_streams(path):
+    query = parse_qs(urlparse(path or '').query)
+    streams = query.get('streams', [''])[0]
+    return [x for x in streams.split('/') if x]
+
+
+class ReplayServer:
+    """Serves a message source to every client that connects."""
+
+    def __init__(self, host='localhost', port=DEFAULT_PORT, file=None, rate=200, drop_after=None, start_price=90000.0):
+        self.host = host
+        self.port = port
+        self.file = file
+        self.rate = rate  # Messages per second per client
+        self.drop_after = drop_after
+        self.start_price = start_price
+        self.connections = 0
+        self._thread = None
+        self._loop = None
+        self._server = None
+        self._started = threading.Event()
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, ws, path=None):
+        request = getattr(ws, 'request', None)
+        path = request.path if request is not None else path
+        streams = _requested_streams(path)
+        self.connections += 1
+
+        if self.file:
+            source = file_messages(self.file)
+        else:
+            symbols = list(dict.fromkeys(x.split('@')[0].upper() for x in streams)) or ['BTCUSDT']
+            intervals = list(dict.fromkeys(x.split('@kline_')[1] for x in streams if '@kline_' in x)) or ['1m']
+            sources = [synthetic_messages(sym, intervals, start_price=self.start_price) for sym in symbols]
+            # Several symbols: round-robin their messages on the one connection
+            source = (msg for batch in zip(*sources) for msg in batch)
+
+        wanted = set(streams)
+        delay = 1.0 / self.rate if self.rate else 0
+        sent = 0
+        try:
+            for msg in source:
+                if wanted and msg.get('stream') not in wanted:
+                    continue
+                await ws.send(json.dumps(msg))
+                sent += 1
+                if self.drop_after and sent >= self.drop_after:
+                    await ws.close()
+                    return
+                await asyncio.sleep(delay)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _serve(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        self._started.set()
+        await self._server.wait_closed()
+
+    def start(self):
+        """Runs the server in a background thread (for scripts and checks)."""
+        def _run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._serve())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=_run, name="replay-server", daemon=True)
+        self._thread.start()
+        self._started.wait(5)
+        return self
+
+    def stop(self):
+        if self._loop and self._server:
+            self._loop.call_soon_threadsafe(self._server.close)
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def serve_forever(self):
+        asyncio.run(self._serve())
+
+
+async def record_stream(symbol, intervals, seconds, out_path, ws_url=BINANCE_WS_URL):
+    """Records the live combined stream to a JSONL file for later replay."""
+    s = symbol.lower()
+    streams = [f"{s}@trade", f"{s}@bookTicker"] + [f"{s}@kline_{i}" for i in intervals]
+    url = f"{ws_url}/stream?streams={'/'.join(streams)}"
+    deadline = time.time() + seconds
+    count = 0
+    with open(out_path, 'w', encoding='utf-8') as f:
+        async with websockets.connect(url) as ws:
+            while time.time() < deadline:
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=max(0.1, deadline - time.time()))
+                except asyncio.TimeoutError:
+                    break
+                f.write(raw.strip() + "\n")
+                count += 1
+    print(f"📼 Recorded {count} messages to {out_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Binance stream replay server")
+    sub = parser.add_subparsers(dest="command")
+
+    rec = sub.add_parser("record", help="Record the live stream to JSONL")
+    rec.add_argument("--symbol", default="BTCUSDT")
+    rec.add_argument("--intervals", default="1h,5m")
+    rec.add_argument("--seconds", type=int, default=300)
+    rec.add_argument("--out", default="feed.jsonl")
+
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--file", help="JSONL recording to replay (default: synthetic)")
+    parser.add_argument("--rate", type=float, default=200, help="Messages per second")
+    parser.add_argument("--drop-after", type=int, help="Close each connection after N messages")
+    parser.add_argument("--start-price", type=float, default=90000.0)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        asyncio.run(record_stream(args.symbol, args.intervals.split(','), args.seconds, args.out))
+    else:
+        server = ReplayServer(args.host, args.port, file=args.file, rate=args.rate,
+                              drop_after=args.drop_after, start_price=args.start_price)
+        print(f"🔁 Replay server listening on {server.url} ({'file: ' + args.file if args.file else 'synthetic'})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n🛑 Replay server stopped.")
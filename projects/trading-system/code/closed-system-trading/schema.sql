@@ -12,6 +12,7 @@ create table if not exists portfolio_summary (
 create table if not exists zones_config (
   id bigint generated by default as identity primary key,
   zone_number int,                 -- 'Zone'
+  symbol text not null default 'BTCUSDT', -- Trading pair this zone belongs to
   zone_name text not null,         -- 'Zone Name' (e.g., Zone 1, 88-90k)
   price_low numeric not null,      -- 'Price Low'
   price_high numeric not null,     -- 'Price High'
@@ -27,10 +28,13 @@ create table if not exists trade_log (
   id bigint generated by default as identity primary key,
   created_at timestamp with time zone default timezone('utc'::text, now()) not null, -- 'Date' + 'Time'
   order_type text check (order_type in ('BUY', 'SELL')) not null, -- 'Type'
+  symbol text not null default 'BTCUSDT', -- Trading pair
+  client_key text unique,          -- Idempotency key set by the bot (trade_journal.py)
   zone_name text,                  -- 'Zone' associated with the trade
   entry_price numeric not null,    -- 'Entry Price'
   quantity numeric not null,       -- 'Qty (BTC)'
   total_usdt numeric generated always as (entry_price * quantity) stored, -- 'Total (USDT)', or manual insert
+  fee_usdt numeric,                -- Actual commissions in USDT (buy, then buy + sell once closed)
   tp_price numeric,                -- 'TP Price'
   exit_price numeric,              -- 'Exit Price'
   exit_at timestamp with time zone, -- 'Exit Date'
@@ -38,7 +42,8 @@ create table if not exists trade_log (
   pnl_percent numeric,             -- 'P/L %'
   status text check (status in ('OPEN', 'CLOSED', 'PENDING')) default 'OPEN', -- 'Status'
   notes text,                      -- 'Notes'
-  matched_pair_id bigint references trade_log(id) -- Internal link to pair buy/sell
+  matched_pair_id bigint references trade_log(id), -- Internal link to pair buy/sell
+  updated_at timestamp with time zone default timezone('utc'::text, now()) not null -- Last change (trigger, section 13)
 );
 
 -- 4. Paper Trade Log (For Paper Trading Mode)
@@ -46,6 +51,8 @@ create table if not exists paper_trade_log (
   id bigint generated by default as identity primary key,
   created_at timestamp with time zone default timezone('utc'::text, now()) not null,
   order_type text check (order_type in ('BUY', 'SELL')) not null,
+  symbol text not null default 'BTCUSDT',
+  client_key text unique,
   zone_name text,
   entry_price numeric not null,
   quantity numeric not null,
@@ -58,7 +65,8 @@ create table if not exists paper_trade_log (
   pnl_percent numeric,
   status text check (status in ('OPEN', 'CLOSED', 'PENDING')) default 'OPEN',
   notes text,
-  matched_pair_id bigint references paper_trade_log(id)
+  matched_pair_id bigint references paper_trade_log(id),
+  updated_at timestamp with time zone default timezone('utc'::text, now()) not null
 );
 
 -- 5. Bot Settings (Required for Dashboard & Bot)
@@ -122,3 +130,185 @@ create table if not exists portfolio_snapshots (
 
 -- Index for faster time-series queries
 create index if not exists idx_snapshots_time on portfolio_snapshots(snapshot_time desc);
+create index if not exists idx_snapshots_symbol_time on portfolio_snapshots(symbol, snapshot_time desc);
+
+-- Per-symbol lookups (position book, snapshots). Existing DBs: run add_symbol_column.sql
+create index if not exists idx_trade_log_symbol_status on trade_log(symbol, status);
+create index if not exists idx_paper_trade_log_symbol_status on paper_trade_log(symbol, status);
+create index if not exists idx_zones_config_symbol_status on zones_config(symbol, status);
+
+-- Snapshot aggregates (snapshot_stats() below): index-only sums, peak equity as an index lookup
+create index if not exists idx_trade_log_snapshot_stats on trade_log(symbol, status) include (pnl_usdt, fee_usdt, quantity, entry_price);
+create index if not exists idx_paper_trade_log_snapshot_stats on paper_trade_log(symbol, status) include (pnl_usdt, fee_usdt, quantity, entry_price);
+create index if not exists idx_snapshots_symbol_equity on portfolio_snapshots(symbol, total_equity_usdt desc);
+-- Chart rollups (snapshot_series() below): range scans without touching the table
+create index if not exists idx_snapshots_series on portfolio_snapshots(symbol, snapshot_time) include (total_equity_usdt, current_drawdown_pct, max_drawdown_pct, btc_price);
+-- Delta sync (delta_sync.py): rows changed since a watermark
+create index if not exists idx_trade_log_symbol_updated on trade_log(symbol, updated_at);
+create index if not exists idx_paper_trade_log_symbol_updated on paper_trade_log(symbol, updated_at);
+
+-- Dashboard aggregates (zone_stats() / daily_pnl() below): index-only scans
+create index if not exists idx_trade_log_zone_stats on trade_log(symbol, zone_name) include (status, total_usdt, pnl_usdt, fee_usdt);
+create index if not exists idx_paper_trade_log_zone_stats on paper_trade_log(symbol, zone_name) include (status, total_usdt, pnl_usdt, fee_usdt);
+create index if not exists idx_trade_log_daily_pnl on trade_log(symbol, exit_at) include (pnl_usdt, fee_usdt) where status = 'CLOSED';
+create index if not exists idx_paper_trade_log_daily_pnl on paper_trade_log(symbol, exit_at) include (pnl_usdt, fee_usdt) where status = 'CLOSED';
+
+-- 8. Realtime for config tables (bot reloads settings/zones on change, see config_cache.py)
+-- Run once; ignore "already member of publication" errors on re-run.
+alter publication supabase_realtime add table bot_settings;
+alter publication supabase_realtime add table zones_config;
+
+-- 9. Snapshot aggregates in one round trip (snapshot_manager.fetch_snapshot_stats)
+-- Sums run in Postgres: one row back however long the history, no API row limit.
+-- Existing DBs: run add_snapshot_stats_function.sql
+create or replace function snapshot_stats(p_symbol text, p_paper boolean default true)
+returns table (
+  realized_pnl numeric,
+  fees_paid numeric,
+  open_trade_count bigint,
+  open_quantity numeric,
+  open_cost numeric,
+  peak_equity numeric,
+  baseline_price numeric,
+  initial_capital numeric
+)
+language plpgsql stable as $$
+begin
+  return query execute format($q$
+    select
+      coalesce(sum(t.pnl_usdt) filter (where t.status = 'CLOSED'), 0),
+      coalesce(sum(t.fee_usdt), 0),
+      count(*) filter (where t.status = 'OPEN'),
+      coalesce(sum(t.quantity) filter (where t.status = 'OPEN'), 0),
+      coalesce(sum(t.entry_price * t.quantity) filter (where t.status = 'OPEN'), 0),
+      (select max(s.total_equity_usdt) from portfolio_snapshots s where s.symbol = $1),
+      (select b.baseline_price from baseline_prices b where b.symbol = $1),
+      (select b.initial_capital from baseline_prices b where b.symbol = $1)
+    from %I t
+    where t.symbol = $1 and t.status in ('OPEN', 'CLOSED')
+  $q$, case when p_paper then 'paper_trade_log' else 'trade_log' end)
+  using p_symbol;
+end;
+$$;
+
+-- 10. Portfolio State (portfolio_ledger.py checkpoints)
+-- Running totals, peak equity and max drawdown per symbol and mode, upserted at most once a minute
+-- Existing DBs: run add_portfolio_state_table.sql
+create table if not exists portfolio_state (
+  id bigint generated by default as identity primary key,
+  symbol text not null,
+  mode text not null check (mode in ('PAPER', 'LIVE')),
+  realized_pnl numeric default 0,
+  fees_paid numeric default 0,
+  open_trade_count int default 0,
+  open_quantity numeric default 0,
+  open_cost numeric default 0,
+  last_price numeric,
+  peak_equity numeric,
+  max_drawdown_pct numeric default 0,       -- Worst drawdown over every price tick
+  updated_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  unique (symbol, mode)
+);
+
+-- 11. Dashboard aggregates (trade_aggregates.py): one row per zone / per day, not per trade
+-- Existing DBs: run add_trade_aggregate_functions.sql
+create or replace function zone_stats(p_symbol text, p_paper boolean default true)
+returns table (
+  zone_name text,
+  invested numeric,          -- total_usdt of OPEN trades
+  realized_pnl numeric,      -- pnl_usdt of CLOSED trades
+  open_count bigint,
+  closed_count bigint,
+  fees_paid numeric
+)
+language plpgsql stable as $$
+begin
+  return query execute format($q$
+    select
+      t.zone_name,
+      coalesce(sum(t.total_usdt) filter (where t.status = 'OPEN'), 0),
+      coalesce(sum(t.pnl_usdt) filter (where t.status = 'CLOSED'), 0),
+      count(*) filter (where t.status = 'OPEN'),
+      count(*) filter (where t.status = 'CLOSED'),
+      coalesce(sum(t.fee_usdt), 0)
+    from %I t
+    where t.symbol = $1
+    group by t.zone_name
+  $q$, case when p_paper then 'paper_trade_log' else 'trade_log' end)
+  using p_symbol;
+end;
+$$;
+
+create or replace function daily_pnl(p_symbol text, p_paper boolean default true, p_days int default 90)
+returns table (
+  day date,                  -- UTC day of exit_at
+  realized_pnl numeric,
+  fees_paid numeric,
+  closed_count bigint
+)
+language plpgsql stable as $$
+begin
+  return query execute format($q$
+    select
+      (t.exit_at at time zone 'utc')::date,
+      coalesce(sum(t.pnl_usdt), 0),
+      coalesce(sum(t.fee_usdt), 0),
+      count(*)
+    from %I t
+    where t.symbol = $1 and t.status = 'CLOSED' and t.exit_at >= now() - make_interval(days => $2)
+    group by 1
+    order by 1
+  $q$, case when p_paper then 'paper_trade_log' else 'trade_log' end)
+  using p_symbol, p_days;
+end;
+$$;
+
+-- 12. Equity / drawdown chart rollups (snapshot_series.py): one row per time bucket
+-- Existing DBs: run add_snapshot_series_function.sql
+create or replace function snapshot_series(p_symbol text, p_from timestamptz, p_to timestamptz, p_bucket_seconds int)
+returns table (
+  bucket_time timestamptz,
+  equity_open numeric,
+  equity_high numeric,
+  equity_low numeric,
+  equity_close numeric,
+  drawdown_pct numeric,      -- worst current_drawdown_pct in the bucket
+  max_drawdown_pct numeric,  -- worst DD ever, as of the bucket
+  btc_price numeric,         -- last price in the bucket
+  samples bigint
+)
+language sql stable as $$
+  select
+    to_timestamp(floor(extract(epoch from s.snapshot_time) / greatest(p_bucket_seconds, 1)) * greatest(p_bucket_seconds, 1)) as bucket_time,
+    (array_agg(s.total_equity_usdt order by s.snapshot_time))[1],
+    max(s.total_equity_usdt),
+    min(s.total_equity_usdt),
+    (array_agg(s.total_equity_usdt order by s.snapshot_time desc))[1],
+    max(s.current_drawdown_pct),
+    max(s.max_drawdown_pct),
+    (array_agg(s.btc_price order by s.snapshot_time desc))[1],
+    count(*)
+  from portfolio_snapshots s
+  where s.symbol = p_symbol and s.snapshot_time >= p_from and s.snapshot_time < p_to
+  group by 1
+  order by 1;
+$$;
+
+-- 13. Last-change stamps for delta sync (delta_sync.py): every update moves updated_at
+-- Existing DBs: run add_updated_at_columns.sql
+create or replace function set_updated_at()
+returns trigger
+language plpgsql as $$
+begin
+  new.updated_at = now();
+  return new;
+end;
+$$;
+
+drop trigger if exists trade_log_set_updated_at on trade_log;
+create trigger trade_log_set_updated_at before update on trade_log
+  for each row execute function set_updated_at();
+
+drop trigger if exists paper_trade_log_set_updated_at on paper_trade_log;
+create trigger paper_trade_log_set_updated_at before update on paper_trade_log
+  for each row execute function set_updated_at();
@@ -0,0 +1,458 @@
+"""
+Simulated Exchange (PAPER / Backtest Matching Engine)
+=====================================================
+In-process stand-in for the Binance order endpoints, so PAPER fills look
+like live ones instead of "full quantity at the last ticker price".
+
+- MARKET orders walk the order book level by level (depth-based slippage);
+  if the book runs out the rest expires (partial fill), as on Binance.
+- LIMIT orders (GTC / IOC / FOK): the marketable part fills against the
+  book as taker, the rest rests and fills as maker when trades print
+  through its price or the opposite quote crosses it. Trades exactly at
+  the price fill only QUEUE_SHARE of their size (we are not first in line).
+- Latency: an order reaches the book `latency_ms` after it is sent.
+- Filters: LOT_SIZE, PRICE_FILTER and NOTIONAL / MIN_NOTIONAL from
+  get_symbol_info; violations are rejected with the Binance error text.
+- Responses have the Binance FULL response shape (create_order), fills are
+  also pushed to `listeners` as user-data-stream `executionReport` events.
+
+Book sources:
+  - on_book(symbol, bids, asks): real depth levels (partial depth stream or a recording).
+  - on_quote(symbol, bid, ask, bid_qty, ask_qty): bookTicker; the levels behind
+    the best ones are synthesized (DEPTH_LEVELS levels, DEPTH_SPACING_BPS apart,
+    LEVEL_NOTIONAL_USDT each) only when an order actually needs them.
+  - on_price(symbol, price): a bare price (REST ticker, backtest bar) +- half SPREAD_BPS.
+  - on_trade(symbol, price, qty): prints that fill resting orders.
+
+Clocks:
+  - realtime=True (live PAPER): create_order waits the latency, then matches
+    against the book the feed has kept current meanwhile.
+  - realtime=False (backtest / replay): time comes from the events (`ts`, ms);
+    an order is matched once an event at or after its arrival time is seen
+    (or advance(ts) is called).
+
+Run `python verify_sim_exchange.py` for the matching checks and a throughput benchmark.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import strategy
+
+DEFAULT_LATENCY_MS = 50
+SPREAD_BPS = 1.0              # Bid/ask spread assumed around a bare price
+DEPTH_LEVELS = 20             # Synthetic levels behind the best bid/ask
+DEPTH_SPACING_BPS = 0.5       # Distance between synthetic levels
+LEVEL_NOTIONAL_USDT = 25_000  # Liquidity per synthetic level
+QUEUE_SHARE = 0.5             # Share of a print at our limit price that reaches us
+MAX_ORDER_HISTORY = 10_000   # Finished orders kept for get_order()
+MAKER_FEE_RATE = strategy.FEE_RATE_BNB
+TAKER_FEE_RATE = strategy.FEE_RATE_BNB
+
+SymbolFilters = namedtuple('SymbolFilters', [
+    'step_size', 'min_qty', 'max_qty', 'tick_size', 'min_notional', 'max_notional', 'apply_min_to_market',
+])
+DEFAULT_FILTERS = SymbolFilters(0.00001, 0.00001, 9000.0, 0.01, 5.0, 9_000_000.0, True)
+
+
+def log(message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] [SIM] {message}")
+
+
+class SimOrderError(Exception):
+    """Order rejected the way Binance would reject it (same code and message)."""
+
+    def __init__(self, code, message):
+        super().__init__(f"APIError(code={code}): {message}")
+        self.code = code
+        self.message = message
+
+
+def filters_from_info(info):
+    """SymbolFilters from a get_symbol_info() response (missing filters keep DEFAULT_FILTERS values)."""
+    values = DEFAULT_FILTERS._asdict()
+    for f in (info or {}).get('filters', []):
+        kind = f.get('filterType')
+        if kind == 'LOT_SIZE':
+            values.update(step_size=float(f['stepSize']), min_qty=float(f.get('minQty', f['stepSize'])),
+                          max_qty=float(f.get('maxQty', values['max_qty'])))
+        elif kind == 'PRICE_FILTER':
+            values.update(tick_size=float(f['tickSize']))
+        elif kind == 'NOTIONAL':
+            values.update(min_notional=float(f['minNotional']), max_notional=float(f.get('maxNotional', values['max_notional'])),
+                          apply_min_to_market=bool(f.get('applyMinToMarket', True)))
+        elif kind == 'MIN_NOTIONAL':
+            values.update(min_notional=float(f['minNotional']), apply_min_to_market=bool(f.get('applyToMarket', True)))
+    return SymbolFilters(**values)
+
+
+def _off_step(value, step, base=0.0):
+    if step <= 0:
+        return False
+    n = (value - base) / step
+    return abs(n - round(n)) > 1e-6
+
+
+class _Book:
+    """Best quote plus depth levels ([price, qty], best first) for one symbol."""
+    __slots__ = ('bid', 'ask', 'bid_qty', 'ask_qty', 'bids', 'asks', 'synth')
+
+    def __init__(self):
+        self.bid = self.ask = None
+        self.bid_qty = self.ask_qty = None
+        self.bids, self.asks = [], []
+        self.synth = None  # Quote-only book: side -> [next synthetic level, best price, best qty]
+
+
+class SimExchange:
+    def __init__(self, latency_ms=DEFAULT_LATENCY_MS, realtime=True, maker_fee_rate=MAKER_FEE_RATE,
+                 taker_fee_rate=TAKER_FEE_RATE, queue_share=QUEUE_SHARE, spread_bps=SPREAD_BPS,
+                 depth_levels=DEPTH_LEVELS, depth_spacing_bps=DEPTH_SPACING_BPS, level_notional=LEVEL_NOTIONAL_USDT,
+                 client=None):
+        self.latency_ms = latency_ms
+        self.realtime = realtime
+        self.maker_fee_rate = maker_fee_rate
+        self.taker_fee_rate = taker_fee_rate
+        self.queue_share = queue_share
+        self.spread_bps = spread_bps
+        self.depth_levels = depth_levels
+        self.depth_spacing_bps = depth_spacing_bps
+        self.level_notional = level_notional
+        self.listeners = []  # callback(executionReport dict) per fill / status change
+        self.client = client  # Binance client for get_symbol_info (filters are loaded on first use)
+
+        self._lock = threading.RLock()
+        self._books = {}
+        self._filters = {}
+        self._orders = {}          # orderId -> order dict (Binance response shape, updated in place)
+        self._resting = {}         # symbol -> ([(-price, seq, id)] buys, [(price, seq, id)] sells)
+        self._inflight = []        # (arrival ms, seq, orderId), realtime=False only
+        self._seq = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+        self._now = 0              # Event time (ms), realtime=False
+        self.events = 0
+
+    # --- Setup ---
+
+    def set_filters(self, symbol, filters):
+        self._filters[symbol.upper()] = filters
+
+    def load_filters(self, client, symbol):
+        """Filters from the exchange (get_symbol_info); keeps the defaults if that fails."""
+        try:
+            self.set_filters(symbol, filters_from_info(client.get_symbol_info(symbol.upper())))
+        except Exception as e:
+            log(f"⚠️ Could not load filters for {symbol}, using defaults: {e}")
+            self.set_filters(symbol, DEFAULT_FILTERS)
+        return self._filters[symbol.upper()]
+
+    def filters(self, symbol):
+        f = self._filters.get(symbol.upper())
+        if f is None:
+            f = self.load_filters(self.client, symbol) if self.client else DEFAULT_FILTERS
+        return f
+
+    def _time(self, ts=None):
+        if ts is not None:
+            return ts
+        return int(time.time() * 1000) if self.realtime else self._now
+
+    # --- Market data ---
+
+    def _book(self, symbol):
+        book = self._books.get(symbol)
+        if book is None:
+            book = self._books[symbol] = _Book()
+        return book
+
+    def on_quote(self, symbol, bid, ask, bid_qty=None, ask_qty=None, ts=None):
+        """Best bid/ask (bookTicker). Deeper levels are synthesized on demand."""
+        with self._lock:
+            self._advance(ts)
+            book = self._book(symbol.upper())
+            book.bid, book.ask, book.bid_qty, book.ask_qty = bid, ask, bid_qty, ask_qty
+            book.bids, book.asks = [], []
+            book.synth = {'BUY': [0, ask, ask_qty], 'SELL': [0, bid, bid_qty]}
+            self.events += 1
+            if self._resting.get(symbol.upper()):
+                self._match_resting_quote(symbol.upper(), book)
+
+    def on_price(self, symbol, price, ts=None):
+        """A bare last price: quoted +- half the spread."""
+        half = price * self.spread_bps / 20_000
+        self.on_quote(symbol, price - half, price + half, ts=ts)
+
+    def on_book(self, symbol, bids, asks, ts=None):
+        """Depth levels [(price, qty), ...], best first (partial depth stream / recording)."""
+        with self._lock:
+            self._advance(ts)
+            book = self._book(symbol.upper())
+            book.bids = [[float(p), float(q)] for p, q in bids]
+            book.asks = [[float(p), float(q)] for p, q in asks]
+            book.bid, book.bid_qty = book.bids[0] if book.bids else (None, None)
+            book.ask, book.ask_qty = book.asks[0] if book.asks else (None, None)
+            book.synth = None
+            self.events += 1
+            if self._resting.get(symbol.upper()):
+                self._match_resting_quote(symbol.upper(), book)
+
+    def on_trade(self, symbol, price, qty, ts=None):
+        """A public trade print: fills resting orders it trades through."""
+        with self._lock:
+            self._advance(ts)
+            self.events += 1
+            resting = self._resting.get(symbol.upper())
+            if not resting:
+                return
+            buys, sells = resting
+            if buys and price <= -buys[0][0]:
+                self._fill_resting(buys, price, qty, lambda limit: price < limit)
+            if sells and price >= sells[0][0]:
+                self._fill_resting(sells, price, qty, lambda limit: price > limit)
+
+    def advance(self, ts):
+        """Event clock: delivers every in-flight order that has reached the exchange by `ts` (ms)."""
+        with self._lock:
+            self._advance(ts)
+
+    def replay(self, messages):
+        """Feeds combined-stream messages (replay_server.py recordings): trade, bookTicker and partial depth."""
+        for msg in messages:
+            data = msg.get('data', msg)
+            stream = msg.get('stream', '')
+            symbol = (data.get('s') or stream.split('@')[0]).upper()
+            if data.get('e') == 'trade':
+                self.on_trade(symbol, float(data['p']), float(data['q']), ts=data.get('T'))
+            elif 'bids' in data and 'asks' in data:
+                self.on_book(symbol, data['bids'], data['asks'], ts=data.get('E'))
+            elif 'b' in data and 'a' in data:
+                self.on_quote(symbol, float(data['b']), float(data['a']), float(data.get('B', 0)) or None, float(data.get('A', 0)) or None, ts=data.get('E'))
+
+    def _advance(self, ts):
+        if self.realtime or ts is None:
+            return
+        while self._inflight and self._inflight[0][0] <= ts:
+            arrival, _, order_id = heapq.heappop(self._inflight)
+            self._now = arrival
+            self._arrive(self._orders[order_id])
+        self._now = max(self._now, ts)
+
+    def _levels(self, book, side, need):
+        """
+        Depth on the side an order of `side` takes from (asks for BUY), best first.
+        On a quote-only book, synthetic levels are added until they cover `need`.
+        """
+        levels = book.asks if side == 'BUY' else book.bids
+        if book.synth is not None:
+            state = book.synth[side]
+            i, top, top_qty = state
+            available = sum(q for _, q in levels)
+            sign = 1 if side == 'BUY' else -1
+            while available < need and i < self.depth_levels and top is not None:
+                price = top * (1 + sign * i * self.depth_spacing_bps / 10_000)
+                qty = top_qty if i == 0 and top_qty else self.level_notional / price
+                levels.append([price, qty])
+                available += qty
+                i += 1
+            state[0] = i
+        return levels
+
+    # --- Orders ---
+
+    def create_order(self, symbol, side, type, quantity, price=None, timeInForce='GTC', newClientOrderId=None, ts=None, **_):
+        """
+        Binance create_order. Returns the order dict (FULL response shape); with
+        realtime=False it is updated in place once the order reaches the book.
+        """
+        symbol, side, type = symbol.upper(), side.upper(), type.upper()
+        quantity = float(quantity)
+        price = float(price) if price is not None else None
+        if self.realtime and self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        with self._lock:
+            book = self._books.get(symbol)
+            reference = price if type == 'LIMIT' else (book and (book.ask if side == 'BUY' else book.bid))
+            self._check_filters(symbol, type, quantity, price, reference)
+            now = self._time(ts)
+            order_id = next(self._seq)
+            order = {
+                'symbol': symbol,
+                'orderId': order_id,
+                'clientOrderId': newClientOrderId or f"sim_{order_id}",
+                'transactTime': now,
+                'price': f"{price or 0:.8f}",
+                'origQty': f"{quantity:.8f}",
+                'executedQty': "0.00000000",
+                'cummulativeQuoteQty': "0.00000000",
+                'status': 'NEW',
+                'timeInForce': timeInForce if type == 'LIMIT' else 'GTC',
+                'type': type,
+                'side': side,
+                'fills': [],
+            }
+            self._orders[order_id] = order
+            if len(self._orders) > MAX_ORDER_HISTORY:
+                self._prune()
+            if self.realtime or not self.latency_ms:
+                self._arrive(order)
+            else:
+                heapq.heappush(self._inflight, (now + self.latency_ms, order_id, order_id))
+            return order
+
+    def cancel_order(self, symbol, orderId, **_):
+        with self._lock:
+            order = self._orders.get(int(orderId))
+            if order is None or order['status'] in ('FILLED', 'CANCELED', 'EXPIRED', 'REJECTED'):
+                raise SimOrderError(-2011, "Unknown order sent.")
+            order['status'] = 'CANCELED'  # Resting entries are dropped lazily
+            self._report(order, 0.0, 0.0, False)
+            return order
+
+    def get_order(self, symbol, orderId, **_):
+        with self._lock:
+            order = self._orders.get(int(orderId))
+            if order is None:
+                raise SimOrderError(-2013, "Order does not exist.")
+            return order
+
+    def get_open_orders(self, symbol=None, **_):
+        with self._lock:
+            return [o for o in self._orders.values()
+                    if o['status'] in ('NEW', 'PARTIALLY_FILLED') and (symbol is None or o['symbol'] == symbol.upper())]
+
+    def _prune(self):
+        """Forgets the oldest finished orders (open and in-flight ones are kept)."""
+        finished = [i for i, o in self._orders.items() if o['status'] not in ('NEW', 'PARTIALLY_FILLED')]
+        for order_id in finished[:len(self._orders) - MAX_ORDER_HISTORY // 2]:
+            del self._orders[order_id]
+
+    def _check_filters(self, symbol, type, quantity, price, reference):
+        f = self.filters(symbol)
+        if quantity < f.min_qty - 1e-12 or quantity > f.max_qty or _off_step(quantity, f.step_size, f.min_qty):
+            raise SimOrderError(-1013, "Filter failure: LOT_SIZE")
+        if type == 'LIMIT':
+            if price is None or price <= 0 or _off_step(price, f.tick_size):
+                raise SimOrderError(-1013, "Filter failure: PRICE_FILTER")
+        if reference and (type == 'LIMIT' or f.apply_min_to_market):
+            notional = quantity * reference
+            if notional < f.min_notional or notional > f.max_notional:
+                raise SimOrderError(-1013, "Filter failure: NOTIONAL")
+
+    # --- Matching ---
+
+    def _arrive(self, order):
+        """The order reaches the book: take liquidity, then rest / expire."""
+        if order['status'] != 'NEW':
+            return  # Canceled while in flight
+        symbol, side = order['symbol'], order['side']
+        book = self._books.get(symbol)
+        remaining = float(order['origQty'])
+        limit = float(order['price']) if order['type'] == 'LIMIT' else None
+
+        levels = self._levels(book, side, remaining) if book else []
+        crosses = (lambda p: True) if limit is None else ((lambda p: p <= limit) if side == 'BUY' else (lambda p: p >= limit))
+
+        if order['timeInForce'] == 'FOK':
+            available = sum(q for p, q in levels if crosses(p))
+            if available < remaining - 1e-12:
+                order['status'] = 'EXPIRED'
+                self._report(order, 0.0, 0.0, False)
+                return
+
+        # Take liquidity, best level first; consumed depth stays gone until the next book update
+        for level in levels:
+            if remaining <= 1e-12 or not crosses(level[0]):
+                break
+            take = min(remaining, level[1])
+            if take <= 0:
+                continue
+            level[1] -= take
+            remaining -= take
+            self._fill(order, level[0], take, is_maker=False)
+        if levels:
+            levels[:] = [level for level in levels if level[1] > 1e-12]
+            if book.synth is None:
+                self._sync_top(book)
+
+        if remaining <= 1e-12:
+            return
+        if limit is None or order['timeInForce'] in ('IOC', 'FOK'):
+            order['status'] = 'EXPIRED'  # Binance: market order out of liquidity / IOC remainder
+            self._report(order, 0.0, 0.0, False)
+            return
+        buys, sells = self._resting.setdefault(symbol, ([], []))
+        if side == 'BUY':
+            heapq.heappush(buys, (-limit, order['orderId'], order['orderId']))
+        else:
+            heapq.heappush(sells, (limit, order['orderId'], order['orderId']))
+
+    def _sync_top(self, book):
+        """Best bid/ask of a depth book after liquidity was taken (None = that side is empty)."""
+        book.bid, book.bid_qty = book.bids[0] if book.bids else (None, None)
+        book.ask, book.ask_qty = book.asks[0] if book.asks else (None, None)
+
+    def _fill_resting(self, heap, price, qty, through):
+        """A print at `price` with `qty`: fills the best resting orders on one side, at their limit (maker)."""
+        while heap and qty > 1e-12:
+            key, _, order_id = heap[0]
+            order = self._orders.get(order_id)
+            if order is None or order['status'] not in ('NEW', 'PARTIALLY_FILLED'):
+                heapq.heappop(heap)
+                continue
+            limit = abs(key)
+            if not (through(limit) or price == limit):
+                break
+            available = qty if through(limit) else qty * self.queue_share
+            take = min(float(order['origQty']) - float(order['executedQty']), available)
+            self._fill(order, limit, take, is_maker=True)
+            qty -= take
+            if order['status'] == 'FILLED':
+                heapq.heappop(heap)
+            else:
+                break
+
+    def _match_resting_quote(self, symbol, book):
+        """The opposite quote moved onto / through resting limits: fill against the quoted size."""
+        buys, sells = self._resting[symbol]
+        if buys and book.ask is not None and book.ask <= -buys[0][0]:
+            self._fill_resting(buys, book.ask, book.ask_qty or math.inf, lambda limit: book.ask <= limit)
+        if sells and book.bid is not None and book.bid >= sells[0][0]:
+            self._fill_resting(sells, book.bid, book.bid_qty or math.inf, lambda limit: book.bid >= limit)
+
+    def _fill(self, order, price, qty, is_maker):
+        executed = float(order['executedQty']) + qty
+        quote = float(order['cummulativeQuoteQty']) + price * qty
+        fee_rate = self.maker_fee_rate if is_maker else self.taker_fee_rate
+        trade_id = next(self._trade_ids)
+        order['executedQty'] = f"{executed:.8f}"
+        order['cummulativeQuoteQty'] = f"{quote:.8f}"
+        order['status'] = 'FILLED' if executed >= float(order['origQty']) - 1e-12 else 'PARTIALLY_FILLED'
+        order['fills'].append({
+            'price': f"{price:.8f}", 'qty': f"{qty:.8f}", 'commission': f"{price * qty * fee_rate:.8f}",
+            'commissionAsset': 'USDT', 'tradeId': trade_id, 'isMaker': is_maker,
+        })
+        self._report(order, price, qty, is_maker, trade_id)
+
+    def _report(self, order, price, qty, is_maker, trade_id=-1):
+        if not self.listeners:
+            return
+        fee_rate = self.maker_fee_rate if is_maker else self.taker_fee_rate
+        event = {
+            'e': 'executionReport', 'E': self._time(), 's': order['symbol'], 'c': order['clientOrderId'],
+            'S': order['side'], 'o': order['type'], 'f': order['timeInForce'], 'q': order['origQty'], 'p': order['price'],
+            'x': 'TRADE' if qty else order['status'], 'X': order['status'], 'i': order['orderId'],
+            'l': f"{qty:.8f}", 'z': order['executedQty'], 'L': f"{price:.8f}",
+            'n': f"{price * qty * fee_rate:.8f}", 'N': 'USDT', 'T': self._time(), 't': trade_id, 'm': is_maker,
+            'Z': order['cummulativeQuoteQty'],
+        }
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                log(f"⚠️ Listener error: {e}")
@@ -55,8 +55,8 @@ def fetch_baseline_price(supabase: SupabaseClient, symbol='BTCUSDT'):
         print(f"⚠️ Error fetching baseline: {e}")
     return None
 
-def fetch_portfolio_stats(supabase: SupabaseClient, is_paper=True):
-    """Fetch realized P&L and fees."""
+def fetch_portfolio_stats(supabase: SupabaseClient, is_paper=True, symbol=None):
+    """Fetch realized P&L and fees (for one symbol if given)."""
     table = "paper_trade_log" if is_paper else "trade_log"
     
     realized_pnl = 0.0
@@ -69,7 +69,10 @@ def fetch_portfolio_stats(supabase: SupabaseClient, is_paper=True):
         # For production with large data, use RPC function in Postgres.
         
         # Fetch CLOSED trades for Realized PnL
-        res = supabase.table(table).select("pnl_usdt, fee_usdt").eq("status", "CLOSED").execute()
+        query = supabase.table(table).select("pnl_usdt, fee_usdt").eq("status", "CLOSED")
+        if symbol:
+            query = query.eq("symbol", symbol)
+        res = query.execute()
         df_closed = pd.DataFrame(res.data)
         
         if not df_closed.empty:
@@ -81,7 +84,10 @@ def fetch_portfolio_stats(supabase: SupabaseClient, is_paper=True):
         # Also need fees from OPEN trades (Buy fees are already paid/recorded?)
         # In paper mode, we record buy fee immediately? 
         # The schema has fee_usdt. Let's check open trades for fees too.
-        res_open = supabase.table(table).select("fee_usdt").eq("status", "OPEN").execute()
+        query = supabase.table(table).select("fee_usdt").eq("status", "OPEN")
+        if symbol:
+            query = query.eq("symbol", symbol)
+        res_open = query.execute()
         df_open = pd.DataFrame(res_open.data)
         if not df_open.empty:
              if 'fee_usdt' in df_open.columns:
@@ -92,41 +98,90 @@ def fetch_portfolio_stats(supabase: SupabaseClient, is_paper=True):
         
     return realized_pnl, fees_paid
 
-def capture_snapshot(supabase: SupabaseClient, binance_client, mode='PAPER'):
+SNAPSHOT_STATS_FIELDS = ('realized_pnl', 'fees_paid', 'open_trade_count', 'open_quantity', 'open_cost',
+                         'peak_equity', 'baseline_price', 'initial_capital')
+
+def fetch_snapshot_stats(supabase: SupabaseClient, is_paper=True, symbol='BTCUSDT'):
+    """
+    Realized PnL, fees, open position totals (count, quantity, cost), peak
+    equity, baseline price and initial capital of one symbol in one round trip.
+    The sums run in Postgres (snapshot_stats(), add_snapshot_stats_function.sql),
+    so the response is one row however long the trade history is.
+    Returns a dict (None for missing peak / baseline), or None if the call failed.
+    """
+    try:
+        res = supabase.rpc("snapshot_stats", {"p_symbol": symbol, "p_paper": is_paper}).execute()
+    except Exception as e:
+        print(f"⚠️ snapshot_stats() unavailable ({e}). Run add_snapshot_stats_function.sql; using client-side totals.")
+        return None
+    row = res.data[0] if isinstance(res.data, list) and res.data else res.data or {}
+    return {f: None if row.get(f) is None else float(row[f]) for f in SNAPSHOT_STATS_FIELDS}
+
+def fetch_snapshot_stats_client_side(supabase: SupabaseClient, is_paper=True, symbol='BTCUSDT'):
+    """
+    Same dict as fetch_snapshot_stats(), from plain table queries summed here.
+    Pulls every trade row and is cut off at the API row limit: only a fallback
+    for databases without snapshot_stats().
+    """
+    table_name = "paper_trade_log" if is_paper else "trade_log"
+    open_trades = supabase.table(table_name).select("entry_price, quantity").eq("status", "OPEN").eq("symbol", symbol).execute().data
+    realized_pnl, fees_paid = fetch_portfolio_stats(supabase, is_paper=is_paper, symbol=symbol)
+
+    initial_capital = None
+    try:
+        res = supabase.table("baseline_prices").select("initial_capital").eq("symbol", symbol).execute()
+        if res.data and res.data[0]['initial_capital']:
+            initial_capital = float(res.data[0]['initial_capital'])
+    except Exception:
+        pass
+
+    peak_equity = None
+    try:
+        res_max = supabase.table("portfolio_snapshots")\
+            .select("total_equity_usdt")\
+            .eq("symbol", symbol)\
+            .order("total_equity_usdt", desc=True)\
+            .limit(1)\
+            .execute()
+        if res_max.data:
+            peak_equity = float(res_max.data[0]['total_equity_usdt'])
+    except Exception as e:
+        print(f"⚠️ Error fetching peak equity: {e}")
+
+    return {
+        'realized_pnl': float(realized_pnl),
+        'fees_paid': float(fees_paid),
+        'open_trade_count': float(len(open_trades)),
+        'open_quantity': sum(float(t['quantity']) for t in open_trades),
+        'open_cost': sum(float(t['entry_price']) * float(t['quantity']) for t in open_trades),
+        'peak_equity': peak_equity,
+        'baseline_price': fetch_baseline_price(supabase, symbol),
+        'initial_capital': initial_capital,
+    }
+
+def capture_snapshot(supabase: SupabaseClient, binance_client, mode='PAPER', symbol='BTCUSDT'):
     """
-    Main function to capture and save portfolio snapshot.
+    Main function to capture and save portfolio snapshot for one symbol.
     """
     try:
         # 1. Get Market Data
-        ticker = binance_client.get_symbol_ticker(symbol='BTCUSDT')
+        ticker = binance_client.get_symbol_ticker(symbol=symbol)
         current_price = float(ticker['price'])
         
-        # 2. Get Open Trades
-        table_name = "paper_trade_log" if mode == 'PAPER' else "trade_log"
-        open_trades_res = supabase.table(table_name).select("*").eq("status", "OPEN").execute()
-        open_trades = open_trades_res.data
-        
-        # 3. Calculate Unrealized Metrics
-        unrealized_pnl, total_pos_btc, total_pos_value = calculate_unrealized_pnl(open_trades, current_price)
-        
-        # 4. Get Realized Stats
-        realized_pnl, total_fees = fetch_portfolio_stats(supabase, is_paper=(mode=='PAPER'))
+        # 2. Totals of the trade history, peak and baseline (one round trip)
+        is_paper = mode == 'PAPER'
+        stats = fetch_snapshot_stats(supabase, is_paper, symbol)
+        if stats is None:
+            stats = fetch_snapshot_stats_client_side(supabase, is_paper, symbol)
+        realized_pnl = stats['realized_pnl']
+        total_fees = stats['fees_paid']
+        baseline_price = stats['baseline_price']
+        initial_capital = stats['initial_capital'] or 0.0
         
-        # 5. Get Cash Balance (Simulated or Real)
-        # For Paper, we might calculate cash based on Initial - NetInvested + Realized?
-        # Or just track "Equity" = Initial + Realized + Unrealized.
-        
-        # Let's fetch Baseline info first
-        baseline_price = fetch_baseline_price(supabase, 'BTCUSDT')
-        
-        # Try to find Initial Capital
-        initial_capital = 0.0
-        try:
-             res = supabase.table("baseline_prices").select("initial_capital").eq("symbol", "BTCUSDT").execute()
-             if res.data and res.data[0]['initial_capital']:
-                 initial_capital = float(res.data[0]['initial_capital'])
-        except:
-            pass
+        # 3. Unrealized Metrics: Sum((Current - Entry) * Qty) = Current * Sum(Qty) - Sum(Entry * Qty)
+        total_pos_btc = stats['open_quantity']
+        total_pos_value = current_price * total_pos_btc
+        unrealized_pnl = total_pos_value - stats['open_cost']
             
         # Total Equity Calculation
         # Equity = Initial Capital + Realized PnL + Unrealized PnL - Fees (if not already deducted from realized)
@@ -141,24 +196,8 @@ def capture_snapshot(supabase: SupabaseClient, binance_client, mode='PAPER'):
         else:
             total_equity = initial_capital + realized_pnl + unrealized_pnl
 
-        # 6. Calculate Drawdown
-        # Need Peak Equity
-        peak_equity = total_equity # Default to current if no history
-        
-        # Fetch max equity from history
-        try:
-            # Perform a query to get max(total_equity_usdt)
-            # direct ordering
-            res_max = supabase.table("portfolio_snapshots")\
-                .select("total_equity_usdt")\
-                .order("total_equity_usdt", desc=True)\
-                .limit(1)\
-                .execute()
-            if res_max.data:
-                hist_peak = float(res_max.data[0]['total_equity_usdt'])
-                peak_equity = max(peak_equity, hist_peak)
-        except Exception as e:
-            print(f"⚠️ Error fetching peak equity: {e}")
+        # 4. Drawdown against the highest equity so far (current if no history)
+        peak_equity = max(total_equity, stats['peak_equity'] if stats['peak_equity'] is not None else total_equity)
             
         # Drawdown %
         drawdown_pct = 0.0
@@ -170,15 +209,15 @@ def capture_snapshot(supabase: SupabaseClient, binance_client, mode='PAPER'):
         if baseline_price and baseline_price > 0:
             baseline_return = (current_price - baseline_price) / baseline_price * 100
             
-        # 7. Insert Snapshot
+        # 5. Insert Snapshot
         snapshot_data = {
-            "symbol": "BTCUSDT",
-            "btc_price": current_price,
+            "symbol": symbol,
+            "btc_price": current_price, # Column predates multi-symbol: price of `symbol`
             "total_equity_usdt": total_equity,
             "realized_pnl": realized_pnl,
             "unrealized_pnl": unrealized_pnl,
             "total_fees_paid": total_fees,
-            "open_trade_count": len(open_trades),
+            "open_trade_count": int(stats['open_trade_count']),
             "total_position_btc": total_pos_btc,
             "total_position_usdt": total_pos_value,
             "peak_equity": peak_equity,
@@ -190,7 +229,7 @@ def capture_snapshot(supabase: SupabaseClient, binance_client, mode='PAPER'):
         }
         
         supabase.table("portfolio_snapshots").insert(snapshot_data).execute()
-        print(f"📸 Portfolio Snapshot Captured. Equity: ${total_equity:,.2f} | DD: {drawdown_pct:.2f}%")
+        print(f"📸 {symbol} Portfolio Snapshot Captured. Equity: ${total_equity:,.2f} | DD: {drawdown_pct:.2f}%")
         
     except Exception as e:
         print(f"❌ Snapshot Capture Failed: {e}")
@@ -0,0 +1,170 @@
+"""
+Snapshot Series (Equity / Drawdown Charts)
+==========================================
+Query layer for the Performance tab charts. The visible range picks the
+resolution: a time bucket giving at most MAX_BUCKETS buckets, rolled up in
+Postgres (snapshot_series(), add_snapshot_series_function.sql) to OHLC of
+equity, worst drawdown and last price per bucket. LTTB then takes each line
+down to POINT_BUDGET points. What reaches the browser is bounded by the
+budget, not by how many snapshots the range holds (hourly for years, or
+per minute).
+
+- CHART_RANGES: visible range -> seconds (None: all history)
+- pick_bucket(): the finest BUCKET_LADDER bucket for a span
+- fetch_snapshot_series(): rollups of one range (None if the function is missing)
+- rollup_snapshots(): the same rollups from raw rows (fallback)
+- lttb(): Largest-Triangle-Three-Buckets downsampling
+- load_series(): range -> (chart frame, bucket seconds)
+"""
+
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+CHART_RANGES = {'24h': 86400, '7d': 7 * 86400, '30d': 30 * 86400, '90d': 90 * 86400, '1y': 365 * 86400, 'All': None}
+DEFAULT_RANGE = '30d'
+POINT_BUDGET = 500               # Points per chart line
+MAX_BUCKETS = 2 * POINT_BUDGET   # Rows per rollup response; LTTB takes them to POINT_BUDGET
+BUCKET_LADDER = [60, 300, 900, 3600, 4 * 3600, 86400, 7 * 86400]
+SERIES_COLUMNS = ['bucket_time', 'equity_open', 'equity_high', 'equity_low', 'equity_close',
+                  'drawdown_pct', 'max_drawdown_pct', 'btc_price', 'samples']
+SNAPSHOT_COLUMNS = "snapshot_time, total_equity_usdt, current_drawdown_pct, max_drawdown_pct, btc_price"
+SNAPSHOT_PAGE_SIZE = 1000
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+def _epoch(times):
+    """Epoch seconds of a tz-aware datetime Series."""
+    return (times - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+
+
+def _series_frame(rows):
+    df = pd.DataFrame(rows, columns=SERIES_COLUMNS)
+    df['bucket_time'] = pd.to_datetime(df['bucket_time'], utc=True, format='ISO8601')
+    for col in SERIES_COLUMNS[1:]:
+        df[col] = df[col].astype(float)
+    return df
+
+
+def pick_bucket(span_seconds, max_buckets=MAX_BUCKETS):
+    """Finest bucket (seconds) that splits `span_seconds` into at most `max_buckets`."""
+    for bucket in BUCKET_LADDER:
+        if span_seconds / bucket <= max_buckets:
+            return bucket
+    return int(np.ceil(span_seconds / max_buckets))
+
+
+def format_bucket(seconds):
+    for unit, size in (('w', 7 * 86400), ('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+def first_snapshot_time(supabase, symbol):
+    """Epoch seconds of the oldest snapshot of `symbol` (None if there is none)."""
+    res = supabase.table("portfolio_snapshots").select("snapshot_time").eq("symbol", symbol)\
+        .order("snapshot_time", desc=False).limit(1).execute()
+    return pd.Timestamp(res.data[0]['snapshot_time']).timestamp() if res.data else None
+
+
+def fetch_snapshot_series(supabase, symbol, start, end, bucket_seconds):
+    """Rollups of [start, end) (epoch seconds) from snapshot_series(), or None if the call failed."""
+    try:
+        rows = supabase.rpc("snapshot_series", {
+            "p_symbol": symbol, "p_from": _iso(start), "p_to": _iso(end), "p_bucket_seconds": int(bucket_seconds),
+        }).execute().data or []
+    except Exception as e:
+        print(f"⚠️ snapshot_series() unavailable ({e}). Run add_snapshot_series_function.sql; rolling up client-side.")
+        return None
+    return _series_frame(rows)
+
+
+def fetch_snapshot_rows(supabase, symbol, start, end, page_size=SNAPSHOT_PAGE_SIZE):
+    """Raw snapshots of [start, end), oldest first, paged past the API row limit."""
+    rows = []
+    while True:
+        page = supabase.table("portfolio_snapshots")\
+            .select(SNAPSHOT_COLUMNS)\
+            .eq("symbol", symbol)\
+            .gte("snapshot_time", _iso(start))\
+            .lt("snapshot_time", _iso(end))\
+            .order("snapshot_time", desc=False)\
+            .range(len(rows), len(rows) + page_size - 1)\
+            .execute().data
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+
+
+def rollup_snapshots(rows, bucket_seconds):
+    """snapshot_series() computed from raw snapshot rows."""
+    if not rows:
+        return _series_frame([])
+    df = pd.DataFrame(rows)
+    t = pd.to_datetime(df['snapshot_time'], utc=True, format='ISO8601')
+    df = df.assign(bucket_time=pd.to_datetime(_epoch(t) // bucket_seconds * bucket_seconds, unit='s', utc=True), _t=t)\
+        .sort_values('_t')
+    for col in ('total_equity_usdt', 'current_drawdown_pct', 'max_drawdown_pct', 'btc_price'):
+        df[col] = df[col].astype(float) if col in df.columns else np.nan
+    out = df.groupby('bucket_time').agg(
+        equity_open=('total_equity_usdt', 'first'), equity_high=('total_equity_usdt', 'max'),
+        equity_low=('total_equity_usdt', 'min'), equity_close=('total_equity_usdt', 'last'),
+        drawdown_pct=('current_drawdown_pct', 'max'), max_drawdown_pct=('max_drawdown_pct', 'max'),
+        btc_price=('btc_price', 'last'), samples=('total_equity_usdt', 'size'))
+    return out.reset_index()[SERIES_COLUMNS].astype({col: float for col in SERIES_COLUMNS[1:]})
+
+
+def lttb(x, y, threshold):
+    """Indices of the `threshold` points Largest-Triangle-Three-Buckets keeps (first and last always)."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)  # threshold - 2 buckets of interior points
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            avg_x, avg_y = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(df, budget=POINT_BUDGET):
+    """The buckets LTTB keeps for the equity line or the drawdown line, at most `budget` each."""
+    if len(df) <= budget:
+        return df
+    x = _epoch(df['bucket_time']).to_numpy()
+    keep = np.union1d(lttb(x, df['equity_close'].ffill().fillna(0).to_numpy(), budget),
+                      lttb(x, df['drawdown_pct'].fillna(0).to_numpy(), budget))
+    return df.iloc[keep].reset_index(drop=True)
+
+
+def load_series(supabase, symbol, range_key=DEFAULT_RANGE, now=None, budget=POINT_BUDGET):
+    """
+    (chart frame, bucket seconds) for the range `range_key` of CHART_RANGES ending `now`:
+    at most MAX_BUCKETS rollups fetched, at most `budget` points per line returned.
+    """
+    end = (now or time.time()) + 1
+    span = CHART_RANGES[range_key]
+    start = end - span if span else first_snapshot_time(supabase, symbol)
+    if start is None:
+        return _series_frame([]), BUCKET_LADDER[0]
+    bucket = pick_bucket(end - start)
+    start = start // bucket * bucket  # Whole buckets only
+    df = fetch_snapshot_series(supabase, symbol, start, end, bucket)
+    if df is None:
+        df = rollup_snapshots(fetch_snapshot_rows(supabase, symbol, start, end), bucket)
+    return downsample(df, budget), bucket
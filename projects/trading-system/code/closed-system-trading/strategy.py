@@ -0,0 +1,163 @@
+"""
+Strategy Rules (Grid + RSI + Regime)
+====================================
+The pure decision logic of the bot, shared by the sync loop (trade_and_log.py)
+and the async engine (bot_engine.py). No I/O here: every function takes the
+current state and returns a decision, so the rules can run anywhere
+(including the backtester, backtest.py).
+"""
+
+import math
+
+OCCUPIED_TOLERANCE = 10.0  # USDT: an open trade within $10 of a level occupies it
+BREAKEVEN_BUFFER = 10.0    # USDT above entry to cover fees on a Smart Exit
+SECURE_RATIO = 0.5         # Trade is SECURED once price reaches 50% of the TP distance
+BEAR_RSI_LIMIT = 30        # In BEAR_TREND only buy oversold
+FEE_RATE_BNB = 0.00075     # Binance spot fee paying with BNB
+FEE_RATE_STANDARD = 0.001  # Binance spot fee paying with the quote asset
+
+
+def generate_grid_levels(zone_config, step):
+    """
+    Generates a list of grid prices within the zone.
+    Range: [price_low, price_high] with step `step`.
+    """
+    low = float(zone_config['price_low'])
+    high = float(zone_config['price_high'])
+
+    levels = []
+    current_level = low
+    while current_level <= high:
+        levels.append(current_level)
+        current_level += step
+
+    return levels
+
+
+def select_zone(active_zones, price):
+    """Returns the first active zone containing `price`, or None."""
+    for zone in active_zones:
+        if float(zone['price_low']) <= price <= float(zone['price_high']):
+            return zone
+    return None
+
+
+def summarize_open_trades(open_trades, zone_name):
+    """
+    Maps open trades to grid levels and calculates zone usage.
+    Returns: (occupied_levels, invested capital in `zone_name`)
+    """
+    occupied_levels = []
+    zone_invested = 0.0
+
+    for t in open_trades:
+        occupied_levels.append(float(t['entry_price']))
+
+        if t.get('zone_name') == zone_name:
+            # Use total_usdt if available, else calc
+            trade_val = float(t.get('total_usdt') or 0)
+            if trade_val == 0:
+                trade_val = float(t['entry_price']) * float(t['quantity'])
+            zone_invested += trade_val
+
+    return occupied_levels, zone_invested
+
+
+def check_buy_permission(zone, zone_invested, trade_size, rsi, rsi_limit, market_regime):
+    """
+    Budget, Regime and RSI gates for new entries.
+    Returns: (can_buy, block_reason)
+    """
+    # A. Budget Check
+    allocated_cap = float(zone['capital_allocated'])
+    if zone_invested + trade_size > allocated_cap:
+        return False, f"💰 Zone Budget Exceeded (${zone_invested:,.2f} + ${trade_size} > ${allocated_cap:,.2f})"
+
+    # B. Regime & RSI Check
+    if market_regime == 'BEAR_TREND':
+        if rsi < BEAR_RSI_LIMIT:
+            return True, None
+        return False, f"🐻 Market is BEARISH & RSI High ({rsi:.2f} >= {BEAR_RSI_LIMIT})"
+
+    if rsi >= rsi_limit:
+        return False, f"⚠️ RSI High ({rsi:.2f} >= {rsi_limit})"
+
+    return True, None
+
+
+def find_buy_level(grid_levels, price, occupied_levels, step, tolerance=OCCUPIED_TOLERANCE):
+    """
+    Bucket Logic: only buy if price is within the bucket BELOW a level,
+    i.e. (Level - Step) < Price <= Level, and the level is empty.
+    Returns the level to buy, or None.
+    """
+    for level in grid_levels:
+        is_in_bucket = level - step < price <= level
+
+        is_occupied = False
+        for occ_price in occupied_levels:
+            if abs(occ_price - level) < tolerance:
+                is_occupied = True
+                break
+
+        if is_in_bucket and not is_occupied:
+            return level
+    return None
+
+
+def evaluate_exits(open_trades, price, tp_profit, secured_ids):
+    """
+    Take Profit & Smart Exit rules.
+    Returns: (newly_secured_ids, exits) where exits is a list of (trade, reason),
+    reason being 'BREAKEVEN' (SECURED trade fell back to entry + buffer) or 'TAKE_PROFIT'.
+    `secured_ids` is not modified; the caller owns that state.
+    """
+    newly_secured = []
+    exits = []
+
+    for trade in open_trades:
+        entry = float(trade['entry_price'])
+        trade_id = trade['id']
+
+        # Mark as SECURED once price covers 50% of the way to target
+        secured = trade_id in secured_ids
+        if price >= entry + tp_profit * SECURE_RATIO and not secured:
+            newly_secured.append(trade_id)
+            secured = True
+
+        # If Secured, Check for Breakeven Stop
+        if secured and price <= entry + BREAKEVEN_BUFFER:
+            exits.append((trade, 'BREAKEVEN'))
+            continue
+
+        # Normal TP Check
+        if price >= entry + tp_profit:
+            exits.append((trade, 'TAKE_PROFIT'))
+
+    return newly_secured, exits
+
+
+def round_step_size(quantity, step_size):
+    precision = int(round(-math.log(step_size, 10), 0))
+    return float(round(quantity, precision))
+
+
+def order_quantity(trade_size_usdt, price, step_size, max_qty=None):
+    """Quantity for a `trade_size_usdt` entry, rounded to the LOT_SIZE step and capped at `max_qty`."""
+    qty = round_step_size(trade_size_usdt / price, step_size)
+    if max_qty and qty > max_qty:
+        qty = max_qty
+    return qty
+
+
+def close_economics(entry_price, exit_price, quantity, fee_rate):
+    """
+    Result of closing `quantity` bought at `entry_price`, fees estimated on the round trip (Buy + Sell).
+    Returns: (net_pnl, total_fee, pnl_percent)
+    """
+    buy_value = entry_price * quantity
+    sell_value = exit_price * quantity
+    total_fee = (buy_value + sell_value) * fee_rate
+    net_pnl = sell_value - buy_value - total_fee
+    pnl_percent = ((exit_price - entry_price) / entry_price) * 100
+    return net_pnl, total_fee, pnl_percent
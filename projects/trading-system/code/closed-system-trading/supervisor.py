@@ -0,0 +1,179 @@
+"""
+Multi-Symbol Supervisor
+=======================
+Runs the grid bot for several pairs from one process instead of one
+process per pair (SYMBOLS=BTCUSDT,ETHUSDT in .env).
+
+Shared by all workers:
+  - one WebSocket feed carrying every symbol, and the process-wide KlineCache
+  - the Supabase and Binance clients
+  - one config snapshot per round (config_cache.py)
+
+Owned by each SymbolWorker (trade_and_log.SymbolState):
+  - its zones (zones_config.symbol), grid index, position book,
+    incremental indicators, trade cooldown and SYMBOL_SETTINGS overrides
+
+Workers run on a thread pool, so every symbol is evaluated in parallel and
+a slow REST fallback or order on one pair does not hold up the others.
+Threads rather than processes: the workers share the feed, the kline cache
+and the clients, which cannot cross a process boundary, and the per-tick
+indicator work is O(1) (indicators.py), so there is little CPU to spread.
+
+Needs the `symbol` columns from add_symbol_column.sql.
+
+Usage: python supervisor.py
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import metrics
+import trade_and_log as bot
+from trade_and_log import log
+
+
+class SymbolWorker:
+    """Decision loop of one pair. run_iteration() is one pass of start_bot's loop."""
+
+    def __init__(self, symbol):
+        self.symbol = symbol.upper()
+        self.state = bot.symbol_state(self.symbol)
+        self.step_size = None
+        self.last_snapshot_time = 0
+
+    def start(self):
+        bot.set_log_symbol(self.symbol)
+        self.step_size = bot.get_symbol_step_size(self.symbol)
+        self.state.position_book.load()
+
+    def maybe_snapshot(self):
+        if time.time() - self.last_snapshot_time > bot.SNAPSHOT_INTERVAL:
+            log(f"[SNAPSHOT] Running Portfolio Snapshot...")
+            with metrics.span('snapshot', self.symbol):
+                bot.take_snapshot(self.symbol)
+            self.last_snapshot_time = time.time()
+        bot.checkpoint_portfolio(self.state)
+
+    def sync_limit_grid(self, config, *args, **kwargs):
+        if self.state.limit_grid:
+            bot.set_log_symbol(self.symbol)
+            bot.sync_limit_grid(self.state, self.state.apply_overrides(config), *args, **kwargs)
+
+    def run_iteration(self, config):
+        with metrics.span('iteration', self.symbol):
+            self._run_iteration(config)
+
+    def _run_iteration(self, config):
+        bot.set_log_symbol(self.symbol)
+        with metrics.span('settings', self.symbol):
+            config = self.state.apply_overrides(config)
+        book = self.state.position_book
+
+        self.maybe_snapshot()
+
+        # 1. Zones of this symbol & Price
+        with metrics.span('zones', self.symbol):
+            active_zones = config.zones_for(self.symbol)
+        if not active_zones:
+            log("⚠️ No Active Zones found for this symbol.")
+            self.sync_limit_grid(config)
+            return
+
+        with metrics.span('price', self.symbol):
+            current_price = bot.get_market_price(self.symbol)
+        if not current_price:
+            return
+
+        with metrics.span('regime', self.symbol):
+            market_regime, current_adx = bot.analyze_market_regime(self.symbol)
+        log(f"[ANALYSIS] Regime: {market_regime} | ADX: {current_adx:.2f}")
+
+        # 2. Select Correct Zone based on Price
+        with metrics.span('zone_select', self.symbol):
+            active_zone = bot.select_active_zone(config, current_price, self.symbol)
+        if not active_zone:
+            self.sync_limit_grid(config, current_price=current_price)
+            return
+
+        with metrics.span('rsi', self.symbol):
+            current_rsi = bot.calculate_rsi(self.symbol)
+        log(f"[STATS] Market Data | Price: {current_price:.2f} | RSI: {current_rsi:.2f}")
+
+        # 3. State (in memory)
+        with metrics.span('open_trades', self.symbol):
+            book.maybe_reconcile()
+            bot.check_balance_drift(self.state)
+            open_trades = book.open_trades()
+        metrics.open_trades.set(len(open_trades), symbol=self.symbol)
+
+        # 4. BUY
+        with metrics.span('buy', self.symbol):
+            if self.state.limit_grid:
+                self.sync_limit_grid(config, active_zone, current_price, current_rsi, market_regime)
+            else:
+                level, _ = bot.check_buy(active_zone, book, current_price, current_rsi, market_regime, config, self.state.grid_index)
+                if level is not None:
+                    bot.execute_buy(active_zone, level, current_price, self.step_size, current_rsi, config, self.symbol)
+
+        # 5. SELL
+        with metrics.span('sell', self.symbol):
+            for trade, reason in bot.check_sells(open_trades, current_price, config, book, self.state.limit_grid):
+                bot.execute_sell(trade, current_price, self.step_size, current_rsi, market_regime, config)
+                book.secured.discard(trade['id'])
+
+
+class Supervisor:
+    def __init__(self, symbols=None, max_workers=None):
+        self.workers = [SymbolWorker(s) for s in (symbols or bot.SYMBOLS)]
+        self.pool = ThreadPoolExecutor(max_workers=max_workers or len(self.workers), thread_name_prefix="symbol-worker")
+
+    def _run_all(self, fn):
+        futures = {self.pool.submit(fn, w): w for w in self.workers}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                log(f"[CRITICAL] {futures[future].symbol} worker error: {e}")
+                metrics.errors.inc(symbol=futures[future].symbol, where='loop')
+
+    def start(self):
+        symbols = [w.symbol for w in self.workers]
+        config = bot.config_cache.get()
+        log(f"[START] Supervisor Starting... MODE={bot.TRADING_MODE} | Symbols: {', '.join(symbols)} | Step=${config.grid_step_usdt} | TP=${config.tp_usdt} | RSI Limit: {config.rsi_limit} | Size=${config.trade_size_usdt}")
+        bot.start_metrics()
+        bot.start_trade_journal()
+        self._run_all(SymbolWorker.start)
+        bot.warm_up_from_store(symbols)
+        bot.start_market_feed(symbols)
+        bot.start_portfolio_ledger(symbols)
+        bot.start_read_model(symbols)
+        bot.start_user_stream()
+        bot.start_limit_grid(symbols)
+        bot.start_config_watch()
+
+    def run_round(self):
+        # One snapshot for every worker in the round
+        config = bot.config_cache.get()
+        if not config.is_active:
+            log("[PAUSE] Bot Paused via Dashboard (Master Switch OFF). Sleeping...")
+            self._run_all(lambda w: w.sync_limit_grid(config))  # Take the resting buys down
+            return
+        self._run_all(lambda w: w.run_iteration(config))
+
+    def run(self):
+        self.start()
+        while True:
+            started = time.perf_counter()
+            try:
+                self.run_round()
+            except Exception as e:
+                log(f"[CRITICAL] Error in supervisor loop: {e}")
+            log(f"💤 Round done in {(time.perf_counter() - started) * 1000:.0f} ms. Waiting for price action...")
+            time.sleep(bot.LOOP_INTERVAL)
+
+
+if __name__ == "__main__":
+    try:
+        Supervisor().run()
+    except KeyboardInterrupt:
+        print("\n🛑 Supervisor stopped by user.")
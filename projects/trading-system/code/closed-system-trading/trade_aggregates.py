@@ -0,0 +1,108 @@
+"""
+Trade Aggregates
+================
+Thin client for the SQL aggregates over trade_log / paper_trade_log
+(add_trade_aggregate_functions.sql). The dashboard reads one row per zone
+or per day instead of every trade row, so the payload stays the same size
+however long the history gets and the API row limit cannot cut the sums short.
+
+- fetch_zone_stats(): invested, realized PnL, open / closed counts and fees per zone (zone_stats())
+- fetch_daily_pnl(): realized PnL, fees and closed trades per UTC day (daily_pnl())
+
+The totals of a symbol come from snapshot_stats() (snapshot_manager.fetch_snapshot_stats).
+The fetch_* aggregates return None when the function is not installed;
+*_from_trades() compute the same frames from a trades frame instead
+(every row, DashboardData.trades).
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+ZONE_STATS_COLUMNS = ['zone_name', 'invested', 'realized_pnl', 'open_count', 'closed_count', 'fees_paid']
+DAILY_PNL_COLUMNS = ['day', 'realized_pnl', 'fees_paid', 'closed_count']
+DAILY_PNL_DAYS = 90
+
+
+def trade_table(is_paper):
+    return "paper_trade_log" if is_paper else "trade_log"
+
+
+def _rpc(supabase, fn, params):
+    """Rows of an aggregate function, or None if the call failed."""
+    try:
+        return supabase.rpc(fn, params).execute().data or []
+    except Exception as e:
+        print(f"⚠️ {fn}() unavailable ({e}). Run add_trade_aggregate_functions.sql; aggregating client-side.")
+        return None
+
+
+def _frame(rows, columns, counts):
+    df = pd.DataFrame(rows, columns=columns)
+    for col in columns[1:]:
+        df[col] = df[col].fillna(0).astype(int if col in counts else float)
+    return df
+
+
+def _daily_frame(rows):
+    df = _frame(rows, DAILY_PNL_COLUMNS, ('closed_count',))
+    df['day'] = pd.to_datetime(df['day'])
+    return df
+
+
+def fetch_zone_stats(supabase, is_paper=True, symbol='BTCUSDT'):
+    """One row per zone that has trades (ZONE_STATS_COLUMNS), or None."""
+    rows = _rpc(supabase, "zone_stats", {"p_symbol": symbol, "p_paper": is_paper})
+    return None if rows is None else _frame(rows, ZONE_STATS_COLUMNS, ('open_count', 'closed_count'))
+
+
+def fetch_daily_pnl(supabase, is_paper=True, symbol='BTCUSDT', days=DAILY_PNL_DAYS):
+    """One row per UTC day with closed trades in the last `days` days, oldest first (DAILY_PNL_COLUMNS), or None."""
+    rows = _rpc(supabase, "daily_pnl", {"p_symbol": symbol, "p_paper": is_paper, "p_days": days})
+    return None if rows is None else _daily_frame(rows)
+
+
+# --- Client-side fallbacks (databases without the functions) ---
+
+def zone_stats_from_trades(df_trades):
+    """fetch_zone_stats() computed from a trades frame."""
+    if df_trades.empty:
+        return _frame([], ZONE_STATS_COLUMNS, ())
+    is_open, is_closed = df_trades['status'] == 'OPEN', df_trades['status'] == 'CLOSED'
+    df = pd.DataFrame({
+        'zone_name': df_trades['zone_name'],
+        'invested': df_trades['total_usdt'].where(is_open, 0.0),
+        'realized_pnl': df_trades['pnl_usdt'].where(is_closed, 0.0) if 'pnl_usdt' in df_trades.columns else 0.0,
+        'open_count': is_open.astype(int),
+        'closed_count': is_closed.astype(int),
+        'fees_paid': df_trades['fee_usdt'] if 'fee_usdt' in df_trades.columns else 0.0,
+    })
+    return _frame(df.groupby('zone_name', as_index=False).sum(), ZONE_STATS_COLUMNS, ('open_count', 'closed_count'))
+
+
+def daily_pnl_from_trades(df_trades, days=DAILY_PNL_DAYS, now=None):
+    """fetch_daily_pnl() computed from a trades frame."""
+    if df_trades.empty or 'exit_at' not in df_trades.columns:
+        return _daily_frame([])
+    closed = df_trades[df_trades['status'] == 'CLOSED']
+    exit_at = pd.to_datetime(closed['exit_at'], utc=True, format='ISO8601')
+    recent = exit_at >= (now or datetime.now(timezone.utc)) - timedelta(days=days)
+    df = closed[recent].groupby(exit_at[recent].dt.floor('D').dt.tz_localize(None).rename('day'))\
+        .agg(realized_pnl=('pnl_usdt', 'sum'), fees_paid=('fee_usdt', 'sum'), closed_count=('pnl_usdt', 'size'))
+    return _daily_frame(df.reset_index())
+
+
+def trade_stats_from_trades(df_trades):
+    """The trade totals of snapshot_manager.fetch_snapshot_stats() computed from a trades frame."""
+    stats = {'realized_pnl': 0.0, 'fees_paid': 0.0, 'open_trade_count': 0.0, 'open_quantity': 0.0, 'open_cost': 0.0}
+    if df_trades.empty:
+        return stats
+    open_trades = df_trades[df_trades['status'] == 'OPEN']
+    if 'pnl_usdt' in df_trades.columns:
+        stats['realized_pnl'] = float(df_trades.loc[df_trades['status'] == 'CLOSED', 'pnl_usdt'].sum())
+    if 'fee_usdt' in df_trades.columns:
+        stats['fees_paid'] = float(df_trades['fee_usdt'].sum())
+    stats['open_trade_count'] = float(len(open_trades))
+    stats['open_quantity'] = float(open_trades['quantity'].sum())
+    stats['open_cost'] = float((open_trades['entry_price'] * open_trades['quantity']).sum())
+    return stats
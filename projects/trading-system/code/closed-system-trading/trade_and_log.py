@@ -1,15 +1,27 @@
 import os
 import time
-import math
 from datetime import datetime, timezone
-import pandas as pd
 from binance.client import Client
 from binance.enums import *
-import ta
 from dotenv import load_dotenv
 from supabase import create_client, Client as SupabaseClient
 # Import Snapshot Manager
 from snapshot_manager import capture_snapshot
+from market_feed import MarketDataFeed, BINANCE_WS_URL, INTERVAL_MS
+from indicators import IndicatorEngine
+from kline_cache import shared_cache as kline_cache
+from market_store import shared_store as market_store
+import strategy
+from config_cache import ConfigCache, SupabaseConfigSource
+from position_book import PositionBook, normalize_trade
+from portfolio_ledger import PortfolioLedger
+from trade_journal import TradeJournal
+from sim_exchange import SimExchange, filters_from_info
+from limit_grid import LimitGrid
+from user_stream import UserDataStream
+from grid_index import GridIndex
+import metrics
+from read_model import ReadModel, READ_MODEL_PORT, start_server as serve_read_model
 import requests
 import json
 import threading
@@ -29,7 +41,7 @@ TP_PROFIT = 200.0       # USDT
 TRADE_SIZE_USDT = 20.0  # USDT
 MAX_TRADE_QTY = 0.001   # BTC (Hard Limit)
 LOOP_INTERVAL = 60      # Seconds
-SNAPSHOT_INTERVAL = 3600 # 1 Hour
+SNAPSHOT_INTERVAL = int(os.getenv('SNAPSHOT_INTERVAL', 3600)) # 1 Hour (a minute is fine with USE_PORTFOLIO_LEDGER)
 
 # RSI SETTINGS
 RSI_PERIOD = 14
@@ -37,16 +49,87 @@ RSI_LIMIT = 60 # Buy only if RSI < 60
 RSI_TIMEFRAME = KLINE_INTERVAL_5MINUTE
 TRADE_COOLDOWN = 300 # 5 Minutes
 
+# MULTI-SYMBOL (supervisor.py)
+# SYMBOLS=BTCUSDT,ETHUSDT in .env runs one worker per pair; SYMBOL is the default / single-pair bot
+SYMBOLS = [s.strip().upper() for s in os.getenv('SYMBOLS', SYMBOL).split(',') if s.strip()]
+# Per-symbol overrides: 'max_trade_qty' (base asset hard limit) and any bot_settings key
+# (e.g. 'grid_step_usdt', 'tp_usdt') whose USDT value only makes sense for one price scale
+SYMBOL_SETTINGS = {
+    'BTCUSDT': {'max_trade_qty': MAX_TRADE_QTY},
+}
+
+# MARKET DATA FEED
+# Price and candles come from the WebSocket feed; REST is only a fallback
+USE_MARKET_FEED = True
+MARKET_WS_URL = os.getenv('MARKET_WS_URL', BINANCE_WS_URL) # ws://localhost:8765 for replay_server.py
+FEED_MAX_AGE = 30 # Seconds without a trade before falling back to REST
+REGIME_KLINE_LIMIT = 300
+RSI_KLINE_LIMIT = 100
+
+# MARKET DATA STORE
+# Candle history is kept on disk (market_store.py); at startup the kline cache is
+# filled from it and only the candles since the last run are downloaded.
+USE_MARKET_STORE = True
+
+# TRADE JOURNAL
+# Fills go to a local SQLite journal and are flushed to Supabase in the background (trade_journal.py)
+# Requires add_client_key_column.sql. False = synchronous Supabase writes as before.
+USE_TRADE_JOURNAL = True
+
+# PAPER FILLS
+# PAPER orders go through an in-process matching engine (sim_exchange.py): book-depth
+# slippage, partial fills, order latency and LOT_SIZE/NOTIONAL filters.
+# False = fill the full quantity at the last price as before.
+USE_SIM_EXCHANGE = True
+PAPER_LATENCY_MS = 50
+
+# USER DATA STREAM (LIVE)
+# Fills, real commissions and balances from the Binance user data stream (user_stream.py).
+# fee_usdt is recorded from the actual commissions (also in trade_log: add_fee_usdt_column.sql)
+# and a commission paid in the bought asset is left out of the trade quantity.
+# False = REST responses and estimated fees as before. LIMIT_GRID starts the stream either way.
+USE_USER_STREAM = True
+USER_STREAM_FILL_WAIT = 2 # Seconds to wait for the fills of an order its REST response did not carry
+QUOTE_ASSET = 'USDT'
+
 # FEE SETTINGS
 # Set to True if you hold BNB and enabled "Use BNB for fees" on Binance (0.075%)
 # Set to False for standard USDT fees (0.1%)
 USE_BNB_FOR_FEES = True 
-TRADING_FEE_RATE = 0.00075 if USE_BNB_FOR_FEES else 0.001
+TRADING_FEE_RATE = strategy.FEE_RATE_BNB if USE_BNB_FOR_FEES else strategy.FEE_RATE_STANDARD
+MAKER_FEE_RATE = TRADING_FEE_RATE # Regular tier: maker == taker. Lower it on a VIP tier.
+
+# EXECUTION MODE
+# 'MARKET': MARKET buy when the loop finds the price in an empty level's bucket (default).
+# 'LIMIT_GRID': resting LIMIT buys on the GRID_ORDERS nearest empty levels below the price and
+# a LIMIT take profit per open trade, filled as maker (limit_grid.py). PAPER needs USE_SIM_EXCHANGE,
+# LIVE gets its fills from the user data stream (user_stream.py).
+EXECUTION_MODE = 'MARKET'
+GRID_ORDERS = 3
+
+# METRICS
+# Stage timings, Binance/Supabase request timings, orders, errors and zone usage on a local
+# Prometheus endpoint (metrics.py): http://127.0.0.1:METRICS_PORT/metrics. False = clients unwrapped, no endpoint.
+USE_METRICS = True
+METRICS_PORT = int(os.getenv('METRICS_PORT', metrics.METRICS_PORT))
+
+# PORTFOLIO LEDGER
+# Realized PnL, fees, position, peak equity and max drawdown per symbol, updated on every fill
+# and price tick (portfolio_ledger.py) and checkpointed to portfolio_state (add_portfolio_state_table.sql).
+# A snapshot is then one insert. False = capture_snapshot recomputes everything every SNAPSHOT_INTERVAL.
+USE_PORTFOLIO_LEDGER = True
+
+# READ MODEL
+# Price, zones, settings, open positions, ledger and recent trades served from this process on a local
+# endpoint (read_model.py): http://127.0.0.1:READ_MODEL_PORT/state?symbol=BTCUSDT, plus /subscribe for changes.
+# The dashboard and check scripts read it before opening their own clients. False = no endpoint.
+USE_READ_MODEL = True
+READ_MODEL_PORT = int(os.getenv('READ_MODEL_PORT', READ_MODEL_PORT))
 
 # Global State
-LAST_TRADE_TIME = 0
 LAST_SNAPSHOT_TIME = 0
-SECURED_TRADES = set() # Tracks IDs of trades that have hit > 50% TP
+market_feed = None # MarketDataFeed, started in start_bot()
+user_stream = None # UserDataStream (LIVE + LIMIT_GRID), started in start_limit_grid()
 
 # Load environment variables
 load_dotenv(override=True)
@@ -63,6 +146,70 @@ if not all([binance_api_key, binance_api_secret, supabase_url, supabase_key]):
 
 binance_client = Client(binance_api_key, binance_api_secret)
 supabase_client: SupabaseClient = create_client(supabase_url, supabase_key)
+if USE_METRICS:
+    # Every request timed and counted (metrics.py); attributes and constants pass through
+    binance_client = metrics.instrument_binance(binance_client)
+    supabase_client = metrics.instrument_supabase(supabase_client)
+
+# Settings & Active Zones: cached snapshot, reloaded on change notification or TTL
+# The constants above are only the defaults for missing bot_settings columns
+DEFAULT_SETTINGS = {
+    'rsi_limit': RSI_LIMIT,
+    'tp_usdt': TP_PROFIT,
+    'grid_step_usdt': GRID_STEP_PRICE,
+    'trade_cooldown': TRADE_COOLDOWN,
+    'trade_size_usdt': TRADE_SIZE_USDT,
+}
+config_cache = ConfigCache(SupabaseConfigSource(supabase_client), DEFAULT_SETTINGS)
+
+TRADE_TABLE = "paper_trade_log" if TRADING_MODE == 'PAPER' else "trade_log"
+trade_journal = TradeJournal(supabase_client) if USE_TRADE_JOURNAL else None
+read_model = ReadModel() if USE_READ_MODEL else None
+sim_exchange = SimExchange(PAPER_LATENCY_MS, maker_fee_rate=MAKER_FEE_RATE, taker_fee_rate=TRADING_FEE_RATE, client=binance_client) if USE_SIM_EXCHANGE and TRADING_MODE == 'PAPER' else None
+
+class SymbolState:
+    """
+    Everything the bot keeps per trading pair: open trades (position book),
+    grid occupancy, incremental indicators, trade cooldown and overrides.
+    """
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        overrides = dict(SYMBOL_SETTINGS.get(symbol, {}))
+        self.max_trade_qty = overrides.pop('max_trade_qty', None)
+        self.overrides = overrides
+        # Open trades: loaded once at startup, then kept in memory and written through to Supabase
+        self.position_book = PositionBook(supabase_client, TRADE_TABLE, symbol=symbol, journal=trade_journal)
+        self.grid_index = GridIndex() # Sorted grid levels + occupancy per level, synced from position_book
+        # Running totals, peak and drawdown for the snapshots, loaded in start_portfolio_ledger()
+        self.ledger = PortfolioLedger(supabase_client, symbol, TRADE_TABLE == "paper_trade_log", trade_journal) if USE_PORTFOLIO_LEDGER else None
+        self.indicator_engine = IndicatorEngine(regime_interval=KLINE_INTERVAL_1HOUR, rsi_interval=RSI_TIMEFRAME, rsi_window=RSI_PERIOD)
+        self.last_trade_time = 0
+        self.limit_grid = None # LimitGrid (EXECUTION_MODE = 'LIMIT_GRID'), see start_limit_grid()
+        self.last_rsi = 0.0 # Last iteration's RSI / regime, logged with fills of resting orders
+        self.last_regime = 'UNKNOWN'
+        self.exchange_balance = None # Base asset held on Binance (free + locked), from the user data stream
+        self.balance_drift = None
+
+    def apply_overrides(self, config):
+        """The iteration's config snapshot with this symbol's setting overrides applied."""
+        return config._replace(**self.overrides) if self.overrides else config
+
+SYMBOL_STATES = {}
+_symbol_states_lock = threading.Lock()
+
+def symbol_state(symbol=None):
+    symbol = (symbol or SYMBOL).upper()
+    with _symbol_states_lock:
+        if symbol not in SYMBOL_STATES:
+            SYMBOL_STATES[symbol] = SymbolState(symbol)
+        return SYMBOL_STATES[symbol]
+
+# Single-pair bot (start_bot / bot_engine.py) state
+position_book = symbol_state(SYMBOL).position_book
+SECURED_TRADES = position_book.secured # Tracks IDs of trades that have hit > 50% TP
+grid_index = symbol_state(SYMBOL).grid_index
+indicator_engine = symbol_state(SYMBOL).indicator_engine
 
 # --- Helpers ---
 
@@ -79,7 +226,7 @@ def send_trade_to_analysis(trade_data):
             payload = {
                 "trade_id": trade_data.get('id'),
                 "mode": TRADING_MODE, 
-                "pair": SYMBOL,
+                "pair": trade_data.get('symbol') or SYMBOL,
                 "entry_price": float(trade_data.get('entry_price', 0)),
                 "exit_price": float(trade_data.get('exit_price', 0) or 0),
                 "quantity": float(trade_data.get('quantity', 0)),
@@ -97,50 +244,46 @@ def send_trade_to_analysis(trade_data):
 
     threading.Thread(target=_send).start()
 
+_log_context = threading.local() # Symbol tag for log lines of supervisor workers
+
+def set_log_symbol(symbol):
+    _log_context.symbol = symbol
+
 def log(message):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"[{timestamp}] {message}")
+    tag = getattr(_log_context, 'symbol', None)
+    print(f"[{timestamp}] [{tag}] {message}" if tag else f"[{timestamp}] {message}")
+
+def get_kline_view(symbol, interval, limit):
+    """
+    Newest `limit` candles from the shared KlineCache (zero-copy NumPy view).
+    While the feed is streaming it keeps the cache current; otherwise only the
+    candles newer than the last stored one are fetched over REST.
+    """
+    feed_live = market_feed and market_feed.covers(symbol) and market_feed.get_price(max_age=FEED_MAX_AGE, symbol=symbol) is not None
+    if not feed_live or kline_cache.size(symbol, interval) < limit:
+        kline_cache.top_up(binance_client, symbol, interval)
+    return kline_cache.view(symbol, interval, limit)
 
 def analyze_market_regime(symbol):
     """
     Analyzes the market regime using EMA 200 and ADX 14 on 1h timeframe.
-    Returns: 'SIDEWAY', 'BULL_TREND', or 'BEAR_TREND'
+    Indicators are updated incrementally (only new candles are processed).
+    Returns: ('SIDEWAY' | 'BULL_TREND' | 'BEAR_TREND', adx)
     """
     try:
-        klines = binance_client.get_klines(symbol=symbol, interval=Client.KLINE_INTERVAL_1HOUR, limit=300)
-        if not klines:
-            return 'SIDEWAY'
-
-        # Parse Klines
-        closes = [float(k[4]) for k in klines]
-        highs = [float(k[2]) for k in klines]
-        lows = [float(k[3]) for k in klines]
-        
-        df = pd.DataFrame({
-            'high': highs,
-            'low': lows,
-            'close': closes
-        })
-
-        # Calculate Indicators
-        # EMA 200
-        df['ema200'] = ta.trend.EMAIndicator(close=df['close'], window=200).ema_indicator()
-        
-        # ADX 14
-        df['ADX_14'] = ta.trend.ADXIndicator(high=df['high'], low=df['low'], close=df['close'], window=14).adx()
-        
-        # Get latest values
-        current_close = df['close'].iloc[-1]
-        current_ema200 = df['ema200'].iloc[-1]
-        current_adx = df['ADX_14'].iloc[-1]
-        
-        # Logic
-        if current_adx < 25:
-            return 'SIDEWAY', current_adx
-        elif current_close > current_ema200:
-            return 'BULL_TREND', current_adx
-        else:
-            return 'BEAR_TREND', current_adx
+        candles = get_kline_view(symbol, Client.KLINE_INTERVAL_1HOUR, REGIME_KLINE_LIMIT)
+        if len(candles.close) == 0:
+            return 'SIDEWAY', 0
+
+        engine = symbol_state(symbol).indicator_engine
+        engine.sync_view(Client.KLINE_INTERVAL_1HOUR, candles)
+
+        # Logic: ADX < 25 -> SIDEWAY, else trend direction from Close vs EMA 200
+        result = engine.regime(adx_threshold=25)
+        if result is None:
+            return 'SIDEWAY', 0 # Not enough history yet
+        return result
             
     except Exception as e:
         log(f"⚠️ Error analyzing market regime: {e}")
@@ -156,10 +299,18 @@ def get_symbol_step_size(symbol):
         log(f"⚠️ Error fetching step size: {e}")
     return 0.00001
 
-def execute_mock_order(side, quantity, price):
+def execute_mock_order(side, quantity, price, symbol=SYMBOL):
     """Simulates a Binance order execution for Paper Trading."""
+    if sim_exchange:
+        # The feed keeps the simulated book current; without it, quote around the last price
+        if not (market_feed and market_feed.covers(symbol) and market_feed.get_book(symbol)[0]):
+            sim_exchange.on_price(symbol, price)
+        order = sim_exchange.create_order(symbol=symbol, side=side, type=ORDER_TYPE_MARKET, quantity=quantity)
+        if float(order['executedQty']) < quantity:
+            log(f"⚠️ PAPER {side} partially filled: {order['executedQty']} / {quantity} ({order['status']})")
+        return order
     return {
-        'symbol': SYMBOL,
+        'symbol': symbol,
         'orderId': f"paper_{int(time.time()*1000)}",
         'transactTime': int(time.time() * 1000),
         'price': str(price),
@@ -172,10 +323,23 @@ def execute_mock_order(side, quantity, price):
     }
 
 def round_step_size(quantity, step_size):
-    precision = int(round(-math.log(step_size, 10), 0))
-    return float(round(quantity, precision))
+    return strategy.round_step_size(quantity, step_size)
 
 def get_market_price(symbol):
+    price = _market_price(symbol)
+    ledger = symbol_state(symbol).ledger
+    if price and ledger:
+        ledger.on_price(price) # Every price the loop sees also marks the portfolio
+    if price and read_model:
+        read_model.on_trade(symbol, price)
+    return price
+
+def _market_price(symbol):
+    if market_feed and market_feed.covers(symbol):
+        price = market_feed.get_price(max_age=FEED_MAX_AGE, symbol=symbol)
+        if price:
+            return price
+        log("⚠️ Market feed stale, falling back to REST price.")
     try:
         ticker = binance_client.get_symbol_ticker(symbol=symbol)
         return float(ticker['price'])
@@ -183,23 +347,14 @@ def get_market_price(symbol):
         log(f"❌ Error fetching price: {e}")
         return None
 
-def calculate_rsi(symbol, period=14):
-    """Calculates the RSI for a given symbol."""
+def calculate_rsi(symbol):
+    """Calculates the Wilder RSI (RSI_PERIOD) for a given symbol, incrementally."""
     try:
-        klines = binance_client.get_klines(symbol=symbol, interval=RSI_TIMEFRAME, limit=100)
-        closes = [float(k[4]) for k in klines]
-        df = pd.DataFrame(closes, columns=['close'])
-        
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        
-        # Simple RSI calculation (SMA based) - sufficient for bot logic
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
-        
-        # Return the last valid RSI value
-        return df['rsi'].iloc[-1]
+        candles = get_kline_view(symbol, RSI_TIMEFRAME, RSI_KLINE_LIMIT)
+        engine = symbol_state(symbol).indicator_engine
+        engine.sync_view(RSI_TIMEFRAME, candles)
+        rsi = engine.rsi.value
+        return rsi if rsi is not None else 50.0
     except Exception as e:
         log(f"⚠️ Error calculating RSI: {e}")
         return 50.0 # Neutral fallback
@@ -229,387 +384,662 @@ def fetch_active_zones():
         log(f"❌ Error fetching active zones: {e}")
         return []
 
-def generate_grid_levels(zone_config):
+def generate_grid_levels(zone_config, step=None):
     """
     Generates a list of grid prices within the zone.
-    Range: [price_low, price_high] with step GRID_STEP_PRICE.
+    Range: [price_low, price_high] with step `step` (default GRID_STEP_PRICE).
     """
-    low = float(zone_config['price_low'])
-    high = float(zone_config['price_high'])
-    
-    levels = []
-    current_level = low
-    while current_level <= high:
-        levels.append(current_level)
-        current_level += GRID_STEP_PRICE
-        
-    return levels
+    return strategy.generate_grid_levels(zone_config, step or GRID_STEP_PRICE)
 
-def get_open_trades():
-    """Fetches all OPEN trades from Supabase."""
-    table_name = "paper_trade_log" if TRADING_MODE == 'PAPER' else "trade_log"
+def get_open_trades(symbol=None):
+    """OPEN trades from the in-memory position book (loads it from Supabase on first use)."""
+    book = symbol_state(symbol).position_book
     try:
-        # Note: Schema might not have 'symbol', we assume all trades are for this system (BTCUSDT)
-        response = supabase_client.table(table_name)\
-            .select("*")\
-            .eq("status", "OPEN")\
-            .execute()
-        return response.data
+        if not book.loaded:
+            book.load()
+        return book.open_trades()
     except Exception as e:
         log(f"❌ Error fetching open trades: {e}")
         return []
 
-def execute_buy(zone, grid_price, market_price, step_size, current_rsi):
+def execute_buy(zone, grid_price, market_price, step_size, current_rsi, config=None, symbol=SYMBOL):
     """
     Executes a BUY order (Limit or Market).
+    `config` is the BotConfig snapshot of the current iteration.
     """
-    global LAST_TRADE_TIME
+    state = symbol_state(symbol)
+    config = config or state.apply_overrides(config_cache.get())
     
-    # Check Cooldown
-    if time.time() - LAST_TRADE_TIME < TRADE_COOLDOWN:
-        log(f"⏳ Trade Cooldown Active. Skipping BUY. ({int(TRADE_COOLDOWN - (time.time() - LAST_TRADE_TIME))}s left)")
+    # Check Cooldown (per symbol)
+    if time.time() - state.last_trade_time < config.trade_cooldown:
+        log(f"⏳ Trade Cooldown Active. Skipping BUY. ({int(config.trade_cooldown - (time.time() - state.last_trade_time))}s left)")
         return
 
-    trade_size_usdt = TRADE_SIZE_USDT
-    qty = round_step_size(trade_size_usdt / market_price, step_size)
-    
-    if qty > MAX_TRADE_QTY:
-        qty = MAX_TRADE_QTY
+    trade_size_usdt = config.trade_size_usdt
+    qty = strategy.order_quantity(trade_size_usdt, market_price, step_size, state.max_trade_qty)
         
-    log(f"[BUY SIGNAL] Grid: {grid_price} | Price: {market_price} | Qty: {qty} | RSI: {current_rsi:.2f}")
+    log(f"[BUY SIGNAL] {symbol} Grid: {grid_price} | Price: {market_price} | Qty: {qty} | RSI: {current_rsi:.2f}")
 
     if TRADING_MODE == 'DRY_RUN':
-        log(f"💊 [DRY RUN] Would BUY {qty} BTC @ {market_price}")
-        LAST_TRADE_TIME = time.time() # Update cooldown even in Dry Run
+        log(f"💊 [DRY RUN] Would BUY {qty} {symbol} @ {market_price}")
+        state.last_trade_time = time.time() # Update cooldown even in Dry Run
         return
 
+    if TRADING_MODE == 'LIVE' and user_stream:
+        balance = user_stream.balance(QUOTE_ASSET)
+        if balance and balance[0] < trade_size_usdt:
+            log(f"⚠️ Not enough {QUOTE_ASSET} on Binance ({balance[0]:.2f} free). Skipping BUY.")
+            return
+
     try:
         order = None
         if TRADING_MODE == 'LIVE':
             # Execute Real Order
             order = binance_client.create_order(
-                symbol=SYMBOL,
+                symbol=symbol,
                 side=SIDE_BUY,
                 type=ORDER_TYPE_MARKET,
                 quantity=qty
             )
         elif TRADING_MODE == 'PAPER':
             # Execute Mock Order
-            order = execute_mock_order(SIDE_BUY, qty, market_price)
-        
-        # Update Global State
-        LAST_TRADE_TIME = time.time()
-        
-        # Log to Supabase
-        cummulative_quote_qty = float(order['cummulativeQuoteQty'])
-        executed_qty = float(order['executedQty'])
-        avg_price = cummulative_quote_qty / executed_qty if executed_qty > 0 else market_price
-
-        # Specific Logic for Paper vs Live Table
-        table_name = "paper_trade_log" if TRADING_MODE == 'PAPER' else "trade_log"
+            order = execute_mock_order(SIDE_BUY, qty, market_price, symbol)
         
-        data = {
-            "order_type": "BUY",
-            "zone_name": zone['zone_name'],
-            "entry_price": avg_price,
-            "quantity": executed_qty,
-            "status": "OPEN",
-            "rsi_entry": float(current_rsi), # NEW: Save RSI
-            "notes": f"Grid Level {grid_price}. OrderID: {order['orderId']}" 
-        }
-
-        if TRADING_MODE == 'PAPER':
-            # Add fields specific to paper_trade_log
-            data["total_usdt"] = cummulative_quote_qty
-            data["fee_usdt"] = cummulative_quote_qty * TRADING_FEE_RATE
-
-        supabase_client.table(table_name).insert(data).execute()
-        log(f"[OK] {TRADING_MODE} BUY Executed & Logged: {executed_qty} BTC @ {avg_price}")
+        # Update Cooldown
+        state.last_trade_time = time.time()
+        record_buy(zone, grid_price, order, market_price, current_rsi, symbol)
 
     except Exception as e:
         log(f"❌ {TRADING_MODE} BUY Failure: {e}")
+        metrics.errors.inc(symbol=symbol, where='buy')
+
+def record_buy(zone, grid_price, order, market_price, current_rsi, symbol=SYMBOL):
+    """Logs a filled BUY order as an OPEN trade (position book -> journal -> Supabase). Returns the trade, or None if nothing filled."""
+    state = symbol_state(symbol)
+    cummulative_quote_qty = float(order['cummulativeQuoteQty'])
+    executed_qty = float(order['executedQty'])
+    if executed_qty <= 0:
+        log(f"⚠️ {TRADING_MODE} BUY not filled ({order['status']}). Nothing to log.")
+        return None
+    avg_price = cummulative_quote_qty / executed_qty if executed_qty > 0 else market_price
+    fees = order_fees(order, symbol, avg_price)
+    if fees and fees[1]:
+        executed_qty -= fees[1] # Commission taken from the bought asset: not held, not sold later
+
+    data = {
+        "order_type": "BUY",
+        "zone_name": zone['zone_name'],
+        "entry_price": avg_price,
+        "quantity": executed_qty,
+        "status": "OPEN",
+        "rsi_entry": float(current_rsi), # NEW: Save RSI
+        "notes": f"Grid Level {grid_price}. OrderID: {order['orderId']}" + (f" ({order['type']})" if order.get('type') == 'LIMIT' else "")
+    }
 
-def execute_sell(trade, market_price, step_size, current_rsi, market_regime='UNKNOWN'):
-    """Executes a SELL (Take Profit) order."""
-    log(f"[SELL SIGNAL] Entry: {trade['entry_price']} | Price: {market_price} | Target: {float(trade['entry_price']) + TP_PROFIT}")
+    if TRADING_MODE == 'PAPER':
+        # Add fields specific to paper_trade_log
+        data["total_usdt"] = cummulative_quote_qty
+        data["fee_usdt"] = cummulative_quote_qty * (MAKER_FEE_RATE if order.get('type') == 'LIMIT' else TRADING_FEE_RATE)
+    if fees:
+        data["fee_usdt"] = fees[0] # Actual commission
+
+    # Journal first (Supabase is written in the background), then the in-memory book
+    trade = state.position_book.open(data)
+    if state.ledger:
+        state.ledger.on_open(trade)
+    if read_model:
+        read_model.on_fill(symbol, trade)
+    metrics.orders.inc(symbol=symbol, side='BUY', mode=TRADING_MODE)
+    log(f"[OK] {TRADING_MODE} BUY Executed & Logged: {executed_qty} {symbol} @ {avg_price}")
+    return trade
+
+def execute_sell(trade, market_price, step_size, current_rsi, market_regime='UNKNOWN', config=None, prior_fill=None):
+    """
+    Executes a SELL (Take Profit) order.
+    `prior_fill` (qty, quote): part of the position already sold by a cancelled TP order (limit grid mode).
+    """
+    symbol = trade.get('symbol') or SYMBOL
+    state = symbol_state(symbol)
+    config = config or state.apply_overrides(config_cache.get())
+
+    grid = state.limit_grid
+    if grid and prior_fill is None:
+        # Resting TP order: cancel it first, and keep the grid from placing a new one until the trade is closed
+        with grid.lock:
+            prior_fill = grid.cancel_tp(trade['id'])
+            if prior_fill is None:
+                log(f"[OK] Trade {trade['id']} was closed by its TP order meanwhile.")
+                return
+            return execute_sell(trade, market_price, step_size, current_rsi, market_regime, config, prior_fill)
+
+    log(f"[SELL SIGNAL] Entry: {trade['entry_price']} | Price: {market_price} | Target: {float(trade['entry_price']) + config.tp_usdt}")
     
     if TRADING_MODE == 'DRY_RUN':
-        log(f"💊 [DRY RUN] Would SELL {trade['quantity']} BTC @ {market_price}. PnL: ~{(market_price - float(trade['entry_price'])) * float(trade['quantity']):.2f} USDT")
+        log(f"💊 [DRY RUN] Would SELL {trade['quantity']} {symbol} @ {market_price}. PnL: ~{(market_price - float(trade['entry_price'])) * float(trade['quantity']):.2f} USDT")
         return
 
     try:
         qty = float(trade['quantity'])
+        if prior_fill and prior_fill[0]:
+            qty = strategy.round_step_size(qty - prior_fill[0], step_size)
         order = None
 
         if TRADING_MODE == 'LIVE':
             # Execute Real Order
             order = binance_client.create_order(
-                symbol=SYMBOL,
+                symbol=symbol,
                 side=SIDE_SELL,
                 type=ORDER_TYPE_MARKET,
                 quantity=qty
             )
         elif TRADING_MODE == 'PAPER':
              # Execute Mock Order
-            order = execute_mock_order(SIDE_SELL, qty, market_price)
-        
-        # Log update to Supabase
-        cummulative_quote_qty = float(order['cummulativeQuoteQty'])
-        executed_qty = float(order['executedQty'])
-        exit_price = cummulative_quote_qty / executed_qty if executed_qty > 0 else market_price
-        
-        # Calculate Trade Economics
-        entry_price_val = float(trade['entry_price'])
-        buy_value = entry_price_val * executed_qty
-        sell_value = exit_price * executed_qty
-        
-        # Estimate Fees (Roundtrip: Buy + Sell)
-        estimated_total_fee = (buy_value + sell_value) * TRADING_FEE_RATE
-        
-        # Net Profit
-        net_pnl = sell_value - buy_value - estimated_total_fee
+            order = execute_mock_order(SIDE_SELL, qty, market_price, symbol)
         
-        pnl_percent = ((exit_price - entry_price_val) / entry_price_val) * 100
-
-        update_data = {
-            "exit_price": exit_price,
-            "exit_at": datetime.now(timezone.utc).isoformat(),
-            "pnl_usdt": net_pnl,  # Storing Net PnL
-            "pnl_percent": pnl_percent,
-            "status": "CLOSED",
-            "rsi_exit": float(current_rsi), # NEW: Save RSI Exit
-            "notes": f"{trade.get('notes', '')} | Closed at {exit_price} | Net PnL: {net_pnl:.2f}"
-        }
-
-        table_name = "paper_trade_log" if TRADING_MODE == 'PAPER' else "trade_log"
-        
-        if TRADING_MODE == 'PAPER':
-            # Update fee_usdt for paper trade
-            # In Buy order we only stored Buy Fee. Now we need to update it to Total Fee (Buy + Sell).
-            # But wait, the schema says: "Update fee_usdt (accumulate Buy Fee + Sell Fee)."
-            # So if we stored buy fee, we should add sell fee? Or just overwrite with total estimated fee?
-            # Re-reading: "Values: ... fee_usdt".
-            # If I overwrite it with `estimated_total_fee` (which is Buy+Sell), that is correct.
-            update_data["fee_usdt"] = estimated_total_fee
-
-        supabase_client.table(table_name).update(update_data).eq("id", trade['id']).execute()
-        
-        log(f"[SUCCESS] {TRADING_MODE} Trade Closed! Gross: {sell_value - buy_value:.2f} | Net PnL: {net_pnl:.2f} | Fee: {estimated_total_fee:.2f}")
+        record_sell(trade, order, market_price, current_rsi, market_regime, prior_fill)
+
+    except Exception as e:
+        log(f"❌ {TRADING_MODE} SELL Failure: {e}")
+        metrics.errors.inc(symbol=symbol, where='sell')
+
+def record_sell(trade, order, market_price, current_rsi, market_regime='UNKNOWN', prior_fill=None):
+    """Logs a filled SELL order as the close of `trade` (net PnL, fees, AI analysis). Returns False if nothing filled."""
+    state = symbol_state(trade.get('symbol') or SYMBOL)
+    # Log update to Supabase
+    cummulative_quote_qty = float(order['cummulativeQuoteQty'])
+    executed_qty = float(order['executedQty'])
+    if prior_fill:
+        executed_qty += prior_fill[0]
+        cummulative_quote_qty += prior_fill[1]
+    if executed_qty <= 0:
+        log(f"⚠️ {TRADING_MODE} SELL not filled ({order['status']}). Trade stays open.")
+        return False
+    exit_price = cummulative_quote_qty / executed_qty if executed_qty > 0 else market_price
+    
+    # Calculate Trade Economics (Net PnL after estimated Buy + Sell fees)
+    entry_price_val = float(trade['entry_price'])
+    buy_value = entry_price_val * executed_qty
+    sell_value = exit_price * executed_qty
+    fee_rate = MAKER_FEE_RATE if order.get('type') == 'LIMIT' else TRADING_FEE_RATE
+    net_pnl, total_fee, pnl_percent = strategy.close_economics(entry_price_val, exit_price, executed_qty, fee_rate)
+    fees = order_fees(order, trade.get('symbol') or SYMBOL, exit_price)
+    if fees:
+        # Actual commissions: the buy's as recorded (estimated for trades without one) + this sell's
+        buy_fee = trade.get('fee_usdt')
+        if buy_fee is None:
+            buy_fee = buy_value * fee_rate
+        prior_fee = prior_fill[1] * MAKER_FEE_RATE if prior_fill else 0.0
+        total_fee = buy_fee + fees[0] + prior_fee
+        net_pnl = sell_value - buy_value - total_fee
+
+    update_data = {
+        "exit_price": exit_price,
+        "exit_at": datetime.now(timezone.utc).isoformat(),
+        "pnl_usdt": net_pnl,  # Storing Net PnL
+        "pnl_percent": pnl_percent,
+        "status": "CLOSED",
+        "rsi_exit": float(current_rsi), # NEW: Save RSI Exit
+        "notes": f"{trade.get('notes', '')} | Closed at {exit_price} | Net PnL: {net_pnl:.2f}"
+    }
+
+    if TRADING_MODE == 'PAPER' or fees:
+        # Update fee_usdt for paper trade
+        # In Buy order we only stored Buy Fee. Now we need to update it to Total Fee (Buy + Sell).
+        # But wait, the schema says: "Update fee_usdt (accumulate Buy Fee + Sell Fee)."
+        # So if we stored buy fee, we should add sell fee? Or just overwrite with total estimated fee?
+        # Re-reading: "Values: ... fee_usdt".
+        # If I overwrite it with `total_fee` (which is Buy+Sell), that is correct.
+        update_data["fee_usdt"] = total_fee
 
-        # Trigger AI Analysis
+    # Trigger AI Analysis once the close is in Supabase (n8n writes the analysis back by DB id)
+    def _analyze(row):
         try:
             completed_trade_data = trade.copy()
             completed_trade_data.update(update_data)
+            completed_trade_data.update(row or {})
+            if not row:
+                completed_trade_data['id'] = trade.get('db_id') or trade['id']
             completed_trade_data['market_regime'] = market_regime
             send_trade_to_analysis(completed_trade_data)
         except Exception:
             pass # Creating payload failed, ignore
 
-    except Exception as e:
-        log(f"❌ {TRADING_MODE} SELL Failure: {e}")
-
-    except Exception as e:
-        log(f"❌ {TRADING_MODE} SELL Failure: {e}")
+    # Journaled (or written through): the trade leaves the book right away
+    closed = state.position_book.close(trade['id'], update_data, on_flushed=_analyze)
+    if state.ledger and closed:
+        state.ledger.on_close(closed, update_data)
+    if read_model and closed:
+        read_model.on_fill(state.symbol, dict(closed, **update_data))
+    metrics.orders.inc(symbol=state.symbol, side='SELL', mode=TRADING_MODE)
+    
+    log(f"[SUCCESS] {TRADING_MODE} Trade Closed! Gross: {sell_value - buy_value:.2f} | Net PnL: {net_pnl:.2f} | Fee: {total_fee:.2f}")
+    return True
 
 # --- Main Loop ---
 
-def start_bot():
-    global RSI_LIMIT, TP_PROFIT, GRID_STEP_PRICE, TRADE_COOLDOWN, TRADE_SIZE_USDT, SECURED_TRADES, LAST_SNAPSHOT_TIME
+def start_trade_journal():
+    """Starts the background flusher; fills left over from the last run are replayed first."""
+    if trade_journal:
+        trade_journal.start()
+
+def warm_up_from_store(symbols=None):
+    """Fills the kline cache from the local store (synced first, so only new candles are downloaded)."""
+    if not USE_MARKET_STORE:
+        return
+    history = {Client.KLINE_INTERVAL_1HOUR: REGIME_KLINE_LIMIT, RSI_TIMEFRAME: RSI_KLINE_LIMIT}
+    for symbol in symbols or [SYMBOL]:
+        for interval, limit in history.items():
+            try:
+                step = INTERVAL_MS[interval]
+                market_store.sync(binance_client, symbol, interval, int(time.time() * 1000) - (limit + 1) * step)
+                v = market_store.last(symbol, interval, limit)
+                rows = list(zip(v.open_time, v.open, v.high, v.low, v.close, v.volume, v.close_time))
+                kline_cache.upsert_many(symbol, interval, rows)
+                log(f"[STORE] {symbol} {interval}: {len(rows)} candles loaded from the market data store")
+            except Exception as e:
+                log(f"⚠️ Market store warm-up failed for {symbol} {interval}: {e}")
+
+def start_metrics():
+    """Serves the Prometheus endpoint (once per process)."""
+    if USE_METRICS:
+        metrics.start_server(METRICS_PORT)
+
+def start_config_watch():
+    """Reload settings/zones as soon as they change (marker file from dashboard + Supabase Realtime)."""
+    config_cache.watch_marker()
+    config_cache.watch_realtime(supabase_url, supabase_key)
+
+def start_market_feed(symbols=None):
+    """Starts the WebSocket feed that keeps price and candles in memory (one connection for all symbols)."""
+    global market_feed
+    if not USE_MARKET_FEED:
+        return
+    market_feed = MarketDataFeed(
+        symbols or SYMBOL,
+        history={Client.KLINE_INTERVAL_1HOUR: REGIME_KLINE_LIMIT, RSI_TIMEFRAME: RSI_KLINE_LIMIT},
+        rest_client=binance_client,
+        ws_url=MARKET_WS_URL,
+        cache=kline_cache
+    )
+    if sim_exchange:
+        market_feed.listeners.append(sim_exchange)
+    market_feed.start()
+    if not market_feed.wait_ready(15):
+        log("⚠️ Market feed not ready yet, using REST until it catches up.")
+
+def start_portfolio_ledger(symbols=None):
+    """Seeds each symbol's ledger (after the position book and journal) and marks it on every feed trade."""
+    if not USE_PORTFOLIO_LEDGER:
+        return
+    for symbol in symbols or [SYMBOL]:
+        ledger = symbol_state(symbol).ledger
+        ledger.load()
+        if market_feed:
+            market_feed.listeners.append(ledger)
+
+def take_snapshot(symbol=SYMBOL):
+    """Portfolio snapshot of `symbol`: one insert from the ledger, or the full capture_snapshot without one."""
+    ledger = symbol_state(symbol).ledger
+    if ledger and not ledger.loaded:
+        ledger.load() # Failed at startup: retry, else recompute below
+    if ledger and ledger.loaded:
+        get_market_price(symbol) # Marks the ledger
+        ledger.write_snapshot()
+    else:
+        capture_snapshot(supabase_client, binance_client, mode=TRADING_MODE, symbol=symbol)
+
+def checkpoint_portfolio(state):
+    """Every iteration: ledger resync (when due or drifted from the position book) and checkpoint (when changed)."""
+    if state.ledger and state.ledger.loaded:
+        state.ledger.maybe_checkpoint(state.position_book.count())
+    if read_model:
+        # Reconciles and resyncs change the book and the ledger without a fill
+        read_model.observe('positions', state.symbol, state.position_book.version)
+        if state.ledger:
+            read_model.observe('ledger', state.symbol, (state.ledger.open_count, state.ledger.realized_pnl, state.ledger.fees_paid))
+
+def start_read_model(symbols=None):
+    """Serves the bot's in-memory state (after the position books, feed and ledgers are up) and seeds the recent trades."""
+    if not read_model:
+        return
+    symbols = symbols or [SYMBOL]
+    read_model.symbols.update(symbols)
+    read_model.provide('zones', lambda symbol: config_cache.get().zones_for(symbol))
+    read_model.provide('settings', read_model_settings)
+    read_model.provide('positions', lambda symbol: SYMBOL_STATES[symbol].position_book.open_trades())
+    read_model.provide('ledger', read_model_ledger)
+    read_model.provide('price', get_market_price) # Until the first tick
+    for symbol in symbols:
+        try:
+            res = supabase_client.table(TRADE_TABLE).select("*").eq("symbol", symbol)\
+                .order("id", desc=True).limit(read_model.recent_trades).execute()
+            read_model.seed_trades(symbol, [normalize_trade(row) for row in reversed(res.data)])
+        except Exception as e:
+            log(f"⚠️ Read model: recent trades of {symbol} not loaded: {e}")
+    config_cache.listeners.append(read_model.on_config)
+    if market_feed:
+        market_feed.listeners.append(read_model)
+    serve_read_model(read_model, READ_MODEL_PORT)
+
+def read_model_settings(symbol):
+    config = SYMBOL_STATES[symbol].apply_overrides(config_cache.get())
+    settings = {k: v for k, v in config._asdict().items() if k not in ('zones', 'zone_indexes')}
+    settings['trading_mode'] = TRADING_MODE # Which trade table `positions` / `trades` come from
+    return settings
+
+def read_model_ledger(symbol):
+    ledger = SYMBOL_STATES[symbol].ledger
+    return ledger.snapshot_row() if ledger and ledger.loaded else None
+
+def start_user_stream():
+    """LIVE: order fills, commissions and balances over the Binance user data stream."""
+    global user_stream
+    if TRADING_MODE != 'LIVE' or user_stream or not (USE_USER_STREAM or EXECUTION_MODE == 'LIMIT_GRID'):
+        return
+    user_stream = UserDataStream(binance_client)
+    user_stream.listeners.append(on_account_update)
+    user_stream.start()
+
+def on_account_update(event):
+    """outboundAccountPosition: the base asset balance of every traded symbol, for check_balance_drift()."""
+    if event.get('e') != 'outboundAccountPosition':
+        return
+    balances = {b['a']: float(b['f']) + float(b['l']) for b in event.get('B', [])}
+    for symbol, state in list(SYMBOL_STATES.items()):
+        held = balances.get(symbol[:-len(QUOTE_ASSET)])
+        if held is not None:
+            state.exchange_balance = held
+
+def check_balance_drift(state):
+    """Warns (once per change) when Binance holds less of the symbol's asset than its open trades, e.g. sold outside the bot."""
+    if state.exchange_balance is None:
+        return
+    needed = sum(t['quantity'] for t in state.position_book.open_trades())
+    drift = (state.exchange_balance, needed) if state.exchange_balance < needed * (1 - 1e-6) else None
+    if drift and drift != state.balance_drift:
+        log(f"⚠️ Binance holds {state.exchange_balance:.8f} {state.symbol[:-len(QUOTE_ASSET)]}, open trades need {needed:.8f}.")
+    state.balance_drift = drift
+
+def order_fees(order, symbol, price):
+    """
+    Actual commission of a filled order: (fee_usdt, qty paid in the base asset).
+    From the order's fills (FULL REST response, simulated exchange) or the user
+    data stream; None when unknown, so the fee is estimated as before.
+    """
+    if TRADING_MODE == 'LIVE' and not USE_USER_STREAM:
+        return None # trade_log may not have fee_usdt (add_fee_usdt_column.sql)
+    fills = order.get('fills')
+    if not fills and sim_exchange and TRADING_MODE == 'PAPER':
+        try:
+            fills = sim_exchange.get_order(symbol, order['orderId'])['fills']
+        except Exception:
+            fills = None
+    if fills:
+        commissions = {}
+        for f in fills:
+            commissions[f['commissionAsset']] = commissions.get(f['commissionAsset'], 0.0) + float(f['commission'])
+    elif user_stream and TRADING_MODE == 'LIVE':
+        tracked = user_stream.order(order['orderId'], wait=USER_STREAM_FILL_WAIT)
+        if not tracked:
+            return None
+        commissions = tracked['commissions']
+    else:
+        return None
+
+    base = symbol[:-len(QUOTE_ASSET)]
+    fee_usdt = 0.0
+    for asset, qty in commissions.items():
+        if asset == QUOTE_ASSET:
+            fee_usdt += qty
+        elif asset == base:
+            fee_usdt += qty * price
+        elif qty:
+            asset_price = _market_price(f"{asset}{QUOTE_ASSET}") # e.g. BNB; not get_market_price(): no SymbolState, ledger mark or read model price for it
+            if not asset_price:
+                return None
+            fee_usdt += qty * asset_price
+    return fee_usdt, commissions.get(base, 0.0)
+
+def start_limit_grid(symbols=None):
+    """EXECUTION_MODE = 'LIMIT_GRID': one LimitGrid per symbol, filled by the simulated exchange (PAPER) or Binance (LIVE)."""
+    if EXECUTION_MODE != 'LIMIT_GRID':
+        return
+    if TRADING_MODE == 'LIVE':
+        exchange = binance_client
+    elif sim_exchange:
+        exchange = sim_exchange
+    else:
+        log(f"⚠️ LIMIT_GRID needs LIVE, or PAPER with USE_SIM_EXCHANGE ({TRADING_MODE}). Using MARKET orders.")
+        return
+
+    listeners = []
+    for symbol in symbols or [SYMBOL]:
+        state = symbol_state(symbol)
+        filters = sim_exchange.filters(symbol) if exchange is sim_exchange else filters_from_info(binance_client.get_symbol_info(symbol))
+        state.limit_grid = LimitGrid(
+            exchange, symbol, state.position_book, filters,
+            on_buy_filled=lambda buy, order, symbol=symbol: record_buy(buy['zone_row'], buy['level'], order, buy['price'], buy['rsi'], symbol),
+            on_tp_filled=on_tp_filled,
+            orders=GRID_ORDERS
+        )
+        listeners.append(state.limit_grid.on_execution_report)
+
+    if exchange is sim_exchange:
+        sim_exchange.listeners.extend(listeners)
+    else:
+        start_user_stream()
+        user_stream.listeners.extend(listeners)
+        user_stream.on_connect.extend(symbol_state(s).limit_grid.poll for s in symbols or [SYMBOL])
+    for symbol in symbols or [SYMBOL]:
+        symbol_state(symbol).limit_grid.start()
+    log(f"[GRID] LIMIT_GRID mode: {GRID_ORDERS} resting buys per symbol + TP orders ({TRADING_MODE})")
+
+def on_tp_filled(trade, order, prior):
+    """A resting TP order filled: the trade is closed like a Take Profit of the loop."""
+    state = symbol_state(trade.get('symbol') or SYMBOL)
+    price = float(trade['entry_price']) + state.limit_grid.tp_usdt
+    if record_sell(trade, order, price, state.last_rsi, state.last_regime, prior if prior[0] else None):
+        state.position_book.secured.discard(trade['id'])
+
+def select_active_zone(config, current_price, symbol=SYMBOL):
+    """
+    Picks the zone to trade from the snapshot's ZoneIndex for `symbol` (O(log n), overlaps allowed).
+    With overlapping zones the first one in config order wins, as before.
+    """
+    zone_index = config.zone_index(symbol)
+    zones = zone_index.containing(current_price)
+    if not zones:
+        distance, edge = zone_index.nearest_edge(current_price)
+        log(f"⚠️ Price {current_price} is OUTSIDE all Active Zones. Trading Paused." + (f" Nearest zone edge: {edge} (${distance:,.2f} away)" if edge is not None else ""))
+        return None
+    active_zone = zones[0]
+    overlap = f" | Overlapping: {', '.join(z['zone_name'] for z in zones[1:])}" if len(zones) > 1 else ""
+    log(f"[OK] Active Zone Selected: {active_zone['zone_name']} ({float(active_zone['price_low'])}-{float(active_zone['price_high'])}){overlap}")
+    return active_zone
+
+def check_buy(active_zone, book, current_price, current_rsi, market_regime, config, grid=None):
+    """
+    Decides whether to BUY on this iteration.
+    Zone usage comes from the position book, the bucket/occupancy lookup from grid_index.
+    Returns: (grid_level or None, current_zone_invested)
+    """
+    current_zone_invested = book.zone_invested(active_zone['zone_name'])
+    metrics.record_zone(book.symbol or SYMBOL, active_zone, current_zone_invested)
+
+    log(f"[STATUS] Status: {book.count()} Open Trades | Zone Usage: ${current_zone_invested:,.2f} / ${float(active_zone['capital_allocated']):,.2f}")
+
+    # --- Permission Check (Pre-Loop) ---
+    can_buy, buy_block_reason = strategy.check_buy_permission(
+        active_zone, current_zone_invested, config.trade_size_usdt, current_rsi, config.rsi_limit, market_regime
+    )
+
+    # Log Permission Status ONCE
+    if not can_buy:
+        log(f"[STOP] Trading Paused: {buy_block_reason}")
+        return None, current_zone_invested
+
+    # Execute Grid Checks ONLY if allowed
+    # Bucket Logic: (Grid - Step) < Price <= Grid, and level is empty (O(log n) via grid_index)
+    level = (grid or grid_index).find_buy_level(active_zone, current_price, config.grid_step_usdt, book)
+    return level, current_zone_invested
+
+def sync_limit_grid(state, config, active_zone=None, current_price=None, current_rsi=None, market_regime=None):
+    """
+    LIMIT_GRID counterpart of check_buy/execute_buy: same permission gate, then the
+    resting orders are brought in line. No active zone (paused, outside all zones)
+    cancels the resting buys; the TP orders of open trades stay.
+    """
+    if current_rsi is not None:
+        state.last_rsi, state.last_regime = current_rsi, market_regime
+    can_buy = False
+    if active_zone:
+        book = state.position_book
+        current_zone_invested = book.zone_invested(active_zone['zone_name'])
+        metrics.record_zone(state.symbol, active_zone, current_zone_invested)
+        log(f"[STATUS] Status: {book.count()} Open Trades | Zone Usage: ${current_zone_invested:,.2f} / ${float(active_zone['capital_allocated']):,.2f}")
+        can_buy, buy_block_reason = strategy.check_buy_permission(
+            active_zone, current_zone_invested, config.trade_size_usdt, current_rsi, config.rsi_limit, market_regime
+        )
+        if not can_buy:
+            log(f"[STOP] Trading Paused: {buy_block_reason} (resting buys cancelled)")
+    if sim_exchange and current_price and not (market_feed and market_feed.covers(state.symbol)):
+        sim_exchange.on_price(state.symbol, current_price) # No feed: resting PAPER orders fill against the polled price
+    state.limit_grid.sync(active_zone, current_price, config, can_buy, state.grid_index, state.last_rsi, state.max_trade_qty)
+
+def check_sells(open_trades, current_price, config, book=None, limit_grid=None):
+    """
+    Applies Smart Exit (SECURED -> Breakeven) and Take Profit rules.
+    Returns: list of (trade, reason) to SELL. Updates the book's SECURED set.
+    With a `limit_grid`, Take Profits are left to the resting TP orders.
+    """
+    book = book or position_book
+    newly_secured, exits = strategy.evaluate_exits(open_trades, current_price, config.tp_usdt, book.secured)
+    if limit_grid:
+        exits = [(trade, reason) for trade, reason in exits if reason == 'BREAKEVEN']
+    for trade_id in newly_secured:
+        log(f"[SECURED] Trade {trade_id} SECURED! (Price hit > 50% to TP)")
+        book.mark_secured(trade_id)
+
+    for trade, reason in exits:
+        if reason == 'BREAKEVEN':
+            log(f"[SECURED] [SMART EXIT] Trade {trade['id']} hit Breakeven Trigger! Closing to protect funds.")
+    return exits
+
+def run_iteration(state, step_size):
+    """
+    One pass of start_bot's loop, every stage timed (metrics.py).
+    Returns the seconds to sleep before the next pass.
+    """
+    global LAST_SNAPSHOT_TIME
+
+    # 0. Dynamic Configuration & Master Switch
+    # One snapshot per iteration: changes apply between iterations, never mid-way
+    with metrics.span('settings', SYMBOL):
+        config = state.apply_overrides(config_cache.get())
+    if not config.is_active:
+        log("[PAUSE] Bot Paused via Dashboard (Master Switch OFF). Sleeping...")
+        if state.limit_grid:
+            sync_limit_grid(state, config)
+        return LOOP_INTERVAL
+
+    # 0.5 Snapshot Check (For Portfolio Tracking)
+    if time.time() - LAST_SNAPSHOT_TIME > SNAPSHOT_INTERVAL:
+        # Capture snapshot
+        # Note: Capture runs in main thread here, might delay 1-2s. Acceptable.
+        log(f"[SNAPSHOT] Running Portfolio Snapshot...")
+        with metrics.span('snapshot', SYMBOL):
+            take_snapshot(SYMBOL)
+        LAST_SNAPSHOT_TIME = time.time()
+    checkpoint_portfolio(state)
+
+    # 1. Active Zones (from config snapshot) & Price
+    with metrics.span('zones', SYMBOL):
+        active_zones = config.zones_for(SYMBOL)
+    if not active_zones:
+        log("⚠️ No Active Zones found. Sleeping...")
+        if state.limit_grid:
+            sync_limit_grid(state, config)
+        return LOOP_INTERVAL
+
+    with metrics.span('price', SYMBOL):
+        current_price = get_market_price(SYMBOL)
+    if not current_price:
+        return 10
     
+    # --- MARKET REGIME ANALYSIS ---
+    with metrics.span('regime', SYMBOL):
+        market_regime, current_adx = analyze_market_regime(SYMBOL)
+    log(f"[ANALYSIS] Regime: {market_regime} | ADX: {current_adx:.2f}")
+
+    # 2. Select Correct Zone based on Price
+    with metrics.span('zone_select', SYMBOL):
+        active_zone = select_active_zone(config, current_price)
+    if not active_zone:
+        # Fallback: Price is outside ALL active zones
+        if state.limit_grid:
+            sync_limit_grid(state, config, current_price=current_price)
+        return LOOP_INTERVAL
+    
+    # Fetch RSI
+    with metrics.span('rsi', SYMBOL):
+        current_rsi = calculate_rsi(SYMBOL)
+    log(f"[STATS] Market Data | Price: {current_price:.2f} | RSI: {current_rsi:.2f}")
+
+    # 3. Get State (in memory; reconciled with Supabase every RECONCILE_INTERVAL)
+    with metrics.span('open_trades', SYMBOL):
+        position_book.maybe_reconcile()
+        check_balance_drift(state)
+        open_trades = position_book.open_trades()
+    metrics.open_trades.set(len(open_trades), symbol=SYMBOL)
+
+    # 4. Check BUY Conditions (Entry)
+    with metrics.span('buy', SYMBOL):
+        if state.limit_grid:
+            # Resting LIMIT buys + TP orders instead of a MARKET buy on this tick
+            sync_limit_grid(state, config, active_zone, current_price, current_rsi, market_regime)
+        else:
+            level, _ = check_buy(active_zone, position_book, current_price, current_rsi, market_regime, config)
+            if level is not None:
+                # We already checked RSI/Regime globally, so we are safe to buy
+                # One trade attempt per loop (and cooldown)
+                execute_buy(active_zone, level, current_price, step_size, current_rsi, config)
+
+    # 5. Check SELL Conditions (Take Profit & Smart Exit)
+    with metrics.span('sell', SYMBOL):
+        for trade, reason in check_sells(open_trades, current_price, config, limit_grid=state.limit_grid):
+            execute_sell(trade, current_price, step_size, current_rsi, market_regime, config)
+            SECURED_TRADES.discard(trade['id']) # Clean up
+
+    log("💤 Waiting for price action...")
+    return LOOP_INTERVAL
+
+def start_bot():
     # Pre-fetch settings for accurate startup log
-    initial_settings = get_bot_settings()
-    if initial_settings:
-        RSI_LIMIT = int(initial_settings.get('rsi_limit', RSI_LIMIT))
-        TP_PROFIT = float(initial_settings.get('tp_usdt', TP_PROFIT))
-        GRID_STEP_PRICE = float(initial_settings.get('grid_step_usdt', GRID_STEP_PRICE))
-        TRADE_COOLDOWN = int(initial_settings.get('trade_cooldown', TRADE_COOLDOWN))
-        TRADE_SIZE_USDT = float(initial_settings.get('trade_size_usdt', TRADE_SIZE_USDT))
-
-    log(f"[START] Bot Starting... MODE={TRADING_MODE} | Step=${GRID_STEP_PRICE} | TP=${TP_PROFIT} | RSI Limit: {RSI_LIMIT} | Size=${TRADE_SIZE_USDT}")
+    config = config_cache.get()
+
+    log(f"[START] Bot Starting... MODE={TRADING_MODE} | Step=${config.grid_step_usdt} | TP=${config.tp_usdt} | RSI Limit: {config.rsi_limit} | Size=${config.trade_size_usdt}")
     step_size = get_symbol_step_size(SYMBOL)
+    state = symbol_state(SYMBOL)
+    start_metrics()
+    start_trade_journal()
+    position_book.load()
+    warm_up_from_store()
+    start_market_feed()
+    start_portfolio_ledger()
+    start_read_model()
+    start_user_stream()
+    start_limit_grid()
+    start_config_watch()
     
     while True:
         try:
-            # 0. Dynamic Configuration & Master Switch
-            settings = get_bot_settings()
-            if settings:
-                # Update Globals - Keep updating in loop for dynamic changes
-                RSI_LIMIT = int(settings.get('rsi_limit', RSI_LIMIT))
-                TP_PROFIT = float(settings.get('tp_usdt', TP_PROFIT))
-                GRID_STEP_PRICE = float(settings.get('grid_step_usdt', GRID_STEP_PRICE))
-                TRADE_COOLDOWN = int(settings.get('trade_cooldown', TRADE_COOLDOWN))
-                TRADE_SIZE_USDT = float(settings.get('trade_size_usdt', TRADE_SIZE_USDT))
-                
-                is_active = settings.get('is_active', True)
-                if not is_active:
-                    log("[PAUSE] Bot Paused via Dashboard (Master Switch OFF). Sleeping...")
-                    time.sleep(LOOP_INTERVAL)
-                    continue
-
-            # 0.5 Snapshot Check (For Portfolio Tracking)
-            if time.time() - LAST_SNAPSHOT_TIME > SNAPSHOT_INTERVAL:
-                # Capture snapshot
-                # Note: Capture runs in main thread here, might delay 1-2s. Acceptable.
-                log(f"[SNAPSHOT] Running Hourly Portfolio Snapshot...")
-                capture_snapshot(supabase_client, binance_client, mode=TRADING_MODE)
-                LAST_SNAPSHOT_TIME = time.time()
-
-            # 1. Fetch Active Zones & Price
-            active_zones = fetch_active_zones()
-            if not active_zones:
-                log("⚠️ No Active Zones found. Sleeping...")
-                time.sleep(LOOP_INTERVAL)
-                continue
-
-            current_price = get_market_price(SYMBOL)
-            if not current_price:
-                time.sleep(10)
-                continue
-            
-            # --- MARKET REGIME ANALYSIS ---
-            market_regime, current_adx = analyze_market_regime(SYMBOL)
-            log(f"[ANALYSIS] Regime: {market_regime} | ADX: {current_adx:.2f}")
-
-            # 2. Select Correct Zone based on Price
-            active_zone = None
-            for zone in active_zones:
-                z_low = float(zone['price_low'])
-                z_high = float(zone['price_high'])
-                
-                if z_low <= current_price <= z_high:
-                    active_zone = zone
-                    log(f"[OK] Active Zone Selected: {zone['zone_name']} ({z_low}-{z_high})")
-                    break
-            
-            if not active_zone:
-                # Fallback: Price is outside ALL active zones
-                log(f"⚠️ Price {current_price} is OUTSIDE all Active Zones. Trading Paused.")
-                time.sleep(LOOP_INTERVAL)
-                continue
-            
-            # Fetch RSI
-            current_rsi = calculate_rsi(SYMBOL)
-            log(f"[STATS] Market Data | Price: {current_price:.2f} | RSI: {current_rsi:.2f}")
-
-            # 3. Get State
-            grid_levels = generate_grid_levels(active_zone)
-            open_trades = get_open_trades()
-            
-            # Map open trades to grid levels and calculate zone usage
-            occupied_levels = []
-            current_zone_invested = 0.0
-            
-            for t in open_trades:
-                # Track occupied levels
-                entry = float(t['entry_price'])
-                occupied_levels.append(entry)
-                
-                # Calculate invested capital for this zone
-                # Check if trade belongs to current active zone (by name or ID if available)
-                # Note: t['zone_name'] is available from fetch
-                if t.get('zone_name') == active_zone['zone_name']:
-                    # Use total_usdt if available, else calc
-                    trade_val = float(t.get('total_usdt') or 0)
-                    if trade_val == 0:
-                        trade_val = float(t['entry_price']) * float(t['quantity'])
-                    current_zone_invested += trade_val
-
-            log(f"[STATUS] Status: {len(open_trades)} Open Trades | Zone Usage: ${current_zone_invested:,.2f} / ${float(active_zone['capital_allocated']):,.2f}")
-
-            # 4. Check BUY Conditions (Entry)
-            # --- Permission Check (Pre-Loop) ---
-            can_buy = True
-            buy_block_reason = None
-            
-            # A. Budget Check
-            allocated_cap = float(active_zone['capital_allocated'])
-            if current_zone_invested + TRADE_SIZE_USDT > allocated_cap:
-                can_buy = False
-                buy_block_reason = f"💰 Zone Budget Exceeded (${current_zone_invested:,.2f} + ${TRADE_SIZE_USDT} > ${allocated_cap:,.2f})"
-
-            # B. Regime & RSI Check (Only check if budget allows)
-            if can_buy:
-                is_rsi_safe = current_rsi < RSI_LIMIT
-                
-                if market_regime == 'BEAR_TREND':
-                    if current_rsi < 30:
-                        is_rsi_safe = True
-                    else:
-                        is_rsi_safe = False
-                        buy_block_reason = f"🐻 Market is BEARISH & RSI High ({current_rsi:.2f} >= 30)"
-                elif not is_rsi_safe:
-                     buy_block_reason = f"⚠️ RSI High ({current_rsi:.2f} >= {RSI_LIMIT})"
-                
-                if not is_rsi_safe:
-                    can_buy = False
-            
-            # Log Permission Status ONCE
-            if not can_buy:
-                log(f"[STOP] Trading Paused: {buy_block_reason}")
-            
-            # Execute Grid Checks ONLY if allowed
-            if can_buy:
-                for level in grid_levels:
-                    # Optimized Bucket Logic: Only buy if price is within the bucket BELOW the level
-                    # and ABOVE the previous level (approximately)
-                    # Effectively: (Grid - Step) < Price <= Grid
-                    
-                    lower_bound = level - GRID_STEP_PRICE
-                    
-                    # Condition A: Price is inside the immediate bucket of this specific grid level
-                    is_in_bucket = lower_bound < current_price <= level
-                    
-                    # Condition B: Level is empty
-                    is_occupied = False
-                    for occ_price in occupied_levels:
-                        if abs(occ_price - level) < 10.0: # $10 Tolerance
-                            is_occupied = True
-                            break
-                    
-                    if is_in_bucket and not is_occupied:
-                        # We already checked RSI/Regime globally, so we are safe to buy
-                        execute_buy(active_zone, level, current_price, step_size, current_rsi)
-                        # Break after one trade attempt to wait for next loop (and cooldown)
-                        break 
-                    # No else logging here to prevent spam
-
-
-            # 5. Check SELL Conditions (Take Profit & Smart Exit)
-            for trade in open_trades:
-                entry = float(trade['entry_price'])
-                target_price = entry + TP_PROFIT
-                trade_id = trade['id']
-                
-                # --- Smart Exit Logic ---
-                # Check if we should mark as SECURED
-                # 50% to Target
-                secure_trigger_price = entry + (TP_PROFIT * 0.5)
-                
-                if current_price >= secure_trigger_price:
-                    if trade_id not in SECURED_TRADES:
-                        log(f"[SECURED] Trade {trade_id} SECURED! (Price hit > 50% to TP)")
-                        SECURED_TRADES.add(trade_id)
-                
-                # If Secured, Check for Breakeven Stop
-                if trade_id in SECURED_TRADES:
-                    breakeven_price = entry + 10.0 # Buffer to cover fees
-                    if current_price <= breakeven_price:
-                        log(f"[SECURED] [SMART EXIT] Trade {trade_id} hit Breakeven Trigger! Closing to protect funds.")
-                        execute_sell(trade, current_price, step_size, current_rsi, market_regime)
-                        SECURED_TRADES.remove(trade_id) # Clean up
-                        continue # Trade closed, move to next
-
-                # Normal TP Check
-                if current_price >= target_price:
-                    execute_sell(trade, current_price, step_size, current_rsi, market_regime)
-                    if trade_id in SECURED_TRADES:
-                        SECURED_TRADES.remove(trade_id)
-
-            log("💤 Waiting for price action...")
-            time.sleep(LOOP_INTERVAL)
+            with metrics.span('iteration', SYMBOL):
+                delay = run_iteration(state, step_size)
+            time.sleep(delay)
 
         except Exception as e:
             log(f"[CRITICAL] Error in main loop: {e}")
+            metrics.errors.inc(symbol=SYMBOL, where='loop')
             time.sleep(LOOP_INTERVAL)
 
 if __name__ == "__main__":
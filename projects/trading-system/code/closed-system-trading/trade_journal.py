@@ -0,0 +1,275 @@
+"""
+Trade Journal (write-behind)
+============================
+Fills are recorded in a local SQLite journal (WAL mode) before anything is
+sent to Supabase, so execute_buy / execute_sell return as soon as the fill is
+on disk and a Supabase outage can no longer lose a fill.
+
+- append(): one local INSERT per fill.
+- A background flusher sends pending entries to Supabase in order:
+  consecutive OPENs go out as one batched upsert, CLOSEs as updates
+  (PostgREST has no multi-row update with different values per row).
+- Idempotency: every trade carries a client-generated `client_key`
+  (unique column, see add_client_key_column.sql). OPENs are upserted with
+  ON CONFLICT (client_key) DO NOTHING and CLOSEs update by client_key, so a
+  retry after a timeout, or a replay after a crash, never duplicates a row.
+- Failed flushes are retried with exponential backoff; nothing is dropped.
+  A CLOSE that matches no row stays pending and is retried on its own
+  backoff (logged every UNMATCHED_LOG_EVERY attempts) while later entries flush.
+- On restart, entries not yet flushed are replayed first, and the position
+  book overlays them on top of what Supabase returns (pending()), holding
+  barrier() across both reads so no entry is flushed in between.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+JOURNAL_PATH = os.getenv('TRADE_JOURNAL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trade_journal.db'))
+FLUSH_INTERVAL = 0.5     # Seconds between flushes when idle
+BATCH_SIZE = 100         # Max entries per flush
+RETRY_MIN_DELAY = 1      # Seconds
+RETRY_MAX_DELAY = 60     # Seconds
+RETENTION = 7 * 86400    # Flushed entries are kept this long for inspection
+UNMATCHED_LOG_EVERY = 5  # Attempts between log lines for a CLOSE that matches no row
+
+SCHEMA = """
+create table if not exists journal (
+    seq integer primary key autoincrement,
+    op text not null,              -- OPEN | CLOSE
+    table_name text not null,
+    client_key text not null,
+    payload text not null,         -- JSON row (OPEN) or update (CLOSE)
+    created_at real not null,
+    flushed_at real,
+    attempts integer not null default 0,
+    last_error text
+);
+create index if not exists idx_journal_pending on journal(flushed_at, seq);
+"""
+
+
+def log(message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] [JOURNAL] {message}")
+
+
+def new_client_key(symbol=None):
+    """Idempotency key for a new trade, e.g. BTCUSDT-1718000000000-3f9a1c."""
+    return f"{symbol or 'TRADE'}-{int(time.time() * 1000)}-{uuid.uuid4().hex[:6]}"
+
+
+class TradeJournal:
+    def __init__(self, supabase_client, path=JOURNAL_PATH):
+        self.supabase = supabase_client
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute("pragma synchronous=normal")  # Durable across process crashes; fsync at checkpoints
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._flushing = threading.Lock()  # Held while a run is sent and marked flushed (barrier())
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._callbacks = {}  # seq -> fn(row), called after the entry reached Supabase
+        self._deferred = {}   # seq -> time.monotonic() before which an unmatched CLOSE is not retried
+        self._retry_delay = RETRY_MIN_DELAY
+        self.flushed = 0
+
+    # --- Writer side (called from execute_buy / execute_sell) ---
+
+    def append(self, op, table_name, client_key, payload, on_flushed=None):
+        """Records a fill locally and returns its sequence number. Supabase is written later."""
+        with self._lock:
+            cur = self._conn.execute(
+                "insert into journal (op, table_name, client_key, payload, created_at) values (?, ?, ?, ?, ?)",
+                (op, table_name, client_key, json.dumps(payload, default=str), time.time())
+            )
+            seq = cur.lastrowid
+            if on_flushed:
+                self._callbacks[seq] = on_flushed
+        self._wake.set()
+        return seq
+
+    def pending(self, table_name=None):
+        """Entries not yet in Supabase, oldest first: [(op, client_key, payload)]."""
+        sql = "select op, client_key, payload from journal where flushed_at is null"
+        args = ()
+        if table_name:
+            sql += " and table_name = ?"
+            args = (table_name,)
+        with self._lock:
+            rows = self._conn.execute(sql + " order by seq", args).fetchall()
+        return [(op, key, json.loads(payload)) for op, key, payload in rows]
+
+    def barrier(self):
+        """
+        Context manager that holds off the flusher: an entry is either still
+        pending() or already in Supabase for every read made inside it.
+        """
+        return self._flushing
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute("select count(*) from journal where flushed_at is null").fetchone()[0]
+
+    # --- Flusher ---
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        waiting = self.pending_count()
+        if waiting:
+            log(f"Replaying {waiting} unflushed entries from the last run")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="trade-journal", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        """Stops the flusher after a last flush attempt."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        last_prune = 0
+        while True:
+            self._wake.wait(FLUSH_INTERVAL)
+            self._wake.clear()
+            try:
+                while self.flush_once():
+                    pass
+                self._retry_delay = RETRY_MIN_DELAY
+            except Exception as e:
+                log(f"⚠️ Flush failed, retrying in {self._retry_delay}s ({self.pending_count()} pending): {e}")
+                if self._stop.wait(self._retry_delay):
+                    return
+                self._retry_delay = min(self._retry_delay * 2, RETRY_MAX_DELAY)
+                continue
+            if self._stop.is_set():
+                return
+            if time.time() - last_prune > 3600:
+                self.prune()
+                last_prune = time.time()
+
+    def _next_batch(self):
+        sql = "select seq, op, table_name, client_key, payload from journal where flushed_at is null"
+        with self._lock:
+            now = time.monotonic()
+            waiting = [seq for seq, due in self._deferred.items() if due > now]
+            if waiting:
+                sql += f" and seq not in ({','.join('?' * len(waiting))})"
+            return self._conn.execute(sql + " order by seq limit ?", (*waiting, BATCH_SIZE)).fetchall()
+
+    def flush_once(self):
+        """
+        Sends the oldest pending run of entries (same op and table) to Supabase.
+        Returns True if a run was sent. Raises on failure (entries stay pending).
+        """
+        with self._flushing:
+            callbacks = self._flush_run()
+        if callbacks is None:
+            return False
+
+        for fn, row in callbacks:
+            if fn:
+                try:
+                    fn(row)
+                except Exception as e:
+                    log(f"⚠️ Post-flush callback failed: {e}")
+        return True
+
+    def _flush_run(self):
+        """Flushes the oldest run; returns its [(on_flushed, row)], or None if nothing was pending."""
+        batch = self._next_batch()
+        if not batch:
+            return None
+
+        _, op, table_name, _, _ = batch[0]
+        run = []
+        for entry in batch:
+            if entry[1] != op or entry[2] != table_name:
+                break
+            run.append(entry)
+
+        try:
+            if op == 'OPEN':
+                returned = self._flush_opens(table_name, run)
+            else:
+                returned = self._flush_closes(table_name, run)
+        except Exception as e:
+            with self._lock:
+                self._conn.executemany(
+                    "update journal set attempts = attempts + 1, last_error = ? where seq = ?",
+                    [(str(e)[:500], entry[0]) for entry in run]
+                )
+            raise
+
+        unmatched = [entry for entry in run if op == 'CLOSE' and entry[3] not in returned]
+        flushed = [entry for entry in run if entry not in unmatched]
+        now = time.time()
+        with self._lock:
+            self._conn.executemany("update journal set flushed_at = ? where seq = ?", [(now, entry[0]) for entry in flushed])
+            callbacks = [(self._callbacks.pop(entry[0], None), returned.get(entry[3])) for entry in flushed]
+            for entry in flushed:
+                self._deferred.pop(entry[0], None)
+        if unmatched:
+            self._defer(table_name, unmatched)
+        self.flushed += len(flushed)
+        return callbacks
+
+    def _defer(self, table_name, entries):
+        """Keeps CLOSEs whose update matched no row pending, retried on their own backoff so later entries still flush."""
+        seqs = [entry[0] for entry in entries]
+        with self._lock:
+            self._conn.executemany(
+                "update journal set attempts = attempts + 1, last_error = ? where seq = ?",
+                [(f"CLOSE matched no {table_name} row", seq) for seq in seqs]
+            )
+            attempts = dict(self._conn.execute(
+                f"select seq, attempts from journal where seq in ({','.join('?' * len(seqs))})", seqs
+            ).fetchall())
+            now = time.monotonic()
+            for seq in seqs:
+                self._deferred[seq] = now + min(RETRY_MIN_DELAY * 2 ** (attempts[seq] - 1), RETRY_MAX_DELAY)
+        for seq, _, _, client_key, _ in entries:
+            if attempts[seq] % UNMATCHED_LOG_EVERY == 0:
+                log(f"⚠️ CLOSE {client_key} matched no {table_name} row after {attempts[seq]} attempts: kept pending, "
+                    f"retrying every {RETRY_MAX_DELAY}s at most")
+
+    def _flush_opens(self, table_name, run):
+        # A bulk upsert needs identical columns in every row (PAPER and LIVE rows differ)
+        groups = {}
+        for entry in run:
+            row = json.loads(entry[4])
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        returned = {}
+        for rows in groups.values():
+            response = self.supabase.table(table_name)\
+                .upsert(rows, on_conflict="client_key", ignore_duplicates=True)\
+                .execute()
+            returned.update({r.get('client_key'): r for r in (response.data or [])})
+        return returned
+
+    def _flush_closes(self, table_name, run):
+        returned = {}
+        for _, _, _, client_key, payload in run:
+            response = self.supabase.table(table_name)\
+                .update(json.loads(payload))\
+                .eq("client_key", client_key)\
+                .execute()
+            if response.data:
+                returned[client_key] = response.data[0]
+        return returned
+
+    def prune(self):
+        with self._lock:
+            self._conn.execute("delete from journal where flushed_at is not null and flushed_at < ?", (time.time() - RETENTION,))
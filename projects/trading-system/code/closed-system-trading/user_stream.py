@@ -0,0 +1,194 @@
+"""
+User Data Stream
+================
+Order and account updates from Binance over the user data WebSocket (LIVE),
+so fills, real commissions and balances arrive as they happen instead of
+by polling the REST API.
+
+- Gets a listenKey (POST /api/v3/userDataStream) and keeps it alive every
+  30 minutes; a new one is requested when Binance reports it expired.
+- Runs its own asyncio loop in a background thread and reconnects with
+  exponential backoff, like market_feed.py.
+- executionReport events are aggregated per order (executed qty, quote qty,
+  commission per asset): order() returns them, optionally waiting for the
+  order to finish. outboundAccountPosition events keep `balances` current.
+- Every event is also passed to the `listeners` as the decoded dict (e.g.
+  limit_grid.py). After every (re)connect the `on_connect` callbacks run,
+  so fills missed while disconnected can be picked up over REST.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import websockets
+
+from market_feed import BINANCE_WS_URL, RECONNECT_MAX_DELAY, RECONNECT_MIN_DELAY
+
+KEEPALIVE_INTERVAL = 30 * 60  # Seconds (listenKeys expire after 60 minutes)
+MAX_TRACKED_ORDERS = 1000     # Most recent orders kept with their fills
+FINAL_STATUSES = ('FILLED', 'CANCELED', 'EXPIRED', 'REJECTED', 'EXPIRED_IN_MATCH')
+
+
+def log(message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] [USER] {message}")
+
+
+class UserDataStream:
+    def __init__(self, client, ws_url=BINANCE_WS_URL):
+        self.client = client
+        self.ws_url = ws_url.rstrip('/')
+        self.listeners = []   # callback(event dict)
+        self.on_connect = []  # callback() after every (re)connect
+        self.listen_key = None
+        self.reconnects = 0
+        self.connected = False
+
+        self.orders = OrderedDict()  # orderId -> {'symbol', 'side', 'status', 'executed', 'quote', 'commissions': {asset: qty}}
+        self.balances = {}           # asset -> (free, locked), from outboundAccountPosition
+        self._state = threading.Condition()
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._loop = None
+        self._ws = None
+        self._last_keepalive = 0
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="user-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._loop and self._ws:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    # --- Readers (thread-safe) ---
+
+    def order(self, order_id, wait=0):
+        """
+        Fills of an order seen on the stream (copy), or None if none arrived.
+        With `wait` (seconds), blocks until the order has reached a final status.
+        """
+        deadline = time.time() + wait
+        with self._state:
+            while True:
+                order = self.orders.get(int(order_id))
+                remaining = deadline - time.time()
+                if (order and order['status'] in FINAL_STATUSES) or remaining <= 0:
+                    break
+                self._state.wait(remaining)
+            return dict(order, commissions=dict(order['commissions'])) if order else None
+
+    def balance(self, asset):
+        """(free, locked) of `asset`, or None before the first account update that mentions it."""
+        with self._state:
+            return self.balances.get(asset)
+
+    # --- listenKey ---
+
+    def _new_listen_key(self):
+        self.listen_key = self.client.stream_get_listen_key()
+        self._last_keepalive = time.time()
+        return self.listen_key
+
+    def _keepalive(self):
+        try:
+            self.client.stream_keepalive(self.listen_key)
+            self._last_keepalive = time.time()
+        except Exception as e:
+            log(f"⚠️ listenKey keepalive failed: {e}")
+            self.listen_key = None  # Next reconnect asks for a new one
+
+    # --- Internals ---
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._consume())
+        finally:
+            self._loop.close()
+
+    async def _consume(self):
+        delay = RECONNECT_MIN_DELAY
+        while not self._stop.is_set():
+            try:
+                key = self.listen_key or await asyncio.to_thread(self._new_listen_key)
+                async with websockets.connect(f"{self.ws_url}/ws/{key}", ping_interval=20) as ws:
+                    self._ws = ws
+                    self.connected = True
+                    log(f"Connected ({self.ws_url})")
+                    delay = RECONNECT_MIN_DELAY
+                    for callback in self.on_connect:
+                        await asyncio.to_thread(callback)
+                    while not self._stop.is_set():
+                        if time.time() - self._last_keepalive > KEEPALIVE_INTERVAL:
+                            await asyncio.to_thread(self._keepalive)
+                        try:
+                            raw = await asyncio.wait_for(ws.recv(), timeout=60)
+                        except asyncio.TimeoutError:
+                            continue
+                        if not self._handle_message(raw):
+                            break
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                log(f"⚠️ Stream error: {e}")
+            finally:
+                self._ws = None
+                self.connected = False
+
+            if self._stop.is_set():
+                break
+            self.reconnects += 1
+            log(f"Reconnecting in {delay}s...")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def _handle_message(self, raw):
+        """Dispatches one event. Returns False when the connection has to be re-opened."""
+        event = json.loads(raw)
+        kind = event.get('e')
+        if kind == 'listenKeyExpired':
+            log("⚠️ listenKey expired, requesting a new one")
+            self.listen_key = None
+            return False
+        if kind == 'executionReport':
+            self._track_order(event)
+        elif kind == 'outboundAccountPosition':
+            with self._state:
+                for b in event.get('B', []):
+                    self.balances[b['a']] = (float(b['f']), float(b['l']))
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                log(f"⚠️ Listener error: {e}")
+        return True
+
+    def _track_order(self, event):
+        with self._state:
+            order_id = int(event['i'])
+            order = self.orders.get(order_id)
+            if order is None:
+                order = self.orders[order_id] = {'symbol': event['s'], 'side': event['S'], 'commissions': {}}
+                if len(self.orders) > MAX_TRACKED_ORDERS:
+                    self.orders.popitem(last=False)
+            order['status'] = event['X']
+            order['executed'] = float(event['z'])
+            order['quote'] = float(event['Z'])
+            if event.get('x') == 'TRADE' and event.get('N'):
+                order['commissions'][event['N']] = order['commissions'].get(event['N'], 0.0) + float(event['n'])
+            self._state.notify_all()
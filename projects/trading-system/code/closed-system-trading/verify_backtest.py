@@ -0,0 +1,128 @@
+"""
+Verifies backtest.py on a synthetic random walk:
+  1. The vectorized indicators match an IndicatorEngine fed tick by tick,
+     the way analyze_market_regime / calculate_rsi feed it live.
+  2. run_backtest() trades exactly like a plain per-tick loop over the
+     strategy.py reference functions (select_zone, summarize_open_trades,
+     check_buy_permission, find_buy_level, evaluate_exits).
+  3. Times a year of 1m bars.
+
+Usage: python verify_backtest.py
+"""
+
+import time
+
+import numpy as np
+
+import strategy
+from backtest import DEFAULT_SETTINGS, REGIMES, RSI_INTERVAL_MS, REGIME_INTERVAL_MS, compute_indicators, run_backtest, to_view
+from indicators import IndicatorEngine
+
+MINUTE_MS = 60_000
+ZONES = [
+    {'zone_name': 'Z1', 'price_low': 84000, 'price_high': 90000, 'capital_allocated': 400},
+    {'zone_name': 'Z2', 'price_low': 89000, 'price_high': 96000, 'capital_allocated': 300},
+]
+
+
+def random_walk(n, seed=3, start=90000.0, volatility=0.0008):
+    rng = np.random.default_rng(seed)
+    close = start * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    open_ = np.r_[start, close[:-1]]
+    spread = np.abs(rng.normal(0, volatility / 2, n)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    t0 = 1_700_000_000_000 - 1_700_000_000_000 % REGIME_INTERVAL_MS
+    rows = [[t0 + i * MINUTE_MS, open_[i], high[i], low[i], close[i], 1.0, 0] for i in range(n)]
+    return to_view(rows)
+
+
+def live_indicators(bars):
+    """What IndicatorEngine reports at each 1m close, fed with the candles the live cache would hold."""
+    engine = IndicatorEngine(regime_interval='1h', rsi_interval='5m')
+    candles = {'1h': [], '5m': []}
+    rsi, adx, ema, regime = [], [], [], []
+    for i in range(len(bars.close)):
+        for interval, ms in (('1h', REGIME_INTERVAL_MS), ('5m', RSI_INTERVAL_MS)):
+            rows = candles[interval]
+            open_time = int(bars.open_time[i]) - int(bars.open_time[i]) % ms
+            h, l, c = float(bars.high[i]), float(bars.low[i]), float(bars.close[i])
+            if rows and rows[-1][0] == open_time:
+                rows[-1] = [open_time, 0, max(rows[-1][2], h), min(rows[-1][3], l), c]
+            else:
+                rows.append([open_time, 0, h, l, c])
+            engine.sync(interval, rows[-3:])
+        rsi.append(np.nan if engine.rsi.value is None else engine.rsi.value)
+        adx.append(np.nan if engine.adx.value is None else engine.adx.value)
+        ema.append(np.nan if engine.ema.value is None else engine.ema.value)
+        result = engine.regime(adx_threshold=25)
+        regime.append(REGIMES.index(result[0]) if result else 0)
+    return np.array(rsi), np.array(adx), np.array(ema), np.array(regime)
+
+
+def reference_backtest(bars, ind, zones, settings):
+    """The start_bot loop written out with the strategy.py reference (scan) functions."""
+    s = dict(DEFAULT_SETTINGS, **settings)
+    open_trades, secured, log = [], set(), []
+    last_trade_time, next_id = float('-inf'), 1
+    for i in range(len(bars.close)):
+        price, now = float(bars.close[i]), (int(bars.close_time[i]) + 1) / 1000
+        zone = strategy.select_zone(zones, price)
+        if not zone:
+            continue
+        rsi = 50.0 if np.isnan(ind.rsi[i]) else float(ind.rsi[i])
+        snapshot = list(open_trades)
+
+        occupied, invested = strategy.summarize_open_trades(snapshot, zone['zone_name'])
+        can_buy, _ = strategy.check_buy_permission(zone, invested, s['trade_size_usdt'], rsi, s['rsi_limit'], REGIMES[ind.regime[i]])
+        level = None
+        if can_buy:
+            level = strategy.find_buy_level(strategy.generate_grid_levels(zone, s['grid_step_usdt']), price, occupied, s['grid_step_usdt'])
+        if level is not None and now - last_trade_time >= s['trade_cooldown']:
+            last_trade_time = now
+            qty = strategy.order_quantity(s['trade_size_usdt'], price, 0.00001, 0.001)
+            open_trades.append({'id': next_id, 'zone_name': zone['zone_name'], 'entry_price': price * qty / qty, 'quantity': qty, 'total_usdt': price * qty})
+            next_id += 1
+
+        newly_secured, exits = strategy.evaluate_exits(snapshot, price, s['tp_usdt'], secured)
+        secured.update(newly_secured)
+        for trade, reason in exits:
+            open_trades.remove(trade)
+            secured.discard(trade['id'])
+            log.append((trade['id'], i, reason))
+    return sorted(log), [t['id'] for t in open_trades]
+
+
+def main():
+    # 1. Indicators
+    bars = random_walk(20_000)
+    ind = compute_indicators(bars)
+    for name, live, fast in zip(('RSI', 'ADX', 'EMA', 'Regime'), live_indicators(bars), ind):
+        same_nan = np.array_equal(np.isnan(live), np.isnan(fast)) if live.dtype.kind == 'f' else True
+        diff = np.nanmax(np.abs(live - fast)) if live.dtype.kind == 'f' else int(np.sum(live != fast))
+        print(f"{'✅' if same_nan and diff < 1e-6 else '❌'} {name}: max diff {diff:.2e}")
+
+    # 2. Trades
+    settings = {'grid_step_usdt': 150.0, 'tp_usdt': 200.0, 'rsi_limit': 55}
+    trades, summary = run_backtest(bars, ZONES, settings, indicators=ind)
+    closed = trades[trades['status'] == 'CLOSED'] if not trades.empty else trades
+    exit_bars = np.searchsorted(bars.close_time + 1, [int(np.datetime64(t[:19], 'ms').astype(np.int64)) for t in closed['exit_at']])
+    fast_log = sorted(zip(closed['id'], exit_bars.tolist(), closed['exit_reason']))
+    ref_log, ref_open = reference_backtest(bars, ind, ZONES, settings)
+    fast_open = trades[trades['status'] == 'OPEN']['id'].tolist() if not trades.empty else []
+    ok = fast_log == ref_log and fast_open == ref_open
+    print(f"{'✅' if ok else '❌'} Trades: {summary['closed_trades']} closed / {summary['open_trades']} open, reference {len(ref_log)} / {len(ref_open)}")
+
+    # 3. Speed
+    year = random_walk(365 * 24 * 60)
+    started = time.perf_counter()
+    ind = compute_indicators(year)
+    t_ind = time.perf_counter() - started
+    started = time.perf_counter()
+    _, summary = run_backtest(year, ZONES, settings, indicators=ind)
+    t_sim = time.perf_counter() - started
+    print(f"⏱️ 1 year of 1m bars: indicators {t_ind:.2f}s | simulation {t_sim:.2f}s | {summary['closed_trades']} closed trades")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Verifies the dashboard's cached data layer (dashboard_data.DashboardData) offline
+against bench_fakes.FakeSupabase / FakeBinance:
+  1. Reruns within the TTLs make no Supabase / Binance calls; an expired dataset is reloaded alone.
+  2. Writes invalidate precisely: zones of one symbol, settings, baseline.
+  3. Eight sessions missing the same dataset at once load it once.
+  4. Derived results follow their inputs (overview / Zone Performance after the aggregates reload).
+  5. A failed load is not cached.
+
+Usage: python verify_dashboard_data.py
+"""
+
+import threading
+import time
+
+from bench_fakes import FakeBinance, FakeSupabase, synthetic_dataset
+from dashboard_data import DASHBOARD_TTLS, DashboardData
+
+SYMBOL = 'BTCUSDT'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def setup(latency_ms=0.0):
+    zones, trades = synthetic_dataset(2000, 5, 100.0, SYMBOL, open_ratio=0.3, low=90000, high=100000)
+    eth_zones = [dict(z, id=z['id'] + 100, symbol='ETHUSDT') for z in zones]
+    db = FakeSupabase({
+        'paper_trade_log': trades, 'zones_config': zones + eth_zones,
+        'bot_settings': [{'id': 1, 'rsi_limit': 45, 'tp_usdt': 200.0}],
+        'baseline_prices': [{'id': 1, 'symbol': SYMBOL, 'baseline_price': 90000.0, 'initial_capital': 10000.0}],
+    }, latency_ms=latency_ms)
+    binance = FakeBinance(latency_ms, prices={SYMBOL: 95000.0, 'USDTTHB': 33.5})
+    data = DashboardData(db, binance)
+    clock = Clock()
+    data.cache.clock = clock
+    return db, binance, data, clock
+
+
+def rerun(data):
+    """Overview tab + settings + baseline, like one dashboard.py run."""
+    price = data.price(SYMBOL)
+    data.settings()
+    data.baseline(SYMBOL)
+    data.zones('ETHUSDT')
+    data.thb_rate()
+    return data.overview(True, SYMBOL, price), data.zone_performance(True, SYMBOL)
+
+
+def calls(*clients):
+    return sum(c.calls for c in clients)
+
+
+def check(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    return ok
+
+
+def main():
+    db, binance, data, clock = setup()
+
+    # 1. TTLs
+    rerun(data)
+    first = calls(db, binance)
+    started = time.perf_counter()
+    for _ in range(100):
+        rerun(data)
+    ms = (time.perf_counter() - started) * 1000 / 100
+    warm = calls(db, binance) - first
+    clock.now += DASHBOARD_TTLS['price'] + 0.1
+    before = calls(db, binance)
+    rerun(data)
+    check(warm == 0 and calls(db, binance) - before == 1,
+          f"First run {first} calls, 100 reruns {warm} calls ({ms:.3f} ms each), after {DASHBOARD_TTLS['price']}s only the price reloads")
+
+    # 2. Write invalidation
+    data.invalidate('zones', SYMBOL)
+    before = db.calls
+    data.zones(SYMBOL), data.zones('ETHUSDT'), data.settings()
+    zones_only = db.calls - before
+    data.invalidate('settings')
+    data.invalidate('baseline', SYMBOL)
+    before = db.calls
+    data.settings(), data.baseline(SYMBOL), data.zones(SYMBOL)
+    check(zones_only == 1 and db.calls - before == 2, f"Invalidate zones of {SYMBOL}: {zones_only} reload (ETHUSDT kept); settings + baseline: {db.calls - before}")
+
+    # 3. Concurrent misses load once
+    db2, _, data2, _ = setup(latency_ms=50)
+    barrier = threading.Barrier(8)
+
+    def session():
+        barrier.wait()
+        data2.zone_stats(True, SYMBOL)
+    threads = [threading.Thread(target=session) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    check(db2.calls == 1 and data2.cache.misses == 1, f"8 sessions, 1 Supabase call (hits {data2.cache.hits}, misses {data2.cache.misses})")
+
+    # 4. Derived results follow an aggregates reload
+    overview, _ = rerun(data)
+    db.tables['paper_trade_log'].append(dict(db.tables['paper_trade_log'][0], id=99999, status='OPEN', zone_name='Z1',
+                                            entry_price=95000.0, quantity=1.0, total_usdt=95000.0))
+    cached, _ = rerun(data)
+    clock.now += max(DASHBOARD_TTLS['stats'], DASHBOARD_TTLS['zone_stats']) + 0.1
+    fresh, perf = rerun(data)
+    check(cached['open_trades_count'] == overview['open_trades_count'] and fresh['open_trades_count'] == overview['open_trades_count'] + 1
+          and perf.loc[perf['Zone Name'] == 'Z1', 'Invested (USDT)'].iloc[0] >= 95000.0,
+          f"Open trades {overview['open_trades_count']} -> {cached['open_trades_count']} (cached) -> {fresh['open_trades_count']} after the aggregates TTL")
+
+    # 5. Errors are not cached
+    def fail():
+        raise RuntimeError("Supabase down")
+    try:
+        data.cache.get('settings_test', None, fail)
+    except RuntimeError:
+        pass
+    value = data.cache.get('settings_test', None, lambda: 'ok')
+    check(value == 'ok', "A failed load is retried on the next run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Verifies delta sync (delta_sync.DeltaFrame, DashboardData row datasets) offline
+against bench_fakes.FakeSupabase with the updated_at trigger and a 1000-row cap:
+  1. The first sync loads every row (paged); an idle sync fetches nothing.
+  2. New trades, closes and AI results arrive as deltas; the frame equals a full re-read.
+  3. A row committed late with an older stamp (inside the overlap) is still picked up.
+  4. A windowed frame (recent trades) keeps the newest N by its order column.
+  5. Without the updated_at column the frame falls back to id: new rows still arrive.
+     A transient error raises and keeps the updated_at watermark; the next sync catches up.
+  6. 100 live refreshes with one new trade each fetch a fraction of the rows a full reload would.
+  7. DashboardData: new snapshots and AI results show up after their TTL.
+
+Usage: python verify_delta_sync.py
+"""
+
+import contextlib
+import io
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from bench_fakes import FakeBinance, FakeSupabase, synthetic_dataset
+from dashboard_data import DASHBOARD_TTLS, DashboardData
+from delta_sync import DELTA_OVERLAP_SECONDS, DeltaFrame
+
+SYMBOL = 'BTCUSDT'
+TABLE = 'paper_trade_log'
+ROW_CAP = 1000
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+    def __call__(self):
+        return self.now
+
+    def tick(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+def setup(n_trades=5000, with_updated_at=True, tables=None):
+    _, trades = synthetic_dataset(n_trades, 5, 50.0, SYMBOL, open_ratio=0.3, low=90000, high=100000)
+    clock = Clock()
+    if with_updated_at:
+        for i, t in enumerate(trades):
+            t['updated_at'] = (clock.now - timedelta(minutes=n_trades - i)).isoformat()
+    db = FakeSupabase({TABLE: trades, **(tables or {})}, max_rows=ROW_CAP, updated_at=(TABLE,) if with_updated_at else ())
+    db.now = clock
+    return db, clock
+
+
+class FlakySupabase(FakeSupabase):
+    """Drops the connection on its first select."""
+
+    failed = False
+
+    def _execute(self, q):
+        if q.op == 'select' and not self.failed:
+            self.failed = True
+            raise ConnectionError("Server disconnected without sending a response.")
+        return super()._execute(q)
+
+
+def full_read(db):
+    rows = [dict(r) for r in db.tables[TABLE] if r['symbol'] == SYMBOL]
+    return pd.DataFrame(rows).sort_values('id').reset_index(drop=True)
+
+
+def same(frame, expected):
+    a = frame.sort_values('id').reset_index(drop=True)[sorted(expected.columns)]
+    b = expected[sorted(expected.columns)]
+    return a.astype(str).equals(b.astype(str))
+
+
+def activity(db, clock, n_new=3, n_closed=2, n_ai=1):
+    """New trades, closes by the bot and AI results by n8n, one second apart."""
+    for i in range(n_new):
+        clock.tick(1)
+        db.table(TABLE).insert({'symbol': SYMBOL, 'zone_name': 'Z1', 'entry_price': 95000.0 + i, 'quantity': 0.0002,
+                                'total_usdt': 19.0, 'fee_usdt': 0.01, 'status': 'OPEN'}).execute()
+    open_ids = [r['id'] for r in db.tables[TABLE] if r['status'] == 'OPEN'][:n_closed]
+    for trade_id in open_ids:
+        clock.tick(1)
+        db.table(TABLE).update({'status': 'CLOSED', 'exit_price': 96000.0, 'pnl_usdt': 1.5}).eq('id', trade_id).execute()
+    closed_ids = [r['id'] for r in db.tables[TABLE] if r['status'] == 'CLOSED'][:n_ai]
+    for trade_id in closed_ids:
+        clock.tick(1)
+        db.table(TABLE).update({'ai_analysis': 'Good entry', 'ai_score': 8}).eq('id', trade_id).execute()
+    return n_new + n_closed + n_ai
+
+
+def check(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    return ok
+
+
+def main():
+    # 1. Full load, then idle
+    db, clock = setup()
+    frame = DeltaFrame(db, TABLE, {'symbol': SYMBOL})
+    first = frame.sync()
+    clock.tick(DELTA_OVERLAP_SECONDS + 1)
+    idle = frame.sync()
+    check(first == 5000 and idle == 0 and same(frame.frame, full_read(db)),
+          f"First sync {first} rows past the {ROW_CAP}-row cap, idle sync {idle} rows")
+
+    # 2. Deltas
+    changed = activity(db, clock)
+    merged = frame.sync()
+    check(merged == changed and same(frame.frame, full_read(db)),
+          f"{changed} changes (3 new, 2 closed, 1 AI result): {merged} rows merged, frame == full re-read")
+
+    # 3. Late commit inside the overlap
+    clock.tick(DELTA_OVERLAP_SECONDS + 1)
+    frame.sync()
+    late = db.tables[TABLE][10]
+    late.update(status='CLOSED', pnl_usdt=2.5, updated_at=(pd.Timestamp(frame.last_seen) - timedelta(seconds=3)).isoformat())
+    frame.sync()
+    picked = frame.frame.loc[frame.frame['id'] == late['id'], 'pnl_usdt'].iloc[0] == 2.5
+    check(picked, f"Row stamped 3s before the watermark (committed late) merged via the {DELTA_OVERLAP_SECONDS}s overlap")
+
+    # 4. Windowed frame
+    recent = DeltaFrame(db, TABLE, {'symbol': SYMBOL}, columns="id, status, updated_at", window=20)
+    recent.sync()
+    activity(db, clock, n_new=5, n_closed=3, n_ai=0)
+    recent.sync()
+    expected = full_read(db).assign(t=lambda d: pd.to_datetime(d['updated_at'], format='ISO8601')).nlargest(20, 't')
+    check(len(recent.frame) == 20 and set(recent.frame['id']) == set(expected['id']),
+          f"Recent trades window: {len(recent.frame)} rows == newest 20 by updated_at after 8 changes")
+
+    # 5. No updated_at column: id watermark
+    legacy, _ = setup(2000, with_updated_at=False)
+    old = DeltaFrame(legacy, TABLE, {'symbol': SYMBOL})
+    with contextlib.redirect_stdout(io.StringIO()):
+        old.sync()
+    legacy.table(TABLE).insert({'symbol': SYMBOL, 'zone_name': 'Z1', 'entry_price': 1.0, 'quantity': 1.0, 'status': 'OPEN'}).execute()
+    fetched = old.sync()
+    check(old.watermark == 'id' and fetched == 1 and len(old.frame) == 2001,
+          f"Without updated_at: watermark '{old.watermark}', new row fetched alone ({fetched} row)")
+
+    frame.sync()  # Catch up with check 4's changes
+    flaky = FlakySupabase(db.tables, max_rows=ROW_CAP, updated_at=(TABLE,))
+    flaky.now = clock
+    frame.supabase = flaky
+    changed = activity(flaky, clock)
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        try:
+            frame.sync()
+            raised = False
+        except ConnectionError:
+            raised = True
+        merged = frame.sync()
+    check(raised and frame.watermark == 'updated_at' and 'add_updated_at_columns' not in out.getvalue()
+          and merged == changed and same(frame.frame, full_read(db)),
+          f"Dropped connection: raised, watermark kept '{frame.watermark}', next sync merged {merged} changes")
+
+    # 6. Bandwidth of a live session
+    db, clock = setup()
+    frame = DeltaFrame(db, TABLE, {'symbol': SYMBOL})
+    frame.sync()
+    base = frame.rows_fetched
+    for _ in range(100):
+        clock.tick(5)
+        activity(db, clock, n_new=1, n_closed=0, n_ai=0)
+        frame.sync()
+    delta_rows = frame.rows_fetched - base
+    full_rows = sum(5000 + i for i in range(1, 101))
+    check(same(frame.frame, full_read(db)) and delta_rows < full_rows / 100,
+          f"100 refreshes: {delta_rows} rows fetched vs {full_rows:,} for full reloads ({full_rows / delta_rows:,.0f}x less)")
+
+    # 7. DashboardData row datasets
+    snapshots = [{'id': i + 1, 'symbol': SYMBOL, 'total_equity_usdt': 10000.0 + i} for i in range(200)]
+    db, clock = setup(500, tables={'portfolio_snapshots': snapshots})
+    data = DashboardData(db, FakeBinance())
+    mono = [0.0]
+    data.cache.clock = lambda: mono[0]
+    data.snapshots(SYMBOL, 100)
+    before_ai = data.ai_trades(True, SYMBOL)
+    db.table('portfolio_snapshots').insert({'symbol': SYMBOL, 'total_equity_usdt': 12345.0}).execute()
+    target = before_ai.iloc[-1]['id']
+    clock.tick(1)
+    db.table(TABLE).update({'ai_analysis': 'Late AI result', 'ai_score': 9}).eq('id', int(target)).execute()
+    mono[0] += max(DASHBOARD_TTLS['snapshots'], DASHBOARD_TTLS['ai_trades']) + 0.1
+    snap, ai = data.snapshots(SYMBOL, 100), data.ai_trades(True, SYMBOL)
+    check(snap.iloc[0]['total_equity_usdt'] == 12345.0 and len(snap) == 100
+          and ai.loc[ai['id'] == target, 'ai_analysis'].iloc[0] == 'Late AI result' and len(ai) == len(before_ai),
+          f"DashboardData: new snapshot on top of the last {len(snap)}, AI result merged into {len(ai)} AI trades")
+
+
+if __name__ == "__main__":
+    main()
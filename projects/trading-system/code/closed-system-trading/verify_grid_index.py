@@ -0,0 +1,74 @@
+"""
+Verifies grid_index.GridIndex against the reference scan strategy.find_buy_level
+on random zones, steps, open trades and prices, and times both per tick.
+
+Usage: python verify_grid_index.py
+"""
+
+import random
+import time
+
+import strategy
+from grid_index import GridIndex
+
+CASES = 20000
+
+
+class FakeBook:
+    def __init__(self, entries):
+        self.entries = sorted(entries)
+        self.version = 1
+
+    def entry_prices(self):
+        return list(self.entries)
+
+
+def random_case(rng):
+    low = rng.choice([60000.0, 80000.0, 89000.5])
+    step = rng.choice([5.0, 12.5, 50.0, 200.0])
+    zone = {'zone_name': 'Z', 'price_low': low, 'price_high': low + step * rng.randint(1, 400)}
+    levels = strategy.generate_grid_levels(zone, step)
+    entries = [rng.choice(levels) + rng.uniform(-15, 15) for _ in range(rng.randint(0, 60))]
+    price = rng.uniform(low - step, float(zone['price_high']) + step)
+    if rng.random() < 0.2:
+        price = rng.choice(levels)  # Exactly on a level (bucket edge)
+    return zone, step, levels, entries, price
+
+
+def main():
+    rng = random.Random(7)
+    mismatches = 0
+    for _ in range(CASES):
+        zone, step, levels, entries, price = random_case(rng)
+        expected = strategy.find_buy_level(levels, price, entries, step)
+        actual = GridIndex().find_buy_level(zone, price, step, FakeBook(entries))
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"❌ zone={zone} step={step} price={price} expected={expected} got={actual}")
+    print(f"{'✅ PASS' if mismatches == 0 else '❌ FAIL'}: {CASES} random cases | {mismatches} mismatches")
+
+    # Timing: wide fine grid with many open lots
+    zone = {'zone_name': 'Z', 'price_low': 60000.0, 'price_high': 120000.0}
+    step = 5.0
+    levels = strategy.generate_grid_levels(zone, step)
+    entries = [rng.choice(levels) for _ in range(500)]
+    prices = [rng.uniform(60000, 120000) for _ in range(200)]
+    book, index = FakeBook(entries), GridIndex()
+
+    t0 = time.perf_counter()
+    for p in prices:
+        strategy.find_buy_level(levels, p, entries, step)
+    scan = (time.perf_counter() - t0) / len(prices)
+
+    index.find_buy_level(zone, prices[0], step, book)  # Build once
+    t0 = time.perf_counter()
+    for p in prices:
+        index.find_buy_level(zone, p, step, book)
+    indexed = (time.perf_counter() - t0) / len(prices)
+    print(f"[TIMING] {len(levels)} levels x {len(entries)} trades | scan {scan * 1e3:.2f} ms/tick | index {indexed * 1e6:.1f} µs/tick")
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,160 @@
+"""
+Verifies limit_grid.LimitGrid offline against sim_exchange.SimExchange and a
+PositionBook journaled to a temporary SQLite file (nothing reaches Supabase):
+  1. Resting LIMIT buys sit on the nearest empty levels below the price.
+  2. A filled buy opens the trade at its level and gets a TP order; the buys move down.
+  3. A filled TP closes the trade, both sides as maker.
+  4. A tp_usdt change moves the TP order; a closed buy gate cancels the buys, not the TPs.
+  5. A part-filled buy that is cancelled opens a trade with the filled quantity.
+  6. cancel_tp() before a Smart Exit, and after the TP has filled (None: do not sell).
+  7. cancel_tp() while the fill worker is still recording a TP fill, and with a trade already closed: None.
+  8. trade_cooldown: a fast drop fills one resting buy; the others are cancelled until the cooldown has passed.
+
+Usage: python verify_limit_grid.py
+"""
+
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+from grid_index import GridIndex
+from limit_grid import LimitGrid
+from position_book import PositionBook
+from sim_exchange import DEFAULT_FILTERS, SimExchange
+from trade_journal import TradeJournal
+
+SYMBOL = 'BTCUSDT'
+ZONE = {'zone_name': 'Z1', 'price_low': 90000.0, 'price_high': 100000.0, 'capital_allocated': 1000.0}
+Config = namedtuple('Config', 'grid_step_usdt tp_usdt trade_size_usdt trade_cooldown', defaults=(0,))
+
+
+def check(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    return ok
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        journal = TradeJournal(None, path=os.path.join(root, 'journal.db'))
+        book = PositionBook(None, 'paper_trade_log', symbol=SYMBOL, journal=journal)
+        book.loaded = True
+        ex = SimExchange(realtime=False, latency_ms=0)
+        ex.set_filters(SYMBOL, DEFAULT_FILTERS)
+        closed = []
+
+        def on_buy_filled(buy, order):
+            qty = float(order['executedQty'])
+            return book.open({'zone_name': buy['zone'], 'entry_price': float(order['cummulativeQuoteQty']) / qty,
+                              'quantity': qty, 'status': 'OPEN', 'notes': f"Grid Level {buy['level']}"})
+
+        def on_tp_filled(trade, order, prior):
+            qty, quote = float(order['executedQty']) + prior[0], float(order['cummulativeQuoteQty']) + prior[1]
+            closed.append((trade, quote / qty))
+            book.close(trade['id'], {'status': 'CLOSED', 'exit_price': quote / qty})
+
+        grid = LimitGrid(ex, SYMBOL, book, ex.filters(SYMBOL), on_buy_filled, on_tp_filled, orders=3).start()
+        ex.listeners.append(grid.on_execution_report)
+        index = GridIndex()
+        config = Config(200.0, 200.0, 20.0)
+
+        def tick(price, qty, ts):
+            ex.on_trade(SYMBOL, price, qty, ts=ts)
+            ex.on_price(SYMBOL, price, ts=ts)
+            grid.wait_idle()
+
+        def resting(side):
+            return sorted(float(o['price']) for o in ex.get_open_orders(SYMBOL) if o['side'] == side)
+
+        # 1. Resting buys
+        ex.on_price(SYMBOL, 95050.0, ts=1)
+        grid.sync(ZONE, 95050.0, config, True, index, 40.0)
+        check(resting('BUY') == [94600.0, 94800.0, 95000.0], f"Resting buys below 95050: {resting('BUY')}")
+
+        # 2. Buy fill -> trade + TP, buys move down
+        tick(94990.0, 1.0, ts=2)
+        trades = book.open_trades()
+        grid.sync(ZONE, 94990.0, config, True, index, 40.0)
+        check(len(trades) == 1 and abs(trades[0]['entry_price'] - 95000.0) < 1e-6 and resting('SELL') == [95200.0]
+              and resting('BUY') == [94400.0, 94600.0, 94800.0],
+              f"Buy filled at {trades[0]['entry_price']:.2f}: TP {resting('SELL')}, buys {resting('BUY')}")
+
+        # 3. TP fill closes the trade
+        tick(95250.0, 1.0, ts=3)
+        fills = [f for o in ex._orders.values() for f in o['fills']]
+        check(book.count() == 0 and closed and closed[0][1] == 95200.0 and all(f['isMaker'] for f in fills),
+              f"TP filled at {closed[0][1] if closed else None}, {len(fills)} fills all maker, {book.count()} open trades")
+
+        # 4. TP moves with tp_usdt; a closed gate cancels only the buys
+        tick(94790.0, 1.0, ts=4)
+        grid.sync(ZONE, 94790.0, config._replace(tp_usdt=300.0), False, index, 70.0)
+        check(resting('SELL') == [95100.0] and resting('BUY') == [],
+              f"tp_usdt 200 -> 300: TP {resting('SELL')} | gate closed: buys {resting('BUY')}")
+
+        # 5. Part-filled buy cancelled by sync
+        grid.sync(ZONE, 94790.0, config, True, index, 40.0)
+        ex.on_trade(SYMBOL, 94600.0, 0.0002, ts=5)  # Queue share of a print at the limit
+        grid.sync(None, 94790.0, config, False, index, 40.0)
+        grid.wait_idle()
+        partial = [t for t in book.open_trades() if abs(t['entry_price'] - 94600.0) < 1e-6]
+        check(len(partial) == 1 and abs(partial[0]['quantity'] - 0.0001) < 1e-12 and grid.tps.get(partial[0]['id']),
+              f"Part-filled buy cancelled: trade of {partial[0]['quantity'] if partial else 0} opened")
+
+        # 6. cancel_tp
+        trade = [t for t in book.open_trades() if abs(t['entry_price'] - 94800.0) < 1e-6][0]
+        prior = grid.cancel_tp(trade['id'])
+        tp_order = grid.tps[partial[0]['id']]['orderId']
+        ex.on_trade(SYMBOL, 94850.0, 1.0, ts=6)  # Fills the partial trade's TP (94800)
+        check(prior == (0.0, 0.0) and trade['id'] not in grid.tps and ex.get_order(SYMBOL, tp_order)['status'] == 'FILLED'
+              and grid.cancel_tp(partial[0]['id']) is None and book.get(partial[0]['id']) is None,
+              f"cancel_tp: {prior} before a Smart Exit, None once the TP has filled")
+
+        # 7. Smart Exit racing the fill worker: TP popped, close not recorded yet
+        grid.sync(None, 94790.0, config, False, index, 40.0)
+        tp = grid.tps[trade['id']]
+        recording, release = threading.Event(), threading.Event()
+        record_close = grid.on_tp_filled
+
+        def slow_close(*args):
+            recording.set()
+            release.wait(5)
+            record_close(*args)
+
+        grid.on_tp_filled = slow_close
+        worker = threading.Thread(target=grid._handle, args=(tp['orderId'], 'FILLED', trade['quantity'], trade['quantity'] * tp['price']))
+        worker.start()
+        recording.wait(5)
+        during = grid.cancel_tp(trade['id'])
+        release.set()
+        worker.join()
+        after = grid.cancel_tp(trade['id'])
+        check(during is None and after is None and book.get(trade['id']) is None,
+              f"cancel_tp while the TP fill is recorded: {during}, after the close: {after} (no second sell)")
+
+        # 8. Trade cooldown
+        book = PositionBook(None, 'paper_trade_log', symbol=SYMBOL, journal=TradeJournal(None, path=os.path.join(root, 'cooldown.db')))
+        book.loaded = True
+        ex = SimExchange(realtime=False, latency_ms=0)
+        ex.set_filters(SYMBOL, DEFAULT_FILTERS)
+        now = [1000.0]
+        grid = LimitGrid(ex, SYMBOL, book, ex.filters(SYMBOL), on_buy_filled, on_tp_filled, orders=3, clock=lambda: now[0]).start()
+        ex.listeners.append(grid.on_execution_report)
+        cooling = config._replace(trade_cooldown=300)
+        ex.on_price(SYMBOL, 95050.0, ts=10)
+        grid.sync(ZONE, 95050.0, cooling, True, index, 40.0)
+        placed = resting('BUY')
+        for ts, price in enumerate((94990.0, 94790.0, 94590.0), start=11):  # Through all three levels, print by print
+            tick(price, 1.0, ts=ts)
+        after_drop = resting('BUY')
+        now[0] += 299
+        grid.sync(ZONE, 94590.0, cooling, True, index, 40.0)
+        during = resting('BUY')
+        now[0] += 2
+        grid.sync(ZONE, 94590.0, cooling, True, index, 40.0)
+        check(len(placed) == 3 and book.count() == 1 and after_drop == [] and during == [] and len(resting('BUY')) == 3,
+              f"Cooldown 300s: {len(placed)} resting buys, a drop through them opened {book.count()} trade; "
+              f"buys during the cooldown {during}, after it {len(resting('BUY'))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Verifies market_store.py offline against fixture_client.FixtureClient:
+  1. An initial sync stores exactly the candles the exchange returns.
+  2. A later sync downloads only the new candles.
+  3. A hole in the stored series is detected and refilled.
+  4. Exchange outages are recorded as known gaps and not requested again.
+  5. range() reads are zero-copy views into the memory-mapped file.
+  6. A backtest reads straight from the store.
+  7. Writers in separate processes (bot, dashboard) appending and backfilling the same series leave it sorted and unique.
+
+Usage: python verify_market_store.py
+"""
+
+import mmap
+import multiprocessing
+import tempfile
+
+import numpy as np
+
+from backtest import run_backtest
+from fixture_client import FIXTURE_ORIGIN, FixtureClient
+from market_store import MarketStore, to_records
+
+DAY_MS = 86_400_000
+HOUR_MS = 3_600_000
+
+
+def check(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    return ok
+
+
+def expected(client, symbol, interval, start, end):
+    calls = client.calls
+    rows = client.get_historical_klines(symbol, interval, start, end - 1)
+    client.calls = calls
+    return to_records(rows)
+
+
+def write_chunks(root, symbol, records, seed):
+    """One writer process: the same candles in a different order of overlapping chunks."""
+    store = MarketStore(root)
+    rng = np.random.default_rng(seed)
+    starts = rng.permutation(np.arange(0, len(records), 50))
+    for a in starts:
+        store.write(symbol, '1m', records[a:a + 120])
+
+
+def main():
+    symbol = 'BTCUSDT'
+    now = FIXTURE_ORIGIN + 20 * DAY_MS + 17 * 60_000 + 30_000
+    client = FixtureClient(now=now)
+    end = now // 60_000 * 60_000  # The in-progress candle is not stored
+    start = end - 5 * DAY_MS
+
+    with tempfile.TemporaryDirectory() as root:
+        store = MarketStore(root)
+
+        # 1. Initial sync
+        added = store.sync(client, symbol, '1m', start, end)
+        stored = np.array(store.records(symbol, '1m'))
+        check(added == 5 * 1440 and np.array_equal(stored, expected(client, symbol, '1m', start, end)),
+              f"Initial sync: {added:,} candles in {client.calls} requests, identical to the exchange")
+
+        # 2. Incremental sync
+        client.now, client.calls = now + HOUR_MS, 0
+        added = store.sync(client, symbol, '1m', start, end + HOUR_MS)
+        check(added == 60 and client.calls == 1, f"Incremental sync: +{added} candles in {client.calls} request(s)")
+
+        # 3. Hole in the middle
+        records = np.array(store.records(symbol, '1m'))
+        hole = (records['open_time'] >= start + DAY_MS) & (records['open_time'] < start + DAY_MS + 300 * 60_000)
+        records[~hole].tofile(store._path(symbol, '1m'))
+        gaps = store.gaps(symbol, '1m')
+        client.calls = 0
+        added = store.sync(client, symbol, '1m', start, end + HOUR_MS)
+        check(gaps == [(start + DAY_MS, start + DAY_MS + 300 * 60_000)] and added == 300 and client.calls == 1 and not store.gaps(symbol, '1m'),
+              f"Hole: {gaps} detected, refilled with {added} candles in {client.calls} request(s)")
+
+        # 4. Exchange outage
+        outage = (start // HOUR_MS * HOUR_MS + 2 * DAY_MS, start // HOUR_MS * HOUR_MS + 2 * DAY_MS + 2 * HOUR_MS)
+        outage_client = FixtureClient(now=now, outages=[outage])
+        store.sync(outage_client, 'ETHUSDT', '1h', start, end)
+        outage_client.calls = 0
+        store.sync(outage_client, 'ETHUSDT', '1h', start, end)
+        check(store.known_gaps('ETHUSDT', '1h') == [outage] and not store.gaps('ETHUSDT', '1h') and outage_client.calls == 0,
+              f"Outage recorded as known gap {store.known_gaps('ETHUSDT', '1h')}, re-sync made {outage_client.calls} requests")
+
+        # 5. Zero-copy reads
+        view = store.range(symbol, '1m', start + DAY_MS, start + 2 * DAY_MS)
+        base = view.close
+        while isinstance(base, np.ndarray):
+            base = base.base
+        check(len(view.close) == 1440 and isinstance(base, mmap.mmap) and view.open_time[0] == start + DAY_MS,
+              f"range(): {len(view.close)} candles, backed by {type(base).__name__}")
+
+        # 6. Backtest from the store
+        bars = store.range(symbol, '1m', start, end)
+        price = float(bars.close[-1])
+        zones = [{'zone_name': 'Z1', 'price_low': price * 0.9, 'price_high': price * 1.1, 'capital_allocated': 400}]
+        _, summary = run_backtest(bars, zones, {'grid_step_usdt': price * 0.002, 'tp_usdt': price * 0.003})
+        check(summary['bars'] == len(bars.close), f"Backtest on the store: {summary['bars']:,} bars, {summary['closed_trades']} closed trades")
+        del bars, view, base
+
+        # 7. Concurrent writer processes
+        records = expected(client, 'SOLUSDT', '1m', start, start + DAY_MS)
+        writers = [multiprocessing.Process(target=write_chunks, args=(root, 'SOLUSDT', records, seed)) for seed in range(4)]
+        for w in writers:
+            w.start()
+        for w in writers:
+            w.join()
+        stored = np.array(store.records('SOLUSDT', '1m'))
+        check(all(w.exitcode == 0 for w in writers) and np.array_equal(stored, records),
+              f"4 writer processes, {len(records)} candles in overlapping chunks: {len(stored)} stored, "
+              f"{len(np.unique(stored['open_time']))} unique, sorted: {bool(np.all(np.diff(stored['open_time']) > 0))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Verifies portfolio_ledger.PortfolioLedger offline against bench_fakes.FakeSupabase:
+  1. After a run of fills and ticks, the ledger's snapshot has the same totals
+     as capture_snapshot recomputing them from the trade table.
+  2. The max drawdown is over every tick (hourly samples of the same path miss the bottom).
+  3. A restarted ledger gets the peak and max drawdown back from its checkpoint.
+  4. A trade closed outside the bot (open count drift vs the position book) is adopted.
+  5. A snapshot is one insert + one checkpoint upsert, however long the trade history.
+
+Usage: python verify_portfolio_ledger.py
+"""
+
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from bench_fakes import FakeBinance, FakeSupabase, synthetic_dataset
+from portfolio_ledger import PortfolioLedger
+from snapshot_manager import capture_snapshot
+
+SYMBOL = 'BTCUSDT'
+COMPARED = ('total_equity_usdt', 'realized_pnl', 'unrealized_pnl', 'total_fees_paid', 'open_trade_count',
+            'total_position_btc', 'total_position_usdt', 'baseline_return_pct')
+
+
+def tables(n_trades):
+    _, trades = synthetic_dataset(n_trades, 10, 5.0, SYMBOL, open_ratio=0.2)
+    return {
+        'paper_trade_log': trades,
+        'baseline_prices': [{'id': 1, 'symbol': SYMBOL, 'baseline_price': 90000.0, 'initial_capital': 10000.0}],
+        'portfolio_snapshots': [],
+    }
+
+
+def quiet(fn, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+
+def buy(db, ledger, price, qty=0.0002):
+    """A fill as record_buy logs it: the row, then the ledger."""
+    row = db.table('paper_trade_log').insert({
+        'symbol': SYMBOL, 'zone_name': 'Z1', 'entry_price': price, 'quantity': qty, 'total_usdt': price * qty,
+        'fee_usdt': price * qty * 0.00075, 'status': 'OPEN', 'created_at': '2026-01-01T00:00:00+00:00'}).execute().data[0]
+    ledger.on_open(row)
+    return row
+
+
+def sell(db, ledger, trade, price):
+    fee = trade['fee_usdt'] + price * trade['quantity'] * 0.00075
+    update = {'status': 'CLOSED', 'exit_price': price, 'pnl_usdt': (price - trade['entry_price']) * trade['quantity'] - fee, 'fee_usdt': fee}
+    db.table('paper_trade_log').update(update).eq('id', trade['id']).execute()
+    ledger.on_close(trade, update)
+
+
+def close(a, b):
+    return all(abs(float(a[k]) - float(b[k])) <= 1e-6 * max(1.0, abs(float(a[k]))) for k in COMPARED)
+
+
+def check(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    return ok
+
+
+def main():
+    db = FakeSupabase(tables(2000))
+    ledger = quiet(PortfolioLedger(db, SYMBOL).load)
+
+    # A day of minute ticks: up, a crash, a recovery; a buy every 30 ticks, sold 200 above
+    t = np.linspace(0, 1, 1440)
+    path = 100000 + 8000 * np.sin(t * np.pi) - 12000 * np.exp(-((t - 0.6) / 0.05) ** 2)
+    open_rows, equity = [], []
+    for i, price in enumerate(path):
+        ledger.on_price(price)
+        equity.append(ledger.equity())
+        if i % 30 == 0:
+            open_rows.append(buy(db, ledger, float(price)))
+        for row in [r for r in open_rows if price >= r['entry_price'] + 200]:
+            sell(db, ledger, row, float(price))
+            open_rows.remove(row)
+        equity.append(ledger.equity())  # Fills mark too (fees)
+
+    # 1. Same totals as the full recompute
+    row = ledger.snapshot_row()
+    quiet(capture_snapshot, db, FakeBinance(prices={SYMBOL: float(path[-1])}), 'PAPER', SYMBOL)
+    full = db.tables['portfolio_snapshots'][-1]
+    check(close(row, full), f"Incremental vs recomputed: equity {row['total_equity_usdt']:.2f} vs {full['total_equity_usdt']:.2f}, "
+                            f"{row['open_trade_count']} open, realized {row['realized_pnl']:.2f}")
+
+    # 2. Max drawdown over every tick
+    equity = np.array(equity)
+    peak = np.maximum.accumulate(equity)
+    expected = float(((peak - equity) / peak * 100).max())
+    hourly = equity[::120]
+    hourly_dd = float(((np.maximum.accumulate(hourly) - hourly) / np.maximum.accumulate(hourly) * 100).max())
+    check(abs(ledger.max_drawdown_pct - expected) < 0.01 and ledger.max_drawdown_pct > hourly_dd,
+          f"Max drawdown {ledger.max_drawdown_pct:.3f}% (per tick {expected:.3f}%, hourly samples only {hourly_dd:.3f}%)")
+
+    # 3. Restart from the checkpoint
+    quiet(ledger.checkpoint)
+    restarted = quiet(PortfolioLedger(db, SYMBOL).load)
+    check(abs(restarted.max_drawdown_pct - ledger.max_drawdown_pct) < 1e-9 and abs(restarted.peak_equity - ledger.peak_equity) < 1e-6
+          and abs(restarted.realized_pnl - ledger.realized_pnl) < 1e-6 and restarted.open_count == ledger.open_count,
+          f"Restart: peak {restarted.peak_equity:,.2f}, max DD {restarted.max_drawdown_pct:.3f}%, {restarted.open_count} open from {len(db.tables['portfolio_state'])} checkpoint row")
+
+    # 4. Drift: a trade closed in the dashboard
+    victim = next(r for r in db.tables['paper_trade_log'] if r['status'] == 'OPEN')
+    victim.update(status='CLOSED', pnl_usdt=1.0)
+    before = ledger.open_count
+    quiet(ledger.maybe_checkpoint, before - 1)
+    check(ledger.open_count == before - 1, f"Drift: {before} -> {ledger.open_count} open after the book reported {before - 1}")
+
+    # 5. O(1) snapshots
+    big = FakeSupabase(tables(100000))
+    big_ledger = quiet(PortfolioLedger(big, SYMBOL).load)
+    big_ledger.on_price(100000.0)
+    calls, started = big.calls, time.perf_counter()
+    quiet(big_ledger.write_snapshot)
+    ms = (time.perf_counter() - started) * 1000
+    check(big.calls - calls == 2, f"100000 trades: snapshot = {big.calls - calls} round trips (insert + checkpoint) in {ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Verifies the read model (read_model.py) offline: a ReadModel over a real
+ConfigCache and PositionBook on bench_fakes.FakeSupabase, served on a local port:
+  1. /state returns the bot's price, zones, settings, open positions and recent trades.
+  2. A read is one keep-alive round trip: far below a Supabase query (FakeSupabase at SUPABASE_MS).
+  3. A subscriber wakes on a fill with the changed topics; a quiet topic times out empty.
+  4. Price ticks are coalesced into at most one notification per PRICE_PUBLISH_INTERVAL; reads see the last tick.
+  5. A zones_config change reaches /zones and wakes a zones subscriber.
+  6. Without the service the client returns None and skips it until CLIENT_RETRY_AFTER.
+  7. A subscriber ahead of a restarted bot's version returns at once.
+  8. The async engine (bot_engine.py, what start_system.bat launches) serves the read model once started.
+
+Usage: python verify_read_model.py
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+# The engine's trade journal goes to a scratch directory. Set before trade_journal is
+# imported (position_book imports it), which fixes its default path.
+WORKDIR = tempfile.mkdtemp(prefix='verify_read_model-')
+os.environ['TRADE_JOURNAL_PATH'] = os.path.join(WORKDIR, 'journal.db')
+
+import read_model
+from bench_fakes import FakeBinance, FakeSupabase, synthetic_dataset
+from benchmark import load_bot
+from config_cache import ConfigCache, SupabaseConfigSource
+from position_book import PositionBook, normalize_trade
+from read_model import PRICE_PUBLISH_INTERVAL, ReadModel, ReadModelClient, start_server
+
+SYMBOL = 'BTCUSDT'
+TABLE = 'paper_trade_log'
+PORT = 9198
+SUPABASE_MS = 30
+DEFAULTS = {'rsi_limit': 40, 'tp_usdt': 200, 'grid_step_usdt': 100, 'trade_cooldown': 60, 'trade_size_usdt': 20}
+
+
+def setup():
+    zones, trades = synthetic_dataset(200, 5, 50.0, SYMBOL, open_ratio=0.3, low=90000, high=100000)
+    db = FakeSupabase({TABLE: trades, 'zones_config': zones, 'bot_settings': [{'id': 1, 'is_active': True, 'tp_usdt': 150}]})
+    config_cache = ConfigCache(SupabaseConfigSource(db), DEFAULTS)
+    book = PositionBook(db, TABLE, symbol=SYMBOL)
+    book.load()
+
+    model = ReadModel()
+    model.symbols.add(SYMBOL)
+    model.provide('zones', lambda symbol: config_cache.get().zones_for(symbol))
+    model.provide('settings', lambda symbol: {k: v for k, v in config_cache.get()._asdict().items() if k not in ('zones', 'zone_indexes')})
+    model.provide('positions', lambda symbol: book.open_trades())
+    model.provide('ledger', lambda symbol: {'open_trade_count': book.count()})
+    model.seed_trades(SYMBOL, [normalize_trade(t) for t in trades[-model.recent_trades:]])
+    config_cache.listeners.append(model.on_config)
+    config_cache.get()
+    return db, config_cache, book, model
+
+
+async def start_engine(port, timeout=15):
+    """Runs AsyncBotEngine.run() on the fakes until its read model answers. Returns (bot, /state or None)."""
+    zones, trades = synthetic_dataset(200, 5, 50.0, SYMBOL, open_ratio=0.3, low=90000, high=100000)
+    db = FakeSupabase({TABLE: trades, 'zones_config': zones, 'portfolio_state': [], 'portfolio_snapshots': [],
+                       'bot_settings': [dict(DEFAULTS, id=1, is_active=False)],
+                       'baseline_prices': [{'id': 1, 'symbol': SYMBOL, 'baseline_price': 90000.0, 'initial_capital': 10000.0}]})
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot = load_bot(FakeBinance(prices={SYMBOL: 95000.0}), db, WORKDIR)
+        import bot_engine
+        bot.USE_METRICS = bot.USE_MARKET_FEED = bot.USE_MARKET_STORE = False
+        bot.start_config_watch = lambda: None  # No Realtime connection to the fake project
+        bot.READ_MODEL_PORT = port
+        read_model._server = None  # One server per process: this one is the bot's
+        client = ReadModelClient(port, retry_after=0)
+        task = asyncio.create_task(bot_engine.AsyncBotEngine(SYMBOL).run())
+        state, deadline = None, time.monotonic() + timeout
+        while state is None and not task.done() and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+            state = await asyncio.to_thread(client.state, SYMBOL)
+        task.cancel()
+        with contextlib.suppress(BaseException):
+            await task
+    return bot, state
+
+
+def check(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    return ok
+
+
+def main():
+    db, config_cache, book, model = setup()
+    start_server(model, PORT)
+    client = ReadModelClient(PORT)
+
+    # 1. State
+    model.on_trade(SYMBOL, 95123.45, 0.01)
+    state = client.state(SYMBOL)
+    check(state['price'] == 95123.45 and len(state['zones']) == 5 and state['settings']['tp_usdt'] == 150
+          and len(state['positions']) == book.count() and len(state['trades']) == model.recent_trades
+          and state['trades'][0]['id'] == 200 and client.state('ETHUSDT')['price'] is None,
+          f"/state: price {state['price']}, {len(state['zones'])} zones, TP ${state['settings']['tp_usdt']}, "
+          f"{len(state['positions'])} open positions, {len(state['trades'])} recent trades (newest first); other symbols None")
+
+    # 2. Latency
+    reads = []
+    for _ in range(500):
+        started = time.perf_counter()
+        client.price(SYMBOL)
+        reads.append(time.perf_counter() - started)
+    slow = FakeSupabase(db.tables, latency_ms=SUPABASE_MS)
+    started = time.perf_counter()
+    slow.table(TABLE).select("*").eq("symbol", SYMBOL).eq("status", "OPEN").execute()
+    query = time.perf_counter() - started
+    median = statistics.median(reads)
+    check(median < 0.002 and median < query / 10,
+          f"Price read: median {median * 1e6:.0f} µs over 500 keep-alive reads vs {query * 1000:.1f} ms for one Supabase query")
+
+    # 3. Subscribe: woken by a fill
+    since, woken = model.version, {}
+
+    def subscriber():
+        woken['response'] = client.subscribe(('trades', 'positions'), since, timeout=5)
+        woken['at'] = time.perf_counter()
+
+    t = threading.Thread(target=subscriber)
+    t.start()
+    time.sleep(0.1)
+    trade = book.open({'zone_name': 'Z1', 'entry_price': 95000.0, 'quantity': 0.0002, 'total_usdt': 19.0, 'status': 'OPEN'})
+    filled = time.perf_counter()
+    model.on_fill(SYMBOL, trade)
+    t.join()
+    started = time.perf_counter()
+    quiet = client.subscribe(('zones',), model.version, timeout=0.3)
+    waited = time.perf_counter() - started
+    check(sorted(woken['response']['changed']) == ['positions', 'trades'] and woken['at'] - filled < 0.05
+          and quiet['changed'] == [] and 0.3 <= waited < 1.0 and client.get('trades', SYMBOL)[0]['id'] == trade['id'],
+          f"Fill woke the subscriber after {(woken['at'] - filled) * 1000:.1f} ms with {sorted(woken['response']['changed'])}; "
+          f"quiet zones subscription returned {quiet['changed']} after {waited:.2f}s")
+
+    # 4. Price tick coalescing
+    version = model.version
+    started = time.perf_counter()
+    for i in range(5000):
+        model.on_trade(SYMBOL, 95000.0 + i)
+    elapsed = time.perf_counter() - started
+    notifications = model.version - version
+    check(client.price(SYMBOL) == 99999.0 and notifications <= elapsed / PRICE_PUBLISH_INTERVAL + 1,
+          f"5000 ticks in {elapsed * 1000:.0f} ms: {notifications} notification(s), last price {client.price(SYMBOL)}")
+
+    # 5. Config change
+    since, woken = model.version, {}
+    t = threading.Thread(target=lambda: woken.update(response=client.subscribe(('zones',), since, timeout=5)))
+    t.start()
+    time.sleep(0.1)
+    db.tables['zones_config'].append(dict(db.tables['zones_config'][-1], id=99, zone_name='Z6', price_low=100000.0, price_high=102000.0))
+    config_cache.invalidate("zones_config changed")
+    config_cache.get()
+    t.join()
+    zones = client.get('zones', SYMBOL)
+    check(woken['response']['changed'] == ['zones'] and len(zones) == 6,
+          f"zones_config change: subscriber woken with {woken['response']['changed']}, /zones has {len(zones)} zones")
+
+    # 6. Service down
+    down = ReadModelClient(PORT + 1)
+    first = time.perf_counter()
+    missing = down.price(SYMBOL)
+    first = time.perf_counter() - first
+    second = time.perf_counter()
+    skipped = down.state(SYMBOL)
+    second = time.perf_counter() - second
+    check(missing is None and skipped is None and second < 0.001,
+          f"No service: None after {first * 1000:.2f} ms, then None in {second * 1e6:.0f} µs without connecting")
+
+    # 7. Restarted bot
+    started = time.perf_counter()
+    ahead = client.subscribe(('trades',), model.version + 1000, timeout=5)
+    check(ahead['changed'] == ['trades'] and time.perf_counter() - started < 0.5,
+          f"Subscriber ahead of the bot's version (restart): returned at once with {ahead['changed']}")
+
+    # 8. Async engine startup
+    try:
+        bot, state = asyncio.run(start_engine(PORT + 2))
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+    book = bot.symbol_state(SYMBOL).position_book
+    check(state is not None and len(state['zones']) == 5 and len(state['positions']) == book.count() > 0,
+          f"AsyncBotEngine.run(): read model up on :{PORT + 2} with "
+          f"{len(state['zones']) if state else 0} zones and {len(state['positions']) if state else 0} open positions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Verifies sim_exchange.py:
+  1. MARKET orders walk the depth (slippage) and expire the rest when the book runs out.
+  2. Orders reach the book after the latency, against the book at that time.
+  3. Resting LIMIT orders fill as maker from prints (queue share at the price), IOC / FOK.
+  4. LOT_SIZE / PRICE_FILTER / NOTIONAL rejections.
+  5. Event throughput (trade + bookTicker events with resting orders).
+  6. A backtest filled through the simulated exchange pays the spread.
+
+Usage: python verify_sim_exchange.py
+"""
+
+import time
+
+import numpy as np
+
+from sim_exchange import DEFAULT_FILTERS, SimExchange, SimOrderError, filters_from_info
+
+SYMBOL = 'BTCUSDT'
+
+
+def check(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    return ok
+
+
+def book_exchange(**kwargs):
+    ex = SimExchange(realtime=False, **kwargs)
+    ex.set_filters(SYMBOL, DEFAULT_FILTERS._replace(min_notional=1.0))
+    ex.on_book(SYMBOL, [(99.9, 1.0), (99.8, 2.0)], [(100.1, 0.5), (100.2, 0.5), (100.5, 1.0)], ts=0)
+    return ex
+
+
+def main():
+    # 1. Depth walk / partial fill
+    ex = book_exchange(latency_ms=0)
+    order = ex.create_order(SYMBOL, 'BUY', 'MARKET', 0.8, ts=1)
+    avg = float(order['cummulativeQuoteQty']) / float(order['executedQty'])
+    check(order['status'] == 'FILLED' and abs(avg - (0.5 * 100.1 + 0.3 * 100.2) / 0.8) < 1e-9 and len(order['fills']) == 2,
+          f"MARKET BUY 0.8: {len(order['fills'])} levels, avg {avg:.4f} (best ask 100.1)")
+    order = ex.create_order(SYMBOL, 'BUY', 'MARKET', 5.0, ts=2)
+    check(order['status'] == 'EXPIRED' and float(order['executedQty']) == 1.2,
+          f"MARKET BUY 5.0 on 1.2 left: {order['status']}, executed {float(order['executedQty'])}")
+
+    # 2. Latency
+    ex = book_exchange(latency_ms=100)
+    order = ex.create_order(SYMBOL, 'SELL', 'MARKET', 0.5, ts=1000)
+    sent = order['status']
+    ex.on_book(SYMBOL, [(98.0, 1.0)], [(98.2, 1.0)], ts=1050)  # Price drops while the order is in flight
+    ex.on_trade(SYMBOL, 98.1, 0.1, ts=1200)
+    check(sent == 'NEW' and order['status'] == 'FILLED' and order['fills'][0]['price'] == f"{98.0:.8f}",
+          f"Latency: sent {sent}, filled at {float(order['fills'][0]['price'])} (book at arrival)")
+
+    # 3. Resting LIMIT
+    ex = book_exchange(latency_ms=0)
+    reports = []
+    ex.listeners.append(reports.append)
+    order = ex.create_order(SYMBOL, 'BUY', 'LIMIT', 1.0, price=99.5, ts=1)
+    ex.on_trade(SYMBOL, 99.5, 0.4, ts=2)   # At the price: queue share
+    at_price = float(order['executedQty'])
+    ex.on_trade(SYMBOL, 99.4, 5.0, ts=3)   # Through the price
+    check(at_price == 0.2 and order['status'] == 'FILLED' and all(f['isMaker'] for f in order['fills'])
+          and [r['X'] for r in reports] == ['PARTIALLY_FILLED', 'FILLED'],
+          f"LIMIT GTC: {at_price} filled at the price, then FILLED through it as maker, {len(reports)} executionReports")
+    ioc = ex.create_order(SYMBOL, 'BUY', 'LIMIT', 1.5, price=100.2, timeInForce='IOC', ts=4)
+    fok = ex.create_order(SYMBOL, 'BUY', 'LIMIT', 5.0, price=100.5, timeInForce='FOK', ts=5)
+    check(ioc['status'] == 'EXPIRED' and float(ioc['executedQty']) == 1.0 and fok['status'] == 'EXPIRED' and float(fok['executedQty']) == 0,
+          f"IOC: {float(ioc['executedQty'])} taken, rest {ioc['status']} | FOK: {fok['status']} with nothing filled")
+
+    # 4. Filters
+    f = filters_from_info({'filters': [
+        {'filterType': 'LOT_SIZE', 'stepSize': '0.00001000', 'minQty': '0.00001000', 'maxQty': '9000.00000000'},
+        {'filterType': 'PRICE_FILTER', 'tickSize': '0.01000000'},
+        {'filterType': 'NOTIONAL', 'minNotional': '5.00000000', 'applyMinToMarket': True, 'maxNotional': '9000000.00000000'},
+    ]})
+    ex = SimExchange(realtime=False, latency_ms=0)
+    ex.set_filters(SYMBOL, f)
+    ex.on_price(SYMBOL, 90000.0, ts=0)
+    errors = []
+    for kwargs in ({'type': 'MARKET', 'quantity': 0.000015}, {'type': 'LIMIT', 'quantity': 0.001, 'price': 90000.005},
+                   {'type': 'MARKET', 'quantity': 0.00005}):
+        try:
+            ex.create_order(SYMBOL, 'BUY', **kwargs)
+        except SimOrderError as e:
+            errors.append(e.message)
+    check(errors == ["Filter failure: LOT_SIZE", "Filter failure: PRICE_FILTER", "Filter failure: NOTIONAL"], f"Filters: {errors}")
+
+    # 5. Throughput
+    ex = SimExchange(realtime=False, latency_ms=50)
+    n = 1_000_000
+    rng = np.random.default_rng(1)
+    prices = (90000 * np.exp(np.cumsum(rng.normal(0, 0.00005, n)))).round(2).tolist()
+    for k in range(50):
+        ex.create_order(SYMBOL, 'BUY', 'LIMIT', 0.001, price=round(prices[0] * (1 - 0.0005 * (k + 1)), 2), ts=0)
+        ex.create_order(SYMBOL, 'SELL', 'LIMIT', 0.001, price=round(prices[0] * (1 + 0.0005 * (k + 1)), 2), ts=0)
+    started = time.perf_counter()
+    for i, p in enumerate(prices):
+        if i & 1:
+            ex.on_quote(SYMBOL, p - 0.01, p + 0.01, 1.0, 1.0, ts=i)
+        else:
+            ex.on_trade(SYMBOL, p, 0.01, ts=i)
+    elapsed = time.perf_counter() - started
+    filled = 100 - len(ex.get_open_orders(SYMBOL))
+    check(ex.events == n, f"Throughput: {n / elapsed * 60 / 1e6:.1f}M events/min ({filled} of 100 resting orders filled)")
+
+    # 6. Backtest
+    from backtest import run_backtest
+    from verify_backtest import ZONES, random_walk
+    bars = random_walk(20_000)
+    settings = {'grid_step_usdt': 150.0, 'tp_usdt': 200.0, 'rsi_limit': 55}
+    _, plain = run_backtest(bars, ZONES, settings)
+    ex = SimExchange(realtime=False, spread_bps=2.0)
+    _, sim = run_backtest(bars, ZONES, settings, exchange=ex)
+    check(sim['realized_pnl'] < plain['realized_pnl'],
+          f"Backtest: realized ${plain['realized_pnl']:.2f} at the close vs ${sim['realized_pnl']:.2f} through the simulated exchange")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Verifies the chart query layer (snapshot_series.py, add_snapshot_series_function.sql)
+offline against bench_fakes.FakeSupabase with Supabase's 1000-row cap:
+  1. Each visible range gets a bucket giving at most MAX_BUCKETS rollups.
+  2. A chart is at most POINT_BUDGET points per line, for hourly and per-minute histories alike.
+  3. LTTB keeps a one-sample crash that plain decimation drops; the worst drawdown survives the rollups.
+  4. The rollups from snapshot_series() equal the client-side fallback (paged raw rows).
+  5. DashboardData serves a range from memory on reruns.
+
+Usage: python verify_snapshot_series.py
+"""
+
+import contextlib
+import io
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import snapshot_series as ss
+from bench_fakes import FakeBinance, FakeSupabase
+from dashboard_data import DashboardData
+
+SYMBOL = 'BTCUSDT'
+ROW_CAP = 1000
+NOW = 1_790_000_000.0
+
+
+def history(n, step_seconds, seed=7):
+    """`n` snapshots every `step_seconds` up to NOW: an equity random walk with one deep, one-sample crash."""
+    rng = np.random.default_rng(seed)
+    equity = 10000.0 + np.cumsum(rng.normal(0, 5, n))
+    crash = int(n * 0.6)
+    equity[crash] -= 2500.0
+    peak = np.maximum.accumulate(equity)
+    dd = (peak - equity) / peak * 100
+    max_dd = np.maximum.accumulate(dd)
+    rows = [{
+        'id': i + 1, 'symbol': SYMBOL, 'btc_price': 95000.0,
+        'snapshot_time': datetime.fromtimestamp(NOW - (n - 1 - i) * step_seconds, timezone.utc).isoformat(),
+        'total_equity_usdt': float(equity[i]), 'current_drawdown_pct': float(dd[i]),
+        'max_drawdown_pct': float(max_dd[i]),
+    } for i in range(n)]
+    return rows, equity, float(dd.max())
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def check(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    return ok
+
+
+def main():
+    # 1. Resolution per range
+    picks = {r: ss.pick_bucket(span or 3 * 365 * 86400) for r, span in ss.CHART_RANGES.items()}
+    check(all((span or 3 * 365 * 86400) / picks[r] <= ss.MAX_BUCKETS for r, span in ss.CHART_RANGES.items()),
+          "Buckets: " + ", ".join(f"{r} {ss.format_bucket(b)}" for r, b in picks.items()) + " ('All' over 3 years)")
+
+    # 2. Point budget for both histories
+    hourly, _, _ = history(24 * 365, 3600)
+    minutely, equity, worst_dd = history(90 * 24 * 60, 60)
+    sizes = []
+    for name, rows in (('hourly, 1y', hourly), ('per minute, 90d', minutely)):
+        db = FakeSupabase({'portfolio_snapshots': rows}, max_rows=ROW_CAP)
+        for range_key in ss.CHART_RANGES:
+            df, bucket = ss.load_series(db, SYMBOL, range_key, now=NOW)
+            sizes.append((name, range_key, len(df)))
+    most = max(n for _, _, n in sizes)
+    check(most <= 2 * ss.POINT_BUDGET, f"Largest chart {most} points over {len(sizes)} range/history pairs "
+                                       f"(budget {ss.POINT_BUDGET} per line; {len(minutely):,} raw snapshots at most)")
+
+    # 3. Shape kept
+    x = np.arange(len(equity), dtype=float)
+    keep = ss.lttb(x, equity, ss.POINT_BUDGET)
+    stride = np.arange(0, len(equity), len(equity) // ss.POINT_BUDGET)
+    crash = int(np.argmin(equity))
+    df_all, _ = ss.load_series(FakeSupabase({'portfolio_snapshots': minutely}), SYMBOL, 'All', now=NOW)
+    check(len(keep) == ss.POINT_BUDGET and crash in keep and crash not in stride
+          and abs(df_all['drawdown_pct'].max() - worst_dd) < 1e-9,
+          f"LTTB keeps the crash at {crash} (every-nth decimation does not); worst drawdown {df_all['drawdown_pct'].max():.2f}% "
+          f"of {worst_dd:.2f}% in the 'All' chart")
+
+    # 4. Server rollups == client-side fallback
+    server = FakeSupabase({'portfolio_snapshots': minutely}, max_rows=ROW_CAP)
+    legacy = FakeSupabase({'portfolio_snapshots': minutely}, max_rows=ROW_CAP, functions={})
+    a = ss.load_series(server, SYMBOL, '7d', now=NOW, budget=10**9)[0]
+    b = quiet(ss.load_series, legacy, SYMBOL, '7d', now=NOW, budget=10**9)[0]
+    same = len(a) == len(b) and (a['bucket_time'] == b['bucket_time']).all() \
+        and np.allclose(a[ss.SERIES_COLUMNS[1:]].to_numpy(), b[ss.SERIES_COLUMNS[1:]].to_numpy())
+    check(same, f"7d: {len(a)} rollups from snapshot_series() ({server.calls} call) == fallback ({legacy.calls} paged calls)")
+
+    # 5. Cached reruns
+    data = DashboardData(server, FakeBinance())
+    data.snapshot_series(SYMBOL, '30d')
+    before, started = server.calls, time.perf_counter()
+    for _ in range(100):
+        data.snapshot_series(SYMBOL, '30d')
+    ms = (time.perf_counter() - started) * 1000 / 100
+    check(server.calls == before, f"100 reruns: {server.calls - before} calls, {ms:.3f} ms each")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Verifies the server-side snapshot aggregates (snapshot_manager.fetch_snapshot_stats)
+offline against bench_fakes.FakeSupabase, whose snapshot_stats() mirrors
+add_snapshot_stats_function.sql:
+  1. capture_snapshot writes the same row through snapshot_stats() as through
+     the client-side fallback, while the history fits in one response.
+  2. Past the 1000-row API limit the totals stay exact through snapshot_stats()
+     (the client-side path truncates), in one round trip with a one-row payload.
+  3. Without the function installed, capture_snapshot falls back to the client-side totals.
+
+Usage: python verify_snapshot_stats.py
+"""
+
+import contextlib
+import io
+
+from bench_fakes import FakeBinance, FakeSupabase, synthetic_dataset
+from snapshot_manager import capture_snapshot, fetch_snapshot_stats, fetch_snapshot_stats_client_side
+
+SYMBOL = 'BTCUSDT'
+PRICE = 100000.0
+ROW_LIMIT = 1000
+COMPARED = ('total_equity_usdt', 'realized_pnl', 'unrealized_pnl', 'total_fees_paid', 'open_trade_count',
+            'total_position_btc', 'total_position_usdt', 'peak_equity', 'current_drawdown_pct', 'baseline_return_pct')
+
+
+def tables(n_trades):
+    _, trades = synthetic_dataset(n_trades, 10, 5.0, SYMBOL, open_ratio=0.2)
+    return {
+        'paper_trade_log': trades,
+        'baseline_prices': [{'id': 1, 'symbol': SYMBOL, 'baseline_price': 90000.0, 'initial_capital': 10000.0}],
+        'portfolio_snapshots': [{'id': 1, 'symbol': SYMBOL, 'total_equity_usdt': 1e6}],
+    }
+
+
+def snapshot(db):
+    with contextlib.redirect_stdout(io.StringIO()):
+        capture_snapshot(db, FakeBinance(prices={SYMBOL: PRICE}), mode='PAPER', symbol=SYMBOL)
+    return db.tables['portfolio_snapshots'][-1]
+
+
+def close(a, b):
+    return all(abs(float(a[k]) - float(b[k])) <= 1e-6 * max(1.0, abs(float(a[k]))) for k in COMPARED)
+
+
+def check(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    return ok
+
+
+def main():
+    # 1. Same snapshot both ways while everything fits in one response
+    server = snapshot(FakeSupabase(tables(800), max_rows=ROW_LIMIT))
+    client = snapshot(FakeSupabase(tables(800), max_rows=ROW_LIMIT, functions={}))
+    check(close(server, client), f"800 trades: equity {server['total_equity_usdt']:.2f} vs {client['total_equity_usdt']:.2f}, "
+                                 f"{server['open_trade_count']} open, DD {server['current_drawdown_pct']:.2f}%")
+
+    # 2. Past the row limit
+    data = tables(20000)
+    closed = [t for t in data['paper_trade_log'] if t['status'] == 'CLOSED']
+    expected = sum(t['pnl_usdt'] for t in closed)
+    db = FakeSupabase(data, max_rows=ROW_LIMIT)
+    stats = fetch_snapshot_stats(db, True, SYMBOL)
+    truncated = fetch_snapshot_stats_client_side(FakeSupabase(data, max_rows=ROW_LIMIT), True, SYMBOL)
+    check(abs(stats['realized_pnl'] - expected) < 1e-6 and db.calls == 1 and truncated['realized_pnl'] != stats['realized_pnl'],
+          f"20000 trades: realized {stats['realized_pnl']:.2f} (expected {expected:.2f}) in {db.calls} call, "
+          f"client-side capped at {truncated['realized_pnl']:.2f}")
+
+    # 3. Function missing
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        capture_snapshot(FakeSupabase(tables(800), functions={}), FakeBinance(prices={SYMBOL: PRICE}), mode='PAPER', symbol=SYMBOL)
+    check("add_snapshot_stats_function.sql" in out.getvalue() and "Captured" in out.getvalue(),
+          "No snapshot_stats(): warned and captured from client-side totals")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Verifies the dashboard's trade aggregates (trade_aggregates.py, add_trade_aggregate_functions.sql)
+offline against bench_fakes.FakeSupabase with Supabase's 1000-row cap:
+  1. Zone Performance, overview and daily PnL from the aggregates equal a recompute over every trade,
+     where the old select("*") stopped at 1000 rows.
+  2. The aggregate responses are the same size for 5,000 and 50,000 trades.
+  3. Without the functions, DashboardData pages every trade row and gets the same numbers.
+  4. Zones without trades get zeros.
+
+Usage: python verify_trade_aggregates.py
+"""
+
+import contextlib
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import trade_aggregates
+from bench_fakes import FakeBinance, FakeSupabase, synthetic_dataset
+from dashboard_data import DashboardData, trades_frame
+
+SYMBOL = 'BTCUSDT'
+ROW_CAP = 1000
+PRICE = 95000.0
+
+
+def tables(n_trades):
+    zones, trades = synthetic_dataset(n_trades, 8, 50.0, SYMBOL, open_ratio=0.3, low=90000, high=100000)
+    zones.append(dict(zones[-1], id=99, zone_name='EMPTY', price_low=100000.0, price_high=101000.0))
+    now = datetime.now(timezone.utc)
+    for i, t in enumerate(trades):  # Closed over the last ~120 days, so the 90-day window cuts some off
+        if t['status'] == 'CLOSED':
+            t['exit_at'] = (now - timedelta(minutes=i * 173000 // n_trades)).isoformat()
+    return {'paper_trade_log': trades, 'zones_config': zones,
+            'baseline_prices': [{'id': 1, 'symbol': SYMBOL, 'baseline_price': 90000.0, 'initial_capital': 10000.0}]}
+
+
+def expected(trades, zones):
+    """Zone Performance + overview + daily PnL recomputed row by row from every trade."""
+    df = trades_frame(trades)
+    is_open, is_closed = df['status'] == 'OPEN', df['status'] == 'CLOSED'
+    perf = {z['zone_name']: (df.loc[is_open & (df['zone_name'] == z['zone_name']), 'total_usdt'].sum(),
+                             df.loc[is_closed & (df['zone_name'] == z['zone_name']), 'pnl_usdt'].sum(),
+                             int((is_open & (df['zone_name'] == z['zone_name'])).sum())) for z in zones}
+    open_df = df[is_open]
+    overview = (df.loc[is_closed, 'pnl_usdt'].sum(), PRICE * open_df['quantity'].sum() - (open_df['entry_price'] * open_df['quantity']).sum(),
+                int(is_open.sum()), df['fee_usdt'].sum())
+    since = datetime.now(timezone.utc) - timedelta(days=trade_aggregates.DAILY_PNL_DAYS)
+    days = {}
+    for t in trades:
+        exit_at = t['status'] == 'CLOSED' and datetime.fromisoformat(t['exit_at'])
+        if exit_at and exit_at >= since:
+            days[exit_at.date()] = days.get(exit_at.date(), 0.0) + t['pnl_usdt']
+    return perf, overview, days
+
+
+def dashboard(db):
+    data = DashboardData(db, FakeBinance(prices={SYMBOL: PRICE}))
+    with contextlib.redirect_stdout(io.StringIO()):
+        return data.zone_performance(True, SYMBOL), data.overview(True, SYMBOL, PRICE), data.daily_pnl(True, SYMBOL), data
+
+
+def matches(perf_df, overview, daily, want):
+    perf, totals, days = want
+    got_perf = {r['Zone Name']: (r['Invested (USDT)'], r['Realized PnL (USDT)'], r['Trade Count']) for r in perf_df.to_dict('records')}
+    got_totals = (overview['realized_profit'], overview['unrealized_profit'], overview['open_trades_count'], overview['paper_fees'])
+    got_days = {d.date(): p for d, p in zip(daily['day'], daily['realized_pnl'])}
+    return (got_perf.keys() == perf.keys() and all(np.allclose(got_perf[z], perf[z]) for z in perf)
+            and np.allclose(got_totals, totals) and got_days.keys() == days.keys()
+            and np.allclose([got_days[d] for d in days], list(days.values())))
+
+
+def payload(db, fn, **params):
+    return len(json.dumps(db.rpc(fn, dict(p_symbol=SYMBOL, p_paper=True, **params)).execute().data))
+
+
+def check(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    return ok
+
+
+def main():
+    # 1. Exact past the row cap
+    t = tables(5000)
+    db = FakeSupabase(t, max_rows=ROW_CAP)
+    want = expected(t['paper_trade_log'], t['zones_config'])
+    perf_df, overview, daily, _ = dashboard(db)
+    capped = trades_frame(db.table('paper_trade_log').select("*").eq("symbol", SYMBOL).execute().data)
+    check(matches(perf_df, overview, daily, want) and len(capped) == ROW_CAP,
+          f"5000 trades: aggregates exact ({overview['open_trades_count']} open, realized {overview['realized_profit']:,.2f}, "
+          f"{len(daily)} days); select(\"*\") saw {len(capped)} rows ({int((capped['status'] == 'OPEN').sum())} open)")
+
+    # 2. Constant-size payloads
+    big = FakeSupabase(tables(50000), max_rows=ROW_CAP)
+    sizes = [(payload(d, 'zone_stats'), payload(d, 'daily_pnl', p_days=trade_aggregates.DAILY_PNL_DAYS)) for d in (db, big)]
+    check(abs(sizes[0][0] - sizes[1][0]) < 100 and abs(sizes[0][1] - sizes[1][1]) < 200,
+          f"zone_stats {sizes[0][0]} -> {sizes[1][0]} bytes, daily_pnl {sizes[0][1]} -> {sizes[1][1]} bytes for 5k -> 50k trades")
+
+    # 3. Fallback without the functions: paged reads
+    legacy = FakeSupabase(t, max_rows=ROW_CAP, functions={})
+    perf_df, overview, daily, data = dashboard(legacy)
+    check(matches(perf_df, overview, daily, want) and len(data.trades(True, SYMBOL)) == 5000,
+          f"No functions: {len(data.trades(True, SYMBOL))} rows paged in {ROW_CAP}s, same numbers ({legacy.calls} calls)")
+
+    # 4. Zones without trades
+    row = perf_df[perf_df['Zone Name'] == 'EMPTY'].iloc[0]
+    check(row['Invested (USDT)'] == 0 and row['Realized PnL (USDT)'] == 0 and row['Trade Count'] == 0,
+          f"Zone without trades: invested {row['Invested (USDT)']}, PnL {row['Realized PnL (USDT)']}, {row['Trade Count']} trades")
+
+
+if __name__ == "__main__":
+    main()
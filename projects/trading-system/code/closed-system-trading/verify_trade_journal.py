@@ -0,0 +1,113 @@
+"""
+Verifies the write-behind trade journal (trade_journal.py) and the position
+book's reads over it offline, on bench_fakes.FakeSupabase:
+  1. A reconcile whose Supabase read races a flush of a pending OPEN keeps the trade open.
+  2. A reconcile whose Supabase read races a flush of a pending CLOSE drops the trade.
+  3. A CLOSE that matches no row stays pending with last_error, is logged every UNMATCHED_LOG_EVERY
+     attempts, does not hold back later entries, and is flushed once the row is there.
+
+Usage: python verify_trade_journal.py
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import threading
+
+from bench_fakes import FakeSupabase
+from position_book import PositionBook
+from trade_journal import UNMATCHED_LOG_EVERY, TradeJournal
+
+SYMBOL = 'BTCUSDT'
+TABLE = 'paper_trade_log'
+OPEN_ROW = {'id': 1, 'symbol': SYMBOL, 'client_key': 'BTCUSDT-1-aaaaaa', 'zone_name': 'Z1',
+            'entry_price': 95000.0, 'quantity': 0.0002, 'total_usdt': 19.0, 'status': 'OPEN'}
+
+
+class RacingSupabase(FakeSupabase):
+    """Runs one journal flush right after the first select is read: between the book's Supabase and pending() reads."""
+
+    def __init__(self, tables):
+        super().__init__(tables)
+        self.journal = None
+        self.flusher = None
+
+    def _execute(self, q):
+        response = super()._execute(q)
+        if q.op == 'select' and self.journal and self.flusher is None:
+            self.flusher = threading.Thread(target=self.journal.flush_once)
+            self.flusher.start()
+            self.flusher.join(0.5)  # Returns at once without a barrier; times out behind one
+        return response
+
+
+def racing_book(root, name):
+    db = RacingSupabase({TABLE: [dict(OPEN_ROW)]})
+    journal = TradeJournal(db, path=os.path.join(root, f'{name}.db'))
+    book = PositionBook(db, TABLE, symbol=SYMBOL, journal=journal).load()
+    return db, journal, book
+
+
+def reconcile_during_flush(db, book):
+    db.journal = book.journal
+    book.reconcile()
+    db.flusher.join()
+    return {t['id'] for t in book.open_trades()}
+
+
+def check(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    return ok
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        # 1. OPEN flushed between the reads
+        db, journal, book = racing_book(root, 'open')
+        trade = book.open({'zone_name': 'Z1', 'entry_price': 94900.0, 'quantity': 0.0002, 'total_usdt': 18.98, 'status': 'OPEN'})
+        ids = reconcile_during_flush(db, book)
+        check(ids == {OPEN_ROW['client_key'], trade['id']} and journal.pending_count() == 0 and len(db.tables[TABLE]) == 2,
+              f"Reconcile racing an OPEN flush: {len(ids)} open trades in the book (expected 2), "
+              f"{len(db.tables[TABLE])} rows in Supabase, {journal.pending_count()} pending")
+
+        # 2. CLOSE flushed between the reads
+        db, journal, book = racing_book(root, 'close')
+        book.close(OPEN_ROW['client_key'], {'status': 'CLOSED', 'exit_price': 95200.0})
+        ids = reconcile_during_flush(db, book)
+        check(ids == set() and journal.pending_count() == 0 and db.tables[TABLE][0]['status'] == 'CLOSED',
+              f"Reconcile racing a CLOSE flush: {len(ids)} open trades in the book (expected 0), "
+              f"Supabase row {db.tables[TABLE][0]['status']}")
+
+        # 3. CLOSE that matches no row
+        db = FakeSupabase({TABLE: []})
+        journal = TradeJournal(db, path=os.path.join(root, 'unmatched.db'))
+        book = PositionBook(db, TABLE, symbol=SYMBOL, journal=journal).load()
+        flushed_rows = []
+        book.close(OPEN_ROW['client_key'], {'status': 'CLOSED', 'exit_price': 95200.0}, flushed_rows.append)
+        later = book.open({'zone_name': 'Z1', 'entry_price': 94900.0, 'quantity': 0.0002, 'total_usdt': 18.98, 'status': 'OPEN'})
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            for _ in range(UNMATCHED_LOG_EVERY):
+                journal._deferred.clear()  # Skip the backoff
+                while journal.flush_once():
+                    pass
+        kept = journal._conn.execute("select attempts, last_error from journal where flushed_at is null").fetchall()
+        logged = out.getvalue().count('matched no')
+        check(len(kept) == 1 and kept[0][0] == UNMATCHED_LOG_EVERY and kept[0][1] and logged == 1 and not flushed_rows
+              and [r['client_key'] for r in db.tables[TABLE]] == [later['id']],
+              f"Unmatched CLOSE: kept pending after {kept[0][0] if kept else 0} attempts ({kept[0][1] if kept else None!r}), "
+              f"logged {logged}x, the OPEN after it flushed")
+
+        db.tables[TABLE].append(dict(OPEN_ROW))
+        journal._deferred.clear()
+        while journal.flush_once():
+            pass
+        check(journal.pending_count() == 0 and db.tables[TABLE][-1]['status'] == 'CLOSED'
+              and [r['status'] for r in flushed_rows] == ['CLOSED'],
+              f"Unmatched CLOSE flushed once its row exists: Supabase row {db.tables[TABLE][-1]['status']}, "
+              f"{journal.pending_count()} pending")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Verifies user_stream.UserDataStream offline against a local WebSocket server
+that speaks the Binance user data stream format:
+  1. executionReports are aggregated per order, with the commission per asset.
+  2. order(wait=...) blocks until the order reaches a final status.
+  3. outboundAccountPosition events keep the balances current.
+  4. An expired listenKey is replaced and the stream reconnects (on_connect runs again).
+
+Usage: python verify_user_stream.py
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+import websockets
+
+from user_stream import UserDataStream
+
+PORT = 8766
+
+
+class FakeClient:
+    """listenKey endpoints of the Binance client."""
+
+    def __init__(self):
+        self.keys = 0
+
+    def stream_get_listen_key(self):
+        self.keys += 1
+        return f"key{self.keys}"
+
+    def stream_keepalive(self, listen_key):
+        pass
+
+
+def report(order_id, status, executed, quote, last_qty=0.0, commission=0.0, asset=None):
+    return {'e': 'executionReport', 'E': 0, 's': 'BTCUSDT', 'c': f"c{order_id}", 'S': 'BUY', 'o': 'LIMIT', 'f': 'GTC',
+            'q': '0.002', 'p': '90000.00', 'x': 'TRADE' if last_qty else status, 'X': status, 'i': order_id,
+            'l': str(last_qty), 'z': str(executed), 'L': '90000.00', 'n': str(commission), 'N': asset, 'T': 0, 't': 1,
+            'm': True, 'Z': str(quote)}
+
+
+class Server:
+    """First connection: two partial fills, then the listenKey expires. Second: the rest, late."""
+
+    def __init__(self):
+        self.paths = []
+        self.ready = threading.Event()
+
+    async def handler(self, ws):
+        self.paths.append(ws.request.path)
+        if len(self.paths) == 1:
+            await ws.send(json.dumps(report(1, 'PARTIALLY_FILLED', 0.001, 90.0, 0.001, 0.000001, 'BTC')))
+            await ws.send(json.dumps(report(1, 'FILLED', 0.002, 180.0, 0.001, 0.0002, 'BNB')))
+            await ws.send(json.dumps(report(2, 'NEW', 0.0, 0.0)))
+            await ws.send(json.dumps({'e': 'listenKeyExpired', 'E': 0, 'listenKey': 'key1'}))
+        else:
+            await asyncio.sleep(0.5)
+            await ws.send(json.dumps(report(2, 'CANCELED', 0.0, 0.0)))
+            await ws.send(json.dumps({'e': 'outboundAccountPosition', 'E': 0, 'u': 0,
+                                      'B': [{'a': 'BTC', 'f': '0.00199900', 'l': '0.00000000'}, {'a': 'USDT', 'f': '820.0', 'l': '0.0'}]}))
+        await asyncio.sleep(5)
+
+    def run(self):
+        async def main():
+            async with websockets.serve(self.handler, 'localhost', PORT):
+                self.ready.set()
+                await asyncio.sleep(30)
+        asyncio.run(main())
+
+
+def check(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    return ok
+
+
+def main():
+    server = Server()
+    threading.Thread(target=server.run, daemon=True).start()
+    server.ready.wait(5)
+
+    client = FakeClient()
+    stream = UserDataStream(client, ws_url=f"ws://localhost:{PORT}")
+    events, connects = [], []
+    stream.listeners.append(events.append)
+    stream.on_connect.append(lambda: connects.append(time.time()))
+    stream.start()
+
+    # 1. Aggregation (order 1 is done on the first connection)
+    order = stream.order(1, wait=5)
+    check(order and order['status'] == 'FILLED' and order['executed'] == 0.002 and order['quote'] == 180.0
+          and order['commissions'] == {'BTC': 0.000001, 'BNB': 0.0002},
+          f"Order 1: {order and order['status']}, {order and order['executed']} for {order and order['quote']}, commissions {order and order['commissions']}")
+
+    # 2. Waiting for a final status (order 2 is cancelled after the reconnect)
+    started = time.time()
+    order = stream.order(2, wait=10)
+    check(order and order['status'] == 'CANCELED', f"Order 2: waited {time.time() - started:.1f}s for {order and order['status']}")
+
+    # 3. Balances
+    deadline = time.time() + 5
+    while stream.balance('USDT') is None and time.time() < deadline:
+        time.sleep(0.05)
+    check(stream.balance('BTC') == (0.001999, 0.0) and stream.balance('USDT') == (820.0, 0.0),
+          f"Balances: BTC {stream.balance('BTC')}, USDT {stream.balance('USDT')}")
+
+    # 4. listenKey renewal
+    check(server.paths == ['/ws/key1', '/ws/key2'] and len(connects) == 2 and stream.reconnects == 1 and len(events) == 5,
+          f"listenKey expired: reconnected on {server.paths}, on_connect x{len(connects)}, {len(events)} events to listeners")
+    stream.stop()
+
+
+if __name__ == "__main__":
+    main()
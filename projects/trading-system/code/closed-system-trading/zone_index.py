@@ -0,0 +1,94 @@
+"""
+Zone Index
+==========
+Sorted-boundary index over zones_config rows, built once per zone set
+(i.e. whenever zones_config changes) instead of scanning and float-parsing
+every zone on each price check.
+
+All zone edges are sorted into one boundary list. For each boundary and for
+each open segment between two neighbouring boundaries the containing zones
+are precomputed, so:
+
+  - containing(P)   -> every zone with price_low <= P <= price_high  (bisect, O(log n))
+  - select(P)       -> the first of those in config order (same as strategy.select_zone)
+  - nearest_edge(P) -> distance to the closest zone edge              (bisect, O(log n))
+  - select_ids(prices) -> select() for a whole price array (NumPy, used by backtest.py)
+
+Overlapping zones are supported. Memory is O(boundaries x overlap depth),
+small for zone ladders where only neighbours overlap.
+"""
+
+import bisect
+from collections import namedtuple
+
+import numpy as np
+
+ZoneBounds = namedtuple('ZoneBounds', ['low', 'high'])
+
+
+class ZoneIndex:
+    def __init__(self, zones):
+        self.zones = tuple(zones)
+        self.bounds = [ZoneBounds(float(z['price_low']), float(z['price_high'])) for z in self.zones]
+        self.edges = sorted({b for zb in self.bounds for b in zb})
+
+        # at_edge[i]: zones containing edges[i]; between[i]: zones containing (edges[i], edges[i+1])
+        n = len(self.edges)
+        at_edge = [[] for _ in range(n)]
+        between = [[] for _ in range(max(n - 1, 0))]
+        for idx, (low, high) in enumerate(self.bounds):
+            if low > high:
+                continue
+            i = bisect.bisect_left(self.edges, low)
+            j = bisect.bisect_left(self.edges, high)
+            for k in range(i, j + 1):
+                at_edge[k].append(idx)
+            for k in range(i, j):
+                between[k].append(idx)
+        # Zone indices were appended in config order, so each list is already sorted
+        self._at_edge = [tuple(x) for x in at_edge]
+        self._between = [tuple(x) for x in between]
+
+    def __len__(self):
+        return len(self.zones)
+
+    def _ids(self, price):
+        i = bisect.bisect_left(self.edges, price)
+        if i < len(self.edges) and self.edges[i] == price:
+            return self._at_edge[i]
+        if i == 0 or i == len(self.edges):
+            return ()
+        return self._between[i - 1]
+
+    def containing(self, price):
+        """All zones containing `price`, in config order."""
+        return [self.zones[i] for i in self._ids(price)]
+
+    def select(self, price):
+        """First zone containing `price` (config order), or None."""
+        ids = self._ids(price)
+        return self.zones[ids[0]] if ids else None
+
+    def nearest_edge(self, price):
+        """(distance, edge_price) to the closest zone edge, or (None, None) if there are no zones."""
+        if not self.edges:
+            return None, None
+        i = bisect.bisect_left(self.edges, price)
+        candidates = self.edges[max(i - 1, 0):i + 1]
+        edge = min(candidates, key=lambda e: abs(e - price))
+        return abs(edge - price), edge
+
+    def select_ids(self, prices):
+        """Vectorized select(): position in `zones` of the zone chosen for each price (-1 = none)."""
+        prices = np.asarray(prices, dtype=float)
+        if not self.edges:
+            return np.full(len(prices), -1, dtype=np.int64)
+        edges = np.asarray(self.edges)
+        first_at = np.array([ids[0] if ids else -1 for ids in self._at_edge], dtype=np.int64)
+        first_between = np.array([ids[0] if ids else -1 for ids in self._between] + [-1], dtype=np.int64)
+
+        i = np.searchsorted(edges, prices, side='left')
+        on_edge = (i < len(edges)) & (edges[np.minimum(i, len(edges) - 1)] == prices)
+        inside = (i > 0) & (i < len(edges))
+        return np.where(on_edge, first_at[np.minimum(i, len(edges) - 1)],
+                        np.where(inside, first_between[np.maximum(i - 1, 0)], -1))